@@ -221,9 +221,9 @@ def create_app(config_name='default'):
                 folder_id = request.view_args.get('folder_id') if request.view_args else None
                 if folder_id:
                     from app.models.file import Folder
-                    folder = Folder.query.get(folder_id)
-                    if folder and folder.parent_id:
-                        return url_for('files.browse_folder', folder_id=folder.parent_id)
+                    parent_id = db.session.query(Folder.parent_id).filter(Folder.id == folder_id).scalar()
+                    if parent_id:
+                        return url_for('files.browse_folder', folder_id=parent_id)
                 return url_for('files.index')
             
             if endpoint.startswith('settings.admin_'):
@@ -467,6 +467,14 @@ def create_app(config_name='default'):
     app.register_blueprint(wiki_bp)
     app.register_blueprint(comments_bp)
     
+    # Speicherverbrauch bei jedem Flush fortschreiben
+    from app.utils.storage_usage import init_storage_usage
+    init_storage_usage()
+    
+    # Tägliche Ausleihzahlen (Inventar-Statistik) bei jedem Flush fortschreiben
+    from app.utils.inventory_stats import init_inventory_stats
+    init_inventory_stats()
+    
     @app.route('/manifest.json')
     def manifest():
         import json
@@ -496,6 +504,12 @@ def create_app(config_name='default'):
             db.create_all()
             print("[OK] Datenbank-Tabellen erfolgreich erstellt/aktualisiert")
             
+            from app.utils.file_search import ensure_search_index
+            ensure_search_index()
+            
+            from app.utils.product_search import ensure_product_search_index
+            ensure_product_search_index()
+            
             try:
                 from sqlalchemy import inspect
                 inspector = inspect(db.engine)
@@ -555,6 +569,66 @@ def create_app(config_name='default'):
                             print("[INFO] Bitte führen Sie manuell aus: python migrations/migrate_languages.py")
                     else:
                         print("[WARNUNG] Sprach-Migrationsdatei nicht gefunden. Bitte manuell ausführen: python migrations/migrate_languages.py")
+
+                # Spalten, die mit Version 2.3 zu bestehenden Tabellen hinzugekommen sind
+                required_2_3_columns = {
+                    'folders': ['tree_path', 'depth'],
+                    'file_versions': ['delta', 'base_version_number'],
+                    'wiki_page_versions': ['delta', 'base_version_number'],
+                    'chat_messages': ['media_size'],
+                    'products': ['length_meters'],
+                    'inventories': ['items_total', 'items_checked', 'event_seq'],
+                }
+                table_names = inspector.get_table_names()
+                missing_2_3 = [
+                    table for table, required in required_2_3_columns.items()
+                    if table in table_names and
+                    not set(required) <= {col['name'] for col in inspector.get_columns(table)}
+                ]
+                # Freigaben aus Versionen vor 2.3 fehlen noch im Token-Index `shares`
+                if not missing_2_3 and 'shares' in table_names:
+                    from app.models.file import File, Folder, Share
+                    if db.session.query(Share.id).first() is None and any(
+                        db.session.query(model.id).filter(model.share_token.isnot(None)).first()
+                        for model in (File, Folder)
+                    ):
+                        missing_2_3.append('shares')
+                # Datumsindizes der Ausleihen für die Inventar-Statistik
+                if not missing_2_3 and 'borrow_transactions' in table_names:
+                    borrow_indexes = {idx['name'] for idx in inspector.get_indexes('borrow_transactions')}
+                    if 'ix_borrow_transactions_borrow_date' not in borrow_indexes:
+                        missing_2_3.append('borrow_transactions')
+                if missing_2_3 and not os.getenv('RUNNING_MIGRATION_2_3'):
+                    print(f"[INFO] Führe Migration zu Version 2.3 aus ({', '.join(missing_2_3)})...")
+                    migrations_path = os.path.join(
+                        os.path.dirname(os.path.dirname(__file__)),
+                        'migrations',
+                        'migrate_to_2.3.0.py'
+                    )
+                    if os.path.exists(migrations_path):
+                        env = os.environ.copy()
+                        env.setdefault('RUNNING_MIGRATION_2_3', '1')
+                        env.setdefault('PRISMATEAMS_SKIP_BACKGROUND_JOBS', '1')
+                        try:
+                            result = subprocess.run(
+                                [sys.executable, migrations_path],
+                                capture_output=True,
+                                text=True,
+                                timeout=300,
+                                env=env
+                            )
+                            if result.returncode == 0:
+                                print("[OK] Migration zu Version 2.3 erfolgreich ausgeführt")
+                            else:
+                                print(f"[WARNUNG] Migration gab Fehler zurück: {result.stderr}")
+                                print("[INFO] Bitte führen Sie manuell aus: python migrations/migrate_to_2.3.0.py")
+                        except subprocess.TimeoutExpired:
+                            print("[WARNUNG] Migration dauerte zu lange. Bitte manuell ausführen.")
+                        except Exception as exc:
+                            print(f"[WARNUNG] Migration konnte nicht ausgeführt werden: {exc}")
+                            print("[INFO] Bitte führen Sie manuell aus: python migrations/migrate_to_2.3.0.py")
+                    else:
+                        print("[WARNUNG] Migrationsdatei nicht gefunden. Bitte manuell ausführen: python migrations/migrate_to_2.3.0.py")
             except Exception as migration_error:
                 print(f"[WARNUNG] Migration konnte nicht automatisch ausgeführt werden: {migration_error}")
                 print("[INFO] Bitte führen Sie manuell aus: python migrations/Migrate_to_1.5.2.py")
@@ -709,6 +783,27 @@ def create_app(config_name='default'):
         
         from app.tasks.notification_scheduler import start_notification_scheduler
         start_notification_scheduler(app)
+        
+        from app.tasks.blob_collector import start_blob_collector
+        start_blob_collector(app)
+        
+        from app.tasks.search_indexer import start_search_indexer
+        start_search_indexer(app)
+        
+        from app.tasks.onlyoffice_saver import start_onlyoffice_save_worker
+        start_onlyoffice_save_worker(app)
+        
+        from app.tasks.usage_reconciler import start_usage_reconciler
+        start_usage_reconciler(app)
+        
+        from app.tasks.inventory_stats_rollup import start_inventory_stats_rollup
+        start_inventory_stats_rollup(app)
+        
+        from app.tasks.backup_jobs import start_backup_worker
+        start_backup_worker(app)
+        
+        from app.tasks.pdf_jobs import start_pdf_job_worker
+        start_pdf_job_worker(app)
     
     from app.blueprints import canvas
     
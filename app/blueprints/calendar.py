@@ -1,11 +1,12 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, Response
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, Response, stream_with_context
 from flask_login import login_required, current_user
 from app import db
 from app.models.calendar import CalendarEvent, EventParticipant, PublicCalendarFeed
 from app.models.user import User
 from datetime import datetime, timedelta
 from dateutil.relativedelta import relativedelta
-from app.utils.ical import generate_ical_feed, import_events_from_ical
+from app.utils.ical import generate_ical_stream, ical_event_query, import_events_from_ical
+from app.utils.export_stream import stream_rows
 import secrets
 import calendar
 
@@ -611,25 +612,19 @@ def public_ical_feed(token):
     
     # Hole alle Events für den Feed
     if feed.include_all_events:
-        events = CalendarEvent.query.filter(
-            CalendarEvent.is_recurring_instance == False
-        ).order_by(CalendarEvent.start_time).all()
+        events = stream_rows(ical_event_query())
     else:
         # Hier könnte man später spezifische Events filtern
-        events = CalendarEvent.query.filter(
-            CalendarEvent.is_recurring_instance == False
-        ).order_by(CalendarEvent.start_time).all()
+        events = stream_rows(ical_event_query())
     
     # Aktualisiere last_synced
     feed.last_synced = datetime.utcnow()
-    db.session.commit()
-    
-    # Generiere iCal-String
     feed_name = feed.name or 'Kalender'
-    ical_string = generate_ical_feed(events, feed_name)
+    db.session.commit()
     
+    # iCal-Feed wird Event für Event gestreamt
     return Response(
-        ical_string,
+        stream_with_context(generate_ical_stream(events, feed_name)),
         mimetype='text/calendar',
         headers={
             'Content-Disposition': f'attachment; filename="{feed_name}.ics"',
@@ -709,15 +704,11 @@ def delete_feed(feed_id):
 @login_required
 def export_calendar():
     """Exportiert alle Events des Benutzers als iCal-Datei."""
-    # Hole alle Events
-    events = CalendarEvent.query.filter(
-        CalendarEvent.is_recurring_instance == False
-    ).order_by(CalendarEvent.start_time).all()
-    
-    ical_string = generate_ical_feed(events, 'Mein Kalender')
+    # Hole alle Events (werden Event für Event gestreamt)
+    events = stream_rows(ical_event_query())
     
     return Response(
-        ical_string,
+        stream_with_context(generate_ical_stream(events, 'Mein Kalender')),
         mimetype='text/calendar',
         headers={
             'Content-Disposition': 'attachment; filename="kalender.ics"',
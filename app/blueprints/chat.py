@@ -1,12 +1,13 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, send_from_directory, current_app
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from flask_login import login_required, current_user
 from app import db
 from app.models.chat import Chat, ChatMessage, ChatMember
 from app.models.user import User
 from app.utils.notifications import send_chat_notification
+from app.utils.storage_usage import enforce_upload_quota
+from app.utils.storage import get_storage, save_upload, safe_key, send_storage_object, delete_stored_file
 from datetime import datetime
 from werkzeug.utils import secure_filename
-import os
 
 chat_bp = Blueprint('chat', __name__)
 
@@ -94,6 +95,7 @@ def view_chat(chat_id):
 
 @chat_bp.route('/<int:chat_id>/send', methods=['POST'])
 @login_required
+@enforce_upload_quota
 def send_message(chat_id):
     """Send a message in a chat."""
     # Special handling: If chat_id is 1, use the actual main chat ID
@@ -122,6 +124,7 @@ def send_message(chat_id):
     
     message_type = 'text'
     media_url = None
+    media_size = None
     
     # Handle file upload
     if file and allowed_file(file.filename):
@@ -129,14 +132,11 @@ def send_message(chat_id):
         timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
         filename = f"{timestamp}_{filename}"
         
-        # Use absolute path with UPLOAD_FOLDER config
-        project_root = os.path.dirname(current_app.root_path)
-        upload_dir = os.path.join(project_root, current_app.config['UPLOAD_FOLDER'], 'chat')
-        os.makedirs(upload_dir, exist_ok=True)
-        filepath = os.path.join(upload_dir, filename)
-        file.save(filepath)
+        key = save_upload(file, 'chat', filename)
+        media_size = get_storage().size(key)
         
         # Store only the filename for URL generation
+        filename = key.rsplit('/', 1)[-1]
         media_url = filename
         
         # Determine message type based on file extension
@@ -157,7 +157,8 @@ def send_message(chat_id):
         sender_id=current_user.id,
         content=content,
         message_type=message_type,
-        media_url=media_url
+        media_url=media_url,
+        media_size=media_size
     )
     
     db.session.add(message)
@@ -336,19 +337,12 @@ def direct_message(user_id):
 def serve_media(filename):
     """Serve uploaded chat media files (images, videos, audio)."""
     try:
-        project_root = os.path.dirname(current_app.root_path)
-        # Handle avatars in subdirectory
-        if filename.startswith('avatars/'):
-            directory = os.path.join(project_root, current_app.config['UPLOAD_FOLDER'], 'chat', 'avatars')
-            filename = filename.replace('avatars/', '', 1)
-        else:
-            directory = os.path.join(project_root, current_app.config['UPLOAD_FOLDER'], 'chat')
-        full_path = os.path.join(directory, filename)
-        
-        if not os.path.isfile(full_path):
+        # Handle avatars in subdirectory (chat/avatars/<name>)
+        key = safe_key('chat', filename)
+        if not key or not get_storage().exists(key):
             return jsonify({'error': 'File not found'}), 404
         
-        return send_from_directory(directory, filename)
+        return send_storage_object(key)
     except FileNotFoundError:
         return jsonify({'error': 'File not found'}), 404
     except Exception as e:
@@ -400,48 +394,20 @@ def update_chat(chat_id):
         if avatar_file and avatar_file.filename and allowed_file(avatar_file.filename):
             # Delete old avatar if exists
             if chat.group_avatar:
-                project_root = os.path.dirname(current_app.root_path)
-                old_avatar_path = os.path.join(
-                    project_root, 
-                    current_app.config['UPLOAD_FOLDER'], 
-                    'chat', 
-                    'avatars', 
-                    chat.group_avatar
-                )
-                if os.path.exists(old_avatar_path):
-                    try:
-                        os.remove(old_avatar_path)
-                    except:
-                        pass
+                delete_stored_file(chat.group_avatar, 'chat/avatars')
             
             # Save new avatar
             filename = secure_filename(avatar_file.filename)
             timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
             filename = f"{timestamp}_{filename}"
             
-            project_root = os.path.dirname(current_app.root_path)
-            avatar_dir = os.path.join(project_root, current_app.config['UPLOAD_FOLDER'], 'chat', 'avatars')
-            os.makedirs(avatar_dir, exist_ok=True)
-            filepath = os.path.join(avatar_dir, filename)
-            avatar_file.save(filepath)
-            chat.group_avatar = filename
+            key = save_upload(avatar_file, 'chat/avatars', filename)
+            chat.group_avatar = key.rsplit('/', 1)[-1]
     
     # Handle avatar removal
     if 'remove_avatar' in request.form and request.form.get('remove_avatar') == '1':
         if chat.group_avatar:
-            project_root = os.path.dirname(current_app.root_path)
-            avatar_path = os.path.join(
-                project_root, 
-                current_app.config['UPLOAD_FOLDER'], 
-                'chat', 
-                'avatars', 
-                chat.group_avatar
-            )
-            if os.path.exists(avatar_path):
-                try:
-                    os.remove(avatar_path)
-                except:
-                    pass
+            delete_stored_file(chat.group_avatar, 'chat/avatars')
             chat.group_avatar = None
     
     chat.updated_at = datetime.utcnow()
@@ -1,4 +1,4 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, current_app, send_file, Response
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, current_app, send_file
 from flask_login import login_required, current_user
 from flask_socketio import join_room
 from uuid import uuid4
@@ -6,6 +6,7 @@ from app import db, mail, socketio
 from app.models.email import EmailMessage, EmailPermission, EmailAttachment, EmailFolder
 from app.models.settings import SystemSettings
 from app.utils.notifications import send_email_notification
+from app.utils.storage import path_for_key, read_stored_file, save_upload, send_stored_file, stored_file_exists
 from flask_mail import Message
 from datetime import datetime, timedelta
 from html import unescape
@@ -611,18 +612,11 @@ def sync_emails_from_folder(folder_name):
                                         logging.info(f"Attachment '{filename}': {attachment_size / (1024*1024):.2f} MB, max_db_size: {max_db_size / (1024*1024):.2f} MB, will store on: {'disk' if attachment_size > max_db_size else 'database'}")
                                         
                                         if attachment_size > max_db_size:
-                                            import os
-                                            
-                                            attachments_dir = os.path.join(current_app.config['UPLOAD_FOLDER'], 'attachments')
-                                            os.makedirs(attachments_dir, exist_ok=True)
-                                            
                                             timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
                                             safe_filename = "".join(c for c in filename if c.isalnum() or c in '._- ')
-                                            file_path = os.path.join(attachments_dir, f"{timestamp}_{safe_filename}")
                                             
                                             try:
-                                                with open(file_path, 'wb') as f:
-                                                    f.write(payload)
+                                                file_path = path_for_key(save_upload(payload, 'attachments', f"{timestamp}_{safe_filename}"))
                                                 logging.info(f"Large attachment saved to disk: {file_path}")
                                                 
                                                 attachments_data.append({
@@ -1328,23 +1322,9 @@ def download_attachment(attachment_id):
             logging.info(f"Downloading large attachment: '{attachment.filename}' ({attachment.size / (1024*1024):.2f} MB)")
         
         if attachment.is_large_file and attachment.file_path:
-            import os
-            if os.path.exists(attachment.file_path):
-                def generate():
-                    with open(attachment.file_path, 'rb') as f:
-                        while True:
-                            data = f.read(8192)
-                            if not data:
-                                break
-                            yield data
-                
-                response = Response(generate(), mimetype=attachment.content_type)
-                import urllib.parse
-                encoded_filename = urllib.parse.quote(attachment.filename.encode('utf-8'))
-                response.headers['Content-Disposition'] = f'attachment; filename*=UTF-8\'\'{encoded_filename}'
-                response.headers['Content-Length'] = str(attachment.size)
-                response.headers['Accept-Ranges'] = 'bytes'
-                return response
+            if stored_file_exists(attachment.file_path, 'attachments'):
+                return send_stored_file(attachment.file_path, 'attachments', download_name=attachment.filename,
+                                        mimetype=attachment.content_type, as_attachment=True)
             else:
                 flash('Anhang-Datei nicht gefunden.', 'danger')
                 return redirect(url_for('email.view_email', email_id=email_msg.id))
@@ -1454,8 +1434,7 @@ def compose():
                         if not att:
                             continue
                         if att.is_large_file and att.file_path:
-                            with open(att.file_path, 'rb') as f:
-                                data = f.read()
+                            data = read_stored_file(att.file_path, 'attachments')
                             msg.attach(att.filename, att.content_type or 'application/octet-stream', data)
                         else:
                             data = att.get_content()
@@ -1,19 +1,38 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, send_file, jsonify, current_app, session
+from flask import Blueprint, render_template, request, redirect, url_for, flash, send_file, jsonify, current_app, session, abort
 from flask_login import login_required, current_user
 from app.utils.i18n import get_current_language
 from app import db
 from app.models.file import File, FileVersion, Folder
 from app.models.user import User
 from app.models.settings import SystemSettings
-from app.utils.notifications import send_file_notification
+from app.utils.notifications import send_file_notification, send_files_uploaded_notification
+from app.utils.blob_gc import mark_blob_unreferenced
+from app.utils.file_search import search_files, remove_files_from_index
+from app.utils.storage import (
+    get_storage, path_for_key, save_upload, send_stored_file, stored_file_exists, read_stored_file
+)
+from app.utils.storage_usage import (
+    enforce_upload_quota, track_bulk_file_delete, track_bulk_file_insert, track_folder_move,
+    upload_quota_response
+)
+from app.utils.share_index import resolve_share, save_share, remove_share, remove_shares_for
+from app.utils.preview_cache import (
+    get_rendered_markdown, render_markdown_preview, read_text_page, get_max_render_size, invalidate_file_preview
+)
+from app.utils.version_storage import (
+    create_file_version, prune_file_versions, get_file_version_bytes, invalidate_version_cache
+)
+from app.tasks.search_indexer import enqueue_file_index
+from app.tasks.onlyoffice_saver import SaveJob, submit_onlyoffice_save
 from werkzeug.utils import secure_filename
 from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy import or_
 from datetime import datetime
+import io
 import os
 import shutil
 import logging
 import secrets
-import requests
 
 files_bp = Blueprint('files', __name__)
 
@@ -67,12 +86,7 @@ def browse_folder(folder_id):
     # Build breadcrumbs starting from root to current folder
     breadcrumb_folders = []
     if current_folder:
-        ancestors = []
-        node = current_folder
-        while node:
-            ancestors.append(node)
-            node = node.parent
-        ancestors.reverse()
+        ancestors = current_folder.ancestors
         breadcrumb_folders = [
             {
                 'id': folder.id,
@@ -104,6 +118,61 @@ def browse_folder(folder_id):
     )
 
 
+@files_bp.route('/search')
+@login_required
+def search():
+    """Volltextsuche über Dateinamen, Ordnerpfade und Dateiinhalte."""
+    query = request.args.get('q', '').strip()
+    folder_id = request.args.get('folder_id', type=int)
+    scope_folder = Folder.query.get_or_404(folder_id) if folder_id else None
+    
+    results = []
+    if query:
+        results = search_files(
+            query,
+            folder_ids=scope_folder.subtree_ids() if scope_folder else None
+        )
+    
+    return render_template(
+        'files/search.html',
+        query=query,
+        scope_folder=scope_folder,
+        results=results
+    )
+
+
+@files_bp.route('/api/search')
+@login_required
+def api_search():
+    """JSON-Variante der Volltextsuche (z.B. für Live-Suche)."""
+    query = request.args.get('q', '').strip()
+    folder_id = request.args.get('folder_id', type=int)
+    limit = min(request.args.get('limit', 20, type=int), 100)
+    scope_folder = Folder.query.get_or_404(folder_id) if folder_id else None
+    
+    results = search_files(
+        query,
+        folder_ids=scope_folder.subtree_ids() if scope_folder else None,
+        limit=limit
+    ) if query else []
+    
+    return jsonify({
+        'query': query,
+        'results': [
+            {
+                'id': result['file'].id,
+                'name': result['file'].name,
+                'folder_id': result['file'].folder_id,
+                'folder_path': result['folder_path'],
+                'snippet': result['snippet'],
+                'score': result['score'],
+                'url': url_for('files.view_file', file_id=result['file'].id),
+            }
+            for result in results
+        ]
+    })
+
+
 @files_bp.route('/create-folder', methods=['POST'])
 @login_required
 def create_folder():
@@ -150,6 +219,7 @@ def rename_file(file_id):
     
     file.name = new_name
     db.session.commit()
+    enqueue_file_index([file.id], refresh_content=False)
     flash('Datei wurde umbenannt.', 'success')
     
     if file.folder_id:
@@ -174,12 +244,48 @@ def rename_folder(folder_id):
     
     folder.name = new_name
     db.session.commit()
+    _reindex_folder_paths(folder)
     flash('Ordner wurde umbenannt.', 'success')
     
     if folder.parent_id:
         return redirect(url_for('files.browse_folder', folder_id=folder.parent_id))
     return redirect(url_for('files.index'))
 
+
+def _reindex_folder_paths(folder):
+    """Aktualisiert den Ordnerpfad im Suchindex für alle Dateien unterhalb eines Ordners."""
+    file_ids = [row[0] for row in db.session.query(File.id).filter(
+        File.folder_id.in_(folder.subtree_ids()),
+        File.is_current == True
+    ).all()]
+    enqueue_file_index(file_ids, refresh_content=False)
+
+
+@files_bp.route('/folder/<int:folder_id>/move', methods=['POST'])
+@login_required
+def move_folder(folder_id):
+    """Verschiebt einen Ordner (inkl. Unterordner) in einen anderen Ordner."""
+    folder = Folder.query.get_or_404(folder_id)
+    target_id = request.form.get('target_folder_id')
+    target = Folder.query.get_or_404(int(target_id)) if target_id else None
+    
+    old_top_key = folder.ancestor_ids[0] if folder.ancestor_ids else folder.id
+    try:
+        folder.move_to(target)
+    except ValueError as e:
+        flash(str(e), 'danger')
+        return redirect(request.referrer or url_for('files.index'))
+    
+    track_folder_move(folder, str(old_top_key))
+    db.session.commit()
+    _reindex_folder_paths(folder)
+    flash('Ordner wurde verschoben.', 'success')
+    
+    if target:
+        return redirect(url_for('files.browse_folder', folder_id=target.id))
+    return redirect(url_for('files.index'))
+
+
 @files_bp.route('/create-file', methods=['POST'])
 @login_required
 def create_file():
@@ -214,31 +320,25 @@ def create_file():
     # Create file
     timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
     stored_filename = f"{timestamp}_{filename}"
-    filepath = os.path.join('uploads', 'files', stored_filename)
-    
-    # Ensure directory exists
-    os.makedirs(os.path.dirname(filepath), exist_ok=True)
     
     # Write content to file
-    with open(filepath, 'w', encoding='utf-8') as f:
-        f.write(content)
-    
-    # Store absolute path in database
-    absolute_filepath = os.path.abspath(filepath)
+    data = content.encode('utf-8')
+    key = save_upload(data, 'files', stored_filename)
     
     new_file = File(
         name=filename,
         original_name=filename,
         folder_id=folder_id,
         uploaded_by=current_user.id,
-        file_path=absolute_filepath,
-        file_size=os.path.getsize(absolute_filepath),
+        file_path=path_for_key(key),
+        file_size=len(data),
         mime_type='text/plain' if file_type == 'txt' else 'text/markdown',
         version_number=1,
         is_current=True
     )
     db.session.add(new_file)
     db.session.commit()
+    enqueue_file_index([new_file.id])
     
     flash(f'Datei "{filename}" wurde erstellt.', 'success')
     
@@ -283,26 +383,23 @@ def create_office_file():
     # Create empty Office file
     timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
     stored_filename = f"{timestamp}_{filename}"
-    filepath = os.path.join('uploads', 'files', stored_filename)
-    
-    # Ensure directory exists
-    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    buffer = io.BytesIO()
     
     try:
         if file_type == 'docx':
             from docx import Document
             doc = Document()
-            doc.save(filepath)
+            doc.save(buffer)
             mime_type = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
         elif file_type == 'xlsx':
             from openpyxl import Workbook
             wb = Workbook()
-            wb.save(filepath)
+            wb.save(buffer)
             mime_type = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
         elif file_type == 'pptx':
             from pptx import Presentation
             prs = Presentation()
-            prs.save(filepath)
+            prs.save(buffer)
             mime_type = 'application/vnd.openxmlformats-officedocument.presentationml.presentation'
     except ImportError as e:
         flash(f'Fehler: Erforderliche Bibliothek nicht installiert. Bitte installieren Sie python-docx, openpyxl und python-pptx.', 'danger')
@@ -312,22 +409,23 @@ def create_office_file():
         flash(f'Fehler beim Erstellen der Datei: {str(e)}', 'danger')
         return redirect(request.referrer or url_for('files.index'))
     
-    # Store absolute path in database
-    absolute_filepath = os.path.abspath(filepath)
+    content = buffer.getvalue()
+    key = save_upload(content, 'files', stored_filename)
     
     new_file = File(
         name=filename,
         original_name=filename,
         folder_id=folder_id,
         uploaded_by=current_user.id,
-        file_path=absolute_filepath,
-        file_size=os.path.getsize(absolute_filepath),
+        file_path=path_for_key(key),
+        file_size=len(content),
         mime_type=mime_type,
         version_number=1,
         is_current=True
     )
     db.session.add(new_file)
     db.session.commit()
+    enqueue_file_index([new_file.id])
     
     flash(f'Datei "{filename}" wurde erstellt.', 'success')
     
@@ -338,6 +436,7 @@ def create_office_file():
 
 @files_bp.route('/upload', methods=['POST'])
 @login_required
+@enforce_upload_quota
 def upload_file():
     """Upload a file or folder."""
     folder_id = request.form.get('folder_id')
@@ -353,6 +452,8 @@ def upload_file():
             skipped_count = 0
             skipped_files = []
             
+            # Verzeichnisstruktur einmalig bestimmen und im Speicher auflösen
+            accepted = []
             for file in folder_files:
                 if not file.filename:
                     continue
@@ -369,62 +470,43 @@ def upload_file():
                 
                 # Process file path to maintain folder structure
                 file_path_parts = file.filename.replace('\\', '/').split('/')
-                file_name = secure_filename(file_path_parts[-1])
-                
-                # Determine target folder - create subfolders if needed
-                target_folder_id = folder_id
-                if len(file_path_parts) > 1:
-                    # Create folder structure
-                    current_parent_id = folder_id
-                    for folder_name in file_path_parts[:-1]:
-                        folder_name_clean = secure_filename(folder_name)
-                        if not folder_name_clean:
-                            continue
-                        
-                        # Check if folder exists
-                        existing_folder = Folder.query.filter_by(
-                            name=folder_name_clean,
-                            parent_id=current_parent_id
-                        ).first()
-                        
-                        if not existing_folder:
-                            # Create new folder
-                            new_folder = Folder(
-                                name=folder_name_clean,
-                                parent_id=current_parent_id,
-                                created_by=current_user.id
-                            )
-                            db.session.add(new_folder)
-                            db.session.flush()  # Get the ID
-                            current_parent_id = new_folder.id
-                        else:
-                            current_parent_id = existing_folder.id
-                    
-                    target_folder_id = current_parent_id
-                
-                # Process file upload
+                dir_path = tuple(
+                    name for name in (secure_filename(part) for part in file_path_parts[:-1]) if name
+                )
+                accepted.append((file, secure_filename(file_path_parts[-1]), dir_path))
+            
+            folder_ids = _resolve_upload_folders(
+                folder_id,
+                {dir_path for _, _, dir_path in accepted},
+                current_user.id
+            )
+            
+            # Dateien speichern und gesammelt einfügen
+            file_rows = []
+            for file, file_name, dir_path in accepted:
                 try:
-                    _process_file_upload(file, file_name, target_folder_id, current_user.id)
+                    file_rows.append(_store_file_upload(file, file_name, folder_ids[dir_path], current_user.id))
                     uploaded_count += 1
                 except Exception as e:
                     logging.error(f"Fehler beim Hochladen von {file_name}: {e}")
                     skipped_count += 1
                     skipped_files.append(file_name)
             
+            if file_rows:
+                db.session.bulk_insert_mappings(File, file_rows)
+                track_bulk_file_insert(file_rows)
             db.session.commit()
             
-            # Send notifications for uploaded files
+            if file_rows:
+                new_ids = db.session.query(File.id).filter(
+                    File.file_path.in_([row['file_path'] for row in file_rows])
+                ).all()
+                enqueue_file_index(row[0] for row in new_ids)
+            
+            # Eine zusammengefasste Benachrichtigung pro Empfänger
             if uploaded_count > 0:
                 try:
-                    # Get recently uploaded files to send notifications
-                    recent_files = File.query.filter_by(
-                        uploaded_by=current_user.id
-                    ).order_by(File.created_at.desc()).limit(uploaded_count).all()
-                    for f in recent_files:
-                        try:
-                            send_file_notification(f.id, 'new')
-                        except Exception as e:
-                            logging.error(f"Fehler beim Senden der Datei-Benachrichtigung: {e}")
+                    send_files_uploaded_notification(uploaded_count, folder_id, current_user.id)
                 except Exception as e:
                     logging.error(f"Fehler beim Senden von Benachrichtigungen: {e}")
             
@@ -482,42 +564,22 @@ def upload_file():
         version_number = existing_file.version_number + 1
         
         # Save old version to version history
-        old_version = FileVersion(
-            file_id=existing_file.id,
-            version_number=existing_file.version_number,
-            file_path=os.path.abspath(existing_file.file_path),
-            file_size=existing_file.file_size,
-            uploaded_by=existing_file.uploaded_by
-        )
-        db.session.add(old_version)
-        
-        # Delete oldest version if we have more than MAX_FILE_VERSIONS
-        versions = FileVersion.query.filter_by(file_id=existing_file.id).order_by(
-            FileVersion.version_number.desc()
-        ).all()
-        
-        if len(versions) >= MAX_FILE_VERSIONS:
-            oldest = versions[-1]
-            if os.path.exists(oldest.file_path):
-                os.remove(oldest.file_path)
-            db.session.delete(oldest)
+        create_file_version(existing_file)
+        prune_file_versions(existing_file.id, MAX_FILE_VERSIONS)
         
         # Update existing file
         timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
-        filename = f"{timestamp}_{original_name}"
-        filepath = os.path.join('uploads', 'files', filename)
-        file.save(filepath)
-        
-        # Store absolute path in database
-        absolute_filepath = os.path.abspath(filepath)
+        key = save_upload(file, 'files', f"{timestamp}_{original_name}")
         
-        existing_file.file_path = absolute_filepath
-        existing_file.file_size = os.path.getsize(absolute_filepath)
+        existing_file.file_path = path_for_key(key)
+        existing_file.file_size = get_storage().size(key)
         existing_file.version_number = version_number
         existing_file.uploaded_by = current_user.id
         existing_file.updated_at = datetime.utcnow()
         
         db.session.commit()
+        enqueue_file_index([existing_file.id])
+        invalidate_file_preview([existing_file.id])
         
         # Sende Benachrichtigung für geänderte Datei
         try:
@@ -528,21 +590,15 @@ def upload_file():
         flash(f'Datei "{original_name}" wurde aktualisiert (Version {version_number}).', 'success')
     else:
         # Create new file
-        _process_file_upload(file, original_name, folder_id, current_user.id)
+        new_file = _process_file_upload(file, original_name, folder_id, current_user.id)
         db.session.commit()
+        enqueue_file_index([new_file.id])
         
         # Sende Benachrichtigung für neue Datei
-        new_file = File.query.filter_by(
-            name=original_name,
-            folder_id=folder_id,
-            uploaded_by=current_user.id
-        ).order_by(File.created_at.desc()).first()
-        
-        if new_file:
-            try:
-                send_file_notification(new_file.id, 'new')
-            except Exception as e:
-                logging.error(f"Fehler beim Senden der Datei-Benachrichtigung: {e}")
+        try:
+            send_file_notification(new_file.id, 'new')
+        except Exception as e:
+            logging.error(f"Fehler beim Senden der Datei-Benachrichtigung: {e}")
         
         flash(f'Datei "{original_name}" wurde hochgeladen.', 'success')
     
@@ -551,32 +607,76 @@ def upload_file():
     return redirect(url_for('files.index'))
 
 
-def _process_file_upload(file, original_name, folder_id, user_id):
-    """Helper function to process a single file upload."""
+def _store_file_upload(file, original_name, folder_id, user_id):
+    """Speichert eine hochgeladene Datei und gibt die Spaltenwerte für `File` zurück."""
     timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
-    filename = f"{timestamp}_{original_name}"
-    filepath = os.path.join('uploads', 'files', filename)
     
-    # Ensure directory exists
-    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    # Gleichnamige Dateien aus verschiedenen Unterordnern nicht überschreiben (eindeutiger Schlüssel)
+    key = save_upload(file, 'files', f"{timestamp}_{original_name}")
+    
+    return {
+        'name': original_name,
+        'original_name': original_name,
+        'folder_id': folder_id,
+        'uploaded_by': user_id,
+        'file_path': path_for_key(key),
+        'file_size': get_storage().size(key),
+        'mime_type': file.content_type,
+        'version_number': 1,
+        'is_current': True
+    }
+
+
+def _process_file_upload(file, original_name, folder_id, user_id):
+    """Helper function to process a single file upload."""
+    new_file = File(**_store_file_upload(file, original_name, folder_id, user_id))
+    db.session.add(new_file)
+    return new_file
+
+
+def _resolve_upload_folders(base_folder_id, dir_paths, user_id):
+    """Löst die Verzeichnispfade eines Ordner-Uploads in Folder-IDs auf.
     
-    file.save(filepath)
+    Pro Verzeichnisebene genügen eine Abfrage und ein Flush – unabhängig davon,
+    wie viele Dateien in den Verzeichnissen liegen. Gibt {Pfad-Tupel: folder_id}
+    zurück, wobei das leere Tupel für den Zielordner selbst steht.
+    """
+    resolved = {(): base_folder_id}
+    prefixes = {path[:i] for path in dir_paths for i in range(1, len(path) + 1)}
+    max_depth = max((len(path) for path in prefixes), default=0)
     
-    # Store absolute path in database
-    absolute_filepath = os.path.abspath(filepath)
+    for level in range(1, max_depth + 1):
+        level_paths = sorted(path for path in prefixes if len(path) == level)
+        parent_ids = {resolved[path[:-1]] for path in level_paths}
+        
+        parent_filters = []
+        if None in parent_ids:
+            parent_filters.append(Folder.parent_id.is_(None))
+        if parent_ids - {None}:
+            parent_filters.append(Folder.parent_id.in_(parent_ids - {None}))
+        
+        existing = {}
+        for row in db.session.query(Folder.id, Folder.parent_id, Folder.name).filter(
+            Folder.name.in_({path[-1] for path in level_paths}),
+            or_(*parent_filters)
+        ).order_by(Folder.id.desc()).all():
+            existing[(row.parent_id, row.name)] = row.id
+        
+        created = {}
+        for path in level_paths:
+            key = (resolved[path[:-1]], path[-1])
+            if key in existing:
+                resolved[path] = existing[key]
+            else:
+                created[path] = Folder(name=path[-1], parent_id=key[0], created_by=user_id)
+                db.session.add(created[path])
+        
+        if created:
+            db.session.flush()
+            for path, folder in created.items():
+                resolved[path] = folder.id
     
-    new_file = File(
-        name=original_name,
-        original_name=original_name,
-        folder_id=folder_id,
-        uploaded_by=user_id,
-        file_path=absolute_filepath,
-        file_size=os.path.getsize(absolute_filepath),
-        mime_type=file.content_type,
-        version_number=1,
-        is_current=True
-    )
-    db.session.add(new_file)
+    return resolved
 
 
 @files_bp.route('/download/<int:file_id>')
@@ -585,14 +685,8 @@ def download_file(file_id):
     """Download a file."""
     file = File.query.get_or_404(file_id)
     
-    # Ensure we have an absolute path
-    if not os.path.isabs(file.file_path):
-        file_path = os.path.join(os.getcwd(), file.file_path)
-    else:
-        file_path = file.file_path
-    
     # Check if file exists
-    if not os.path.exists(file_path):
+    if not stored_file_exists(file.file_path):
         flash(f'Datei "{file.original_name}" wurde nicht gefunden.', 'danger')
         return redirect(url_for('files.index'))
     
@@ -615,8 +709,8 @@ def download_file(file_id):
     else:
         mimetype = 'application/octet-stream'
     
-    return send_file(
-        file_path, 
+    return send_stored_file(
+        file.file_path,
         as_attachment=True, 
         download_name=file.original_name,
         mimetype=mimetype
@@ -630,14 +724,17 @@ def download_version(version_id):
     version = FileVersion.query.get_or_404(version_id)
     file = File.query.get_or_404(version.file_id)
     
-    # Ensure we have an absolute path
-    if not os.path.isabs(version.file_path):
-        file_path = os.path.join(os.getcwd(), version.file_path)
-    else:
-        file_path = version.file_path
-    
-    # Check if file exists
-    if not os.path.exists(file_path):
+    version_content = None
+    if version.delta is not None:
+        # Delta-gespeicherte Textversion aus der Versionskette rekonstruieren
+        try:
+            version_content = io.BytesIO(get_file_version_bytes(version))
+        except ValueError as e:
+            logging.error(f"Datei-Version {version.id} konnte nicht rekonstruiert werden: {e}")
+            flash(f'Datei-Version "{file.original_name} v{version.version_number}" wurde nicht gefunden.', 'danger')
+            return redirect(url_for('files.index'))
+    elif not stored_file_exists(version.file_path):
+        # Check if file exists
         flash(f'Datei-Version "{file.original_name} v{version.version_number}" wurde nicht gefunden.', 'danger')
         return redirect(url_for('files.index'))
     
@@ -665,8 +762,15 @@ def download_version(version_id):
     file_ext = os.path.splitext(file.original_name)[1]
     versioned_filename = f"{name_without_ext}_v{version.version_number}{file_ext}"
     
-    return send_file(
-        file_path, 
+    if version_content is not None:
+        return send_file(
+            version_content, 
+            as_attachment=True, 
+            download_name=versioned_filename,
+            mimetype=mimetype
+        )
+    return send_stored_file(
+        version.file_path,
         as_attachment=True, 
         download_name=versioned_filename,
         mimetype=mimetype
@@ -694,44 +798,23 @@ def edit_file(file_id):
         content = request.form.get('content', '')
         
         # Save current version to history
-        version = FileVersion(
-            file_id=file.id,
-            version_number=file.version_number,
-            file_path=os.path.abspath(file.file_path),
-            file_size=file.file_size,
-            uploaded_by=file.uploaded_by
-        )
-        db.session.add(version)
-        
-        # Delete oldest version if needed
-        versions = FileVersion.query.filter_by(file_id=file.id).order_by(
-            FileVersion.version_number.desc()
-        ).all()
-        
-        if len(versions) >= MAX_FILE_VERSIONS:
-            oldest = versions[-1]
-            if os.path.exists(oldest.file_path):
-                os.remove(oldest.file_path)
-            db.session.delete(oldest)
+        create_file_version(file)
+        prune_file_versions(file.id, MAX_FILE_VERSIONS)
         
         # Save new version
         timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
-        filename = f"{timestamp}_{file.original_name}"
-        filepath = os.path.join('uploads', 'files', filename)
-        
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(content)
+        data = content.encode('utf-8')
+        key = save_upload(data, 'files', f"{timestamp}_{file.original_name}")
         
-        # Store absolute path in database
-        absolute_filepath = os.path.abspath(filepath)
-        
-        file.file_path = absolute_filepath
-        file.file_size = os.path.getsize(absolute_filepath)
+        file.file_path = path_for_key(key)
+        file.file_size = len(data)
         file.version_number += 1
         file.uploaded_by = current_user.id
         file.updated_at = datetime.utcnow()
         
         db.session.commit()
+        enqueue_file_index([file.id])
+        invalidate_file_preview([file.id])
         
         flash('Datei wurde gespeichert.', 'success')
         if file.folder_id:
@@ -741,14 +824,7 @@ def edit_file(file_id):
     
     # Read file content
     try:
-        # Ensure we have an absolute path
-        if not os.path.isabs(file.file_path):
-            file_path = os.path.join(os.getcwd(), file.file_path)
-        else:
-            file_path = file.file_path
-            
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+        content = read_stored_file(file.file_path).decode('utf-8')
     except Exception as e:
         flash(f'Fehler beim Lesen der Datei: {str(e)}', 'danger')
         if file.folder_id:
@@ -777,8 +853,7 @@ def preview_file(file_id):
     # Process markdown if it's a markdown file
     if file.name.endswith('.md'):
         try:
-            from app.utils.markdown import process_markdown
-            processed_content = process_markdown(content, wiki_mode=False)
+            processed_content = render_markdown_preview(content)
         except Exception as e:
             current_app.logger.error(f"Markdown processing error: {e}")
             processed_content = content
@@ -805,16 +880,22 @@ def view_file(file_id):
         else:
             return redirect(url_for('files.index'))
     
+    page = max(request.args.get('page', 0, type=int), 0)
+    is_paged = (file.file_size or 0) > get_max_render_size()
+    content = ''
+    processed_content = None
+    has_more = False
+    
     # Read file content
     try:
-        # Ensure we have an absolute path
-        if not os.path.isabs(file.file_path):
-            file_path = os.path.join(os.getcwd(), file.file_path)
+        if is_paged:
+            # Große Dateien seitenweise als Text anzeigen, statt sie komplett zu laden
+            content, has_more = read_text_page(file, page)
+        elif file.name.endswith('.md'):
+            # Gerendertes HTML aus dem Vorschau-Cache
+            processed_content = get_rendered_markdown(file)
         else:
-            file_path = file.file_path
-            
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+            content = read_stored_file(file.file_path).decode('utf-8')
     except Exception as e:
         flash(f'Fehler beim Lesen der Datei: {str(e)}', 'danger')
         if file.folder_id:
@@ -822,19 +903,8 @@ def view_file(file_id):
         else:
             return redirect(url_for('files.index'))
     
-    # Process markdown if it's a markdown file
-    if file.name.endswith('.md'):
-        try:
-            from app.utils.markdown import process_markdown
-            processed_content = process_markdown(content, wiki_mode=False)
-            current_app.logger.info(f"Markdown processed. Table detected: {'<table>' in processed_content}")
-        except Exception as e:
-            current_app.logger.error(f"Markdown processing error: {e}")
-            processed_content = content
-    else:
-        processed_content = content
-    
-    return render_template('files/view.html', file=file, content=content, processed_content=processed_content)
+    return render_template('files/view.html', file=file, content=content, processed_content=processed_content,
+                           is_paged=is_paged, page=page, has_more=has_more)
 
 
 @files_bp.route('/delete/<int:file_id>', methods=['POST'])
@@ -844,26 +914,17 @@ def delete_file(file_id):
     file = File.query.get_or_404(file_id)
     folder_id = file.folder_id
     
-    # Delete file and all versions
-    if not os.path.isabs(file.file_path):
-        file_path = os.path.join(os.getcwd(), file.file_path)
-    else:
-        file_path = file.file_path
-        
-    if os.path.exists(file_path):
-        os.remove(file_path)
-    
+    # Datei und alle Versionen zur Löschung durch den Blob-Collector vormerken
+    mark_blob_unreferenced(file.file_path, source='file')
     for version in file.versions:
-        if not os.path.isabs(version.file_path):
-            version_path = os.path.join(os.getcwd(), version.file_path)
-        else:
-            version_path = version.file_path
-            
-        if os.path.exists(version_path):
-            os.remove(version_path)
+        mark_blob_unreferenced(version.file_path, source='file_version')
     
+    remove_files_from_index([file.id], commit=False)
+    remove_shares_for(file_ids=[file.id])
     db.session.delete(file)
     db.session.commit()
+    invalidate_version_cache('file', [file.id])
+    invalidate_file_preview([file.id])
     
     flash(f'Datei "{file.original_name}" wurde gelöscht.', 'success')
     if folder_id:
@@ -878,37 +939,36 @@ def delete_folder(folder_id):
     """Delete a folder and all its contents."""
     folder = Folder.query.get_or_404(folder_id)
     parent_id = folder.parent_id
+    folder_name = folder.name
+    
+    # Gesamten Teilbaum über den materialisierten Pfad in einer Abfrage bestimmen
+    folder_ids = folder.subtree_ids()
+    file_rows = db.session.query(File.id, File.file_path).filter(File.folder_id.in_(folder_ids)).all()
+    file_ids = [row.id for row in file_rows]
+    version_paths = []
+    if file_ids:
+        version_paths = [
+            row.file_path for row in
+            db.session.query(FileVersion.file_path).filter(FileVersion.file_id.in_(file_ids)).all()
+        ]
     
-    def delete_folder_recursive(folder):
-        # Delete all files in folder
-        for file in folder.files:
-            if not os.path.isabs(file.file_path):
-                file_path = os.path.join(os.getcwd(), file.file_path)
-            else:
-                file_path = file.file_path
-                
-            if os.path.exists(file_path):
-                os.remove(file_path)
-                
-            for version in file.versions:
-                if not os.path.isabs(version.file_path):
-                    version_path = os.path.join(os.getcwd(), version.file_path)
-                else:
-                    version_path = version.file_path
-                    
-                if os.path.exists(version_path):
-                    os.remove(version_path)
-        
-        # Delete all subfolders
-        for subfolder in folder.subfolders:
-            delete_folder_recursive(subfolder)
-        
-        db.session.delete(folder)
-    
-    delete_folder_recursive(folder)
+    for stored_path in [row.file_path for row in file_rows] + version_paths:
+        mark_blob_unreferenced(stored_path, source='file')
+    
+    if file_ids:
+        remove_files_from_index(file_ids, commit=False)
+        track_bulk_file_delete(file_ids)
+        FileVersion.query.filter(FileVersion.file_id.in_(file_ids)).delete(synchronize_session=False)
+        File.query.filter(File.id.in_(file_ids)).delete(synchronize_session=False)
+    remove_shares_for(file_ids=file_ids, folder_ids=folder_ids)
+    # Selbstreferenz lösen, damit der Teilbaum mit einem DELETE entfernt werden kann
+    Folder.query.filter(Folder.id.in_(folder_ids)).update({Folder.parent_id: None}, synchronize_session=False)
+    Folder.query.filter(Folder.id.in_(folder_ids)).delete(synchronize_session=False)
     db.session.commit()
+    invalidate_version_cache('file', file_ids)
+    invalidate_file_preview(file_ids)
     
-    flash(f'Ordner "{folder.name}" wurde gelöscht.', 'success')
+    flash(f'Ordner "{folder_name}" wurde gelöscht.', 'success')
     if parent_id:
         return redirect(url_for('files.browse_folder', folder_id=parent_id))
     else:
@@ -1106,9 +1166,15 @@ def dropbox_upload_file(token):
                 return redirect(url_for('files.dropbox_upload', token=token))
             session[f'dropbox_auth_{token}'] = True
     
+    # Gast-Uploads werden gegen das Kontingent des Ordner-Besitzers geprüft
+    rejection = upload_quota_response(folder.created_by, json_response=False)
+    if rejection is not None:
+        return rejection
+    
     max_size = 100 * 1024 * 1024  # 100MB in bytes
     uploaded_count = 0
     skipped_count = 0
+    uploaded_files = []
     uploader_name = request.form.get('uploader_name', '').strip() or 'Anonym'
     
     # Handle single file or multiple files
@@ -1169,13 +1235,14 @@ def dropbox_upload_file(token):
                     db.session.add(anonymous_user)
                     db.session.flush()
                 
-                _process_file_upload(file, file_name, folder.id, anonymous_user.id)
+                uploaded_files.append(_process_file_upload(file, file_name, folder.id, anonymous_user.id))
                 uploaded_count += 1
             except Exception as e:
                 logging.error(f"Fehler beim Hochladen von {file_name}: {e}")
                 skipped_count += 1
         
         db.session.commit()
+        enqueue_file_index(uploaded.id for uploaded in uploaded_files)
         
         if uploaded_count > 0:
             flash(f'{uploaded_count} Datei(en) wurden erfolgreich hochgeladen.', 'success')
@@ -1194,25 +1261,27 @@ def _is_sharing_enabled() -> bool:
     return (setting and str(setting.value).lower() == 'true') or False
 
 
-def _generate_unique_share_token():
-    token = secrets.token_urlsafe(32)
-    while File.query.filter_by(share_token=token).first() or Folder.query.filter_by(share_token=token).first():
-        token = secrets.token_urlsafe(32)
-    return token
+def _resolve_shared_item(token, item_type=None):
+    """Löst einen Freigabe-Token über den Token-Index auf und gibt (share, item) zurück.
+    Mit `item_type` ('file'/'folder') werden Freigaben anderer Art ignoriert.
+    """
+    share = resolve_share(token)
+    if not share or (item_type and share.item_type != item_type):
+        return None, None
+    item = share.load_item()
+    if item is None:
+        return None, None
+    return share, item
 
 
 def _check_share_access(token):
     """Prüft ob ein Share-Token gültig ist und gibt (item, guest_name) zurück.
     Der guest_name wird aus der Session gelesen (wird beim ersten Zugriff eingegeben).
     """
-    shared_file = File.query.filter_by(share_token=token, share_enabled=True).first()
-    shared_folder = None if shared_file else Folder.query.filter_by(share_token=token, share_enabled=True).first()
-    
-    if not shared_file and not shared_folder:
+    share, item = _resolve_shared_item(token)
+    if not item:
         return None, None
     
-    item = shared_file or shared_folder
-    
     # Check expiry
     if item.share_expires_at and datetime.utcnow() > item.share_expires_at:
         return None, None
@@ -1234,6 +1303,11 @@ def _check_share_access(token):
     return item, guest_name
 
 
+def _share_owner_id(item) -> int:
+    """Benutzer, gegen dessen Speicherkontingent Gast-Uploads in eine Freigabe geprüft werden."""
+    return item.created_by if isinstance(item, Folder) else item.uploaded_by
+
+
 @files_bp.route('/file/<int:file_id>/share', methods=['POST'])
 @login_required
 def create_file_share(file_id):
@@ -1244,10 +1318,12 @@ def create_file_share(file_id):
     password = request.form.get('password', '').strip()
     expires_at = request.form.get('expires_at', '').strip()
 
-    file.share_enabled = True
-    file.share_token = _generate_unique_share_token()
-    file.share_password_hash = generate_password_hash(password) if password else None
-    file.share_expires_at = datetime.fromisoformat(expires_at) if expires_at else None
+    save_share(
+        file,
+        generate_password_hash(password) if password else None,
+        datetime.fromisoformat(expires_at) if expires_at else None,
+        new_token=True
+    )
     file.share_name = None  # Wird beim ersten Zugriff vom Gast eingegeben
     db.session.commit()
 
@@ -1265,10 +1341,12 @@ def create_folder_share(folder_id):
     password = request.form.get('password', '').strip()
     expires_at = request.form.get('expires_at', '').strip()
 
-    folder.share_enabled = True
-    folder.share_token = _generate_unique_share_token()
-    folder.share_password_hash = generate_password_hash(password) if password else None
-    folder.share_expires_at = datetime.fromisoformat(expires_at) if expires_at else None
+    save_share(
+        folder,
+        generate_password_hash(password) if password else None,
+        datetime.fromisoformat(expires_at) if expires_at else None,
+        new_token=True
+    )
     folder.share_name = None  # Wird beim ersten Zugriff vom Gast eingegeben
     db.session.commit()
 
@@ -1302,16 +1380,15 @@ def update_file_share(file_id):
     file = File.query.get_or_404(file_id)
     action = request.form.get('action')
     if action == 'disable':
-        file.share_enabled = False
-        file.share_token = None
-        file.share_password_hash = None
-        file.share_expires_at = None
-        file.share_name = None
-    else:
+        remove_share(file)
+    elif file.share_enabled:
         password = request.form.get('password', '').strip()
         expires_at = request.form.get('expires_at', '').strip()
-        file.share_password_hash = generate_password_hash(password) if password else file.share_password_hash
-        file.share_expires_at = datetime.fromisoformat(expires_at) if expires_at else None
+        save_share(
+            file,
+            generate_password_hash(password) if password else file.share_password_hash,
+            datetime.fromisoformat(expires_at) if expires_at else None
+        )
     db.session.commit()
     flash('Freigabe aktualisiert.', 'success')
     return redirect(request.referrer or url_for('files.index'))
@@ -1323,16 +1400,15 @@ def update_folder_share(folder_id):
     folder = Folder.query.get_or_404(folder_id)
     action = request.form.get('action')
     if action == 'disable':
-        folder.share_enabled = False
-        folder.share_token = None
-        folder.share_password_hash = None
-        folder.share_expires_at = None
-        folder.share_name = None
-    else:
+        remove_share(folder)
+    elif folder.share_enabled:
         password = request.form.get('password', '').strip()
         expires_at = request.form.get('expires_at', '').strip()
-        folder.share_password_hash = generate_password_hash(password) if password else folder.share_password_hash
-        folder.share_expires_at = datetime.fromisoformat(expires_at) if expires_at else None
+        save_share(
+            folder,
+            generate_password_hash(password) if password else folder.share_password_hash,
+            datetime.fromisoformat(expires_at) if expires_at else None
+        )
     db.session.commit()
     flash('Freigabe aktualisiert.', 'success')
     return redirect(request.referrer or url_for('files.index'))
@@ -1341,13 +1417,13 @@ def update_folder_share(folder_id):
 @files_bp.route('/share/<token>', methods=['GET', 'POST'])
 def public_share(token):
     # Find file or folder by token
-    shared_file = File.query.filter_by(share_token=token, share_enabled=True).first()
-    shared_folder = None if shared_file else Folder.query.filter_by(share_token=token, share_enabled=True).first()
-    if not shared_file and not shared_folder:
+    share, item = _resolve_shared_item(token)
+    if not item:
         flash('Freigabe existiert nicht mehr.', 'danger')
         return redirect(url_for('files.index'))
 
-    item = shared_file or shared_folder
+    shared_file = item if share.item_type == 'file' else None
+    shared_folder = item if share.item_type == 'folder' else None
     # Check expiry
     if item.share_expires_at and datetime.utcnow() > item.share_expires_at:
         flash('Freigabe ist abgelaufen.', 'danger')
@@ -1397,19 +1473,28 @@ def public_share(token):
         return render_template('files/share.html', item_type='file', file=shared_file, token=token, guest_name=guest_name, onlyoffice_available=onlyoffice_available)
     else:
         # Get files in the shared folder
-        folder_files = File.query.filter_by(
-            folder_id=shared_folder.id,
-            is_current=True
-        ).order_by(File.name).all()
+        search_query = request.args.get('q', '').strip()
+        if search_query:
+            # Nur Dateien, die über die Freigabe auch heruntergeladen werden können
+            folder_files = [
+                result['file'] for result in search_files(search_query, folder_ids=[shared_folder.id])
+            ]
+        else:
+            folder_files = File.query.filter_by(
+                folder_id=shared_folder.id,
+                is_current=True
+            ).order_by(File.name).all()
         
         # Show upload list and files in folder
-        return render_template('files/share.html', item_type='folder', folder=shared_folder, folder_files=folder_files, token=token, guest_name=guest_name, onlyoffice_available=onlyoffice_available)
+        return render_template('files/share.html', item_type='folder', folder=shared_folder, folder_files=folder_files, search_query=search_query, token=token, guest_name=guest_name, onlyoffice_available=onlyoffice_available)
 
 
 @files_bp.route('/share/<token>/download', methods=['GET'])
 def public_share_download(token):
     """Download für direkt freigegebene Datei."""
-    shared_file = File.query.filter_by(share_token=token, share_enabled=True).first_or_404()
+    _, shared_file = _resolve_shared_item(token, 'file')
+    if not shared_file:
+        abort(404)
     
     # Prüfe Zugriff (Passwort, Ablaufdatum, Name)
     item, guest_name = _check_share_access(token)
@@ -1417,16 +1502,16 @@ def public_share_download(token):
         flash('Zugriff verweigert.', 'danger')
         return redirect(url_for('files.public_share', token=token))
     
-    # Ensure path
-    file_path = shared_file.file_path if os.path.isabs(shared_file.file_path) else os.path.join(os.getcwd(), shared_file.file_path)
-    return send_file(file_path, as_attachment=True, download_name=shared_file.original_name)
+    return send_stored_file(shared_file.file_path, as_attachment=True, download_name=shared_file.original_name)
 
 
 @files_bp.route('/share/<token>/file/<int:file_id>/download', methods=['GET'])
 def public_share_folder_file_download(token, file_id):
     """Download für Datei in freigegebenem Ordner."""
     # Prüfe ob Ordner freigegeben ist
-    shared_folder = Folder.query.filter_by(share_token=token, share_enabled=True).first_or_404()
+    _, shared_folder = _resolve_shared_item(token, 'folder')
+    if not shared_folder:
+        abort(404)
     
     # Prüfe ob Datei im Ordner ist
     file = File.query.filter_by(id=file_id, folder_id=shared_folder.id, is_current=True).first_or_404()
@@ -1437,14 +1522,17 @@ def public_share_folder_file_download(token, file_id):
         flash('Zugriff verweigert.', 'danger')
         return redirect(url_for('files.public_share', token=token))
     
-    # Ensure path
-    file_path = file.file_path if os.path.isabs(file.file_path) else os.path.join(os.getcwd(), file.file_path)
-    return send_file(file_path, as_attachment=True, download_name=file.original_name)
+    return send_stored_file(file.file_path, as_attachment=True, download_name=file.original_name)
 
 
 @files_bp.route('/share/<token>/upload', methods=['POST'])
 def public_share_upload(token):
-    shared_folder = Folder.query.filter_by(share_token=token, share_enabled=True).first_or_404()
+    _, shared_folder = _resolve_shared_item(token, 'folder')
+    if not shared_folder:
+        abort(404)
+    if shared_folder.share_expires_at and datetime.utcnow() > shared_folder.share_expires_at:
+        flash('Freigabe ist abgelaufen.', 'danger')
+        return redirect(url_for('files.index'))
     # Password gate
     if shared_folder.share_password_hash:
         if not session.get(f'share_auth_{token}'):
@@ -1453,10 +1541,14 @@ def public_share_upload(token):
                 flash('Ungültiges Passwort.', 'danger')
                 return redirect(url_for('files.public_share', token=token))
             session[f'share_auth_{token}'] = True
+    rejection = upload_quota_response(_share_owner_id(shared_folder), json_response=False)
+    if rejection is not None:
+        return rejection
 
     uploader_name = request.form.get('uploader_name', '').strip() or 'Anonym'
     if 'file' in request.files:
         files = request.files.getlist('file')
+        uploaded_files = []
         for f in files:
             if not f.filename:
                 continue
@@ -1481,8 +1573,9 @@ def public_share_upload(token):
                 )
                 db.session.add(anonymous_user)
                 db.session.flush()
-            _process_file_upload(f, name, shared_folder.id, anonymous_user.id)
+            uploaded_files.append(_process_file_upload(f, name, shared_folder.id, anonymous_user.id))
         db.session.commit()
+        enqueue_file_index(f.id for f in uploaded_files)
         flash('Upload abgeschlossen.', 'success')
     return redirect(url_for('files.public_share', token=token))
 
@@ -1847,18 +1940,12 @@ def onlyoffice_document(file_id):
                 logging.warning(f"ONLYOFFICE access denied - user {current_user.id} has no access to file {file_id}")
                 return jsonify({'error': 'Access denied'}), 403
     
-    # Ensure we have an absolute path
-    if not os.path.isabs(file.file_path):
-        file_path = os.path.join(os.getcwd(), file.file_path)
-    else:
-        file_path = file.file_path
-    
     # Check if file exists
-    if not os.path.exists(file_path):
-        logging.error(f"ONLYOFFICE file not found: {file_path} (file_id: {file_id}, original_name: {file.original_name})")
+    if not stored_file_exists(file.file_path):
+        logging.error(f"ONLYOFFICE file not found: {file.file_path} (file_id: {file_id}, original_name: {file.original_name})")
         return jsonify({'error': 'File not found'}), 404
     
-    logging.info(f"ONLYOFFICE serving file: {file.original_name} from {file_path} (size: {os.path.getsize(file_path)} bytes)")
+    logging.info(f"ONLYOFFICE serving file: {file.original_name} from {file.file_path} (size: {file.file_size} bytes)")
     
     # Determine MIME type
     file_ext = os.path.splitext(file.original_name)[1].lower()
@@ -1882,8 +1969,10 @@ def onlyoffice_document(file_id):
     mimetype = mime_types.get(file_ext, 'application/octet-stream')
     
     # Create response with CORS headers for cross-origin requests
-    response = send_file(
-        file_path,
+    # Kein Redirect: Der Document Server erhält die Bytes direkt von der App
+    response = send_stored_file(
+        file.file_path,
+        allow_redirect=False,
         mimetype=mimetype,
         download_name=file.original_name,
         as_attachment=False
@@ -1930,20 +2019,14 @@ def share_onlyoffice_document(token, file_id):
         return jsonify({'error': 'ONLYOFFICE not enabled'}), 404
     
     # IMPORTANT: OnlyOffice callbacks don't have session cookies, so we need to validate
-    # the token differently. We'll check if the share token is valid by querying the database.
+    # the token differently. We'll check if the share token is valid via the share index.
     # Don't use _check_share_access as it requires session data.
-    shared_file = File.query.filter_by(share_token=token, share_enabled=True).first()
-    shared_folder = None
-    if not shared_file:
-        shared_folder = Folder.query.filter_by(share_token=token, share_enabled=True).first()
+    _, item = _resolve_shared_item(token)
     
-    if not shared_file and not shared_folder:
+    if not item:
         logging.warning(f"ONLYOFFICE share document access denied - Invalid share token: {token[:8]}...")
         return jsonify({'error': 'Invalid share token'}), 403
     
-    # Determine which item was shared (file or folder)
-    item = shared_file if shared_file else shared_folder
-    
     # Prüfe ob es eine Datei aus einem Ordner ist oder direkt freigegebene Datei
     if isinstance(item, Folder):
         file = File.query.filter_by(id=file_id, folder_id=item.id, is_current=True).first_or_404()
@@ -1956,14 +2039,8 @@ def share_onlyoffice_document(token, file_id):
     
     logging.info(f"ONLYOFFICE share document access granted - file_id: {file_id}, file: {file.original_name}")
     
-    # Ensure we have an absolute path
-    if not os.path.isabs(file.file_path):
-        file_path = os.path.join(os.getcwd(), file.file_path)
-    else:
-        file_path = file.file_path
-    
     # Check if file exists
-    if not os.path.exists(file_path):
+    if not stored_file_exists(file.file_path):
         return jsonify({'error': 'File not found'}), 404
     
     # Determine MIME type
@@ -1988,8 +2065,10 @@ def share_onlyoffice_document(token, file_id):
     mimetype = mime_types.get(file_ext, 'application/octet-stream')
     
     # Create response with CORS headers for cross-origin requests
-    response = send_file(
-        file_path,
+    # Kein Redirect: Der Document Server erhält die Bytes direkt von der App
+    response = send_stored_file(
+        file.file_path,
+        allow_redirect=False,
         mimetype=mimetype,
         download_name=file.original_name,
         as_attachment=False
@@ -2020,6 +2099,10 @@ def onlyoffice_save(file_id):
     
     file = File.query.get_or_404(file_id)
     
+    rejection = upload_quota_response(current_user.id, json_response=True)
+    if rejection is not None:
+        return rejection
+    
     # Get file content from request
     if 'file' not in request.files:
         return jsonify({'error': 'No file in request'}), 400
@@ -2027,46 +2110,22 @@ def onlyoffice_save(file_id):
     uploaded_file = request.files['file']
     
     # Save current version to history
-    version = FileVersion(
-        file_id=file.id,
-        version_number=file.version_number,
-        file_path=os.path.abspath(file.file_path),
-        file_size=file.file_size,
-        uploaded_by=file.uploaded_by
-    )
-    db.session.add(version)
-    
-    # Delete oldest version if needed
-    versions = FileVersion.query.filter_by(file_id=file.id).order_by(
-        FileVersion.version_number.desc()
-    ).all()
-    
-    if len(versions) >= MAX_FILE_VERSIONS:
-        oldest = versions[-1]
-        if os.path.exists(oldest.file_path):
-            os.remove(oldest.file_path)
-        db.session.delete(oldest)
+    create_file_version(file)
+    prune_file_versions(file.id, MAX_FILE_VERSIONS)
     
     # Save new version
     timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
-    filename = f"{timestamp}_{file.original_name}"
-    filepath = os.path.join('uploads', 'files', filename)
-    
-    # Ensure directory exists
-    os.makedirs(os.path.dirname(filepath), exist_ok=True)
-    
-    uploaded_file.save(filepath)
-    
-    # Store absolute path in database
-    absolute_filepath = os.path.abspath(filepath)
+    key = save_upload(uploaded_file, 'files', f"{timestamp}_{file.original_name}")
     
-    file.file_path = absolute_filepath
-    file.file_size = os.path.getsize(absolute_filepath)
+    file.file_path = path_for_key(key)
+    file.file_size = get_storage().size(key)
     file.version_number += 1
     file.uploaded_by = current_user.id
     file.updated_at = datetime.utcnow()
     
     db.session.commit()
+    enqueue_file_index([file.id])
+    invalidate_file_preview([file.id])
     
     # Send notification
     try:
@@ -2097,6 +2156,10 @@ def share_onlyoffice_save(token, file_id):
             return jsonify({'error': 'File ID mismatch'}), 403
         file = item
     
+    rejection = upload_quota_response(_share_owner_id(item), json_response=True)
+    if rejection is not None:
+        return rejection
+    
     # Get file content from request
     if 'file' not in request.files:
         return jsonify({'error': 'No file in request'}), 400
@@ -2119,46 +2182,22 @@ def share_onlyoffice_save(token, file_id):
         db.session.flush()
     
     # Save current version to history
-    version = FileVersion(
-        file_id=file.id,
-        version_number=file.version_number,
-        file_path=os.path.abspath(file.file_path),
-        file_size=file.file_size,
-        uploaded_by=file.uploaded_by
-    )
-    db.session.add(version)
-    
-    # Delete oldest version if needed
-    versions = FileVersion.query.filter_by(file_id=file.id).order_by(
-        FileVersion.version_number.desc()
-    ).all()
-    
-    if len(versions) >= MAX_FILE_VERSIONS:
-        oldest = versions[-1]
-        if os.path.exists(oldest.file_path):
-            os.remove(oldest.file_path)
-        db.session.delete(oldest)
+    create_file_version(file)
+    prune_file_versions(file.id, MAX_FILE_VERSIONS)
     
     # Save new version
     timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
-    filename = f"{timestamp}_{file.original_name}"
-    filepath = os.path.join('uploads', 'files', filename)
-    
-    # Ensure directory exists
-    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    key = save_upload(uploaded_file, 'files', f"{timestamp}_{file.original_name}")
     
-    uploaded_file.save(filepath)
-    
-    # Store absolute path in database
-    absolute_filepath = os.path.abspath(filepath)
-    
-    file.file_path = absolute_filepath
-    file.file_size = os.path.getsize(absolute_filepath)
+    file.file_path = path_for_key(key)
+    file.file_size = get_storage().size(key)
     file.version_number += 1
     file.uploaded_by = anonymous_user.id
     file.updated_at = datetime.utcnow()
     
     db.session.commit()
+    enqueue_file_index([file.id])
+    invalidate_file_preview([file.id])
     
     return jsonify({'success': True, 'message': 'File saved successfully'})
 
@@ -2243,83 +2282,13 @@ def onlyoffice_callback():
                         saved_file_url = data.get('url')
                         
                         if saved_file_url:
-                            # Download the saved file from ONLYOFFICE
-                            response = requests.get(saved_file_url)
-                            
-                            if response.status_code == 200:
-                                # Save new version
-                                timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
-                                filename = f"{timestamp}_{file.original_name}"
-                                filepath = os.path.join('uploads', 'files', filename)
-                                
-                                os.makedirs(os.path.dirname(filepath), exist_ok=True)
-                                
-                                with open(filepath, 'wb') as f:
-                                    f.write(response.content)
-                                
-                                absolute_filepath = os.path.abspath(filepath)
-                                
-                                # IMPORTANT: For collaborative editing, we need to be careful about version increments
-                                # Status 6 (force save) always increments version and creates version history
-                                # Status 4 (auto-save) should NOT increment version to avoid "Version wurde geändert" messages
-                                
-                                if status == 6:
-                                    # Force save: Create new version with history
-                                    # Save current version to history
-                                    version = FileVersion(
-                                        file_id=file.id,
-                                        version_number=file.version_number,
-                                        file_path=os.path.abspath(file.file_path),
-                                        file_size=file.file_size,
-                                        uploaded_by=file.uploaded_by
-                                    )
-                                    db.session.add(version)
-                                    
-                                    # Delete oldest version if needed
-                                    versions = FileVersion.query.filter_by(file_id=file.id).order_by(
-                                        FileVersion.version_number.desc()
-                                    ).all()
-                                    
-                                    if len(versions) >= MAX_FILE_VERSIONS:
-                                        oldest = versions[-1]
-                                        if os.path.exists(oldest.file_path):
-                                            os.remove(oldest.file_path)
-                                        db.session.delete(oldest)
-                                    
-                                    file.file_path = absolute_filepath
-                                    file.file_size = os.path.getsize(absolute_filepath)
-                                    file.version_number += 1
-                                    file.updated_at = datetime.utcnow()
-                                    
-                                    db.session.commit()
-                                    
-                                    logging.info(f"ONLYOFFICE: File {file_id} force saved (new version {file.version_number})")
-                                else:
-                                    # Auto-save (status 4): Update file in place without version increment
-                                    # This allows collaborative editing without "Version wurde geändert" messages
-                                    old_file_path = file.file_path
-                                    file.file_path = absolute_filepath
-                                    file.file_size = os.path.getsize(absolute_filepath)
-                                    file.updated_at = datetime.utcnow()
-                                    # Keep same version_number for auto-save
-                                    
-                                    db.session.commit()
-                                    
-                                    # Delete old file if it's different (but keep versions)
-                                    if old_file_path != absolute_filepath and os.path.exists(old_file_path):
-                                        # Only delete if it's not a version file
-                                        try:
-                                            os.remove(old_file_path)
-                                        except Exception as e:
-                                            logging.warning(f"Could not delete old file {old_file_path}: {e}")
-                                    
-                                    logging.info(f"ONLYOFFICE: File {file_id} auto-saved (version {file.version_number} updated)")
-                                
-                                # Send notification
-                                try:
-                                    send_file_notification(file.id, 'modified')
-                                except Exception as e:
-                                    logging.error(f"Fehler beim Senden der Datei-Benachrichtigung: {e}")
+                            # Download, Versionierung und Benachrichtigung übernimmt der Speicher-Worker,
+                            # damit OnlyOffice nicht auf große Downloads warten muss
+                            submit_onlyoffice_save(
+                                current_app._get_current_object(),
+                                SaveJob(file.id, key or str(file.id), saved_file_url, status)
+                            )
+                            logging.info(f"ONLYOFFICE: Save of file {file_id} queued (status {status})")
                 except (ValueError, TypeError) as e:
                     logging.error(f"ONLYOFFICE callback: Invalid file_id: {e}")
                 except Exception as e:
@@ -2377,20 +2346,16 @@ def share_onlyoffice_callback(token):
         return jsonify({'error': 'ONLYOFFICE not enabled'}), 404
     
     # IMPORTANT: OnlyOffice callbacks don't have session cookies, so we need to validate
-    # the token differently. We'll check if the share token is valid by querying the database.
+    # the token differently. We'll check if the share token is valid via the share index.
     # Don't use _check_share_access as it requires session data.
-    shared_file = File.query.filter_by(share_token=token, share_enabled=True).first()
-    shared_folder = None
-    if not shared_file:
-        shared_folder = Folder.query.filter_by(share_token=token, share_enabled=True).first()
+    _, item = _resolve_shared_item(token)
     
-    if not shared_file and not shared_folder:
+    if not item:
         logging.warning(f"ONLYOFFICE share callback: Invalid share token: {token}")
         return jsonify({'error': 'Invalid share token'}), 403
     
     # Use a default guest name for callbacks (OnlyOffice doesn't send session info)
-    guest_name = 'Gast' if not shared_file else (shared_file.share_name or 'Gast')
-    item = shared_file if shared_file else shared_folder
+    guest_name = 'Gast' if isinstance(item, Folder) else (item.share_name or 'Gast')
     
     # Get file_id from callback URL parameter
     file_id = request.args.get('file_id')
@@ -2459,91 +2424,12 @@ def share_onlyoffice_callback(token):
             saved_file_url = data.get('url')
             
             if saved_file_url:
-                # Download the saved file from ONLYOFFICE
-                response = requests.get(saved_file_url)
-                
-                if response.status_code == 200:
-                    # Get anonymous user for guest edits
-                    anonymous_user = User.query.filter_by(email='anonymous@system.local').first()
-                    if not anonymous_user:
-                        anonymous_user = User(
-                            email='anonymous@system.local',
-                            first_name=guest_name,
-                            last_name='',
-                            password_hash='',
-                            is_active=True,
-                            is_admin=False,
-                            is_email_confirmed=True
-                        )
-                        db.session.add(anonymous_user)
-                        db.session.flush()
-                    
-                    # Save new version
-                    timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
-                    filename = f"{timestamp}_{file.original_name}"
-                    filepath = os.path.join('uploads', 'files', filename)
-                    
-                    os.makedirs(os.path.dirname(filepath), exist_ok=True)
-                    
-                    with open(filepath, 'wb') as f:
-                        f.write(response.content)
-                    
-                    absolute_filepath = os.path.abspath(filepath)
-                    
-                    # IMPORTANT: For collaborative editing, we need to be careful about version increments
-                    # Status 6 (force save) always increments version and creates version history
-                    # Status 4 (auto-save) should NOT increment version to avoid "Version wurde geändert" messages
-                    
-                    if status == 6:
-                        # Force save: Create new version with history
-                        # Save current version to history
-                        version = FileVersion(
-                            file_id=file.id,
-                            version_number=file.version_number,
-                            file_path=os.path.abspath(file.file_path),
-                            file_size=file.file_size,
-                            uploaded_by=file.uploaded_by
-                        )
-                        db.session.add(version)
-                        
-                        # Delete oldest version if needed
-                        versions = FileVersion.query.filter_by(file_id=file.id).order_by(
-                            FileVersion.version_number.desc()
-                        ).all()
-                        
-                        if len(versions) >= MAX_FILE_VERSIONS:
-                            oldest = versions[-1]
-                            if os.path.exists(oldest.file_path):
-                                os.remove(oldest.file_path)
-                            db.session.delete(oldest)
-                        
-                        file.file_path = absolute_filepath
-                        file.file_size = os.path.getsize(absolute_filepath)
-                        file.version_number += 1
-                        file.uploaded_by = anonymous_user.id
-                        file.updated_at = datetime.utcnow()
-                        
-                        db.session.commit()
-                        
-                        logging.info(f"ONLYOFFICE: Shared file {file.id} force saved (new version {file.version_number}) by guest {guest_name}")
-                    else:
-                        # Auto-save (status 4): Update file in place without version increment
-                        old_file_path = file.file_path
-                        file.file_path = absolute_filepath
-                        file.file_size = os.path.getsize(absolute_filepath)
-                        file.updated_at = datetime.utcnow()
-                        # Keep same version_number and uploaded_by for auto-save
-                        
-                        db.session.commit()
-                        
-                        # Delete old file if it's different (but keep versions)
-                        if old_file_path != absolute_filepath and os.path.exists(old_file_path):
-                            try:
-                                os.remove(old_file_path)
-                            except Exception as e:
-                                logging.warning(f"Could not delete old file {old_file_path}: {e}")
-                        
-                        logging.info(f"ONLYOFFICE: Shared file {file.id} auto-saved (version {file.version_number} updated) by guest {guest_name}")
+                # Speichern als anonymer Benutzer im Hintergrund
+                submit_onlyoffice_save(
+                    current_app._get_current_object(),
+                    SaveJob(file.id, data.get('key') or str(file.id), saved_file_url, status, guest_name=guest_name)
+                )
+                logging.info(f"ONLYOFFICE: Save of shared file {file.id} queued (status {status}) for guest {guest_name}")
         
         # Create response with CORS headers
         response = jsonify({'error': 0})  # Success response for ONLYOFFICE
@@ -1,6 +1,7 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, send_file, current_app, session, send_from_directory
+from flask import Blueprint, render_template, stream_template, request, redirect, url_for, flash, jsonify, send_file, current_app, session
 from flask_login import login_required, current_user
-from app import db
+from flask_socketio import join_room
+from app import db, socketio
 from app.utils.i18n import _
 from app.models.inventory import Product, BorrowTransaction, ProductFolder, ProductSet, ProductSetItem, ProductDocument, SavedFilter, ProductFavorite, Inventory, InventoryItem
 from app.models.api_token import ApiToken
@@ -10,15 +11,38 @@ import json
 from urllib.parse import unquote
 from app.utils.qr_code import (
     generate_product_qr_code, generate_borrow_qr_code, generate_set_qr_code,
-    parse_qr_code, generate_qr_code_bytes
+    parse_qr_code
 )
-from app.utils.pdf_generator import generate_borrow_receipt_pdf, generate_qr_code_sheet_pdf, generate_color_code_table_pdf
-from app.utils.lengths import normalize_length_input, parse_length_to_meters
+from app.utils.qr_image_cache import precompute_qr_codes, qr_code_response
+from app.utils.pdf_generator import (
+    TEMPLATE_VERSIONS, borrow_receipt_document, color_codes_document, generate_qr_code_sheet_pdf,
+    inventory_list_document, inventory_tool_document, pdf_cache_key, qr_sheet_document
+)
+from app.utils.pdf_cache import get_cached_pdf
+from app.tasks.pdf_jobs import get_pdf_job, get_pdf_job_status, pdf_job_room, submit_pdf_job
+from app.utils.lengths import normalize_length_input
+from app.utils.blob_gc import mark_blob_unreferenced
+from app.utils.storage import (
+    get_storage, path_for_key, safe_key, save_upload, send_storage_object, send_stored_file, stored_file_exists
+)
+from app.utils.inventory_stats import inventory_statistics, mobile_statistics, statistics_response
+from app.utils.inventory_count import (
+    apply_item_changes, create_inventory_items, find_inventory_item_id, flush_inventory_checks, forget_inventory,
+    inventory_room, inventory_snapshot, publish_inventory_events, publish_inventory_status, queue_inventory_check
+)
+from app.utils.storage_usage import enforce_upload_quota
+from app.utils.export_stream import stream_rows
+from app.utils.product_listing import (
+    FACET_PARAMS, PRODUCT_FIELDS, SORT_FIELDS, STOCK_FIELDS, ListingError, bump_product_version, count_products,
+    facet_counts, json_response, list_products, parse_fields, parse_length_bound, parse_limit, product_filters
+)
+from app.utils.product_search import DEFAULT_LIMIT as DEFAULT_SEARCH_LIMIT, index_products, search_products
 from werkzeug.utils import secure_filename
 from datetime import datetime, date, timedelta
-from sqlalchemy import or_, and_
+from sqlalchemy import and_, select
 from sqlalchemy.orm import joinedload
 import os
+import re
 import secrets
 import string
 from io import BytesIO
@@ -26,6 +50,8 @@ from io import BytesIO
 inventory_bp = Blueprint('inventory', __name__)
 
 ALLOWED_IMAGE_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
+PRODUCT_IMAGE_SUBDIR = os.path.join('inventory', 'product_images')
+PRODUCT_DOCUMENT_SUBDIR = os.path.join('inventory', 'product_documents')
 
 
 def allowed_file(filename):
@@ -212,11 +238,8 @@ def product_new():
                 filename = secure_filename(file.filename)
                 timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
                 stored_filename = f"{timestamp}_{filename}"
-                upload_dir = os.path.join(current_app.config['UPLOAD_FOLDER'], 'inventory', 'product_images')
-                os.makedirs(upload_dir, exist_ok=True)
-                filepath = os.path.join(upload_dir, stored_filename)
-                file.save(filepath)
-                image_path = stored_filename
+                key = save_upload(file, 'inventory/product_images', stored_filename)
+                image_path = key.rsplit('/', 1)[-1]
         
         created_products = []
         try:
@@ -245,6 +268,7 @@ def product_new():
                 created_products.append(product)
             
             db.session.commit()
+            precompute_qr_codes(p.qr_code_data for p in created_products)
 
             # Flash-Nachricht anpassen je nach Anzahl
             if quantity == 1:
@@ -326,35 +350,20 @@ def product_edit(product_id):
         
         if request.form.get('remove_image') == '1':
             if product.image_path:
-                upload_dir = os.path.join(current_app.config['UPLOAD_FOLDER'], 'inventory', 'product_images')
-                filepath = os.path.join(upload_dir, product.image_path)
-                if os.path.exists(filepath):
-                    try:
-                        os.remove(filepath)
-                    except Exception as e:
-                        current_app.logger.error(f"Fehler beim Löschen des Bildes: {e}")
+                mark_blob_unreferenced(product.image_path, subdir=PRODUCT_IMAGE_SUBDIR, source='product_image')
             product.image_path = None
         
         if 'image' in request.files:
             file = request.files['image']
             if file and file.filename != '' and allowed_file(file.filename):
                 if product.image_path:
-                    upload_dir = os.path.join(current_app.config['UPLOAD_FOLDER'], 'inventory', 'product_images')
-                    old_filepath = os.path.join(upload_dir, product.image_path)
-                    if os.path.exists(old_filepath):
-                        try:
-                            os.remove(old_filepath)
-                        except:
-                            pass
+                    mark_blob_unreferenced(product.image_path, subdir=PRODUCT_IMAGE_SUBDIR, source='product_image')
                 
                 filename = secure_filename(file.filename)
                 timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
                 stored_filename = f"{timestamp}_{filename}"
-                upload_dir = os.path.join(current_app.config['UPLOAD_FOLDER'], 'inventory', 'product_images')
-                os.makedirs(upload_dir, exist_ok=True)
-                filepath = os.path.join(upload_dir, stored_filename)
-                file.save(filepath)
-                product.image_path = stored_filename
+                key = save_upload(file, 'inventory/product_images', stored_filename)
+                product.image_path = key.rsplit('/', 1)[-1]
         
         if not product.qr_code_data:
             product.qr_code_data = generate_product_qr_code(product.id)
@@ -384,17 +393,13 @@ def serve_public_product_image(filename):
         if os.path.isabs(filename) or '/' in filename or '\\' in filename:
             filename = os.path.basename(filename)
         
-        project_root = os.path.dirname(current_app.root_path)
-        directory = os.path.join(project_root, current_app.config['UPLOAD_FOLDER'], 'inventory', 'product_images')
-        full_path = os.path.join(directory, filename)
-        
-        if not os.path.abspath(full_path).startswith(os.path.abspath(directory)):
+        key = safe_key('inventory/product_images', filename)
+        if not key:
             abort(403)
         
-        if os.path.isfile(full_path):
-            return send_from_directory(directory, filename)
-        else:
+        if not get_storage().exists(key):
             abort(404)
+        return send_storage_object(key)
     except Exception as e:
         current_app.logger.error(f"Fehler beim Servieren des Produktbildes: {e}")
         abort(404)
@@ -413,23 +418,12 @@ def serve_product_image(filename):
         if os.path.isabs(filename) or '/' in filename or '\\' in filename:
             filename = os.path.basename(filename)
         
-        project_root = os.path.dirname(current_app.root_path)
-        directory = os.path.join(project_root, current_app.config['UPLOAD_FOLDER'], 'inventory', 'product_images')
-        full_path = os.path.join(directory, filename)
-        
-        if current_app.debug:
-            current_app.logger.debug(f"[PRODUCT IMAGE] Requested filename: {filename}")
-            current_app.logger.debug(f"[PRODUCT IMAGE] Full path: {full_path}")
-            current_app.logger.debug(f"[PRODUCT IMAGE] File exists: {os.path.isfile(full_path)}")
-            if not os.path.isfile(full_path):
-                if os.path.exists(directory):
-                    current_app.logger.debug(f"[PRODUCT IMAGE] Directory contents: {os.listdir(directory)}")
-        
-        if not os.path.isfile(full_path):
-            current_app.logger.warning(f"Produktbild nicht gefunden: {filename} (Pfad: {full_path})")
+        key = safe_key('inventory/product_images', filename)
+        if not key or not get_storage().exists(key):
+            current_app.logger.warning(f"Produktbild nicht gefunden: {filename} (Schlüssel: {key})")
             abort(404)
         
-        return send_from_directory(directory, filename)
+        return send_storage_object(key)
     except FileNotFoundError:
         from flask import abort
         current_app.logger.warning(f"Produktbild nicht gefunden: {filename}")
@@ -440,6 +434,14 @@ def serve_product_image(filename):
         abort(404)
 
 
+@inventory_bp.route('/products/<int:product_id>/qr-code')
+@login_required
+def product_qr_code(product_id):
+    """QR-Code eines Produkts als Bild (aus dem QR-Code-Cache)."""
+    Product.query.get_or_404(product_id)
+    return qr_code_response(generate_product_qr_code(product_id))
+
+
 @inventory_bp.route('/products/<int:product_id>/status', methods=['POST'])
 @login_required
 def product_update_status(product_id):
@@ -473,11 +475,8 @@ def product_delete(product_id):
         flash(_('inventory.flash.product_cannot_delete'), 'danger')
         return redirect(url_for('inventory.stock'))
     
-    if product.image_path and os.path.exists(product.image_path):
-        try:
-            os.remove(product.image_path)
-        except:
-            pass
+    if product.image_path:
+        mark_blob_unreferenced(product.image_path, subdir=PRODUCT_IMAGE_SUBDIR, source='product_image')
     
     db.session.delete(product)
     db.session.commit()
@@ -999,31 +998,113 @@ def borrow_scanner_checkout():
 @login_required
 def inventory_list():
     """Inventurliste - Übersicht aller Produkte für Inventur (Legacy)."""
-    products = Product.query.order_by(Product.name).all()
-    return render_template('inventory/inventory_list.html', products=products)
+    # Seite wird während des Lesens der Produkte gestreamt
+    return stream_template('inventory/inventory_list.html', products=_inventory_list_rows())
+
+
+def _inventory_list_rows():
+    """Spalten der Inventurliste aller Produkte (nach Name sortiert, gestreamt)."""
+    return stream_rows(select(
+        Product.id, Product.name, Product.category, Product.serial_number, Product.location,
+        Product.length, Product.length_meters, Product.status, Product.condition
+    ).order_by(Product.name))
 
 
 @inventory_bp.route('/inventory-list/pdf')
 @login_required
 def inventory_list_pdf():
     """PDF-Generierung für Inventurliste (Legacy)."""
-    from app.utils.pdf_generator import generate_inventory_list_pdf
+    filename = f"Inventurliste_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+    return _pdf_response('inventory_lists', inventory_list_document(_inventory_list_rows()), filename)
+
+
+# ========== PDF-Aufträge ==========
+
+PDF_JOB_KEY = re.compile(r'[0-9a-f]{64}')
+
+
+def _pdf_response(kind, data, filename):
+    """
+    Liefert ein PDF aus dem Cache oder setzt es im Hintergrund.
     
-    products = Product.query.order_by(Product.name).all()
+    Solange das PDF entsteht, erhalten Browser eine Warteseite (Download startet
+    danach automatisch) und JSON-Clients 202 mit den URLs für Status und Download.
+    """
+    pdf_bytes = get_cached_pdf(kind, pdf_cache_key(kind, data))
+    if pdf_bytes is not None:
+        return send_file(
+            BytesIO(pdf_bytes),
+            mimetype='application/pdf',
+            as_attachment=True,
+            download_name=filename
+        )
     
-    pdf_buffer = BytesIO()
-    generate_inventory_list_pdf(products, pdf_buffer)
-    pdf_buffer.seek(0)
+    job = submit_pdf_job(current_app._get_current_object(), kind, data, filename)
+    status_url = url_for('inventory.pdf_job_status', kind=kind, key=job.id)
+    download_url = url_for('inventory.pdf_job_download', kind=kind, key=job.id, name=filename)
+    if request.is_json or request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        payload = job.to_dict()
+        payload.update(status_url=status_url, download_url=download_url)
+        return jsonify(payload), 202
+    return render_template(
+        'inventory/pdf_job.html',
+        job=job,
+        status_url=status_url,
+        download_url=download_url,
+        back_url=request.referrer or url_for('inventory.dashboard')
+    )
+
+
+def _check_pdf_job(kind, key):
+    from flask import abort
+    if kind not in TEMPLATE_VERSIONS or not PDF_JOB_KEY.fullmatch(key):
+        abort(404)
+
+
+@inventory_bp.route('/pdf-jobs/<kind>/<key>')
+@login_required
+def pdf_job_status(kind, key):
+    """Status eines PDF-Auftrags (auch für Aufträge anderer Worker-Prozesse über den Cache)."""
+    _check_pdf_job(kind, key)
+    return jsonify(get_pdf_job_status(kind, key))
+
+
+@inventory_bp.route('/pdf-jobs/<kind>/<key>/download')
+@login_required
+def pdf_job_download(kind, key):
+    """Fertiges PDF eines Auftrags herunterladen."""
+    _check_pdf_job(kind, key)
+    job = get_pdf_job(key)
+    if job is not None and job.kind != kind:
+        job = None
+    pdf_bytes = job.pdf if job is not None else None
+    if pdf_bytes is None:
+        pdf_bytes = get_cached_pdf(kind, key)
+    if pdf_bytes is None:
+        from flask import abort
+        abort(404)
     
-    filename = f"Inventurliste_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+    filename = job.filename if job is not None else (secure_filename(request.args.get('name', '')) or f"{kind}.pdf")
     return send_file(
-        pdf_buffer,
+        BytesIO(pdf_bytes),
         mimetype='application/pdf',
         as_attachment=True,
         download_name=filename
     )
 
 
+@socketio.on('pdf:join')
+def handle_pdf_join(data=None):
+    """Wartende Clients erhalten die Fertigmeldung ihres PDF-Auftrags."""
+    if not (hasattr(current_user, 'is_authenticated') and current_user.is_authenticated):
+        return
+    kind = (data or {}).get('kind')
+    key = (data or {}).get('key')
+    if kind not in TEMPLATE_VERSIONS or not isinstance(key, str) or not PDF_JOB_KEY.fullmatch(key):
+        return
+    join_room(pdf_job_room(kind, key))
+
+
 # ========== Inventurtool Routes ==========
 
 @inventory_bp.route('/inventory-tool', methods=['GET', 'POST'])
@@ -1055,28 +1136,15 @@ def inventory_tool():
             db.session.add(new_inventory)
             db.session.flush()
             
-            products = Product.query.all()
-            for product in products:
-                inventory_item = InventoryItem(
-                    inventory_id=new_inventory.id,
-                    product_id=product.id
-                )
-                db.session.add(inventory_item)
+            new_inventory.items_total = create_inventory_items(new_inventory.id)
             
             db.session.commit()
             flash(_('inventory.flash.inventory_started', name=name), 'success')
             return redirect(url_for('inventory.inventory_tool'))
     
-    inventory_items = []
-    if active_inventory:
-        inventory_items = InventoryItem.query.filter_by(inventory_id=active_inventory.id).options(
-            joinedload(InventoryItem.product),
-            joinedload(InventoryItem.checker)
-        ).all()
-    
+    # Items lädt die Seite per Snapshot-API, der Fortschritt steht an der Inventur
     return render_template('inventory/inventory_tool.html', 
-                         active_inventory=active_inventory,
-                         inventory_items=inventory_items)
+                         active_inventory=active_inventory)
 
 
 @inventory_bp.route('/inventory-tool/<int:inventory_id>/complete', methods=['POST'])
@@ -1089,6 +1157,7 @@ def inventory_complete(inventory_id):
         flash(_('inventory.flash.inventory_completed'), 'warning')
         return redirect(url_for('inventory.inventory_tool'))
     
+    flush_inventory_checks(inventory_id)
     items = InventoryItem.query.filter_by(inventory_id=inventory_id).all()
     updated_count = 0
     
@@ -1105,6 +1174,8 @@ def inventory_complete(inventory_id):
     inventory.completed_at = datetime.utcnow()
     
     db.session.commit()
+    forget_inventory(inventory_id)
+    publish_inventory_status(inventory_id, 'completed')
     
     flash(_('inventory.flash.inventory_finished', count=updated_count), 'success')
     return redirect(url_for('inventory.inventory_tool'))
@@ -1125,26 +1196,16 @@ def inventory_history():
 @login_required
 def inventory_tool_pdf(inventory_id):
     """PDF-Generierung für eine Inventur."""
-    from app.utils.pdf_generator import generate_inventory_tool_pdf
-    
     inventory = Inventory.query.get_or_404(inventory_id)
+    flush_inventory_checks(inventory_id)
     items = InventoryItem.query.filter_by(inventory_id=inventory_id).options(
         joinedload(InventoryItem.product)
     ).all()
     
     items.sort(key=lambda x: x.product.name if x.product else '')
     
-    pdf_buffer = BytesIO()
-    generate_inventory_tool_pdf(inventory, items, pdf_buffer)
-    pdf_buffer.seek(0)
-    
     filename = f"Inventur_{inventory.name.replace(' ', '_')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-    return send_file(
-        pdf_buffer,
-        mimetype='application/pdf',
-        as_attachment=True,
-        download_name=filename
-    )
+    return _pdf_response('inventories', inventory_tool_document(inventory, items), filename)
 
 
 # ========== Inventurtool API Routes ==========
@@ -1154,6 +1215,7 @@ def inventory_tool_pdf(inventory_id):
 def api_inventory_items(inventory_id):
     """API: Alle Items einer Inventur abrufen."""
     inventory = Inventory.query.get_or_404(inventory_id)
+    flush_inventory_checks(inventory_id)
     
     items = InventoryItem.query.filter_by(inventory_id=inventory_id).options(
         joinedload(InventoryItem.product),
@@ -1187,12 +1249,33 @@ def api_inventory_items(inventory_id):
             'name': inventory.name,
             'status': inventory.status,
             'checked_count': inventory.checked_count,
-            'total_count': inventory.total_count
+            'total_count': inventory.total_count,
+            'seq': inventory.event_seq
         },
         'items': result
     })
 
 
+@inventory_bp.route('/api/inventory/<int:inventory_id>/snapshot', methods=['GET'])
+@login_required
+def api_inventory_snapshot(inventory_id):
+    """API: Kompakter Stand einer Inventur (Startpunkt für die Live-Ereignisse)."""
+    inventory = Inventory.query.get_or_404(inventory_id)
+    return jsonify(inventory_snapshot(inventory))
+
+
+@socketio.on('inventory:join')
+def handle_inventory_join(data=None):
+    """Zählende erhalten die Änderungen der Inventur als Live-Ereignisse."""
+    if not (hasattr(current_user, 'is_authenticated') and current_user.is_authenticated):
+        return
+    try:
+        inventory_id = int((data or {}).get('inventory_id'))
+    except (TypeError, ValueError):
+        return
+    join_room(inventory_room(inventory_id))
+
+
 @inventory_bp.route('/api/inventory/<int:inventory_id>/item/<int:product_id>/update', methods=['POST'])
 @login_required
 def api_inventory_item_update(inventory_id, product_id):
@@ -1202,6 +1285,7 @@ def api_inventory_item_update(inventory_id, product_id):
     if inventory.status != 'active':
         return jsonify({'error': 'Inventur ist nicht aktiv.'}), 400
     
+    flush_inventory_checks(inventory_id)
     item = InventoryItem.query.filter_by(
         inventory_id=inventory_id,
         product_id=product_id
@@ -1212,15 +1296,6 @@ def api_inventory_item_update(inventory_id, product_id):
     
     data = request.get_json()
     
-    if 'checked' in data:
-        item.checked = bool(data['checked'])
-        if item.checked:
-            item.checked_by = current_user.id
-            item.checked_at = datetime.utcnow()
-        else:
-            item.checked_by = None
-            item.checked_at = None
-    
     if 'notes' in data:
         item.notes = data['notes'].strip() if data['notes'] else None
     
@@ -1234,7 +1309,21 @@ def api_inventory_item_update(inventory_id, product_id):
         item.new_condition = new_condition
         item.condition_changed = new_condition is not None and new_condition != item.product.condition
     
+    db.session.flush()
+    fields = {
+        'notes': item.notes,
+        'location_changed': item.location_changed,
+        'new_location': item.new_location,
+        'condition_changed': item.condition_changed,
+        'new_condition': item.new_condition
+    }
+    checked = bool(data['checked']) if 'checked' in data else item.checked
+    events, progress = apply_item_changes(db.session.connection(), inventory_id, [{
+        'item_id': item.id, 'product_id': product_id, 'checked': checked,
+        'by': current_user.id, 'at': datetime.utcnow(), 'fields': fields
+    }])
     db.session.commit()
+    publish_inventory_events(inventory_id, events, progress)
     
     return jsonify({
         'success': True,
@@ -1259,26 +1348,22 @@ def api_inventory_item_check(inventory_id, product_id):
     if inventory.status != 'active':
         return jsonify({'error': 'Inventur ist nicht aktiv.'}), 400
     
-    item = InventoryItem.query.filter_by(
-        inventory_id=inventory_id,
-        product_id=product_id
-    ).first()
+    flush_inventory_checks(inventory_id)
+    item_id = find_inventory_item_id(inventory_id, product_id)
     
-    if not item:
+    if item_id is None:
         return jsonify({'error': 'Produkt nicht in dieser Inventur gefunden.'}), 404
     
     data = request.get_json()
-    checked = data.get('checked', True)
-    
-    item.checked = checked
-    if checked:
-        item.checked_by = current_user.id
-        item.checked_at = datetime.utcnow()
-    else:
-        item.checked_by = None
-        item.checked_at = None
+    checked = bool(data.get('checked', True))
     
+    events, progress = apply_item_changes(db.session.connection(), inventory_id, [{
+        'item_id': item_id, 'product_id': product_id, 'checked': checked,
+        'by': current_user.id, 'at': datetime.utcnow()
+    }])
     db.session.commit()
+    publish_inventory_events(inventory_id, events, progress)
+    item = db.session.get(InventoryItem, item_id)
     
     return jsonify({
         'success': True,
@@ -1311,22 +1396,16 @@ def api_inventory_scan(inventory_id):
     qr_type, qr_id = parsed
     
     if qr_type == 'product':
-        product = Product.query.get(qr_id)
+        product = db.session.get(Product, qr_id)
         if not product:
             return jsonify({'error': 'Produkt nicht gefunden.'}), 404
         
-        item = InventoryItem.query.filter_by(
-            inventory_id=inventory_id,
-            product_id=product.id
-        ).first()
-        
-        if not item:
+        item_id = find_inventory_item_id(inventory_id, product.id)
+        if item_id is None:
             return jsonify({'error': 'Produkt nicht in dieser Inventur gefunden.'}), 404
         
-        item.checked = True
-        item.checked_by = current_user.id
-        item.checked_at = datetime.utcnow()
-        db.session.commit()
+        # Abhaken wird gesammelt geschrieben (siehe app.utils.inventory_count)
+        checked_at = queue_inventory_check(inventory_id, product.id, item_id, current_user.id)
         
         return jsonify({
             'success': True,
@@ -1338,13 +1417,10 @@ def api_inventory_scan(inventory_id):
                 'condition': product.condition
             },
             'item': {
-                'id': item.id,
-                'checked': item.checked,
-                'notes': item.notes,
-                'location_changed': item.location_changed,
-                'new_location': item.new_location,
-                'condition_changed': item.condition_changed,
-                'new_condition': item.new_condition
+                'id': item_id,
+                'checked': True,
+                'checked_by': current_user.id,
+                'checked_at': checked_at.isoformat()
             }
         })
     else:
@@ -1424,18 +1500,9 @@ def print_qr():
                 flash(_('inventory.flash.no_valid_products'), 'danger')
                 return redirect(url_for('inventory.print_qr'))
             
-            pdf_buffer = BytesIO()
-            generate_qr_code_sheet_pdf(products, pdf_buffer, label_type=label_type)
-            pdf_buffer.seek(0)
-            
             label_type_name = "Kabel" if label_type == 'cable' else "Geräte"
             filename = f"QR-Codes_{label_type_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-            return send_file(
-                pdf_buffer,
-                mimetype='application/pdf',
-                as_attachment=True,
-                download_name=filename
-            )
+            return _pdf_response('qr_sheets', qr_sheet_document(products, label_type), filename)
         except Exception as e:
             current_app.logger.error(f"Fehler beim Generieren des QR-Code-Druckbogens: {e}")
             flash(_('inventory.flash.generate_error'), 'danger')
@@ -1461,17 +1528,8 @@ def print_qr():
 def print_color_codes():
     """Farbcodes-Tabelle drucken."""
     try:
-        pdf_buffer = BytesIO()
-        generate_color_code_table_pdf(pdf_buffer)
-        pdf_buffer.seek(0)
-        
         filename = f"Farbcodes_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-        return send_file(
-            pdf_buffer,
-            mimetype='application/pdf',
-            as_attachment=True,
-            download_name=filename
-        )
+        return _pdf_response('color_codes', color_codes_document(), filename)
     except Exception as e:
         current_app.logger.error(f"Fehler beim Generieren der Farbcodes-Tabelle: {e}")
         flash(_('inventory.flash.color_table_error'), 'danger')
@@ -1483,7 +1541,11 @@ def print_color_codes():
 @inventory_bp.route('/api/products', methods=['GET'])
 @login_required
 def api_products():
-    """API: Liste aller Produkte mit Such- und Filteroptionen."""
+    """API: Liste aller Produkte mit Such- und Filteroptionen.
+    
+    Optional seitenweise (`limit`, `cursor`) und mit Auswahl der Felder (`fields`),
+    siehe `app.utils.product_listing`.
+    """
     try:
         search = request.args.get('search', '').strip()
         category = request.args.get('category', '').strip()
@@ -1493,139 +1555,47 @@ def api_products():
         
         sort_by = (sort_by_param or 'name').strip().lower()
         sort_dir = (sort_dir_param or 'asc').strip().lower()
-        if sort_by not in {'name', 'category', 'status', 'condition', 'folder', 'created_at', 'length'}:
+        if sort_by not in SORT_FIELDS:
             sort_by = 'name'
         if sort_dir not in {'asc', 'desc'}:
             sort_dir = 'asc'
-        descending = sort_dir == 'desc'
-        
-        query = Product.query
-        
-        if search:
-            query = query.filter(
-                or_(
-                    Product.name.ilike(f'%{search}%'),
-                    Product.serial_number.ilike(f'%{search}%'),
-                    Product.description.ilike(f'%{search}%')
-                )
-            )
-        
-        if category:
-            query = query.filter_by(category=category)
-        
-        if status:
-            query = query.filter_by(status=status)
         
-        try:
-            sort_field_map = {
-                'name': Product.name,
-                'category': Product.category,
-                'status': Product.status,
-                'condition': Product.condition,
-                'folder': Product.folder_id,
-                'created_at': Product.created_at,
-            }
-            
-            products_query = query.options(joinedload(Product.folder))
-            
-            if sort_by != 'length':
-                sort_column = sort_field_map.get(sort_by, Product.name)
-                order_clause = sort_column.desc() if descending else sort_column.asc()
-                products_query = products_query.order_by(order_clause)
-            else:
-                products_query = products_query.order_by(Product.name.asc())
-            
-            products = products_query.all()
-            
-            if sort_by == 'length':
-                def length_sort_key(prod):
-                    meters = parse_length_to_meters(getattr(prod, 'length', None))
-                    if meters is None:
-                        return (1, 0.0)
-                    return (0, -meters if descending else meters)
-                
-                products.sort(key=length_sort_key)
-        except Exception as e:
-            current_app.logger.warning(f"joinedload fehlgeschlagen, verwende Standard-Query: {e}")
-            products = query.order_by(Product.name).all()
-        
-        result = []
-        for p in products:
-            try:
-                folder_id = getattr(p, 'folder_id', None)
-                folder_name = None
-                if folder_id and p.folder:
-                    folder_name = p.folder.name
-                elif hasattr(p, 'folder') and p.folder:
-                    folder_name = p.folder.name
-                
-                location = getattr(p, 'location', None)
-                length = getattr(p, 'length', None)
-                
-                location_value = location if (location and str(location).strip()) else None
-                length_value = length if (length and str(length).strip()) else None
-                
-                image_path_value = None
-                if p.image_path:
-                    if os.path.isabs(p.image_path):
-                        image_path_value = os.path.basename(p.image_path)
-                    else:
-                        image_path_value = p.image_path
-                
-                result.append({
-                    'id': p.id,
-                    'name': p.name,
-                    'description': p.description,
-                    'category': p.category,
-                    'serial_number': p.serial_number,
-                    'condition': p.condition,
-                    'location': location_value,
-                    'length': length_value,
-                    'length_meters': parse_length_to_meters(length_value),
-                    'folder_id': folder_id,
-                    'folder_name': folder_name,
-                    'purchase_date': p.purchase_date.isoformat() if p.purchase_date else None,
-                    'status': p.status,
-                    'image_path': image_path_value,
-                    'qr_code_data': p.qr_code_data,
-                    'created_at': p.created_at.isoformat(),
-                    'created_by': p.created_by
-                })
-            except Exception as e:
-                current_app.logger.error(f"Fehler beim Serialisieren von Produkt {p.id}: {e}", exc_info=True)
-                image_path_value = None
-                image_path_raw = getattr(p, 'image_path', None)
-                if image_path_raw:
-                    if os.path.isabs(image_path_raw):
-                        image_path_value = os.path.basename(image_path_raw)
-                    else:
-                        image_path_value = image_path_raw
-                result.append({
-                    'id': p.id,
-                    'name': p.name,
-                    'description': getattr(p, 'description', None),
-                    'category': p.category,
-                    'serial_number': p.serial_number,
-                    'condition': getattr(p, 'condition', None),
-                    'location': getattr(p, 'location', None),
-                    'length': getattr(p, 'length', None),
-                    'length_meters': parse_length_to_meters(getattr(p, 'length', None)),
-                    'folder_id': None,
-                    'folder_name': None,
-                    'purchase_date': p.purchase_date.isoformat() if p.purchase_date else None,
-                    'status': p.status,
-                    'image_path': image_path_value,
-                    'qr_code_data': getattr(p, 'qr_code_data', None),
-                    'created_at': p.created_at.isoformat(),
-                    'created_by': p.created_by
-                })
+        length_min = parse_length_bound(request.args.get('length_min'))
+        length_max = parse_length_bound(request.args.get('length_max'))
         
-        return jsonify(result)
+        filters = product_filters(search, category, status,
+                                  (Product.name, Product.serial_number, Product.description),
+                                  length_min, length_max)
+        return _product_listing_response(filters, ('products', search, category, status, length_min, length_max),
+                                         PRODUCT_FIELDS, sort_by, sort_dir == 'desc')
+    except ListingError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         current_app.logger.error(f"Kritischer Fehler in api_products: {e}", exc_info=True)
         return jsonify({'error': f'Server-Fehler: {str(e)}'}), 500
 
 
+def _product_listing_response(filters, signature, default_fields, sort_by='name', descending=False,
+                              blank_as_none=True):
+    """Antwort für Produktlisten: ohne `limit`/`cursor` alle Produkte als Liste,
+    sonst eine Seite mit Gesamtzahl und Cursor der nächsten Seite."""
+    fields = parse_fields(request.args.get('fields'), default_fields)
+    paginated = 'limit' in request.args or 'cursor' in request.args
+    if not paginated:
+        items, _next = list_products(fields, filters, sort_by, descending, blank_as_none=blank_as_none)
+        return json_response(items)
+    
+    limit = parse_limit(request.args.get('limit'))
+    items, next_cursor = list_products(fields, filters, sort_by, descending, limit,
+                                       request.args.get('cursor') or None, blank_as_none)
+    return json_response({
+        'items': items,
+        'next_cursor': next_cursor,
+        'total': count_products(filters, signature),
+        'limit': limit
+    })
+
+
 @inventory_bp.route('/api/products/<int:product_id>', methods=['GET'])
 @login_required
 def api_product_get(product_id):
@@ -1648,13 +1618,14 @@ def api_product_get(product_id):
         'condition': product.condition,
         'location': product.location,
         'length': product.length,
-        'length_meters': parse_length_to_meters(product.length),
+        'length_meters': product.length_meters,
         'folder_id': product.folder_id,
         'folder_name': product.folder.name if product.folder else None,
         'purchase_date': product.purchase_date.isoformat() if product.purchase_date else None,
         'status': product.status,
         'image_path': image_path_value,
         'qr_code_data': product.qr_code_data,
+        'qr_code_url': url_for('inventory.product_qr_code', product_id=product.id),
         'created_at': product.created_at.isoformat(),
         'created_by': product.created_by
     })
@@ -1689,15 +1660,13 @@ def api_product_create():
         created_by=current_user.id
     )
     
-    qr_data = generate_product_qr_code(product.id)
-    product.qr_code_data = qr_data
-    
     db.session.add(product)
     db.session.flush()
     
     qr_data = generate_product_qr_code(product.id)
     product.qr_code_data = qr_data
     db.session.commit()
+    precompute_qr_codes([qr_data])
     
     return jsonify({
         'id': product.id,
@@ -1863,13 +1832,7 @@ def api_products_bulk_update():
                 product.folder_id = updates['folder_id']
             if updates.get('remove_image'):
                 if product.image_path:
-                    upload_dir = os.path.join(current_app.config['UPLOAD_FOLDER'], 'inventory', 'product_images')
-                    filepath = os.path.join(upload_dir, product.image_path)
-                    if os.path.exists(filepath):
-                        try:
-                            os.remove(filepath)
-                        except Exception as e:
-                            current_app.logger.error(f"Fehler beim Löschen des Bildes: {e}")
+                    mark_blob_unreferenced(product.image_path, subdir=PRODUCT_IMAGE_SUBDIR, source='product_image')
                 product.image_path = None
             updated_count += 1
         except Exception as e:
@@ -1934,20 +1897,14 @@ def api_products_bulk_delete():
     
     for product in products:
         try:
-            if product.image_path and os.path.exists(product.image_path):
-                try:
-                    os.remove(product.image_path)
-                except Exception as e:
-                    current_app.logger.warning(f"Fehler beim Löschen des Bildes von Produkt {product.id}: {e}")
+            if product.image_path:
+                mark_blob_unreferenced(product.image_path, subdir=PRODUCT_IMAGE_SUBDIR, source='product_image')
             
             # Lösche auch zugehörige Dokumente
             documents = ProductDocument.query.filter_by(product_id=product.id).all()
             for doc in documents:
-                if doc.file_path and os.path.exists(doc.file_path):
-                    try:
-                        os.remove(doc.file_path)
-                    except Exception as e:
-                        current_app.logger.warning(f"Fehler beim Löschen des Dokuments {doc.id}: {e}")
+                if doc.file_path:
+                    mark_blob_unreferenced(doc.file_path, subdir=PRODUCT_DOCUMENT_SUBDIR, source='product_document')
                 db.session.delete(doc)
             
             db.session.delete(product)
@@ -2014,168 +1971,56 @@ def api_folders():
 @inventory_bp.route('/api/stock', methods=['GET'])
 @login_required
 def api_stock():
-    """API: Effiziente Abfrage des gesamten Bestands mit Such- und Filterunterstützung."""
+    """API: Effiziente Abfrage des gesamten Bestands mit Such- und Filterunterstützung.
+    
+    Optional seitenweise (`limit`, `cursor`) und mit Auswahl der Felder (`fields`).
+    """
     search = request.args.get('search', '').strip()
     category = request.args.get('category', '').strip()
     status = request.args.get('status', '').strip()
     
-    query = Product.query
-    
-    if search:
-        query = query.filter(
-            or_(
-                Product.name.ilike(f'%{search}%'),
-                Product.serial_number.ilike(f'%{search}%')
-            )
-        )
-    
-    if category:
-        query = query.filter_by(category=category)
-    
-    if status:
-        query = query.filter_by(status=status)
-    
-    products = query.options(joinedload(Product.folder)).order_by(Product.name).all()
-    
-    result = []
-    for p in products:
-        try:
-            image_path_value = None
-            if p.image_path:
-                if os.path.isabs(p.image_path):
-                    image_path_value = os.path.basename(p.image_path)
-                else:
-                    image_path_value = p.image_path
-            
-            result.append({
-                'id': p.id,
-                'name': p.name,
-                'category': p.category,
-                'serial_number': p.serial_number,
-                'status': p.status,
-                'location': p.location,
-                'length': p.length,
-                'length_meters': parse_length_to_meters(p.length),
-                'folder_id': getattr(p, 'folder_id', None),
-                'folder_name': p.folder.name if p.folder else None,
-                'image_path': image_path_value,
-                'qr_code_data': p.qr_code_data
-            })
-        except Exception as e:
-            current_app.logger.error(f"Fehler beim Serialisieren von Produkt {p.id} in api_stock: {e}")
-            # Normalisiere image_path auch im Fallback
-            image_path_value = None
-            if p.image_path:
-                if os.path.isabs(p.image_path):
-                    image_path_value = os.path.basename(p.image_path)
-                else:
-                    image_path_value = p.image_path
-            # Fallback ohne Ordner-Informationen
-            result.append({
-                'id': p.id,
-                'name': p.name,
-                'category': p.category,
-                'serial_number': p.serial_number,
-                'status': p.status,
-                'location': p.location,
-                'length': getattr(p, 'length', None),
-                'length_meters': parse_length_to_meters(getattr(p, 'length', None)),
-                'folder_id': None,
-                'folder_name': None,
-                'image_path': image_path_value,
-                'qr_code_data': p.qr_code_data
-            })
-    
-    return jsonify(result)
+    try:
+        length_min = parse_length_bound(request.args.get('length_min'))
+        length_max = parse_length_bound(request.args.get('length_max'))
+        filters = product_filters(search, category, status, length_min=length_min, length_max=length_max)
+        return _product_listing_response(filters, ('stock', search, category, status, length_min, length_max),
+                                         STOCK_FIELDS, blank_as_none=False)
+    except ListingError as e:
+        return jsonify({'error': str(e)}), 400
 
 
 @inventory_bp.route('/api/inventory/filter-options', methods=['GET'])
 @login_required
 def api_filter_options():
-    """API: Gibt alle verfügbaren Filter-Optionen zurück (optional gefiltert nach Ordner)."""
+    """API: Gibt alle verfügbaren Filter-Optionen mit Anzahl je Wert zurück.
+    
+    Optional gefiltert nach Ordner (`folder_id`, 0 = ohne Ordner), Suche,
+    Längenbereich und den Facetten selbst (`category`, `condition`, `location`,
+    `length`, `purchase_year`, `status`; mehrfach angebbar).
+    """
     try:
-        from sqlalchemy import distinct, func, extract
-        
         # Hole optionalen folder_id Parameter
         folder_id_param = request.args.get('folder_id', type=int)
+        search = request.args.get('search', '').strip()
+        length_min = parse_length_bound(request.args.get('length_min'))
+        length_max = parse_length_bound(request.args.get('length_max'))
         
-        # Basis-Query mit optionaler Ordner-Filterung
-        base_query = Product.query
+        filters = product_filters(search, search_columns=(Product.name, Product.serial_number, Product.description),
+                                  length_min=length_min, length_max=length_max)
         if folder_id_param is not None:
-            # Filtere nach Ordner (auch None für Produkte ohne Ordner)
-            if folder_id_param == 0:
-                # 0 bedeutet: nur Produkte ohne Ordner (Root)
-                base_query = base_query.filter(Product.folder_id.is_(None))
-            else:
-                # Spezifischer Ordner
-                base_query = base_query.filter(Product.folder_id == folder_id_param)
-        
-        # Verwende DISTINCT-Abfragen für bessere Performance und Korrektheit
-        # Kategorien
-        categories_query = base_query.with_entities(distinct(Product.category)).filter(
-            Product.category.isnot(None),
-            Product.category != ''
-        )
-        categories_result = categories_query.all()
-        categories = sorted([cat[0].strip() for cat in categories_result if cat[0] and cat[0].strip()])
-        
-        # Zustände
-        conditions_query = base_query.with_entities(distinct(Product.condition)).filter(
-            Product.condition.isnot(None),
-            Product.condition != ''
-        )
-        conditions_result = conditions_query.all()
-        conditions = sorted([cond[0].strip() for cond in conditions_result if cond[0] and cond[0].strip()])
-        
-        # Lagerorte
-        locations_query = base_query.with_entities(distinct(Product.location)).filter(
-            Product.location.isnot(None),
-            Product.location != ''
-        )
-        locations_result = locations_query.all()
-        locations = sorted([loc[0].strip() for loc in locations_result if loc[0] and loc[0].strip()])
-        
-        # Längen
-        lengths_query = base_query.with_entities(distinct(Product.length)).filter(
-            Product.length.isnot(None),
-            Product.length != ''
-        )
-        lengths_result = lengths_query.all()
-        lengths_raw = [len[0].strip() for len in lengths_result if len[0] and len[0].strip()]
+            # 0 bedeutet: nur Produkte ohne Ordner (Root)
+            filters.append(Product.folder_id.is_(None) if folder_id_param == 0
+                           else Product.folder_id == folder_id_param)
         
-        try:
-            lengths = sorted(lengths_raw, key=lambda x: (
-                float(str(x).replace(',', '.').replace('m', '').replace('cm', '').replace('mm', '').strip()) 
-                if str(x).replace(',', '.').replace('m', '').replace('cm', '').replace('mm', '').strip().replace('.', '').replace('-', '').replace('+', '').isdigit() 
-                else float('inf'),
-                str(x)
-            ))
-        except (ValueError, AttributeError):
-            lengths = sorted(lengths_raw)
-        
-        # Anschaffungsjahre - verwende EXTRACT für Jahr
-        years_query = base_query.with_entities(
-            distinct(extract('year', Product.purchase_date))
-        ).filter(
-            Product.purchase_date.isnot(None)
-        )
-        years_result = years_query.all()
-        purchase_years = sorted(
-            [str(int(year[0])) for year in years_result if year[0] is not None and year[0] > 0],
-            key=lambda x: int(x) if x.isdigit() else 0,
-            reverse=True
-        )
-        
-        folder_info = f"Ordner {folder_id_param}" if folder_id_param is not None else "alle Ordner"
-        current_app.logger.debug(f"Filter-Optionen extrahiert für {folder_info}: {len(categories)} Kategorien, {len(conditions)} Zustände, {len(locations)} Lagerorte, {len(lengths)} Längen, {len(purchase_years)} Jahre")
-        
-        return jsonify({
-            'categories': categories,
-            'conditions': conditions,
-            'locations': locations,
-            'lengths': lengths,
-            'purchase_years': purchase_years
-        })
+        selected = {
+            param: sorted({value.strip() for value in request.args.getlist(param) if value.strip()})
+            for param in FACET_PARAMS
+        }
+        signature = (folder_id_param, search, length_min, length_max,
+                     tuple((param, tuple(values)) for param, values in selected.items() if values))
+        return json_response(facet_counts(filters, selected, signature))
+    except ListingError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         current_app.logger.error(f"Fehler beim Abrufen der Filter-Optionen: {e}", exc_info=True)
         return jsonify({'error': f'Fehler beim Abrufen der Filter-Optionen: {str(e)}'}), 500
@@ -2410,17 +2255,8 @@ def api_borrow_pdf(transaction_id):
     """API: Ausleihschein-PDF generieren."""
     borrow_transaction = BorrowTransaction.query.get_or_404(transaction_id)
     
-    pdf_buffer = BytesIO()
-    generate_borrow_receipt_pdf(borrow_transaction, pdf_buffer)
-    pdf_buffer.seek(0)
-    
     filename = f"Ausleihschein_{borrow_transaction.transaction_number}.pdf"
-    return send_file(
-        pdf_buffer,
-        mimetype='application/pdf',
-        as_attachment=True,
-        download_name=filename
-    )
+    return _pdf_response('borrow_receipts', borrow_receipt_document(borrow_transaction), filename)
 
 
 @inventory_bp.route('/api/print-qr-codes', methods=['POST'])
@@ -2515,6 +2351,7 @@ def set_new():
                 continue
         
         db.session.commit()
+        precompute_qr_codes([generate_set_qr_code(product_set.id)])
         flash(_('inventory.flash.set_created', name=name), 'success')
         return redirect(url_for('inventory.sets'))
     
@@ -2540,13 +2377,8 @@ def set_view(set_id):
 @login_required
 def set_qr_code(set_id):
     """QR-Code für ein Produktset anzeigen."""
-    product_set = ProductSet.query.get_or_404(set_id)
-    qr_data = generate_set_qr_code(set_id)
-    
-    qr_image_bytes = generate_qr_code_bytes(qr_data)
-    
-    from flask import Response
-    return Response(qr_image_bytes, mimetype='image/png')
+    ProductSet.query.get_or_404(set_id)
+    return qr_code_response(generate_set_qr_code(set_id))
 
 
 @inventory_bp.route('/sets/<int:set_id>/edit', methods=['GET', 'POST'])
@@ -2746,6 +2578,7 @@ def product_documents(product_id):
 
 @inventory_bp.route('/products/<int:product_id>/documents/upload', methods=['POST'])
 @login_required
+@enforce_upload_quota
 def product_document_upload(product_id):
     """Dokument für ein Produkt hochladen."""
     product = Product.query.get_or_404(product_id)
@@ -2766,20 +2599,17 @@ def product_document_upload(product_id):
     filename = secure_filename(file.filename)
     timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
     stored_filename = f"{timestamp}_{filename}"
-    upload_dir = os.path.join(current_app.config['UPLOAD_FOLDER'], 'inventory', 'product_documents')
-    os.makedirs(upload_dir, exist_ok=True)
-    filepath = os.path.join(upload_dir, stored_filename)
-    file.save(filepath)
-    absolute_filepath = os.path.abspath(filepath)
+    key = save_upload(file, 'inventory/product_documents', stored_filename)
+    stored_path = path_for_key(key)
     
     # Dokument-Eintrag erstellen
     document = ProductDocument(
         product_id=product_id,
         manual_id=manual_id,
-        file_path=absolute_filepath,
+        file_path=stored_path,
         file_name=filename,
         file_type=file_type,
-        file_size=os.path.getsize(absolute_filepath),
+        file_size=get_storage().size(key),
         uploaded_by=current_user.id
     )
     
@@ -2800,12 +2630,8 @@ def product_document_delete(product_id, document_id):
         flash('Ungültige Anfrage.', 'danger')
         return redirect(url_for('inventory.product_documents', product_id=product_id))
     
-    # Datei löschen
-    if os.path.exists(document.file_path):
-        try:
-            os.remove(document.file_path)
-        except Exception as e:
-            current_app.logger.error(f"Fehler beim Löschen der Datei: {e}")
+    # Datei zur Löschung vormerken
+    mark_blob_unreferenced(document.file_path, subdir=PRODUCT_DOCUMENT_SUBDIR, source='product_document')
     
     filename = document.file_name
     db.session.delete(document)
@@ -2825,11 +2651,12 @@ def product_document_download(product_id, document_id):
         flash(_('inventory.flash.invalid_request'), 'danger')
         return redirect(url_for('inventory.product_documents', product_id=product_id))
     
-    if not os.path.exists(document.file_path):
+    if not stored_file_exists(document.file_path, PRODUCT_DOCUMENT_SUBDIR):
         flash(_('inventory.flash.file_not_found'), 'danger')
         return redirect(url_for('inventory.product_documents', product_id=product_id))
     
-    return send_file(document.file_path, as_attachment=True, download_name=document.file_name)
+    return send_stored_file(document.file_path, PRODUCT_DOCUMENT_SUBDIR, as_attachment=True,
+                            download_name=document.file_name)
 
 
 @inventory_bp.route('/api/products/<int:product_id>/documents', methods=['GET'])
@@ -2859,38 +2686,18 @@ def api_product_documents(product_id):
 @inventory_bp.route('/api/search', methods=['GET'])
 @login_required
 def api_search():
-    """Erweiterte Volltextsuche über alle Produktfelder."""
+    """Erweiterte Volltextsuche über alle Produktfelder.
+    
+    Gewichtete Treffer aus dem Suchindex, exakte Treffer auf Seriennummer bzw.
+    QR-Code zuerst (höchstens `limit`, Standard 50).
+    """
     search_query = request.args.get('q', '').strip()
     
     if not search_query:
         return jsonify({'error': 'Suchbegriff erforderlich.'}), 400
     
-    # Volltextsuche über alle relevanten Felder
-    search_pattern = f'%{search_query}%'
-    products = Product.query.filter(
-        or_(
-            Product.name.ilike(search_pattern),
-            Product.description.ilike(search_pattern),
-            Product.serial_number.ilike(search_pattern),
-            Product.category.ilike(search_pattern),
-            Product.location.ilike(search_pattern),
-            Product.condition.ilike(search_pattern)
-        )
-    ).order_by(Product.name).all()
-    
-    result = []
-    for p in products:
-        result.append({
-            'id': p.id,
-            'name': p.name,
-            'description': p.description,
-            'category': p.category,
-            'serial_number': p.serial_number,
-            'status': p.status,
-            'location': p.location
-        })
-    
-    return jsonify(result)
+    limit = request.args.get('limit', DEFAULT_SEARCH_LIMIT, type=int)
+    return jsonify(search_products(search_query, limit))
 
 
 @inventory_bp.route('/api/filters', methods=['GET'])
@@ -3038,132 +2845,9 @@ def statistics():
 @inventory_bp.route('/api/statistics', methods=['GET'])
 @login_required
 def api_statistics():
-    """API: Aggregierte Statistiken für Dashboard."""
+    """API: Aggregierte Statistiken für Dashboard (aus den täglichen Rollups, mit ETag)."""
     try:
-        from sqlalchemy import func, extract
-        
-        # Gesamtbestand
-        total_products = Product.query.count()
-        
-        # Ausgeliehene Artikel
-        borrowed_count = Product.query.filter_by(status='borrowed').count()
-        
-        # Überfällige Ausleihen
-        overdue_count = BorrowTransaction.query.filter(
-            BorrowTransaction.status == 'active',
-            BorrowTransaction.expected_return_date < date.today()
-        ).count()
-        
-        # Verfügbare Artikel
-        available_count = Product.query.filter_by(status='available').count()
-        
-        # Verfügbarkeitsquote
-        availability_rate = (available_count / total_products * 100) if total_products > 0 else 0
-        
-        # Meist ausgeliehene Produkte (Top 10)
-        try:
-            returned_count = BorrowTransaction.query.filter_by(status='returned').count()
-            if returned_count > 0:
-                top_borrowed = db.session.query(
-                    Product.id,
-                    Product.name,
-                    func.count(BorrowTransaction.id).label('borrow_count')
-                ).join(
-                    BorrowTransaction, Product.id == BorrowTransaction.product_id
-                ).filter(
-                    BorrowTransaction.status == 'returned'
-                ).group_by(
-                    Product.id, Product.name
-                ).order_by(
-                    func.count(BorrowTransaction.id).desc()
-                ).limit(10).all()
-                
-                top_borrowed_list = [{
-                    'id': p.id,
-                    'name': p.name,
-                    'borrow_count': p.borrow_count
-                } for p in top_borrowed]
-            else:
-                top_borrowed_list = []
-        except Exception as e:
-            current_app.logger.error(f"Fehler bei Top-Borrowed-Query: {e}", exc_info=True)
-            top_borrowed_list = []
-        
-        # Kategorienverteilung
-        try:
-            category_distribution = db.session.query(
-                Product.category,
-                func.count(Product.id).label('count')
-            ).filter(
-                Product.category.isnot(None)
-            ).group_by(
-                Product.category
-            ).all()
-            
-            category_data = [{
-                'category': c.category or 'Keine Kategorie',
-                'count': c.count
-            } for c in category_distribution]
-        except Exception as e:
-            current_app.logger.error(f"Fehler bei Kategorienverteilung: {e}")
-            category_data = []
-        
-        # Zeitreihen-Daten für Ausleihtrends (letzte 12 Monate)
-        try:
-            twelve_months_ago = datetime.utcnow() - timedelta(days=365)
-            monthly_borrows = db.session.query(
-                extract('year', BorrowTransaction.borrow_date).label('year'),
-                extract('month', BorrowTransaction.borrow_date).label('month'),
-                func.count(BorrowTransaction.id).label('count')
-            ).filter(
-                BorrowTransaction.borrow_date >= twelve_months_ago
-            ).group_by(
-                extract('year', BorrowTransaction.borrow_date),
-                extract('month', BorrowTransaction.borrow_date)
-            ).order_by(
-                extract('year', BorrowTransaction.borrow_date),
-                extract('month', BorrowTransaction.borrow_date)
-            ).all()
-            
-            monthly_data = []
-            for m in monthly_borrows:
-                monthly_data.append({
-                    'month': f"{int(m.month):02d}/{int(m.year)}",
-                    'count': m.count
-                })
-        except Exception as e:
-            current_app.logger.error(f"Fehler bei Monatstrends: {e}")
-            monthly_data = []
-        
-        try:
-            status_distribution = db.session.query(
-                Product.status,
-                func.count(Product.id).label('count')
-            ).group_by(
-                Product.status
-            ).all()
-            
-            status_data = [{
-                'status': s.status,
-                'count': s.count
-            } for s in status_distribution]
-        except Exception as e:
-            current_app.logger.error(f"Fehler bei Status-Verteilung: {e}")
-            status_data = []
-        
-        return jsonify({
-            'overview': {
-                'total_products': total_products,
-                'borrowed_count': borrowed_count,
-                'overdue_count': overdue_count,
-                'available_count': available_count,
-                'availability_rate': round(availability_rate, 2)
-            },
-            'top_borrowed': top_borrowed_list,
-            'category_distribution': category_data,
-            'monthly_trends': monthly_data,
-            'status_distribution': status_data
-        })
+        return statistics_response('statistics', inventory_statistics)
     except Exception as e:
         current_app.logger.error(f"Fehler in api_statistics: {e}", exc_info=True)
         return jsonify({
@@ -3458,15 +3142,7 @@ def api_mobile_statistics():
     if not user:
         return jsonify({'error': 'Ungültiger oder abgelaufener Token.'}), 401
     
-    total_products = Product.query.count()
-    borrowed_count = Product.query.filter_by(status='borrowed').count()
-    available_count = Product.query.filter_by(status='available').count()
-    
-    return jsonify({
-        'total_products': total_products,
-        'borrowed_count': borrowed_count,
-        'available_count': available_count
-    })
+    return statistics_response('mobile_statistics', mobile_statistics)
 
 
 @inventory_bp.route('/api/folders/<int:folder_id>', methods=['PUT', 'DELETE'])
@@ -3522,6 +3198,19 @@ def api_categories():
     return jsonify(sorted(categories))
 
 
+def _replace_product_category(original_name, new_name):
+    """
+    Ersetzt die Kategorie aller Produkte per Bulk-Update und zieht den Suchindex nach.
+
+    Nach dem Commit muss `bump_product_version` aufgerufen werden.
+    """
+    product_ids = [product_id for (product_id,) in
+                   db.session.query(Product.id).filter(Product.category == original_name)]
+    Product.query.filter_by(category=original_name).update({'category': new_name}, synchronize_session=False)
+    # Bulk-Updates lösen keine Mapper-Events aus
+    index_products(product_ids)
+
+
 @inventory_bp.route('/api/categories/<path:category_name>', methods=['PUT', 'DELETE'])
 @login_required
 def api_category_update_delete(category_name):
@@ -3540,14 +3229,16 @@ def api_category_update_delete(category_name):
             return jsonify({'error': 'Eine Kategorie mit diesem Namen existiert bereits.'}), 400
         updated_categories = [new_name if c == original_name else c for c in categories]
         save_inventory_categories(updated_categories)
-        Product.query.filter_by(category=original_name).update({'category': new_name}, synchronize_session=False)
+        _replace_product_category(original_name, new_name)
         db.session.commit()
+        bump_product_version()
         return jsonify({'name': new_name})
     # DELETE
     updated_categories = [c for c in categories if c != original_name]
     save_inventory_categories(updated_categories)
     # Entferne Kategorie aus Produkten
-    Product.query.filter_by(category=original_name).update({'category': None}, synchronize_session=False)
+    _replace_product_category(original_name, None)
     db.session.commit()
+    bump_product_version()
     return jsonify({'success': True})
 
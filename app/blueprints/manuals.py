@@ -1,14 +1,24 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, send_file
+from flask import Blueprint, render_template, request, redirect, url_for, flash
 from flask_login import login_required, current_user
 from app import db
 from app.models.manual import Manual
+from app.utils.blob_gc import mark_blob_unreferenced
+from app.utils.storage import get_storage, path_for_key, save_upload, send_storage_object, storage_key
+from app.utils.storage_usage import enforce_upload_quota
 from werkzeug.utils import secure_filename
 from datetime import datetime
-import os
 
 manuals_bp = Blueprint('manuals', __name__)
 
 
+def _manual_key(manual):
+    """Speicherschlüssel einer Anleitung; Fallback auf uploads/manuals/<Dateiname>."""
+    key = storage_key(manual.file_path, 'manuals')
+    if key and get_storage().exists(key):
+        return key
+    return storage_key(manual.filename, 'manuals')
+
+
 @manuals_bp.route('/')
 @login_required
 def index():
@@ -19,6 +29,7 @@ def index():
 
 @manuals_bp.route('/upload', methods=['GET', 'POST'])
 @login_required
+@enforce_upload_quota
 def upload():
     """Upload a new manual (admin only)."""
     if not current_user.is_admin:
@@ -48,18 +59,15 @@ def upload():
         filename = secure_filename(file.filename)
         timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
         filename = f"{timestamp}_{filename}"
-        filepath = os.path.join('uploads', 'manuals', filename)
-        
-        # Ensure we use absolute path for saving
-        absolute_filepath = os.path.abspath(filepath)
-        file.save(absolute_filepath)
+        key = save_upload(file, 'manuals', filename)
+        filename = key.rsplit('/', 1)[-1]
         
         # Create manual record
         manual = Manual(
             title=title,
             filename=filename,
-            file_path=absolute_filepath,
-            file_size=os.path.getsize(absolute_filepath),
+            file_path=path_for_key(key),
+            file_size=get_storage().size(key),
             uploaded_by=current_user.id
         )
         
@@ -78,25 +86,12 @@ def view(manual_id):
     """View a manual (PDF in browser)."""
     manual = Manual.query.get_or_404(manual_id)
     
-    # Ensure we have the correct absolute path
-    file_path = manual.file_path
-    if not os.path.isabs(file_path):
-        # Convert relative path to absolute path
-        file_path = os.path.abspath(file_path)
-    
-    # If file still doesn't exist, try to find it in uploads directory
-    if not os.path.exists(file_path):
-        # Try to construct the path from project root
-        from flask import current_app
-        project_root = current_app.root_path
-        uploads_path = os.path.join(project_root, '..', 'uploads', 'manuals', manual.filename)
-        file_path = os.path.abspath(uploads_path)
-    
-    if not os.path.exists(file_path):
+    key = _manual_key(manual)
+    if not key or not get_storage().exists(key):
         flash('Die Anleitung-Datei konnte nicht gefunden werden.', 'danger')
         return redirect(url_for('manuals.index'))
     
-    return send_file(file_path, mimetype='application/pdf')
+    return send_storage_object(key, mimetype='application/pdf')
 
 
 @manuals_bp.route('/download/<int:manual_id>')
@@ -105,25 +100,12 @@ def download(manual_id):
     """Download a manual."""
     manual = Manual.query.get_or_404(manual_id)
     
-    # Ensure we have the correct absolute path
-    file_path = manual.file_path
-    if not os.path.isabs(file_path):
-        # Convert relative path to absolute path
-        file_path = os.path.abspath(file_path)
-    
-    # If file still doesn't exist, try to find it in uploads directory
-    if not os.path.exists(file_path):
-        # Try to construct the path from project root
-        from flask import current_app
-        project_root = current_app.root_path
-        uploads_path = os.path.join(project_root, '..', 'uploads', 'manuals', manual.filename)
-        file_path = os.path.abspath(uploads_path)
-    
-    if not os.path.exists(file_path):
+    key = _manual_key(manual)
+    if not key or not get_storage().exists(key):
         flash('Die Anleitung-Datei konnte nicht gefunden werden.', 'danger')
         return redirect(url_for('manuals.index'))
     
-    return send_file(file_path, as_attachment=True, download_name=f"{manual.title}.pdf")
+    return send_storage_object(key, as_attachment=True, download_name=f"{manual.title}.pdf")
 
 
 @manuals_bp.route('/delete/<int:manual_id>', methods=['POST'])
@@ -136,23 +118,10 @@ def delete(manual_id):
     
     manual = Manual.query.get_or_404(manual_id)
     
-    # Ensure we have the correct absolute path for deletion
-    file_path = manual.file_path
-    if not os.path.isabs(file_path):
-        # Convert relative path to absolute path
-        file_path = os.path.abspath(file_path)
-    
-    # If file still doesn't exist, try to find it in uploads directory
-    if not os.path.exists(file_path):
-        # Try to construct the path from project root
-        from flask import current_app
-        project_root = current_app.root_path
-        uploads_path = os.path.join(project_root, '..', 'uploads', 'manuals', manual.filename)
-        file_path = os.path.abspath(uploads_path)
-    
-    # Delete file if it exists
-    if os.path.exists(file_path):
-        os.remove(file_path)
+    # Datei zur Löschung durch den Blob-Collector vormerken
+    key = _manual_key(manual)
+    if key:
+        mark_blob_unreferenced(path_for_key(key), source='manual')
     
     db.session.delete(manual)
     db.session.commit()
@@ -1,6 +1,7 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, send_from_directory, abort, current_app, send_file, g, after_this_request
+from flask import Blueprint, render_template, request, redirect, url_for, flash, abort, current_app, send_file, g, jsonify
 from flask_login import login_required, current_user
-from app import db
+from flask_socketio import join_room
+from app import db, socketio
 from app.models.user import User
 from app.models.email import EmailPermission
 from app.models.settings import SystemSettings
@@ -8,7 +9,12 @@ from app.models.notification import NotificationSettings, ChatNotificationSettin
 from app.models.chat import Chat, ChatMember
 from app.models.whitelist import WhitelistEntry
 from app.utils.notifications import get_or_create_notification_settings
-from app.utils.backup import export_backup, import_backup, SUPPORTED_CATEGORIES
+from app.utils.backup import get_backup_folder, BACKUP_TYPES, SUPPORTED_CATEGORIES
+from app.utils.backup_chain import BACKUP_SUFFIX, list_backups
+from app.tasks.backup_jobs import (
+    BACKUP_ROOM, BackupJob, get_backup_job, recent_backup_jobs, submit_backup_job
+)
+from app.utils.storage import delete_stored_file, safe_key, save_upload, send_storage_object
 from werkzeug.utils import secure_filename
 from datetime import datetime
 import os
@@ -65,23 +71,13 @@ def profile():
                     timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
                     filename = f"{current_user.id}_{timestamp}_{filename}"
                     
-                    # Ensure upload directory exists (absolute path)
-                    project_root = os.path.dirname(current_app.root_path)
-                    upload_dir = os.path.join(project_root, current_app.config['UPLOAD_FOLDER'], 'profile_pics')
-                    os.makedirs(upload_dir, exist_ok=True)
-                    
                     # Save file
-                    filepath = os.path.join(upload_dir, filename)
-                    file.save(filepath)
+                    key = save_upload(file, 'profile_pics', filename)
+                    filename = key.rsplit('/', 1)[-1]
                     
                     # Delete old profile picture if it exists
                     if current_user.profile_picture:
-                        try:
-                            old_path = os.path.join(project_root, current_app.config['UPLOAD_FOLDER'], 'profile_pics', current_user.profile_picture)
-                            if os.path.exists(old_path):
-                                os.remove(old_path)
-                        except OSError:
-                            pass  # Ignore if file doesn't exist
+                        delete_stored_file(current_user.profile_picture, 'profile_pics')
                     
                     current_user.profile_picture = filename
                     flash(translate('settings.profile.flash_picture_uploaded'), 'success')
@@ -105,14 +101,7 @@ def profile():
 def remove_profile_picture():
     """Remove user's profile picture."""
     if current_user.profile_picture:
-        try:
-            project_root = os.path.dirname(current_app.root_path)
-            upload_dir = os.path.join(project_root, current_app.config['UPLOAD_FOLDER'], 'profile_pics')
-            file_path = os.path.join(upload_dir, current_user.profile_picture)
-            if os.path.exists(file_path):
-                os.remove(file_path)
-        except OSError:
-            pass  # Ignore if file doesn't exist
+        delete_stored_file(current_user.profile_picture, 'profile_pics')
     
     current_user.profile_picture = None
     db.session.commit()
@@ -129,20 +118,15 @@ def profile_picture(filename):
         # URL-decode den Dateinamen
         filename = unquote(filename)
         
-        project_root = os.path.dirname(current_app.root_path)
-        directory = os.path.join(project_root, current_app.config['UPLOAD_FOLDER'], 'profile_pics')
-        full_path = os.path.join(directory, filename)
+        key = safe_key('profile_pics', filename)
+        if not key:
+            abort(404)
         
         if current_app.debug:
             print(f"[PROFILE PIC] Requested filename: {filename}")
-            print(f"[PROFILE PIC] Full path: {full_path}")
-            print(f"[PROFILE PIC] File exists: {os.path.isfile(full_path)}")
-            print(f"[PROFILE PIC] Directory contents: {os.listdir(directory) if os.path.exists(directory) else 'Directory not found'}")
+            print(f"[PROFILE PIC] Storage key: {key}")
         
-        if not os.path.isfile(full_path):
-            abort(404)
-            
-        return send_from_directory(directory, filename)
+        return send_storage_object(key)
     except FileNotFoundError:
         abort(404)
 
@@ -154,14 +138,11 @@ def portal_logo(filename):
         from urllib.parse import unquote
         filename = unquote(filename)
         
-        project_root = os.path.dirname(current_app.root_path)
-        directory = os.path.join(project_root, current_app.config['UPLOAD_FOLDER'], 'system')
-        full_path = os.path.join(directory, filename)
-        
-        if not os.path.isfile(full_path):
+        key = safe_key('system', filename)
+        if not key:
             abort(404)
             
-        return send_from_directory(directory, filename)
+        return send_storage_object(key)
     except FileNotFoundError:
         abort(404)
 
@@ -430,11 +411,7 @@ def delete_user(user_id):
     
     # Delete profile picture
     if user.profile_picture:
-        project_root = os.path.dirname(current_app.root_path)
-        upload_dir = os.path.join(project_root, current_app.config['UPLOAD_FOLDER'], 'profile_pics')
-        old_path = os.path.join(upload_dir, user.profile_picture)
-        if os.path.exists(old_path):
-            os.remove(old_path)
+        delete_stored_file(user.profile_picture, 'profile_pics')
     
     db.session.delete(user)
     db.session.commit()
@@ -585,24 +562,14 @@ def admin_system():
                     timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
                     filename = f"portal_logo_{timestamp}_{filename}"
                     
-                    # Ensure upload directory exists
-                    project_root = os.path.dirname(current_app.root_path)
-                    upload_dir = os.path.join(project_root, current_app.config['UPLOAD_FOLDER'], 'system')
-                    os.makedirs(upload_dir, exist_ok=True)
-                    
                     # Save file
-                    filepath = os.path.join(upload_dir, filename)
-                    file.save(filepath)
+                    key = save_upload(file, 'system', filename)
+                    filename = key.rsplit('/', 1)[-1]
                     
                     # Delete old portal logo if it exists
                     old_logo_setting = SystemSettings.query.filter_by(key='portal_logo').first()
                     if old_logo_setting and old_logo_setting.value:
-                        try:
-                            old_path = os.path.join(upload_dir, old_logo_setting.value)
-                            if os.path.exists(old_path):
-                                os.remove(old_path)
-                        except OSError:
-                            pass  # Ignore if file doesn't exist
+                        delete_stored_file(old_logo_setting.value, 'system')
                     
                     # Update portal logo setting
                     if old_logo_setting:
@@ -733,95 +700,148 @@ def admin_backup():
             categories = request.form.getlist('export_categories')
             if not categories:
                 flash('Bitte wählen Sie mindestens eine Kategorie zum Exportieren aus.', 'danger')
-                return render_template('settings/admin_backup.html', categories=SUPPORTED_CATEGORIES)
+                return _render_admin_backup()
             
-            try:
-                # Temporäre Datei erstellen
-                timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
-                temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.prismateams', mode='w', encoding='utf-8')
-                temp_path = temp_file.name
-                temp_file.close()
-                
-                # Backup erstellen
-                result = export_backup(categories, temp_path)
-                
-                if result['success']:
-                    @after_this_request
-                    def _cleanup_temp_file(response):
-                        try:
-                            os.unlink(temp_path)
-                        except OSError as cleanup_error:
-                            current_app.logger.warning(f'Temporäre Backup-Datei konnte nicht gelöscht werden: {cleanup_error}')
-                        return response
-                    
-                    return send_file(
-                        temp_path,
-                        as_attachment=True,
-                        download_name=f'backup_{timestamp}.prismateams',
-                        mimetype='application/json'
-                    )
-                else:
-                    os.unlink(temp_path)
-                    flash('Fehler beim Erstellen des Backups.', 'danger')
-            except Exception as e:
-                current_app.logger.error(f"Fehler beim Export: {str(e)}")
-                try:
-                    if 'temp_path' in locals() and os.path.exists(temp_path):
-                        os.unlink(temp_path)
-                except OSError as cleanup_error:
-                    current_app.logger.warning(f'Temporäre Backup-Datei konnte nach Fehler nicht gelöscht werden: {cleanup_error}')
-                flash(f'Fehler beim Erstellen des Backups: {str(e)}', 'danger')
+            backup_type = request.form.get('backup_type', 'full')
+            if backup_type not in BACKUP_TYPES:
+                backup_type = 'full'
+            
+            # Backups werden im Hintergrund erstellt und serverseitig abgelegt;
+            # inkrementelle und differentielle Backups bauen auf dem jeweils
+            # letzten Backup der Kette auf
+            if backup_type != 'full' and not any(b['backup_id'] for b in list_backups(get_backup_folder())):
+                flash('Für ein inkrementelles oder differentielles Backup muss zuerst ein vollständiges Backup erstellt werden.', 'danger')
+                return _render_admin_backup()
+            
+            submit_backup_job(current_app._get_current_object(),
+                              BackupJob('export', categories, backup_type, user_id=current_user.id))
+            flash('Das Backup wird im Hintergrund erstellt. Nach Abschluss steht es unten zum Download bereit.', 'info')
+            return redirect(url_for('settings.admin_backup'))
         
         elif action == 'import':
-            # Import-Backup hochladen
-            if 'backup_file' not in request.files:
+            # Import-Backup hochladen (bei Backup-Ketten mehrere Dateien)
+            files = [f for f in request.files.getlist('backup_file') if f.filename]
+            if not files:
                 flash('Bitte wählen Sie eine Backup-Datei aus.', 'danger')
-                return render_template('settings/admin_backup.html', categories=SUPPORTED_CATEGORIES)
+                return _render_admin_backup()
             
-            file = request.files['backup_file']
-            if file.filename == '':
-                flash('Bitte wählen Sie eine Backup-Datei aus.', 'danger')
-                return render_template('settings/admin_backup.html', categories=SUPPORTED_CATEGORIES)
-            
-            if not file.filename.endswith('.prismateams'):
+            if not all(f.filename.endswith('.prismateams') for f in files):
                 flash('Ungültige Dateiendung. Bitte wählen Sie eine .prismateams-Datei aus.', 'danger')
-                return render_template('settings/admin_backup.html', categories=SUPPORTED_CATEGORIES)
+                return _render_admin_backup()
+            
+            # Kategorien auswählen
+            import_categories = request.form.getlist('import_categories')
+            if not import_categories:
+                flash('Bitte wählen Sie mindestens eine Kategorie zum Importieren aus.', 'danger')
+                return _render_admin_backup()
             
+            temp_paths = []
             try:
-                # Temporäre Datei speichern
-                temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.prismateams', mode='wb')
-                file.save(temp_file.name)
-                temp_path = temp_file.name
-                temp_file.close()
-                
-                # Kategorien auswählen
-                import_categories = request.form.getlist('import_categories')
-                if not import_categories:
-                    flash('Bitte wählen Sie mindestens eine Kategorie zum Importieren aus.', 'danger')
-                    os.unlink(temp_path)
-                    return render_template('settings/admin_backup.html', categories=SUPPORTED_CATEGORIES)
-                
-                # Backup importieren
-                result = import_backup(temp_path, import_categories, current_user.id)
-                
-                # Temporäre Datei löschen
-                os.unlink(temp_path)
-                
-                if result['success']:
-                    imported = ', '.join(result.get('imported', []))
-                    flash(f'Backup erfolgreich importiert! Importierte Kategorien: {imported}', 'success')
-                else:
-                    flash(f'Fehler beim Importieren des Backups: {result.get("error", "Unbekannter Fehler")}', 'danger')
+                # Temporäre Dateien speichern (der Backup-Worker löscht sie nach dem Import)
+                for file in files:
+                    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.prismateams', mode='wb')
+                    temp_paths.append(temp_file.name)
+                    file.save(temp_file.name)
+                    temp_file.close()
             except Exception as e:
                 current_app.logger.error(f"Fehler beim Import: {str(e)}")
                 flash(f'Fehler beim Importieren des Backups: {str(e)}', 'danger')
-                if 'temp_path' in locals():
+                for temp_path in temp_paths:
                     try:
                         os.unlink(temp_path)
-                    except:
+                    except OSError:
                         pass
+                return _render_admin_backup()
+            
+            # Backup (bzw. Kette aus Vollbackup und Folge-Backups) im Hintergrund importieren
+            submit_backup_job(current_app._get_current_object(),
+                              BackupJob('import', import_categories, paths=temp_paths, user_id=current_user.id))
+            flash('Das Backup wird im Hintergrund importiert. Der Fortschritt wird unten angezeigt.', 'info')
+            return redirect(url_for('settings.admin_backup'))
     
-    return render_template('settings/admin_backup.html', categories=SUPPORTED_CATEGORIES)
+    return _render_admin_backup()
+
+
+def _render_admin_backup():
+    """Backup-Seite mit Kategorien, Backup-Arten und den serverseitig abgelegten Backups."""
+    return render_template('settings/admin_backup.html',
+                           categories=SUPPORTED_CATEGORIES,
+                           backup_types=BACKUP_TYPES,
+                           backups=list(reversed(list_backups(get_backup_folder()))),
+                           jobs=[job.to_dict() for job in recent_backup_jobs()])
+
+
+@settings_bp.route('/admin/backup/jobs/<job_id>')
+@login_required
+def admin_backup_job(job_id):
+    """Stand eines Backup-Auftrags (admin only)."""
+    if not current_user.is_admin:
+        abort(403)
+    job = get_backup_job(job_id)
+    if job is None:
+        abort(404)
+    return jsonify(job.to_dict())
+
+
+@settings_bp.route('/admin/backup/download/<filename>')
+@login_required
+def admin_backup_download(filename):
+    """Download eines serverseitig abgelegten Backups (admin only)."""
+    if not current_user.is_admin:
+        abort(403)
+    filename = secure_filename(filename)
+    path = os.path.join(get_backup_folder(), filename)
+    if not filename.endswith(BACKUP_SUFFIX) or not os.path.isfile(path):
+        abort(404)
+    return send_file(path, as_attachment=True, download_name=filename, mimetype='application/zip')
+
+
+@socketio.on('backup:join')
+def handle_backup_join(data=None):
+    """Administratoren erhalten den Fortschritt der Backup-Aufträge."""
+    if hasattr(current_user, 'is_authenticated') and current_user.is_authenticated and current_user.is_admin:
+        join_room(BACKUP_ROOM)
+
+
+@settings_bp.route('/admin/storage', methods=['GET', 'POST'])
+@login_required
+def admin_storage():
+    """Speicherverbrauch pro Modul, Benutzer und Ordner (admin only)."""
+    if not current_user.is_admin:
+        flash('Nur Administratoren haben Zugriff auf diese Seite.', 'danger')
+        return redirect(url_for('settings.index'))
+    
+    from app.models.file import Folder
+    from app.utils.storage_usage import (
+        SCOPE_FOLDER, SCOPE_MODULE, SCOPE_USER, ROOT_FOLDER_KEY,
+        get_usage_overview, get_user_quota, reconcile_storage_usage
+    )
+    
+    if request.method == 'POST':
+        report = reconcile_storage_usage()
+        flash(f"Abgleich abgeschlossen: {report['corrected']} von {report['counters']} Zählern korrigiert.", 'success')
+        return redirect(url_for('settings.admin_storage'))
+    
+    modules = get_usage_overview(SCOPE_MODULE)
+    user_rows = get_usage_overview(SCOPE_USER, limit=50)
+    folder_rows = get_usage_overview(SCOPE_FOLDER, limit=50)
+    
+    user_ids = [int(row.scope_key) for row in user_rows]
+    users = {user.id: user for user in User.query.filter(User.id.in_(user_ids)).all()} if user_ids else {}
+    folder_ids = [int(row.scope_key) for row in folder_rows if row.scope_key != ROOT_FOLDER_KEY]
+    folders = {folder.id: folder for folder in Folder.query.filter(Folder.id.in_(folder_ids)).all()} if folder_ids else {}
+    
+    return render_template(
+        'settings/admin_storage.html',
+        modules=modules,
+        user_rows=user_rows,
+        folder_rows=folder_rows,
+        users=users,
+        folders=folders,
+        root_folder_key=ROOT_FOLDER_KEY,
+        total_bytes=sum(row.bytes_used for row in modules),
+        user_quota=get_user_quota()
+    )
 
 
 @settings_bp.route('/admin/whitelist')
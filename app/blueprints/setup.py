@@ -6,7 +6,7 @@ from app.models.email import EmailPermission
 from app.models.chat import Chat, ChatMember
 from app.models.settings import SystemSettings
 from app.models.whitelist import WhitelistEntry
-from app.utils.backup import import_backup, SUPPORTED_CATEGORIES
+from app.utils.backup import import_backup_chain, SUPPORTED_CATEGORIES
 from datetime import datetime
 import logging
 import os
@@ -62,26 +62,24 @@ def setup_import_backup():
             return redirect(url_for('setup.setup_step1'))
         
         elif action == 'import':
-            # Backup importieren
-            if 'backup_file' not in request.files:
+            # Backup importieren (bei Backup-Ketten mehrere Dateien)
+            files = [f for f in request.files.getlist('backup_file') if f.filename]
+            if not files:
                 flash('Bitte wählen Sie eine Backup-Datei aus.', 'danger')
                 return render_template('setup/import_backup.html', categories=SUPPORTED_CATEGORIES, color_gradient=current_gradient)
             
-            file = request.files['backup_file']
-            if file.filename == '':
-                flash('Bitte wählen Sie eine Backup-Datei aus.', 'danger')
-                return render_template('setup/import_backup.html', categories=SUPPORTED_CATEGORIES, color_gradient=current_gradient)
-            
-            if not file.filename.endswith('.prismateams'):
+            if not all(f.filename.endswith('.prismateams') for f in files):
                 flash('Ungültige Dateiendung. Bitte wählen Sie eine .prismateams-Datei aus.', 'danger')
                 return render_template('setup/import_backup.html', categories=SUPPORTED_CATEGORIES, color_gradient=current_gradient)
             
+            temp_paths = []
             try:
-                # Temporäre Datei speichern
-                temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.prismateams', mode='wb')
-                file.save(temp_file.name)
-                temp_path = temp_file.name
-                temp_file.close()
+                # Temporäre Dateien speichern
+                for file in files:
+                    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.prismateams', mode='wb')
+                    temp_paths.append(temp_file.name)
+                    file.save(temp_file.name)
+                    temp_file.close()
                 
                 # Kategorien auswählen (alle wenn nicht angegeben)
                 import_categories = request.form.getlist('import_categories')
@@ -90,10 +88,7 @@ def setup_import_backup():
                     import_categories = ['all']
                 
                 # Backup importieren (im Setup gibt es noch keinen current_user, daher None)
-                result = import_backup(temp_path, import_categories, None)
-                
-                # Temporäre Datei löschen
-                os.unlink(temp_path)
+                result = import_backup_chain(temp_paths, import_categories, None)
                 
                 if result['success']:
                     imported = ', '.join(result.get('imported', []))
@@ -105,10 +100,12 @@ def setup_import_backup():
             except Exception as e:
                 current_app.logger.error(f"Fehler beim Import im Setup: {str(e)}")
                 flash(f'Fehler beim Importieren des Backups: {str(e)}', 'danger')
-                if 'temp_path' in locals():
+            finally:
+                # Temporäre Dateien löschen
+                for temp_path in temp_paths:
                     try:
                         os.unlink(temp_path)
-                    except:
+                    except OSError:
                         pass
     
     return render_template('setup/import_backup.html', categories=SUPPORTED_CATEGORIES, color_gradient=current_gradient)
@@ -150,17 +147,10 @@ def setup_complete():
                     timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
                     filename = f"portal_logo_{timestamp}_{filename}"
                     
-                    # Ensure upload directory exists
-                    from flask import current_app
-                    import os
-                    project_root = os.path.dirname(current_app.root_path)
-                    upload_dir = os.path.join(project_root, current_app.config['UPLOAD_FOLDER'], 'system')
-                    os.makedirs(upload_dir, exist_ok=True)
-                    
                     # Save file
-                    filepath = os.path.join(upload_dir, filename)
-                    file.save(filepath)
-                    portal_logo_filename = filename
+                    from app.utils.storage import save_upload
+                    key = save_upload(file, 'system', filename)
+                    portal_logo_filename = key.rsplit('/', 1)[-1]
                 else:
                     flash('Ungültiger Dateityp. Nur PNG, JPG, JPEG, GIF und SVG Dateien sind erlaubt.', 'danger')
                     return render_template('setup/complete.html')
@@ -389,17 +379,10 @@ def setup_step1():
                     timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
                     filename = f"portal_logo_{timestamp}_{filename}"
                     
-                    # Ensure upload directory exists
-                    from flask import current_app
-                    import os
-                    project_root = os.path.dirname(current_app.root_path)
-                    upload_dir = os.path.join(project_root, current_app.config['UPLOAD_FOLDER'], 'system')
-                    os.makedirs(upload_dir, exist_ok=True)
-                    
                     # Save file
-                    filepath = os.path.join(upload_dir, filename)
-                    file.save(filepath)
-                    portal_logo_filename = filename
+                    from app.utils.storage import save_upload
+                    key = save_upload(file, 'system', filename)
+                    portal_logo_filename = key.rsplit('/', 1)[-1]
                 else:
                     flash('Ungültiger Dateityp. Nur PNG, JPG, JPEG, GIF und SVG Dateien sind erlaubt.', 'danger')
                     return render_template('setup/step1.html')
@@ -433,16 +416,8 @@ def setup_step1():
                     # Altes Logo löschen wenn vorhanden
                     old_logo = portal_logo_setting.value
                     if old_logo and old_logo != portal_logo_filename:
-                        try:
-                            from flask import current_app
-                            import os
-                            project_root = os.path.dirname(current_app.root_path)
-                            upload_dir = os.path.join(project_root, current_app.config['UPLOAD_FOLDER'], 'system')
-                            old_path = os.path.join(upload_dir, old_logo)
-                            if os.path.exists(old_path):
-                                os.remove(old_path)
-                        except:
-                            pass
+                        from app.utils.storage import delete_stored_file
+                        delete_stored_file(old_logo, 'system')
                     portal_logo_setting.value = portal_logo_filename
                 else:
                     portal_logo_setting = SystemSettings(
@@ -6,8 +6,13 @@ from app.models.wiki import WikiPage, WikiPageVersion, WikiCategory, WikiTag, Wi
 from app.models.user import User
 from app.utils.markdown import process_markdown
 from app.utils.common import is_module_enabled
+from app.utils.blob_gc import mark_blob_unreferenced
+from app.utils.storage import path_for_key, save_upload
+from app.utils.version_storage import (
+    create_wiki_version, prune_wiki_versions, get_wiki_version_content, get_wiki_version_diff,
+    collapse_diff, invalidate_version_cache
+)
 from datetime import datetime
-import os
 import re
 
 wiki_bp = Blueprint('wiki', __name__, url_prefix='/wiki')
@@ -162,21 +167,17 @@ def create():
         # Erstelle Datei
         timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
         filename = f"{timestamp}_{slug}.md"
-        upload_dir = os.path.join('uploads', 'wiki')
-        os.makedirs(upload_dir, exist_ok=True)
-        filepath = os.path.join(upload_dir, filename)
-        absolute_filepath = os.path.abspath(filepath)
         
         # Speichere Markdown-Datei
-        with open(absolute_filepath, 'w', encoding='utf-8') as f:
-            f.write(content)
+        key = save_upload(content.encode('utf-8'), 'wiki', filename)
+        stored_path = path_for_key(key)
         
         # Erstelle Wiki-Seite
         page = WikiPage(
             title=title,
             slug=slug,
             content=content,
-            file_path=absolute_filepath,
+            file_path=stored_path,
             category_id=category_id,
             created_by=current_user.id
         )
@@ -239,26 +240,11 @@ def edit(slug):
                 category_id = new_category.id
                 flash(_('wiki.flash.category_created', name=new_category_name), 'success')
         
-        # Speichere aktuelle Version
-        version = WikiPageVersion(
-            wiki_page_id=page.id,
-            version_number=page.version_number,
-            content=page.content,
-            file_path=page.file_path,
-            created_by=current_user.id
-        )
-        db.session.add(version)
+        # Speichere aktuelle Version (als Delta zur Vorgängerversion)
+        create_wiki_version(page, current_user.id)
         
         # Lösche älteste Versionen wenn nötig
-        versions = WikiPageVersion.query.filter_by(wiki_page_id=page.id).order_by(
-            WikiPageVersion.version_number.desc()
-        ).all()
-        
-        if len(versions) >= MAX_WIKI_VERSIONS:
-            oldest = versions[-1]
-            if os.path.exists(oldest.file_path):
-                os.remove(oldest.file_path)
-            db.session.delete(oldest)
+        prune_wiki_versions(page.id, MAX_WIKI_VERSIONS)
         
         # Aktualisiere Seite
         new_slug = WikiPage.slugify(title)
@@ -282,14 +268,8 @@ def edit(slug):
         # Aktualisiere Datei
         timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
         filename = f"{timestamp}_{page.slug}.md"
-        upload_dir = os.path.join('uploads', 'wiki')
-        filepath = os.path.join(upload_dir, filename)
-        absolute_filepath = os.path.abspath(filepath)
-        
-        with open(absolute_filepath, 'w', encoding='utf-8') as f:
-            f.write(content)
-        
-        page.file_path = absolute_filepath
+        key = save_upload(content.encode('utf-8'), 'wiki', filename)
+        page.file_path = path_for_key(key)
         
         # Aktualisiere Tags
         page.tags.clear()
@@ -321,17 +301,14 @@ def delete(slug):
     
     page = WikiPage.query.filter_by(slug=slug).first_or_404()
     
-    # Lösche Datei
-    if os.path.exists(page.file_path):
-        os.remove(page.file_path)
-    
-    # Lösche alle Versionen
+    # Datei und alle Versionen zur Löschung vormerken
+    mark_blob_unreferenced(page.file_path, subdir='wiki', source='wiki_page')
     for version in page.versions:
-        if os.path.exists(version.file_path):
-            os.remove(version.file_path)
+        mark_blob_unreferenced(version.file_path, subdir='wiki', source='wiki_version')
     
     db.session.delete(page)
     db.session.commit()
+    invalidate_version_cache('wiki', [page.id])
     
     flash(_('wiki.flash.deleted', title=page.title), 'success')
     return redirect(url_for('wiki.index'))
@@ -352,6 +329,37 @@ def history(slug):
     return render_template('wiki/history.html', page=page, versions=versions)
 
 
+@wiki_bp.route('/history/<slug>/<int:version_number>')
+@login_required
+def version(slug, version_number):
+    """Einzelne Version einer Wiki-Seite mit ihren Änderungen gegenüber der Vorgängerversion."""
+    if not check_wiki_module():
+        return redirect(url_for('dashboard.index'))
+    
+    page = WikiPage.query.filter_by(slug=slug).first_or_404()
+    page_version = WikiPageVersion.query.filter_by(
+        wiki_page_id=page.id,
+        version_number=version_number
+    ).first_or_404()
+    
+    try:
+        content = get_wiki_version_content(page_version)
+        diff = collapse_diff(get_wiki_version_diff(page_version, page))
+    except ValueError as e:
+        current_app.logger.error(f"Wiki-Version {page.slug} v{version_number} nicht rekonstruierbar: {e}")
+        flash(_('wiki.history.version_unavailable'), 'danger')
+        return redirect(url_for('wiki.history', slug=page.slug))
+    
+    processed_content = process_markdown(content, wiki_mode=True)
+    return render_template(
+        'wiki/version.html',
+        page=page,
+        version=page_version,
+        processed_content=processed_content,
+        diff=diff
+    )
+
+
 @wiki_bp.route('/preview', methods=['POST'])
 @login_required
 def preview():
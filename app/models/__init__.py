@@ -1,6 +1,6 @@
 from .user import User
 from .chat import Chat, ChatMessage, ChatMember
-from .file import File, FileVersion, Folder
+from .file import File, FileVersion, Folder, FileSearchDocument, Share
 from .calendar import CalendarEvent, EventParticipant, PublicCalendarFeed
 from .email import EmailMessage, EmailPermission, EmailAttachment
 from .credential import Credential
@@ -9,15 +9,16 @@ from .canvas import Canvas
 from .settings import SystemSettings
 from .whitelist import WhitelistEntry
 from .notification import NotificationSettings, ChatNotificationSettings, PushSubscription, NotificationLog
-from .inventory import Product, BorrowTransaction, ProductFolder, ProductSet, ProductSetItem, ProductDocument, SavedFilter, ProductFavorite, Inventory, InventoryItem
+from .inventory import Product, BorrowTransaction, InventoryDailyStat, ProductFolder, ProductSet, ProductSetItem, ProductDocument, SavedFilter, ProductFavorite, Inventory, InventoryItem
 from .api_token import ApiToken
 from .wiki import WikiPage, WikiPageVersion, WikiCategory, WikiTag, WikiFavorite
 from .comment import Comment, CommentMention
+from .storage import PendingBlobDeletion, StorageUsage
 
 __all__ = [
     'User',
     'Chat', 'ChatMessage', 'ChatMember',
-    'File', 'FileVersion', 'Folder',
+    'File', 'FileVersion', 'Folder', 'FileSearchDocument', 'Share',
     'CalendarEvent', 'EventParticipant', 'PublicCalendarFeed',
     'EmailMessage', 'EmailPermission', 'EmailAttachment',
     'Credential',
@@ -26,10 +27,11 @@ __all__ = [
     'SystemSettings',
     'WhitelistEntry',
     'NotificationSettings', 'ChatNotificationSettings', 'PushSubscription', 'NotificationLog',
-    'Product', 'BorrowTransaction', 'ProductFolder', 'ProductSet', 'ProductSetItem', 'ProductDocument', 'SavedFilter', 'ProductFavorite', 'Inventory', 'InventoryItem',
+    'Product', 'BorrowTransaction', 'InventoryDailyStat', 'ProductFolder', 'ProductSet', 'ProductSetItem', 'ProductDocument', 'SavedFilter', 'ProductFavorite', 'Inventory', 'InventoryItem',
     'ApiToken',
     'WikiPage', 'WikiPageVersion', 'WikiCategory', 'WikiTag', 'WikiFavorite',
-    'Comment', 'CommentMention'
+    'Comment', 'CommentMention',
+    'PendingBlobDeletion', 'StorageUsage'
 ]
 
 
@@ -53,6 +53,7 @@ class ChatMessage(db.Model):
     content = db.Column(db.Text, nullable=True)  # Nullable for media-only messages
     message_type = db.Column(db.String(20), default='text', nullable=False)  # text, image, video, voice
     media_url = db.Column(db.String(255), nullable=True)
+    media_size = db.Column(db.BigInteger, nullable=True)  # Größe der Mediendatei in Bytes
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
     edited_at = db.Column(db.DateTime, nullable=True)
     is_deleted = db.Column(db.Boolean, default=False)
@@ -73,10 +73,9 @@ class EmailAttachment(db.Model):
                 return f"data:{self.content_type};base64,{base64.b64encode(self.content).decode()}"
             elif self.file_path:
                 try:
-                    import os
-                    with open(self.file_path, 'rb') as f:
-                        content = f.read()
-                        return f"data:{self.content_type};base64,{base64.b64encode(content).decode()}"
+                    from app.utils.storage import read_stored_file
+                    content = read_stored_file(self.file_path, 'attachments')
+                    return f"data:{self.content_type};base64,{base64.b64encode(content).decode()}"
                 except:
                     return None
         return None
@@ -87,9 +86,8 @@ class EmailAttachment(db.Model):
             return self.content
         elif self.file_path:
             try:
-                import os
-                with open(self.file_path, 'rb') as f:
-                    return f.read()
+                from app.utils.storage import read_stored_file
+                return read_stored_file(self.file_path, 'attachments')
             except:
                 return None
         return None
@@ -1,4 +1,7 @@
 from datetime import datetime
+from sqlalchemy import event, func, literal
+from sqlalchemy.dialects.mysql import MEDIUMTEXT
+from sqlalchemy.orm.attributes import set_committed_value
 from app import db
 
 
@@ -8,6 +11,9 @@ class Folder(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(255), nullable=False)
     parent_id = db.Column(db.Integer, db.ForeignKey('folders.id'), nullable=True)
+    # Materialisierter Pfad aus Ordner-IDs inkl. eigener ID, z.B. "/1/5/9/"
+    tree_path = db.Column(db.String(1000), nullable=True, index=True)
+    depth = db.Column(db.Integer, default=0, nullable=False)
     created_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -28,12 +34,82 @@ class Folder(db.Model):
     def __repr__(self):
         return f'<Folder {self.name}>'
     
+    @property
+    def ancestor_ids(self):
+        """IDs aller Ordner von der Wurzel bis einschließlich diesem Ordner."""
+        if not self.tree_path:
+            return None
+        return [int(part) for part in self.tree_path.strip('/').split('/') if part]
+    
+    @property
+    def ancestors(self):
+        """Ordnerkette von der Wurzel bis einschließlich diesem Ordner (eine Abfrage)."""
+        ids = self.ancestor_ids
+        if ids is None:
+            chain = []
+            node = self
+            while node:
+                chain.append(node)
+                node = node.parent
+            chain.reverse()
+            return chain
+        return Folder.query.filter(Folder.id.in_(ids)).order_by(Folder.depth).all()
+    
     @property
     def path(self):
         """Get the full path of the folder."""
-        if self.parent:
-            return f"{self.parent.path}/{self.name}"
-        return self.name
+        return '/'.join(folder.name for folder in self.ancestors)
+    
+    def subtree_ids(self, include_self=True):
+        """IDs aller Ordner im Teilbaum."""
+        query = db.session.query(Folder.id).filter(Folder.tree_path.like(f'{self.tree_path}%'))
+        if not include_self:
+            query = query.filter(Folder.id != self.id)
+        return [row[0] for row in query.all()]
+    
+    def move_to(self, new_parent):
+        """Verschiebt den Ordner samt Teilbaum unter new_parent (None = Wurzel).
+        
+        Die Pfade aller Nachfahren werden mit einem einzigen UPDATE umgeschrieben.
+        """
+        if new_parent is not None and new_parent.tree_path.startswith(self.tree_path):
+            raise ValueError('Ein Ordner kann nicht in sich selbst verschoben werden.')
+        
+        old_prefix = self.tree_path
+        parent_prefix = new_parent.tree_path if new_parent is not None else '/'
+        new_prefix = f'{parent_prefix}{self.id}/'
+        depth_delta = (new_parent.depth + 1 if new_parent is not None else 0) - self.depth
+        
+        db.session.query(Folder).filter(
+            Folder.tree_path.like(f'{old_prefix}%')
+        ).update({
+            Folder.tree_path: literal(new_prefix, db.String) + func.substr(Folder.tree_path, len(old_prefix) + 1),
+            Folder.depth: Folder.depth + depth_delta
+        }, synchronize_session=False)
+        
+        self.parent_id = new_parent.id if new_parent is not None else None
+        db.session.flush()
+        db.session.expire_all()
+    
+    @staticmethod
+    def rebuild_tree_paths():
+        """Berechnet tree_path/depth aller Ordner neu (Backfill nach Migration/Import)."""
+        rows = db.session.query(Folder.id, Folder.parent_id).all()
+        children = {}
+        for folder_id, parent_id in rows:
+            children.setdefault(parent_id, []).append(folder_id)
+        
+        updates = []
+        stack = [(folder_id, '/', 0) for folder_id in children.get(None, [])]
+        while stack:
+            folder_id, parent_prefix, depth = stack.pop()
+            prefix = f'{parent_prefix}{folder_id}/'
+            updates.append({'id': folder_id, 'tree_path': prefix, 'depth': depth})
+            stack.extend((child_id, prefix, depth + 1) for child_id in children.get(folder_id, []))
+        
+        if updates:
+            db.session.bulk_update_mappings(Folder, updates)
+        return len(updates)
 
 
 class File(db.Model):
@@ -78,6 +154,10 @@ class FileVersion(db.Model):
     file_size = db.Column(db.Integer, nullable=False)
     uploaded_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    # Textversionen: Zeilen-Delta gegenüber `base_version_number` statt eigener Datei
+    # (file_path ist dann leer, siehe app.utils.version_storage)
+    delta = db.Column(db.Text().with_variant(MEDIUMTEXT(), 'mysql'), nullable=True)
+    base_version_number = db.Column(db.Integer, nullable=True)
     
     file = db.relationship('File', back_populates='versions')
     
@@ -86,3 +166,71 @@ class FileVersion(db.Model):
 
 
 
+
+
+@event.listens_for(Folder, 'after_insert')
+def _assign_folder_tree_path(mapper, connection, target):
+    """Setzt den materialisierten Pfad direkt nach dem INSERT (ID ist dann bekannt)."""
+    folders = Folder.__table__
+    parent_prefix, depth = '/', 0
+    if target.parent_id:
+        parent_row = connection.execute(
+            folders.select().with_only_columns(folders.c.tree_path, folders.c.depth)
+            .where(folders.c.id == target.parent_id)
+        ).first()
+        if parent_row and parent_row.tree_path:
+            parent_prefix, depth = parent_row.tree_path, parent_row.depth + 1
+    
+    tree_path = f'{parent_prefix}{target.id}/'
+    connection.execute(
+        folders.update().where(folders.c.id == target.id).values(tree_path=tree_path, depth=depth)
+    )
+    set_committed_value(target, 'tree_path', tree_path)
+    set_committed_value(target, 'depth', depth)
+
+
+class FileSearchDocument(db.Model):
+    """Suchdokument pro Datei: Name, Ordnerpfad und extrahierter Text der aktuellen Version.
+    
+    Der eigentliche Volltextindex (FTS5 bzw. MySQL FULLTEXT) wird in
+    `app.utils.file_search` verwaltet.
+    """
+    __tablename__ = 'file_search_documents'
+    
+    # Bewusst ohne ForeignKey: Dateien werden teils per Bulk-DELETE entfernt,
+    # verwaiste Suchdokumente werden beim Suchen ausgefiltert und bereinigt.
+    file_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    version_number = db.Column(db.Integer, nullable=False)
+    name = db.Column(db.String(255), nullable=False)
+    folder_path = db.Column(db.String(1000), nullable=True)
+    content = db.Column(db.Text().with_variant(MEDIUMTEXT(), 'mysql'), nullable=True)
+    indexed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f'<FileSearchDocument {self.file_id} v{self.version_number}>'
+
+
+class Share(db.Model):
+    """Token-Index aller öffentlichen Freigaben (Dateien und Ordner).
+    
+    Öffentliche Links werden ausschließlich über diese Tabelle aufgelöst, die
+    Spalten `share_*` an Datei bzw. Ordner bleiben für die Verwaltungsoberfläche
+    erhalten. Gepflegt wird der Index über `app.utils.share_index`.
+    """
+    __tablename__ = 'shares'
+    __table_args__ = (
+        db.UniqueConstraint('item_type', 'item_id', name='uq_shares_item'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    token = db.Column(db.String(255), nullable=False, unique=True)
+    # 'file' oder 'folder'; bewusst ohne ForeignKey, da Dateien und Ordner teils per
+    # Bulk-DELETE entfernt werden. Verwaiste Einträge werden beim Auflösen ignoriert.
+    item_type = db.Column(db.String(10), nullable=False)
+    item_id = db.Column(db.Integer, nullable=False)
+    password_hash = db.Column(db.String(255), nullable=True)
+    expires_at = db.Column(db.DateTime, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f'<Share {self.item_type} {self.item_id}>'
@@ -1,4 +1,5 @@
 from datetime import datetime, date
+from sqlalchemy.orm import validates
 from app import db
 from app.utils.lengths import parse_length_to_meters
 
@@ -39,6 +40,7 @@ class Product(db.Model):
     condition = db.Column(db.String(50), nullable=True)  # z.B. "Neu", "Gut", "Beschädigt"
     location = db.Column(db.String(255), nullable=True)  # Lagerort
     length = db.Column(db.String(50), nullable=True)  # Länge (z.B. "5m", "120cm")
+    length_meters = db.Column(db.Float(precision=53), nullable=True, index=True)  # Aus `length` berechnet (Sortierung/Filter in SQL)
     purchase_date = db.Column(db.Date, nullable=True)  # Anschaffungsdatum
     status = db.Column(db.String(20), default='available', nullable=False, index=True)  # 'available', 'borrowed', 'missing'
     image_path = db.Column(db.String(500), nullable=True)  # Pfad zum Produktbild
@@ -67,10 +69,26 @@ class Product(db.Model):
         """Prüft ob das Produkt als fehlend markiert ist."""
         return self.status == 'missing'
     
-    @property
-    def length_meters(self):
-        """Gibt die Länge als Meter-Wert zurück (float)."""
-        return parse_length_to_meters(self.length)
+    @validates('length')
+    def _sync_length_meters(self, key, value):
+        """Hält `length_meters` beim Setzen der Länge aktuell."""
+        self.length_meters = parse_length_to_meters(value)
+        return value
+    
+    @staticmethod
+    def backfill_length_meters():
+        """Berechnet length_meters aller Produkte (je unterschiedlicher Längenangabe ein UPDATE)."""
+        lengths = [length for (length,) in db.session.query(Product.length).distinct()]
+        for length in lengths:
+            db.session.query(Product).filter(Product.length == length).update(
+                {Product.length_meters: parse_length_to_meters(length)}, synchronize_session=False
+            )
+        db.session.query(Product).filter(Product.length.is_(None)).update(
+            {Product.length_meters: None}, synchronize_session=False
+        )
+        from app.utils.product_listing import bump_product_version
+        bump_product_version()
+        return len(lengths)
     
     @property
     def current_borrow(self):
@@ -90,9 +108,9 @@ class BorrowTransaction(db.Model):
     product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
     borrower_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)  # Wer leiht aus
     borrowed_by_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)  # Wer registriert die Ausleihe
-    borrow_date = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
-    expected_return_date = db.Column(db.Date, nullable=False)
-    actual_return_date = db.Column(db.Date, nullable=True)
+    borrow_date = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    expected_return_date = db.Column(db.Date, nullable=False, index=True)
+    actual_return_date = db.Column(db.Date, nullable=True, index=True)
     status = db.Column(db.String(20), default='active', nullable=False, index=True)  # 'active', 'returned'
     qr_code_data = db.Column(db.String(255), nullable=True)  # QR-Code für den Ausleihvorgang (z.B. "BORROW-{transaction_number}")
     
@@ -122,6 +140,30 @@ class BorrowTransaction(db.Model):
             self.product.status = 'available'
 
 
+class InventoryDailyStat(db.Model):
+    """Tägliche Ausleihzahlen pro Produkt (materialisiert für die Inventar-Statistik).
+    
+    Wird bei jedem Flush von Ausleihvorgängen fortgeschrieben und täglich für den
+    Vortag aus `borrow_transactions` neu berechnet (siehe `app.utils.inventory_stats`).
+    Zeilen mit `product_id` 0 enthalten die Summe aller Produkte des Tages.
+    """
+    __tablename__ = 'inventory_daily_stats'
+    __table_args__ = (
+        db.UniqueConstraint('day', 'product_id', name='uq_inventory_daily_stats_day_product'),
+        db.Index('ix_inventory_daily_stats_product_day', 'product_id', 'day', 'returned'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False)
+    product_id = db.Column(db.Integer, nullable=False)  # 0 = Tagessumme
+    borrowed = db.Column(db.Integer, default=0, nullable=False)  # Ausleihen an diesem Tag
+    returned = db.Column(db.Integer, default=0, nullable=False)  # Rückgaben an diesem Tag
+    overdue = db.Column(db.Integer, default=0, nullable=False)  # An diesem Tag überfällig gewordene Ausleihen
+    
+    def __repr__(self):
+        return f'<InventoryDailyStat {self.day} {self.product_id}>'
+
+
 class ProductSet(db.Model):
     """Produktset - mehrere Produkte zu einem Set zusammengefasst."""
     __tablename__ = 'product_sets'
@@ -241,6 +283,11 @@ class Inventory(db.Model):
     completed_at = db.Column(db.DateTime, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Fortschritt, wird beim Abhaken mitgezählt (siehe app.utils.inventory_count)
+    items_total = db.Column(db.Integer, default=0, nullable=False)
+    items_checked = db.Column(db.Integer, default=0, nullable=False)
+    # Fortlaufende Nummer der Live-Ereignisse (Lückenerkennung in den Clients)
+    event_seq = db.Column(db.Integer, default=0, nullable=False)
     
     # Relationships
     starter = db.relationship('User', foreign_keys=[started_by])
@@ -252,12 +299,12 @@ class Inventory(db.Model):
     @property
     def checked_count(self):
         """Anzahl der inventierten Produkte."""
-        return InventoryItem.query.filter_by(inventory_id=self.id, checked=True).count()
+        return self.items_checked or 0
     
     @property
     def total_count(self):
         """Gesamtanzahl der Produkte in dieser Inventur."""
-        return len(self.items)
+        return self.items_total or 0
 
 
 class InventoryItem(db.Model):
@@ -0,0 +1,39 @@
+from datetime import datetime
+from app import db
+
+
+class PendingBlobDeletion(db.Model):
+    """Nicht mehr referenzierte Datei, die der Blob-Collector nach Ablauf der Karenzzeit entfernt."""
+    __tablename__ = 'pending_blob_deletions'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    file_path = db.Column(db.String(500), nullable=False, index=True)  # Absoluter Pfad
+    source = db.Column(db.String(50), nullable=True)  # z.B. 'file', 'file_version', 'product_image'
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    last_error = db.Column(db.Text, nullable=True)
+    
+    def __repr__(self):
+        return f'<PendingBlobDeletion {self.file_path}>'
+
+
+class StorageUsage(db.Model):
+    """Laufender Speicherverbrauch pro Benutzer, Ordner oder Modul.
+    
+    Wird bei jedem Flush inkrementell fortgeschrieben (siehe
+    `app.utils.storage_usage`) und nachts gegen die Tabellen abgeglichen.
+    """
+    __tablename__ = 'storage_usage'
+    __table_args__ = (
+        db.UniqueConstraint('scope', 'scope_key', name='uq_storage_usage_scope'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    scope = db.Column(db.String(20), nullable=False)  # 'user', 'folder' (oberste Ebene) oder 'module'
+    scope_key = db.Column(db.String(50), nullable=False)  # Benutzer-ID, Ordner-ID ('root') oder Modulname
+    bytes_used = db.Column(db.BigInteger, default=0, nullable=False)
+    object_count = db.Column(db.Integer, default=0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f'<StorageUsage {self.scope}:{self.scope_key} {self.bytes_used}>'
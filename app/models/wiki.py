@@ -92,6 +92,10 @@ class WikiPageVersion(db.Model):
     file_path = db.Column(db.String(500), nullable=False)
     created_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    # Delta-Versionen: `content` bleibt leer, der Inhalt ergibt sich aus `delta`
+    # angewendet auf Version `base_version_number` (siehe app.utils.version_storage)
+    delta = db.Column(db.Text, nullable=True)
+    base_version_number = db.Column(db.Integer, nullable=True)
     
     # Relationships
     wiki_page = db.relationship('WikiPage', back_populates='versions')
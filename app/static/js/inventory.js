@@ -12,6 +12,7 @@ class StockManager {
         this.locations = new Set();
         this.lengths = new Set();
         this.purchaseYears = new Set();
+        this.facetCounts = {};  // Facette -> { Wert -> Anzahl } aus filter-options
         this.searchTimeout = null;
         this.selectedProducts = new Set(); // Verwaltet ausgewählte Produkt-IDs
         this.currentFolderId = null; // Aktueller Ordner (aus URL)
@@ -107,6 +108,7 @@ class StockManager {
                 this.locations.clear();
                 this.lengths.clear();
                 this.purchaseYears.clear();
+                this.facetCounts = filterData.counts || {};
                 
                 // Aktualisiere alle Filter-Sets mit Daten vom Server (nur für aktuellen Ordner)
                 if (filterData.categories && Array.isArray(filterData.categories)) {
@@ -174,29 +176,40 @@ class StockManager {
     
     async loadProducts() {
         try {
-            // Verwende die vollständige API, um alle Attribute zu erhalten
-            const params = new URLSearchParams({
-                sort_by: this.sortField || 'name',
-                sort_dir: this.sortDirection === 'desc' ? 'desc' : 'asc'
-            });
-            const response = await fetch(`/inventory/api/products?${params.toString()}`);
-            
-            if (!response.ok) {
-                const errorText = await response.text();
-                console.error('API-Fehler:', response.status, errorText);
-                this.showError(`Fehler beim Laden der Produkte (Status: ${response.status})`);
-                return;
-            }
-            
-            const data = await response.json();
-            
-            if (!Array.isArray(data)) {
-                console.error('Ungültige API-Antwort:', data);
-                this.showError('Ungültige Daten vom Server erhalten');
-                return;
-            }
+            // Verwende die vollständige API, um alle Attribute zu erhalten (seitenweise)
+            const products = [];
+            let cursor = null;
+            do {
+                const params = new URLSearchParams({
+                    sort_by: this.sortField || 'name',
+                    sort_dir: this.sortDirection === 'desc' ? 'desc' : 'asc',
+                    limit: 1000
+                });
+                if (cursor) {
+                    params.set('cursor', cursor);
+                }
+                const response = await fetch(`/inventory/api/products?${params.toString()}`);
+                
+                if (!response.ok) {
+                    const errorText = await response.text();
+                    console.error('API-Fehler:', response.status, errorText);
+                    this.showError(`Fehler beim Laden der Produkte (Status: ${response.status})`);
+                    return;
+                }
+                
+                const data = await response.json();
+                
+                if (!data || !Array.isArray(data.items)) {
+                    console.error('Ungültige API-Antwort:', data);
+                    this.showError('Ungültige Daten vom Server erhalten');
+                    return;
+                }
+                
+                products.push(...data.items);
+                cursor = data.next_cursor;
+            } while (cursor);
             
-            this.products = data;
+            this.products = products;
             
             // Ergänze Filter-Werte aus den geladenen Produkten (überschreibt nicht die Server-Daten)
             // Dies muss NACH dem Laden der Produkte erfolgen
@@ -305,7 +318,7 @@ class StockManager {
             if (cat && cat.trim() !== '') {
                 const option = document.createElement('option');
                 option.value = cat;
-                option.textContent = cat;
+                option.textContent = this.facetLabel('categories', cat);
                 categoryFilter.appendChild(option);
             }
         });
@@ -318,6 +331,12 @@ class StockManager {
         }
     }
     
+    facetLabel(facet, value) {
+        // Wert mit Anzahl der passenden Produkte, sofern vom Server geliefert
+        const counts = this.facetCounts[facet];
+        return counts && counts[value] !== undefined ? `${value} (${counts[value]})` : value;
+    }
+    
     updateFolders() {
         // Ordner-Filter wurde entfernt, daher diese Funktion ist nicht mehr nötig
         // Wird nur noch für interne Zwecke verwendet (falls benötigt)
@@ -340,7 +359,7 @@ class StockManager {
             if (cond && cond.trim() !== '') {
                 const option = document.createElement('option');
                 option.value = cond;
-                option.textContent = cond;
+                option.textContent = this.facetLabel('conditions', cond);
                 conditionFilter.appendChild(option);
             }
         });
@@ -369,7 +388,7 @@ class StockManager {
             if (loc && loc.trim() !== '') {
                 const option = document.createElement('option');
                 option.value = loc;
-                option.textContent = loc;
+                option.textContent = this.facetLabel('locations', loc);
                 locationFilter.appendChild(option);
             }
         });
@@ -412,7 +431,7 @@ class StockManager {
             if (len && String(len).trim() !== '') {
                 const option = document.createElement('option');
                 option.value = String(len);
-                option.textContent = String(len);
+                option.textContent = this.facetLabel('lengths', String(len));
                 lengthFilter.appendChild(option);
             }
         });
@@ -449,7 +468,7 @@ class StockManager {
             if (year && String(year).trim() !== '') {
                 const option = document.createElement('option');
                 option.value = String(year);
-                option.textContent = String(year);
+                option.textContent = this.facetLabel('purchase_years', String(year));
                 purchaseYearFilter.appendChild(option);
             }
         });
@@ -7,6 +7,12 @@ class InventoryToolManager {
         this.items = new Map();
         this.pollingInterval = null;
         this.lastUpdateTime = null;
+        // Letzte angewendete Ereignisnummer (aus Snapshot bzw. Live-Ereignissen)
+        this.lastSeq = null;
+        this.loading = null;
+        this.pendingEvents = [];
+        this.socket = null;
+        this.socketConnected = false;
     }
     
     init() {
@@ -15,7 +21,8 @@ class InventoryToolManager {
         // Lade initiale Daten
         this.loadItems();
         
-        // Starte Polling für Live-Updates
+        // Live-Updates per Socket.IO, Polling nur ohne Verbindung
+        this.connectSocket();
         this.startPolling();
         
         // Event Listeners
@@ -78,20 +85,40 @@ class InventoryToolManager {
         });
     }
     
-    async loadItems() {
+    loadItems() {
+        // Laufendes Laden wiederverwenden, Ereignisse werden solange gepuffert
+        if (!this.loading) {
+            this.loading = this.fetchSnapshot().finally(() => {
+                this.loading = null;
+            });
+        }
+        return this.loading;
+    }
+    
+    async fetchSnapshot() {
         try {
-            const response = await fetch(`/inventory/api/inventory/${this.inventoryId}/items`);
+            const response = await fetch(`/inventory/api/inventory/${this.inventoryId}/snapshot`);
             if (!response.ok) {
                 throw new Error('Fehler beim Laden der Inventur-Items');
             }
             
             const data = await response.json();
             
-            // Speichere Items
+            // Speichere Items (Snapshot enthält Wertelisten in der Reihenfolge von columns)
             this.items.clear();
-            data.items.forEach(item => {
+            data.items.forEach(values => {
+                const item = {};
+                data.columns.forEach((column, index) => {
+                    item[column] = values[index];
+                });
                 this.items.set(item.product_id, item);
             });
+            this.lastSeq = data.inventory.seq;
+            
+            // Während des Ladens eingetroffene Ereignisse nachziehen
+            const pending = this.pendingEvents;
+            this.pendingEvents = [];
+            pending.forEach(payload => this.applyEvents(payload));
             
             // Rendere Tabelle
             this.renderTable();
@@ -105,6 +132,73 @@ class InventoryToolManager {
         }
     }
     
+    connectSocket() {
+        if (typeof io === 'undefined') {
+            return;
+        }
+        
+        this.socket = io();
+        this.socket.on('connect', () => {
+            this.socketConnected = true;
+            this.socket.emit('inventory:join', { inventory_id: this.inventoryId });
+            // Nach (Wieder-)Verbindung verpasste Änderungen nachladen
+            if (this.lastSeq !== null) {
+                this.loadItems();
+            }
+        });
+        this.socket.on('disconnect', () => {
+            this.socketConnected = false;
+        });
+        this.socket.on('inventory:events', (payload) => {
+            if (payload.inventory_id !== this.inventoryId) return;
+            if (this.loading) {
+                this.pendingEvents.push(payload);
+                return;
+            }
+            if (this.applyEvents(payload)) {
+                this.renderTable();
+                this.updateProgress(payload);
+            }
+        });
+        this.socket.on('inventory:status', (payload) => {
+            if (payload.inventory_id === this.inventoryId && payload.status === 'completed') {
+                window.location.reload();
+            }
+        });
+    }
+    
+    applyEvents(payload) {
+        // Gibt true zurück, wenn sich der lokale Stand geändert hat
+        if (this.lastSeq === null || payload.seq <= this.lastSeq) {
+            return false;
+        }
+        
+        const firstSeq = payload.events.length ? payload.events[0].seq : payload.seq;
+        if (firstSeq > this.lastSeq + 1) {
+            // Ereignisse verpasst (z.B. aus einem anderen Worker): neu laden
+            this.loadItems();
+            return false;
+        }
+        
+        payload.events.forEach(event => {
+            if (event.seq <= this.lastSeq) return;
+            const item = this.items.get(event.product_id);
+            if (!item) return;
+            item.checked = event.checked;
+            if ('by' in event) {
+                item.checked_by = event.by;
+                item.checked_at = event.at;
+            }
+            ['notes', 'location_changed', 'new_location', 'condition_changed', 'new_condition'].forEach(field => {
+                if (field in event) {
+                    item[field] = event[field];
+                }
+            });
+        });
+        this.lastSeq = payload.seq;
+        return true;
+    }
+    
     renderTable() {
         const tbody = document.getElementById('inventoryTableBody');
         if (!tbody) return;
@@ -209,11 +303,9 @@ class InventoryToolManager {
                 item.checked_at = data.checked_at;
             }
             
-            // Rendere Tabelle neu
+            // Rendere Tabelle neu (Fortschritt kommt als Live-Ereignis)
             this.renderTable();
-            
-            // Update Fortschritt
-            this.loadItems();
+            this.refreshIfOffline();
         } catch (error) {
             console.error('Fehler beim Toggle Check:', error);
             alert('Fehler beim Aktualisieren der Checkbox');
@@ -350,11 +442,9 @@ class InventoryToolManager {
                 document.body.style.paddingRight = '';
             }, 300);
             
-            // Rendere Tabelle neu
+            // Rendere Tabelle neu (Fortschritt kommt als Live-Ereignis)
             this.renderTable();
-            
-            // Update Fortschritt
-            this.loadItems();
+            this.refreshIfOffline();
             
             // Scanner wieder aktivieren wenn Scanner-Tab aktiv ist
             this.resumeScannerIfActive();
@@ -412,13 +502,20 @@ class InventoryToolManager {
                 window.inventoryScannerManager.scanning = false;
             }
             
+            // Lokal abhaken, geschrieben wird gesammelt (Ereignis folgt per Socket.IO)
+            const item = this.items.get(data.product.id);
+            if (item && !item.checked) {
+                item.checked = true;
+                item.checked_by = data.item.checked_by;
+                item.checked_at = data.item.checked_at;
+                this.renderTable();
+            }
+            this.refreshIfOffline();
+            
             // Öffne Produkt-Modal automatisch
             setTimeout(() => {
                 this.showProductModal(data.product.id);
             }, 500);
-            
-            // Update Items
-            this.loadItems();
         } catch (error) {
             console.error('Fehler beim Scannen:', error);
             this.showError(error.message);
@@ -526,12 +623,20 @@ class InventoryToolManager {
     }
     
     startPolling() {
-        // Polling alle 3 Sekunden
+        // Polling alle 3 Sekunden, nur solange keine Socket.IO-Verbindung besteht
         this.pollingInterval = setInterval(() => {
-            this.loadItems();
+            if (!this.socketConnected) {
+                this.loadItems();
+            }
         }, 3000);
     }
     
+    refreshIfOffline() {
+        if (!this.socketConnected) {
+            this.loadItems();
+        }
+    }
+    
     stopPolling() {
         if (this.pollingInterval) {
             clearInterval(this.pollingInterval);
@@ -0,0 +1,273 @@
+"""
+Background Task für Backup-Export und -Import
+Export und Import laufen nacheinander in einem Worker-Thread statt im Request.
+Der Fortschritt wird per Socket.IO an die Administratoren gemeldet (Raum
+`backup_admins`) und ist zusätzlich über den Auftrag abrufbar. Fertige Exporte
+liegen in BACKUP_FOLDER und können von dort heruntergeladen werden.
+
+Sind geplante Backups aktiviert (BACKUP_SCHEDULE_ENABLED), erstellt der Worker
+täglich zur konfigurierten Stunde ein Backup: am konfigurierten Wochentag (oder
+solange es keines gibt) ein Vollbackup, sonst ein inkrementelles bzw.
+differentielles. Danach werden alte Ketten gelöscht (BACKUP_RETENTION_FULL).
+"""
+
+import logging
+import os
+import queue
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+BACKUP_ROOM = 'backup_admins'
+# Anzahl abgeschlossener Aufträge, deren Status abrufbar bleibt
+MAX_FINISHED_JOBS = 50
+SCHEDULE_CHECK_INTERVAL = 60
+
+
+class BackupJob:
+    """Ein Backup-Export oder -Import mit Fortschritt."""
+
+    def __init__(self, kind: str, categories: List[str], backup_type: str = 'full',
+                 paths: Optional[List[str]] = None, user_id: Optional[int] = None,
+                 scheduled: bool = False):
+        self.id = uuid.uuid4().hex
+        self.kind = kind  # 'export' oder 'import'
+        self.categories = categories
+        self.backup_type = backup_type
+        # Import: hochgeladene Archive (temporäre Dateien, werden danach gelöscht)
+        self.paths = paths or []
+        self.user_id = user_id
+        self.scheduled = scheduled
+        self.status = 'queued'
+        self.step = None
+        self.done = 0
+        self.total = 0
+        self.filename = None
+        self.result = None
+        self.error = None
+        self.created_at = datetime.utcnow()
+        self.finished_at = None
+
+    def to_dict(self) -> Dict:
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'categories': self.categories,
+            'backup_type': self.backup_type,
+            'scheduled': self.scheduled,
+            'step': self.step,
+            'done': self.done,
+            'total': self.total,
+            'filename': self.filename,
+            'imported': (self.result or {}).get('imported'),
+            'error': self.error,
+            'created_at': self.created_at.isoformat(),
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+class BackupJobWorker:
+    """Worker, der Backup-Aufträge nacheinander abarbeitet und geplante Backups auslöst."""
+
+    def __init__(self, app=None):
+        self.app = app
+        self.running = False
+        self.thread = None
+        self.queue = queue.Queue()
+        self.jobs = OrderedDict()
+        self.lock = threading.Lock()
+        self.last_schedule_date = None
+
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Initialisiere den Worker mit der Flask-App."""
+        self.app = app
+
+        # Starte Worker automatisch
+        self.start()
+
+    def start(self):
+        """Starte den Worker."""
+        with self.lock:
+            if self.running:
+                return
+            self.running = True
+        self.thread = threading.Thread(target=self._run_worker, daemon=True)
+        self.thread.start()
+        logger.info("Backup-Worker gestartet")
+
+    def stop(self):
+        """Stoppe den Worker."""
+        self.running = False
+        self.queue.put(None)
+        if self.thread:
+            self.thread.join(timeout=5)
+        logger.info("Backup-Worker gestoppt")
+
+    def submit(self, job: BackupJob) -> BackupJob:
+        """Reiht einen Auftrag ein."""
+        with self.lock:
+            self.jobs[job.id] = job
+            self._prune_jobs()
+        self.queue.put(job)
+        self._publish(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[BackupJob]:
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def recent(self) -> List[BackupJob]:
+        """Aufträge, neueste zuerst."""
+        with self.lock:
+            return list(reversed(self.jobs.values()))
+
+    def _prune_jobs(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.status in ('done', 'failed')]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[job_id]
+
+    def _run_worker(self):
+        """Hauptschleife des Workers."""
+        while self.running:
+            try:
+                job = self.queue.get(timeout=SCHEDULE_CHECK_INTERVAL)
+            except queue.Empty:
+                job = None
+            try:
+                if job is None:
+                    self._check_schedule()
+                else:
+                    self._run_job(job)
+            except Exception as e:
+                logger.error(f"Backup-Worker: Unerwarteter Fehler: {e}")
+
+    def _check_schedule(self):
+        """Stößt das tägliche Backup an, sobald die konfigurierte Stunde erreicht ist."""
+        if not self.running or not self.app.config.get('BACKUP_SCHEDULE_ENABLED'):
+            return
+        now = datetime.utcnow()
+        if now.hour != self.app.config.get('BACKUP_SCHEDULE_HOUR', 2) or self.last_schedule_date == now.date():
+            return
+        self.last_schedule_date = now.date()
+
+        from app.utils.backup import get_backup_folder
+        from app.utils.backup_chain import list_backups
+
+        with self.app.app_context():
+            has_full = any(backup['backup_type'] == 'full' and backup['backup_id']
+                           for backup in list_backups(get_backup_folder()))
+        backup_type = self.app.config.get('BACKUP_SCHEDULE_TYPE', 'incremental')
+        if backup_type not in ('incremental', 'differential'):
+            backup_type = 'incremental'
+        if not has_full or now.weekday() == self.app.config.get('BACKUP_SCHEDULE_FULL_WEEKDAY', 6):
+            backup_type = 'full'
+
+        logger.info(f"Geplantes Backup ({backup_type}) wird erstellt")
+        job = BackupJob('export', ['all'], backup_type, scheduled=True)
+        with self.lock:
+            self.jobs[job.id] = job
+        self._run_job(job)
+
+    def _run_job(self, job: BackupJob):
+        job.status = 'running'
+        self._publish(job)
+
+        def progress(step, done, total):
+            job.step = step
+            job.done = done
+            job.total = total
+            self._publish(job)
+
+        try:
+            with self.app.app_context():
+                if job.kind == 'export':
+                    self._run_export(job, progress)
+                else:
+                    self._run_import(job, progress)
+        except Exception as e:
+            logger.error(f"Backup-Auftrag {job.id} ({job.kind}) fehlgeschlagen: {e}")
+            job.error = str(e)
+            job.status = 'failed'
+        finally:
+            job.finished_at = datetime.utcnow()
+            if job.kind == 'import':
+                for path in job.paths:
+                    try:
+                        os.unlink(path)
+                    except OSError:
+                        pass
+            with self.lock:
+                self._prune_jobs()
+            self._publish(job)
+
+    def _run_export(self, job: BackupJob, progress):
+        from app.utils.backup import create_stored_backup, get_backup_folder
+        from app.utils.backup_chain import rotate_backups
+
+        job.result = create_stored_backup(job.categories, job.backup_type, progress)
+        job.filename = job.result['filename']
+        job.status = 'done'
+        logger.info(f"Backup {job.filename} erstellt")
+
+        if job.scheduled:
+            removed = rotate_backups(get_backup_folder(), self.app.config.get('BACKUP_RETENTION_FULL', 4))
+            if removed:
+                logger.info(f"{len(removed)} alte Backups gelöscht")
+
+    def _run_import(self, job: BackupJob, progress):
+        from app.utils.backup import import_backup_chain
+
+        job.result = import_backup_chain(job.paths, job.categories, job.user_id, progress=progress)
+        if job.result.get('success'):
+            job.status = 'done'
+        else:
+            job.error = job.result.get('error', 'Unbekannter Fehler')
+            job.status = 'failed'
+
+    def _publish(self, job: BackupJob):
+        """Meldet den Stand eines Auftrags an die Administratoren."""
+        try:
+            from app import socketio
+            socketio.emit('backup:progress', job.to_dict(), room=BACKUP_ROOM)
+        except Exception as e:
+            logger.debug(f"Backup-Fortschritt konnte nicht gesendet werden: {e}")
+
+
+# Globale Worker-Instanz
+backup_worker = BackupJobWorker()
+
+
+def start_backup_worker(app):
+    """Starte den Backup-Worker für die gegebene App."""
+    global backup_worker
+    backup_worker.init_app(app)
+    return backup_worker
+
+
+def stop_backup_worker():
+    """Stoppe den Backup-Worker."""
+    global backup_worker
+    backup_worker.stop()
+
+
+def submit_backup_job(app, job: BackupJob) -> BackupJob:
+    """Reiht einen Backup-Auftrag ein und startet den Worker bei Bedarf."""
+    if not backup_worker.running:
+        backup_worker.init_app(app)
+    return backup_worker.submit(job)
+
+
+def get_backup_job(job_id: str) -> Optional[BackupJob]:
+    return backup_worker.get(job_id)
+
+
+def recent_backup_jobs() -> List[BackupJob]:
+    return backup_worker.recent()
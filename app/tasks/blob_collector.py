@@ -0,0 +1,90 @@
+"""
+Background Task für die Blob-Garbage-Collection
+Entfernt zur Löschung markierte Dateien in Batches und gleicht den Upload-Baum
+regelmäßig mit den Datenbank-Referenzen ab.
+"""
+
+import threading
+import time
+import logging
+from datetime import datetime
+from app.utils.blob_gc import collect_pending_blobs, reconcile_upload_tree
+
+logger = logging.getLogger(__name__)
+
+
+class BlobCollector:
+    """Scheduler für das verzögerte Löschen nicht mehr referenzierter Dateien."""
+    
+    def __init__(self, app=None):
+        self.app = app
+        self.running = False
+        self.thread = None
+        self.last_reconcile_date = None
+        
+        if app:
+            self.init_app(app)
+    
+    def init_app(self, app):
+        """Initialisiere den Collector mit der Flask-App."""
+        self.app = app
+        
+        # Starte Collector automatisch
+        self.start()
+    
+    def start(self):
+        """Starte den Blob-Collector."""
+        if self.running:
+            return
+        
+        self.running = True
+        self.thread = threading.Thread(target=self._run_collector, daemon=True)
+        self.thread.start()
+        logger.info("Blob-Collector gestartet")
+    
+    def stop(self):
+        """Stoppe den Blob-Collector."""
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=5)
+        logger.info("Blob-Collector gestoppt")
+    
+    def _run_collector(self):
+        """Hauptschleife des Collectors."""
+        while self.running:
+            interval = self.app.config.get('BLOB_GC_INTERVAL', 300)
+            try:
+                with self.app.app_context():
+                    collect_pending_blobs()
+                    
+                    # Abgleich des Upload-Baums einmal täglich zur konfigurierten Stunde
+                    now = datetime.utcnow()
+                    if (now.hour == self.app.config.get('BLOB_GC_RECONCILE_HOUR', 3) and
+                            self.last_reconcile_date != now.date()):
+                        self.last_reconcile_date = now.date()
+                        reconcile_upload_tree(
+                            reclaim=self.app.config.get('BLOB_GC_RECLAIM_ORPHANS', False)
+                        )
+                
+                time.sleep(interval)
+                
+            except Exception as e:
+                logger.error(f"Fehler im Blob-Collector: {e}")
+                time.sleep(60)  # Warte 1 Minute bei Fehlern
+
+
+# Globale Collector-Instanz
+collector = BlobCollector()
+
+
+def start_blob_collector(app):
+    """Starte den Blob-Collector für die gegebene App."""
+    global collector
+    collector.init_app(app)
+    return collector
+
+
+def stop_blob_collector():
+    """Stoppe den Blob-Collector."""
+    global collector
+    collector.stop()
@@ -0,0 +1,86 @@
+"""
+Background Task für den täglichen Abschluss der Inventar-Statistik
+Berechnet nach Tageswechsel die Rollups aller noch offenen Vortage aus den
+Ausleihen neu (beim ersten Lauf: alle bisherigen Ausleihen). Bis dahin werden
+diese Tage von den Statistik-Endpunkten live berechnet.
+"""
+
+import threading
+import time
+import logging
+from datetime import date, timedelta
+from app.utils.inventory_stats import close_inventory_stats
+
+logger = logging.getLogger(__name__)
+
+CHECK_INTERVAL = 300
+
+
+class InventoryStatsRollup:
+    """Scheduler für den täglichen Abschluss der Inventar-Statistik."""
+
+    def __init__(self, app=None):
+        self.app = app
+        self.running = False
+        self.thread = None
+        self.closed_through = None
+
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Initialisiere den Abschluss mit der Flask-App."""
+        self.app = app
+
+        # Starte Abschluss automatisch
+        self.start()
+
+    def start(self):
+        """Starte den Abschluss."""
+        if self.running:
+            return
+
+        self.running = True
+        self.thread = threading.Thread(target=self._run_rollup, daemon=True)
+        self.thread.start()
+        logger.info("Abschluss der Inventar-Statistik gestartet")
+
+    def stop(self):
+        """Stoppe den Abschluss."""
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=5)
+        logger.info("Abschluss der Inventar-Statistik gestoppt")
+
+    def _run_rollup(self):
+        """Hauptschleife: prüft alle 5 Minuten, ob der Vortag abgeschlossen ist."""
+        while self.running:
+            try:
+                yesterday = date.today() - timedelta(days=1)
+                if self.closed_through != yesterday:
+                    with self.app.app_context():
+                        close_inventory_stats(yesterday)
+                    self.closed_through = yesterday
+
+                time.sleep(CHECK_INTERVAL)
+
+            except Exception as e:
+                logger.error(f"Fehler beim Abschluss der Inventar-Statistik: {e}")
+                time.sleep(60)  # Warte 1 Minute bei Fehlern
+
+
+# Globale Instanz
+rollup = InventoryStatsRollup()
+
+
+def start_inventory_stats_rollup(app):
+    """Starte den Abschluss der Inventar-Statistik für die gegebene App."""
+    global rollup
+    rollup.init_app(app)
+    return rollup
+
+
+def stop_inventory_stats_rollup():
+    """Stoppe den Abschluss der Inventar-Statistik."""
+    global rollup
+    rollup.stop()
@@ -0,0 +1,233 @@
+"""
+Background Task für ONLYOFFICE-Speichervorgänge
+Der Callback bestätigt OnlyOffice sofort und reicht den Speichervorgang hierher
+weiter. Der Worker lädt das Dokument gestreamt herunter, tauscht es atomar ein
+und legt bei Force-Save die Dateiversion an. Mehrere Callbacks für denselben
+Dokumentschlüssel, die noch nicht verarbeitet wurden, werden zusammengefasst.
+"""
+
+import logging
+import os
+import queue
+import tempfile
+import threading
+from datetime import datetime
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+STATUS_AUTO_SAVE = 4
+STATUS_FORCE_SAVE = 6
+
+
+class SaveJob:
+    """Ein ausstehender Speichervorgang für ein Dokument."""
+
+    def __init__(self, file_id: int, document_key: str, url: str, status: int,
+                 guest_name: Optional[str] = None):
+        self.file_id = file_id
+        self.document_key = document_key
+        self.url = url
+        self.status = status
+        # Gesetzt bei Bearbeitung über eine Freigabe (Speichern als anonymer Benutzer)
+        self.guest_name = guest_name
+
+
+class OnlyOfficeSaveWorker:
+    """Worker, der ONLYOFFICE-Speichervorgänge nacheinander abarbeitet."""
+
+    def __init__(self, app=None):
+        self.app = app
+        self.running = False
+        self.thread = None
+        self.queue = queue.Queue()
+        self.pending = {}
+        self.lock = threading.Lock()
+
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Initialisiere den Worker mit der Flask-App."""
+        self.app = app
+
+        # Starte Worker automatisch
+        self.start()
+
+    def start(self):
+        """Starte den Worker."""
+        with self.lock:
+            if self.running:
+                return
+            self.running = True
+        self.thread = threading.Thread(target=self._run_worker, daemon=True)
+        self.thread.start()
+        logger.info("ONLYOFFICE-Speicher-Worker gestartet")
+
+    def stop(self):
+        """Stoppe den Worker."""
+        self.running = False
+        self.queue.put(None)
+        if self.thread:
+            self.thread.join(timeout=5)
+        logger.info("ONLYOFFICE-Speicher-Worker gestoppt")
+
+    def submit(self, job: SaveJob):
+        """
+        Reiht einen Speichervorgang ein.
+
+        Liegt für denselben Dokumentschlüssel bereits ein unbearbeiteter Auftrag vor,
+        wird dieser mit der neuesten URL aktualisiert; ein Force-Save bleibt erhalten.
+        """
+        coalesce_key = (job.file_id, job.document_key)
+        with self.lock:
+            existing = self.pending.get(coalesce_key)
+            if existing is not None:
+                existing.url = job.url
+                existing.status = max(existing.status, job.status)
+                existing.guest_name = job.guest_name or existing.guest_name
+                logger.info(f"ONLYOFFICE: Speichervorgang für Datei {job.file_id} zusammengefasst")
+                return
+            self.pending[coalesce_key] = job
+        self.queue.put(coalesce_key)
+
+    def _run_worker(self):
+        """Hauptschleife des Workers."""
+        while self.running:
+            coalesce_key = self.queue.get()
+            if coalesce_key is None:
+                continue
+            with self.lock:
+                job = self.pending.pop(coalesce_key, None)
+            if job is None:
+                continue
+            try:
+                with self.app.app_context():
+                    process_save_job(job)
+            except Exception as e:
+                logger.error(f"ONLYOFFICE: Fehler beim Speichern von Datei {job.file_id}: {e}")
+
+
+def process_save_job(job: SaveJob):
+    """Lädt das bearbeitete Dokument herunter und übernimmt es als neuen Dateistand."""
+    from flask import current_app
+    from app import db
+    from app.models.file import File
+    from app.models.user import User
+    from app.utils.blob_gc import mark_blob_unreferenced
+    from app.utils.notifications import send_file_notification
+    from app.utils.onlyoffice import download_onlyoffice_document, stored_file_sha256
+    from app.utils.storage import get_storage, path_for_key, stored_file_exists, unique_key
+    from app.utils.preview_cache import invalidate_file_preview
+    from app.utils.version_storage import create_file_version, prune_file_versions
+    from app.tasks.search_indexer import enqueue_file_index
+
+    file = File.query.get(job.file_id)
+    if not file:
+        logger.warning(f"ONLYOFFICE: Datei {job.file_id} existiert nicht mehr, Speichern verworfen")
+        return
+
+    storage = get_storage()
+    # Lokal direkt im Upload-Verzeichnis puffern (atomares Verschieben), sonst im Temp-Verzeichnis
+    temp_dir = storage.local_path('files') or tempfile.gettempdir()
+    temp_path, sha256, size = download_onlyoffice_document(job.url, temp_dir)
+
+    try:
+        # Unveränderte Auto-Saves nicht übernehmen
+        if (job.status == STATUS_AUTO_SAVE and file.file_size == size and stored_file_exists(file.file_path)
+                and stored_file_sha256(file.file_path) == sha256):
+            logger.info(f"ONLYOFFICE: Datei {file.id} unverändert (sha256 {sha256[:12]}), kein Speichern nötig")
+            os.remove(temp_path)
+            return
+
+        timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
+        key = unique_key('files', f"{timestamp}_{file.original_name}")
+        storage.save_local_file(key, temp_path, move=True)
+        stored_path = path_for_key(key)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    uploaded_by = None
+    if job.guest_name is not None:
+        # Gast-Bearbeitung über eine Freigabe
+        anonymous_user = User.query.filter_by(email='anonymous@system.local').first()
+        if not anonymous_user:
+            anonymous_user = User(
+                email='anonymous@system.local',
+                first_name=job.guest_name,
+                last_name='',
+                password_hash='',
+                is_active=True,
+                is_admin=False,
+                is_email_confirmed=True
+            )
+            db.session.add(anonymous_user)
+            db.session.flush()
+        uploaded_by = anonymous_user.id
+
+    try:
+        if job.status == STATUS_FORCE_SAVE:
+            # Force save: Neue Version mit Historie
+            create_file_version(file)
+            prune_file_versions(file.id, current_app.config.get('MAX_FILE_VERSIONS', 3))
+
+            file.file_path = stored_path
+            file.file_size = size
+            file.version_number += 1
+            if uploaded_by:
+                file.uploaded_by = uploaded_by
+            file.updated_at = datetime.utcnow()
+        else:
+            # Auto-save: Datei ohne Versionssprung ersetzen
+            old_file_path = file.file_path
+            file.file_path = stored_path
+            file.file_size = size
+            file.updated_at = datetime.utcnow()
+            if old_file_path != stored_path:
+                mark_blob_unreferenced(old_file_path, source='file')
+
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        mark_blob_unreferenced(stored_path, source='onlyoffice')
+        db.session.commit()
+        raise
+
+    enqueue_file_index([file.id])
+    invalidate_file_preview([file.id])
+    logger.info(
+        f"ONLYOFFICE: Datei {file.id} gespeichert (Status {job.status}, Version {file.version_number}, "
+        f"{size} Bytes, sha256 {sha256[:12]})"
+    )
+
+    if job.guest_name is None:
+        try:
+            send_file_notification(file.id, 'modified')
+        except Exception as e:
+            logger.error(f"Fehler beim Senden der Datei-Benachrichtigung: {e}")
+
+
+# Globale Worker-Instanz
+save_worker = OnlyOfficeSaveWorker()
+
+
+def start_onlyoffice_save_worker(app):
+    """Starte den ONLYOFFICE-Speicher-Worker für die gegebene App."""
+    global save_worker
+    save_worker.init_app(app)
+    return save_worker
+
+
+def stop_onlyoffice_save_worker():
+    """Stoppe den ONLYOFFICE-Speicher-Worker."""
+    global save_worker
+    save_worker.stop()
+
+
+def submit_onlyoffice_save(app, job: SaveJob):
+    """Reiht einen Speichervorgang ein und startet den Worker bei Bedarf."""
+    if not save_worker.running:
+        save_worker.init_app(app)
+    save_worker.submit(job)
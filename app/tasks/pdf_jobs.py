@@ -0,0 +1,313 @@
+"""
+Background Task für die PDF-Erzeugung
+Inventurlisten, Inventuren, QR-Code-Druckbögen, Farbcodes und Ausleihscheine
+werden nicht mehr im Request gesetzt. Der Request sammelt nur die Dokumentdaten
+(siehe app.utils.pdf_generator); das Setzen übernimmt ein Prozess-Pool. Fertige
+PDFs landen im PDF-Cache und werden von dort ausgeliefert.
+
+Die Auftrags-ID ist der Cache-Schlüssel des Dokuments: gleiche Daten ergeben
+denselben Auftrag, und ein fertiges PDF ist auch über andere Worker-Prozesse
+abrufbar. Die Fertigmeldung geht per Socket.IO an den Raum `pdf_<Art>_<ID>`.
+Laufende und fehlgeschlagene Aufträge werden zusätzlich neben dem Cache-Eintrag
+markiert; Aufträge ohne Ergebnis nach PDF_JOB_TIMEOUT Sekunden gelten als
+fehlgeschlagen.
+"""
+
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+# Anzahl abgeschlossener Aufträge, deren Status abrufbar bleibt
+MAX_FINISHED_JOBS = 50
+DEFAULT_JOB_TIMEOUT = 300
+
+
+def pdf_job_room(kind: str, key: str) -> str:
+    """Socket.IO-Raum für die Fertigmeldung eines PDF-Auftrags."""
+    return f"pdf_{kind}_{key}"
+
+
+class PdfJob:
+    """Ein zu setzendes PDF-Dokument."""
+
+    def __init__(self, kind: str, key: str, data: Dict, filename: str):
+        self.id = key
+        self.kind = kind
+        self.data = data
+        self.filename = filename
+        self.status = 'queued'
+        self.error = None
+        # Nur bei deaktiviertem PDF-Cache: fertiges Dokument
+        self.pdf = None
+        # Werden nach dem Setzen mit den PDF-Bytes aufgerufen (im App-Kontext)
+        self.callbacks = []
+        self.created_at = datetime.utcnow()
+        self.finished_at = None
+
+    def to_dict(self) -> Dict:
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'filename': self.filename,
+            'error': self.error,
+            'created_at': self.created_at.isoformat(),
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+class PdfJobWorker:
+    """Verteilt PDF-Aufträge auf einen Prozess-Pool und legt die Ergebnisse ab."""
+
+    def __init__(self, app=None):
+        self.app = app
+        self.running = False
+        self.thread = None
+        self.queue = queue.Queue()
+        self.jobs = OrderedDict()
+        self.lock = threading.Lock()
+        self.pool = None
+        self.pool_lock = threading.Lock()
+
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Initialisiere den Worker mit der Flask-App."""
+        self.app = app
+
+        # Starte Worker automatisch
+        self.start()
+
+    def start(self):
+        """Starte den Worker."""
+        with self.lock:
+            if self.running:
+                return
+            self.running = True
+        self.thread = threading.Thread(target=self._run_worker, daemon=True)
+        self.thread.start()
+        logger.info("PDF-Worker gestartet")
+
+    def stop(self):
+        """Stoppe den Worker."""
+        self.running = False
+        self.queue.put(None)
+        if self.thread:
+            self.thread.join(timeout=5)
+        self._discard_pool()
+        logger.info("PDF-Worker gestoppt")
+
+    def submit(self, kind: str, data: Dict, filename: str,
+               on_done: Optional[Callable[[bytes], None]] = None) -> PdfJob:
+        """
+        Reiht ein Dokument ein (muss im App-Kontext aufgerufen werden).
+
+        Läuft bereits ein Auftrag mit denselben Daten, wird dieser zurückgegeben.
+        Liegt das PDF schon im Cache, wird der Auftrag ohne Setzen abgeschlossen.
+        """
+        from app.utils.pdf_cache import get_cached_pdf, write_job_marker
+        from app.utils.pdf_generator import pdf_cache_key, render_pdf
+
+        key = pdf_cache_key(kind, data)
+        with self.lock:
+            job = self.jobs.get(key)
+            if job is not None and job.status in ('queued', 'running'):
+                if on_done:
+                    job.callbacks.append(on_done)
+                return job
+            job = PdfJob(kind, key, data, filename)
+            if on_done:
+                job.callbacks.append(on_done)
+            self.jobs.pop(key, None)
+            self.jobs[key] = job
+            self._prune_jobs()
+
+        cached = get_cached_pdf(kind, key)
+        if cached is not None:
+            self.queue.put((job, cached, None))
+            return job
+
+        job.status = 'running'
+        write_job_marker(kind, key, 'running')
+        try:
+            future = self._get_pool().submit(render_pdf, kind, data, datetime.now())
+            future.add_done_callback(lambda f: self.queue.put((job, None, f)))
+        except (BrokenProcessPool, OSError, RuntimeError) as e:
+            logger.warning(f"PDF-Pool nicht verfügbar, setze im Worker-Thread: {e}")
+            self._discard_pool()
+            self.queue.put((job, None, None))
+        return job
+
+    def get(self, job_id: str) -> Optional[PdfJob]:
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def _prune_jobs(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.status in ('done', 'failed')]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[job_id]
+
+    def _pool_workers(self) -> int:
+        workers = self.app.config.get('PDF_JOB_WORKERS', 0) if self.app else 0
+        return workers if workers > 0 else (os.cpu_count() or 1)
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """Prozess-Pool (forkserver mit vorgeladenem PDF-Modul, sonst spawn)."""
+        with self.pool_lock:
+            if self.pool is None:
+                if 'forkserver' in multiprocessing.get_all_start_methods():
+                    context = multiprocessing.get_context('forkserver')
+                    context.set_forkserver_preload(['app.utils.pdf_generator'])
+                else:
+                    context = multiprocessing.get_context('spawn')
+                self.pool = ProcessPoolExecutor(max_workers=self._pool_workers(), mp_context=context)
+            return self.pool
+
+    def _discard_pool(self):
+        with self.pool_lock:
+            pool, self.pool = self.pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _run_worker(self):
+        """Hauptschleife: nimmt gesetzte PDFs entgegen und schließt die Aufträge ab."""
+        while self.running:
+            item = self.queue.get()
+            if item is None:
+                continue
+            try:
+                self._finish_job(*item)
+            except Exception as e:
+                logger.error(f"PDF-Worker: Unerwarteter Fehler: {e}")
+
+    def _finish_job(self, job: PdfJob, pdf_bytes: Optional[bytes], future):
+        from app.utils.pdf_cache import DEFAULT_MAX_FILES, put_cached_pdf, remove_job_marker, write_job_marker
+
+        try:
+            with self.app.app_context():
+                if pdf_bytes is None:
+                    pdf_bytes = self._result(job, future)
+                    put_cached_pdf(job.kind, job.id, pdf_bytes)
+                remove_job_marker(job.kind, job.id)
+                if self.app.config.get('PDF_CACHE_MAX_FILES', DEFAULT_MAX_FILES) <= 0:
+                    job.pdf = pdf_bytes
+                with self.lock:
+                    job.status = 'done'
+                    callbacks, job.callbacks = job.callbacks, []
+                for callback in callbacks:
+                    try:
+                        callback(pdf_bytes)
+                    except Exception as e:
+                        logger.error(f"PDF-Auftrag {job.id} ({job.kind}): Folgeschritt fehlgeschlagen: {e}")
+        except Exception as e:
+            logger.error(f"PDF-Auftrag {job.id} ({job.kind}) fehlgeschlagen: {e}")
+            job.error = str(e)
+            job.status = 'failed'
+            with self.app.app_context():
+                write_job_marker(job.kind, job.id, 'failed', job.error)
+        finally:
+            job.data = None
+            job.callbacks = []
+            job.finished_at = datetime.utcnow()
+            with self.lock:
+                self._prune_jobs()
+            self._publish(job)
+
+    def _result(self, job: PdfJob, future) -> bytes:
+        """PDF aus dem Pool; ist der Pool ausgefallen, wird im Worker-Thread gesetzt."""
+        from app.utils.pdf_generator import render_pdf
+
+        if future is not None:
+            try:
+                return future.result()
+            except BrokenProcessPool as e:
+                logger.warning(f"PDF-Pool ausgefallen, setze im Worker-Thread: {e}")
+                self._discard_pool()
+        return render_pdf(job.kind, job.data, datetime.now())
+
+    def _publish(self, job: PdfJob):
+        """Meldet das Ende eines Auftrags an die wartenden Clients."""
+        try:
+            from app import socketio
+            socketio.emit('pdf:done', job.to_dict(), room=pdf_job_room(job.kind, job.id))
+        except Exception as e:
+            logger.debug(f"PDF-Fertigmeldung konnte nicht gesendet werden: {e}")
+
+
+# Globale Worker-Instanz
+pdf_job_worker = PdfJobWorker()
+
+
+def start_pdf_job_worker(app):
+    """Starte den PDF-Worker für die gegebene App."""
+    global pdf_job_worker
+    pdf_job_worker.init_app(app)
+    return pdf_job_worker
+
+
+def stop_pdf_job_worker():
+    """Stoppe den PDF-Worker."""
+    global pdf_job_worker
+    pdf_job_worker.stop()
+
+
+def submit_pdf_job(app, kind: str, data: Dict, filename: str,
+                   on_done: Optional[Callable[[bytes], None]] = None) -> PdfJob:
+    """Reiht ein PDF-Dokument ein und startet den Worker bei Bedarf."""
+    if not pdf_job_worker.running:
+        pdf_job_worker.init_app(app)
+    return pdf_job_worker.submit(kind, data, filename, on_done)
+
+
+def get_pdf_job(job_id: str) -> Optional[PdfJob]:
+    return pdf_job_worker.get(job_id)
+
+
+def get_pdf_job_status(kind: str, key: str) -> Dict:
+    """
+    Status eines Auftrags, auch wenn er in einem anderen Worker-Prozess läuft.
+
+    Liefert immer einen Endzustand, sobald der Auftrag länger als PDF_JOB_TIMEOUT
+    läuft oder über ihn nichts (mehr) bekannt ist: wartende Clients erhalten dann
+    'failed' statt endlos 'pending'.
+    """
+    from app.utils.pdf_cache import DEFAULT_MAX_FILES, get_cached_pdf, read_job_marker
+
+    timeout = current_app.config.get('PDF_JOB_TIMEOUT', DEFAULT_JOB_TIMEOUT)
+    job = get_pdf_job(key)
+    if job is not None and job.kind == kind:
+        status = job.to_dict()
+        if job.status in ('queued', 'running') and (datetime.utcnow() - job.created_at).total_seconds() > timeout:
+            status.update(status='failed', error='Zeitüberschreitung')
+        return status
+
+    status = {'id': key, 'kind': kind, 'status': 'pending'}
+    if get_cached_pdf(kind, key) is not None:
+        status['status'] = 'done'
+        return status
+    marker = read_job_marker(kind, key)
+    if marker is None:
+        if current_app.config.get('PDF_CACHE_MAX_FILES', DEFAULT_MAX_FILES) <= 0:
+            # Ohne Cache liegt ein fertiges PDF nur im Prozess, der es gesetzt hat
+            status.update(status='failed', error='Auftrag in diesem Prozess nicht verfügbar (PDF-Cache deaktiviert)')
+        else:
+            status.update(status='failed', error='Auftrag nicht gefunden')
+        return status
+    marker_status, error, age = marker
+    if marker_status == 'failed':
+        status.update(status='failed', error=error)
+    elif age > timeout:
+        status.update(status='failed', error='Zeitüberschreitung')
+    return status
@@ -0,0 +1,130 @@
+"""
+Background Task für den Volltext-Suchindex
+Extrahiert Dateiinhalte außerhalb des Requests und hält `file_search_documents`
+aktuell. Requests melden geänderte Dateien nur über `enqueue_file_index` an.
+"""
+
+import queue
+import threading
+import logging
+from app.utils.file_search import ensure_search_index, index_files, find_unindexed_file_ids
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 50
+
+
+class SearchIndexer:
+    """Worker, der angemeldete Dateien in Batches indexiert."""
+    
+    def __init__(self, app=None):
+        self.app = app
+        self.running = False
+        self.thread = None
+        self.queue = queue.Queue()
+        
+        if app:
+            self.init_app(app)
+    
+    def init_app(self, app):
+        """Initialisiere den Indexer mit der Flask-App."""
+        self.app = app
+        
+        # Starte Indexer automatisch
+        self.start()
+    
+    def start(self):
+        """Starte den Indexer."""
+        if self.running:
+            return
+        
+        self.running = True
+        self.thread = threading.Thread(target=self._run_indexer, daemon=True)
+        self.thread.start()
+        logger.info("Such-Indexer gestartet")
+    
+    def stop(self):
+        """Stoppe den Indexer."""
+        self.running = False
+        self.queue.put(None)
+        if self.thread:
+            self.thread.join(timeout=5)
+        logger.info("Such-Indexer gestoppt")
+    
+    def enqueue(self, file_ids, refresh_content=True):
+        """Meldet Dateien zur (Neu-)Indexierung an."""
+        for file_id in file_ids:
+            if file_id:
+                self.queue.put((file_id, refresh_content))
+    
+    def _next_batch(self, timeout):
+        """Sammelt bis zu BATCH_SIZE Einträge aus der Queue."""
+        batch = {}
+        try:
+            item = self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return batch
+        while item is not None:
+            file_id, refresh_content = item
+            batch[file_id] = batch.get(file_id, False) or refresh_content
+            if len(batch) >= BATCH_SIZE:
+                break
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                break
+        return batch
+    
+    def _run_indexer(self):
+        """Hauptschleife des Indexers."""
+        try:
+            with self.app.app_context():
+                ensure_search_index()
+        except Exception as e:
+            logger.error(f"Suchindex konnte nicht vorbereitet werden: {e}")
+        
+        while self.running:
+            interval = self.app.config.get('FILE_SEARCH_SCAN_INTERVAL', 600)
+            try:
+                batch = self._next_batch(timeout=interval)
+                with self.app.app_context():
+                    if batch:
+                        index_files([fid for fid, refresh in batch.items() if refresh])
+                        index_files([fid for fid, refresh in batch.items() if not refresh],
+                                    refresh_content=False)
+                    else:
+                        # Leerlauf: noch nicht (oder veraltet) indexierte Dateien nachziehen
+                        missing = find_unindexed_file_ids(limit=BATCH_SIZE)
+                        while missing and self.running and self.queue.empty():
+                            index_files(missing)
+                            missing = find_unindexed_file_ids(limit=BATCH_SIZE)
+            except Exception as e:
+                logger.error(f"Fehler im Such-Indexer: {e}")
+
+
+# Globale Indexer-Instanz
+indexer = SearchIndexer()
+
+
+def start_search_indexer(app):
+    """Starte den Such-Indexer für die gegebene App."""
+    global indexer
+    indexer.init_app(app)
+    return indexer
+
+
+def stop_search_indexer():
+    """Stoppe den Such-Indexer."""
+    global indexer
+    indexer.stop()
+
+
+def enqueue_file_index(file_ids, refresh_content=True):
+    """
+    Meldet Dateien zur Indexierung an.
+    
+    Ohne laufenden Indexer (z.B. mit PRISMATEAMS_SKIP_BACKGROUND_JOBS) werden die
+    Dateien beim nächsten Start über den Leerlauf-Abgleich nachindexiert.
+    """
+    if indexer.running:
+        indexer.enqueue(file_ids, refresh_content)
@@ -0,0 +1,85 @@
+"""
+Background Task für den Abgleich der Speicherverbrauchs-Zähler
+Berechnet die Zähler in `storage_usage` einmal täglich zur konfigurierten Stunde
+aus den Tabellen neu und korrigiert Abweichungen (z.B. nach manuellen Eingriffen
+in die Datenbank oder abgebrochenen Bulk-Operationen).
+"""
+
+import threading
+import time
+import logging
+from datetime import datetime
+from app.utils.storage_usage import reconcile_storage_usage
+
+logger = logging.getLogger(__name__)
+
+
+class UsageReconciler:
+    """Scheduler für den nächtlichen Abgleich des Speicherverbrauchs."""
+
+    def __init__(self, app=None):
+        self.app = app
+        self.running = False
+        self.thread = None
+        self.last_run_date = None
+
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Initialisiere den Abgleich mit der Flask-App."""
+        self.app = app
+
+        # Starte Abgleich automatisch
+        self.start()
+
+    def start(self):
+        """Starte den Abgleich."""
+        if self.running:
+            return
+
+        self.running = True
+        self.thread = threading.Thread(target=self._run_reconciler, daemon=True)
+        self.thread.start()
+        logger.info("Speicherverbrauchs-Abgleich gestartet")
+
+    def stop(self):
+        """Stoppe den Abgleich."""
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=5)
+        logger.info("Speicherverbrauchs-Abgleich gestoppt")
+
+    def _run_reconciler(self):
+        """Hauptschleife: prüft alle 5 Minuten, ob die Abgleichsstunde erreicht ist."""
+        while self.running:
+            try:
+                now = datetime.utcnow()
+                if (now.hour == self.app.config.get('STORAGE_USAGE_RECONCILE_HOUR', 4) and
+                        self.last_run_date != now.date()):
+                    self.last_run_date = now.date()
+                    with self.app.app_context():
+                        reconcile_storage_usage()
+
+                time.sleep(300)
+
+            except Exception as e:
+                logger.error(f"Fehler beim Abgleich des Speicherverbrauchs: {e}")
+                time.sleep(60)  # Warte 1 Minute bei Fehlern
+
+
+# Globale Instanz
+reconciler = UsageReconciler()
+
+
+def start_usage_reconciler(app):
+    """Starte den Speicherverbrauchs-Abgleich für die gegebene App."""
+    global reconciler
+    reconciler.init_app(app)
+    return reconciler
+
+
+def stop_usage_reconciler():
+    """Stoppe den Speicherverbrauchs-Abgleich."""
+    global reconciler
+    reconciler.stop()
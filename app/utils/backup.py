@@ -1,13 +1,18 @@
 """
 Backup- und Restore-Funktionalität für PrismaTeams
 """
+import base64
 import json
 import os
 import shutil
 import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from typing import List, Dict, Set, Optional
-from flask import current_app
+from typing import Callable, List, Dict, Set, Optional, Iterable, Iterator, Tuple
+from flask import current_app, g
+from sqlalchemy import and_, or_, select
+from sqlalchemy.orm import aliased
 from app import db
 from app.models import (
     User,
@@ -21,11 +26,31 @@ from app.models import (
     ProductDocument, SavedFilter, ProductFavorite, Inventory, InventoryItem,
     Manual, Chat, ChatMessage, ChatMember, Canvas
 )
+from app.models.wiki import wiki_page_tags
 from app.blueprints.credentials import get_encryption_key
+from app.utils.version_storage import get_file_version_bytes, get_wiki_version_content
 from app.utils.lengths import normalize_length_input, parse_length_to_meters, format_length_from_meters
+from app.utils.backup_archive import (
+    ARCHIVE_VERSIONS, ArchiveTables, BackupArchiveError, BackupArchiveReader, BackupArchiveWriter,
+    is_backup_archive
+)
+from app.utils.backup_chain import BACKUP_SUFFIX, BackupChain, find_backup_chain, list_backups, order_backup_chain
+from app.utils.export_stream import isoformat, stream_dicts, stream_rows
+from app.utils.product_listing import bump_product_version
+from app.utils.product_search import index_products
+from app.utils.storage import (
+    delete_stored_file, get_storage, path_for_key, read_stored_file, save_upload, storage_key,
+    stored_file_exists, unique_key
+)
+from app.utils.inventory_stats import track_bulk_transactions
+from app.utils.storage_usage import track_bulk_insert
 
 
-BACKUP_VERSION = "1.0"
+BACKUP_VERSION = "2.1"
+# Altes Format: ein JSON-Dokument mit Base64-kodierten Dateiinhalten (nur noch Import)
+LEGACY_BACKUP_VERSION = "1.0"
+# Standard für BACKUP_IMPORT_BATCH_SIZE: Datensätze pro Bulk-Insert beim Import
+IMPORT_BATCH_SIZE = 1000
 SUPPORTED_CATEGORIES = {
     'settings': 'Einstellungen',
     'users': 'Benutzer',
@@ -40,354 +65,576 @@ SUPPORTED_CATEGORIES = {
     'chats': 'Chats',
     'canvas': 'Canvas'
 }
+BACKUP_TYPES = {
+    'full': 'Vollständig',
+    'incremental': 'Inkrementell',
+    'differential': 'Differentiell'
+}
+# Tabellen, die inkrementelle/differentielle Backups nur mit geänderten Datensätzen
+# enthalten: Tabelle -> (Modell, Spalten mit Änderungszeitpunkt). Alle übrigen
+# Tabellen sind klein oder ohne Änderungszeitpunkt (bzw. wie Kommentare über ihre
+# Position referenziert) und werden stets vollständig geschrieben.
+INCREMENTAL_TABLES = {
+    'settings': (SystemSettings, ('updated_at',)),
+    'users': (User, ('created_at', 'updated_at')),
+    'notification_settings': (NotificationSettings, ('created_at', 'updated_at')),
+    # Lesestatus und Ordner von E-Mails haben keinen Änderungszeitpunkt; sie werden
+    # erst mit dem nächsten Vollbackup aktualisiert
+    'emails': (EmailMessage, ('created_at',)),
+    'email_attachments': (EmailAttachment, ('created_at',)),
+    'calendar_events': (CalendarEvent, ('created_at', 'updated_at')),
+    'credentials': (Credential, ('created_at', 'updated_at')),
+    'chats': (Chat, ('created_at', 'updated_at')),
+    'chat_messages': (ChatMessage, ('created_at', 'edited_at')),
+    'canvases': (Canvas, ('created_at', 'updated_at')),
+    'folders': (Folder, ('created_at', 'updated_at')),
+    'files': (File, ('created_at', 'updated_at')),
+    'file_versions': (FileVersion, ('created_at',)),
+    'wiki_pages': (WikiPage, ('created_at', 'updated_at')),
+    'wiki_page_versions': (WikiPageVersion, ('created_at',)),
+    'product_folders': (ProductFolder, ('created_at', 'updated_at')),
+    'products': (Product, ('created_at', 'updated_at')),
+    'borrow_transactions': (BorrowTransaction, ('created_at', 'updated_at')),
+    'product_sets': (ProductSet, ('created_at', 'updated_at')),
+    'product_documents': (ProductDocument, ('created_at',)),
+    'inventories': (Inventory, ('created_at', 'updated_at')),
+    'inventory_items': (InventoryItem, ('created_at', 'updated_at')),
+}
+# Namensverweise, die beim Zusammenführen einer Backup-Kette über die mitexportierte
+# ID auf den aktuellen Namen gebracht werden (z.B. nach Umbenennen eines Ordners)
+CHAIN_REFERENCES = {
+    'folders': {'parent_name': ('parent_id', 'folders', 'name')},
+    'files': {'folder_name': ('folder_id', 'folders', 'name')},
+    'file_versions': {'file_name': ('file_id', 'files', 'name')},
+    'chat_messages': {'chat_name': ('chat_id', 'chats', 'name')},
+    'wiki_pages': {'category_name': ('category_id', 'wiki_categories', 'name')},
+    'wiki_page_versions': {'page_slug': ('wiki_page_id', 'wiki_pages', 'slug')},
+    'products': {'folder_name': ('folder_id', 'product_folders', 'name')},
+    'borrow_transactions': {'product_name': ('product_id', 'products', 'name')},
+    'product_documents': {'product_name': ('product_id', 'products', 'name')},
+    'inventory_items': {
+        'inventory_name': ('inventory_id', 'inventories', 'name'),
+        'product_name': ('product_id', 'products', 'name'),
+    },
+}
 
 
-def export_backup(categories: List[str], output_path: str) -> Dict:
+def export_backup(categories: List[str], output_path: str, backup_type: str = 'full',
+                  parent_path: Optional[str] = None,
+                  progress: Optional[Callable[[str, int, int], None]] = None) -> Dict:
     """
     Erstellt ein Backup der ausgewählten Kategorien.
     
+    Das Backup wird als Archiv (siehe `app.utils.backup_archive`) blockweise
+    geschrieben: jede Tabelle als NDJSON, Dateiinhalte als eigene Einträge. Die
+    Kategorien werden parallel exportiert (BACKUP_EXPORT_WORKERS).
+    
+    Inkrementelle Backups enthalten die seit `parent_path` geänderten Datensätze,
+    differentielle die seit dem Vollbackup der Kette von `parent_path` geänderten
+    (Tabellen siehe INCREMENTAL_TABLES), jeweils mit den IDs gelöschter Datensätze.
+    Dateiinhalte, die bereits in der Kette liegen, werden nicht erneut gespeichert.
+    Die Vorgänger werden im Verzeichnis von `parent_path` gesucht.
+    
     Args:
         categories: Liste der zu exportierenden Kategorien
         output_path: Pfad zur Ausgabedatei (.prismateams)
+        backup_type: 'full', 'incremental' oder 'differential'
+        parent_path: Vorheriges Backup (für inkrementelle/differentielle Backups)
+        progress: Optional, wird mit (Tabelle bzw. Kategorie, fertige Kategorien,
+            Anzahl Kategorien) aufgerufen
     
     Returns:
         Dict mit Metadaten über das Backup
     """
-    backup_data = {
-        'version': BACKUP_VERSION,
-        'created_at': datetime.utcnow().isoformat(),
+    if backup_type not in BACKUP_TYPES:
+        raise ValueError(f'Unbekannte Backup-Art: {backup_type}')
+    
+    compresslevel = current_app.config.get('BACKUP_COMPRESSION_LEVEL', 6)
+    if backup_type == 'full':
+        with BackupArchiveWriter(output_path, categories, compresslevel=compresslevel) as archive:
+            _export_categories(archive, categories, progress)
+    else:
+        if not parent_path:
+            raise ValueError('Für inkrementelle und differentielle Backups wird ein vorheriges Backup benötigt')
+        chain = find_backup_chain(parent_path)
+        if backup_type == 'differential':
+            chain = chain[:1]
+        with BackupChain(chain) as previous:
+            parent = previous.head
+            if not parent.backup_id:
+                raise BackupArchiveError('Das vorherige Backup unterstützt keine Backup-Ketten (Version 2.0)')
+            since = parent.manifest.get('watermark') or parent.manifest['created_at']
+            archive = BackupArchiveWriter(output_path, categories, backup_type, parent=parent.manifest,
+                                          since=since, known_blobs=previous.blob_digests(),
+                                          compresslevel=compresslevel)
+            g.backup_increment = _Increment(parent, datetime.fromisoformat(since))
+            try:
+                with archive:
+                    _export_categories(archive, categories, progress)
+            finally:
+                g.pop('backup_increment', None)
+    
+    return {
+        'success': True,
+        'file_path': output_path,
         'categories': categories,
-        'data': {}
+        'backup_id': archive.backup_id,
+        'backup_type': archive.backup_type,
+        'parent_id': archive.parent_id,
+        'created_at': archive.created_at,
+        'tables': archive.tables,
+        'blob_count': archive.blob_count,
+        'blob_bytes': archive.blob_bytes
     }
+
+
+class _Increment:
+    """Stand eines inkrementellen bzw. differentiellen Exports (in `g.backup_increment`)."""
+
+    def __init__(self, parent: BackupArchiveReader, since: datetime):
+        self.parent = parent
+        self.since = since
+        # Nur Tabellen mit ID-Liste im Vorgänger lassen sich als Änderungen schreiben
+        self.tables = {
+            name for name in INCREMENTAL_TABLES
+            if parent.has_table(name) and parent.manifest['tables'][name].get('ids_sha256')
+        }
+        self.models = {INCREMENTAL_TABLES[name][0]: INCREMENTAL_TABLES[name][1] for name in self.tables}
+        # Vorab gelesen, damit die Export-Threads nicht gleichzeitig das Vorgänger-Archiv lesen
+        self.previous = {name: parent.table_ids(name)['live'] for name in self.tables}
+
+
+def create_stored_backup(categories: List[str], backup_type: str = 'full',
+                         progress: Optional[Callable[[str, int, int], None]] = None) -> Dict:
+    """
+    Erstellt ein Backup in BACKUP_FOLDER.
+    
+    Inkrementelle und differentielle Backups bauen auf dem jüngsten Backup der
+    Ablage auf. Das Archiv wird zunächst als `.part`-Datei geschrieben und erst
+    nach erfolgreichem Export umbenannt, sodass unvollständige Backups nie in der
+    Ablage erscheinen.
+    
+    Returns:
+        Metadaten wie `export_backup`, zusätzlich `filename`
+    """
+    folder = get_backup_folder()
+    parent_path = None
+    if backup_type != 'full':
+        previous = [backup for backup in list_backups(folder) if backup['backup_id']]
+        if not previous:
+            raise BackupArchiveError('Für ein inkrementelles oder differentielles Backup muss zuerst '
+                                     'ein vollständiges Backup erstellt werden.')
+        parent_path = previous[-1]['path']
+    
+    timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
+    filename = f'backup_{timestamp}_{backup_type}{BACKUP_SUFFIX}'
+    counter = 1
+    while os.path.exists(os.path.join(folder, filename)):
+        counter += 1
+        filename = f'backup_{timestamp}_{backup_type}_{counter}{BACKUP_SUFFIX}'
+    output_path = os.path.join(folder, filename)
+    partial_path = f'{output_path}.part'
+    
+    try:
+        result = export_backup(categories, partial_path, backup_type, parent_path, progress)
+        os.replace(partial_path, output_path)
+    except BaseException:
+        if os.path.exists(partial_path):
+            os.unlink(partial_path)
+        raise
+    
+    result['file_path'] = output_path
+    result['filename'] = filename
+    return result
+
+
+def _export_categories(archive: BackupArchiveWriter, categories: List[str],
+                       progress: Optional[Callable[[str, int, int], None]] = None):
+    """Exportiert die Kategorien, bei mehreren Workern parallel.
+    
+    Jede Kategorie läuft in einem eigenen App-Kontext (eigene Datenbank-Session);
+    das Archiv serialisiert die Schreibzugriffe. Tabellen verschiedener Kategorien
+    sind unabhängig, da Verweise über Namen bzw. IDs erst beim Import aufgelöst werden.
+    """
+    selected = [category for category in SUPPORTED_CATEGORIES
+                if category in categories or 'all' in categories]
+    total = len(selected)
+    state = {'done': 0}
+    state_lock = threading.Lock()
+    
+    def report(name):
+        if progress is not None:
+            with state_lock:
+                done = state['done']
+            progress(name, done, total)
+    
+    def finished(category):
+        with state_lock:
+            state['done'] += 1
+        report(category)
+    
+    archive.on_table = lambda name, rows: report(name)
+    workers = max(1, min(int(current_app.config.get('BACKUP_EXPORT_WORKERS', 4)), total))
+    if workers == 1:
+        for category in selected:
+            _export_tables(archive, [category])
+            finished(category)
+        return
+    
+    app = current_app._get_current_object()
+    increment = g.get('backup_increment')
+    
+    def export_category(category):
+        with app.app_context():
+            if increment is not None:
+                g.backup_increment = increment
+            _export_tables(archive, [category])
+        return category
+    
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='backup-export') as executor:
+        futures = [executor.submit(export_category, category) for category in selected]
+        try:
+            for future in as_completed(futures):
+                finished(future.result())
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+
+def _select(model, *columns):
+    """Abfrage der zu exportierenden Spalten eines Modells (nach ID sortiert).
     
+    Bei inkrementellen und differentiellen Backups nur Datensätze, die seit dem
+    Wasserzeichen des Vorgängers angelegt oder geändert wurden.
+    """
+    statement = select(*columns).select_from(model).order_by(model.id)
+    increment = g.get('backup_increment')
+    if increment is None or model not in increment.models:
+        return statement
+    return statement.where(or_(*(getattr(model, column) >= increment.since
+                                 for column in increment.models[model])))
+
+
+def _iter_ids(model) -> Iterator[int]:
+    """Alle IDs eines Modells in aufsteigender Reihenfolge."""
+    for (row_id,) in stream_rows(select(model.id).order_by(model.id)):
+        yield row_id
+
+
+def _write_table(archive: BackupArchiveWriter, name: str, rows: Iterable[Dict]):
+    """Schreibt eine Tabelle; bei Ketten-Backups als Änderungen gegenüber dem Vorgänger."""
+    increment = g.get('backup_increment')
+    if increment is None or name not in increment.tables:
+        return archive.write_table(name, rows)
+    model = INCREMENTAL_TABLES[name][0]
+    return archive.write_table(name, rows, previous=increment.previous[name], current_ids=_iter_ids(model))
+
+
+def _export_tables(archive: BackupArchiveWriter, categories: List[str]):
+    """Schreibt die Tabellen der ausgewählten Kategorien in das Archiv."""
     # Einstellungen exportieren
     if 'settings' in categories or 'all' in categories:
-        backup_data['data']['settings'] = export_settings()
-        backup_data['data']['whitelist'] = export_whitelist()
+        _write_table(archive, 'settings', export_settings(archive))
+        _write_table(archive, 'whitelist', export_whitelist())
     
     # Benutzer exportieren
     if 'users' in categories or 'all' in categories:
-        backup_data['data']['users'] = export_users()
-        backup_data['data']['notification_settings'] = export_notification_settings()
+        _write_table(archive, 'users', export_users(archive))
+        _write_table(archive, 'notification_settings', export_notification_settings())
     
     # E-Mails exportieren
     if 'emails' in categories or 'all' in categories:
-        backup_data['data']['emails'] = export_emails()
-        backup_data['data']['email_permissions'] = export_email_permissions()
-        backup_data['data']['email_attachments'] = export_email_attachments()
+        _write_table(archive, 'emails', export_emails())
+        _write_table(archive, 'email_permissions', export_email_permissions())
+        _write_table(archive, 'email_attachments', export_email_attachments(archive))
     
     # Termine exportieren
     if 'appointments' in categories or 'all' in categories:
-        backup_data['data']['calendar_events'] = export_calendar_events()
-        backup_data['data']['event_participants'] = export_event_participants()
+        _write_table(archive, 'calendar_events', export_calendar_events())
+        _write_table(archive, 'event_participants', export_event_participants())
     
     # Zugangsdaten exportieren (entschlüsselt)
     if 'credentials' in categories or 'all' in categories:
-        backup_data['data']['credentials'] = export_credentials()
+        _write_table(archive, 'credentials', export_credentials())
     
     # Handbücher exportieren
     if 'manuals' in categories or 'all' in categories:
-        backup_data['data']['manuals'] = export_manuals()
+        _write_table(archive, 'manuals', export_manuals(archive))
     
     # Chats exportieren
     if 'chats' in categories or 'all' in categories:
-        backup_data['data']['chats'] = export_chats()
-        backup_data['data']['chat_members'] = export_chat_members()
-        backup_data['data']['chat_messages'] = export_chat_messages()
+        _write_table(archive, 'chats', export_chats(archive))
+        _write_table(archive, 'chat_members', export_chat_members())
+        _write_table(archive, 'chat_messages', export_chat_messages(archive))
     
     # Canvas exportieren
     if 'canvas' in categories or 'all' in categories:
-        backup_data['data']['canvases'] = export_canvases()
-        backup_data['data']['canvas_text_fields'] = export_canvas_text_fields()
-        backup_data['data']['canvas_elements'] = export_canvas_elements()
+        _write_table(archive, 'canvases', export_canvases())
+        _write_table(archive, 'canvas_text_fields', export_canvas_text_fields())
+        _write_table(archive, 'canvas_elements', export_canvas_elements())
     
     # Dateien exportieren
     if 'files' in categories or 'all' in categories:
-        backup_data['data']['folders'] = export_folders()
-        backup_data['data']['files'] = export_files()
-        backup_data['data']['file_versions'] = export_file_versions()
+        _write_table(archive, 'folders', export_folders())
+        _write_table(archive, 'files', export_files(archive))
+        _write_table(archive, 'file_versions', export_file_versions(archive))
     
     # Wiki exportieren
     if 'wiki' in categories or 'all' in categories:
-        backup_data['data']['wiki_categories'] = export_wiki_categories()
-        backup_data['data']['wiki_tags'] = export_wiki_tags()
-        backup_data['data']['wiki_pages'] = export_wiki_pages()
-        backup_data['data']['wiki_page_versions'] = export_wiki_page_versions()
+        _write_table(archive, 'wiki_categories', export_wiki_categories())
+        _write_table(archive, 'wiki_tags', export_wiki_tags())
+        _write_table(archive, 'wiki_pages', export_wiki_pages())
+        _write_table(archive, 'wiki_page_versions', export_wiki_page_versions())
     
     # Kommentare exportieren
     if 'comments' in categories or 'all' in categories:
-        backup_data['data']['comments'] = export_comments()
-        backup_data['data']['comment_mentions'] = export_comment_mentions()
+        positions = _comment_positions()
+        _write_table(archive, 'comments', export_comments(positions))
+        _write_table(archive, 'comment_mentions', export_comment_mentions(positions))
     
     # Inventar exportieren
     if 'inventory' in categories or 'all' in categories:
-        backup_data['data']['product_folders'] = export_product_folders()
-        backup_data['data']['products'] = export_products()
-        backup_data['data']['borrow_transactions'] = export_borrow_transactions()
-        backup_data['data']['product_sets'] = export_product_sets()
-        backup_data['data']['product_set_items'] = export_product_set_items()
-        backup_data['data']['product_documents'] = export_product_documents()
-        backup_data['data']['saved_filters'] = export_saved_filters()
-        backup_data['data']['product_favorites'] = export_product_favorites()
-        backup_data['data']['inventories'] = export_inventories()
-        backup_data['data']['inventory_items'] = export_inventory_items()
-    
-    # Backup-Datei schreiben
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(backup_data, f, indent=2, ensure_ascii=False, default=str)
-    
-    return {
-        'success': True,
-        'file_path': output_path,
-        'categories': categories,
-        'created_at': backup_data['created_at']
-    }
-
-
-def export_settings() -> List[Dict]:
+        _write_table(archive, 'product_folders', export_product_folders())
+        _write_table(archive, 'products', export_products(archive))
+        _write_table(archive, 'borrow_transactions', export_borrow_transactions())
+        _write_table(archive, 'product_sets', export_product_sets())
+        _write_table(archive, 'product_set_items', export_product_set_items())
+        _write_table(archive, 'product_documents', export_product_documents(archive))
+        _write_table(archive, 'saved_filters', export_saved_filters())
+        _write_table(archive, 'product_favorites', export_product_favorites())
+        _write_table(archive, 'inventories', export_inventories())
+        _write_table(archive, 'inventory_items', export_inventory_items())
+
+
+def get_backup_folder() -> str:
+    """Verzeichnis für serverseitige Backups (BACKUP_FOLDER), wird bei Bedarf angelegt."""
+    folder = current_app.config.get('BACKUP_FOLDER') or 'backups'
+    if not os.path.isabs(folder):
+        folder = os.path.join(os.path.dirname(current_app.root_path), folder)
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+
+def _upload_path(*parts) -> str:
+    """Absoluter Pfad unterhalb des Upload-Verzeichnisses."""
+    project_root = os.path.dirname(current_app.root_path)
+    return os.path.join(project_root, current_app.config.get('UPLOAD_FOLDER', 'uploads'), *parts)
+
+
+def _add_stored_blob(blobs: BackupArchiveWriter, stored_path: Optional[str],
+                     subdir: Optional[str] = None) -> Optional[str]:
+    """Übernimmt ein Objekt des Storage-Backends als Blob (None, wenn es fehlt)."""
+    key = storage_key(stored_path, subdir)
+    if not key or not get_storage().exists(key):
+        return None
+    with get_storage().local_file(key) as path:
+        return blobs.add_file(path)
+
+
+def _read_stored_text(stored_path: Optional[str], subdir: Optional[str] = None) -> Optional[str]:
+    """Liest eine gespeicherte Textdatei (z.B. Wiki-Markdown), None wenn sie fehlt."""
+    if not stored_path or not stored_file_exists(stored_path, subdir):
+        return None
+    return read_stored_file(stored_path, subdir).decode('utf-8')
+
+
+def export_settings(blobs: BackupArchiveWriter) -> Iterator[Dict]:
     """Exportiert System-Einstellungen."""
-    settings = SystemSettings.query.all()
-    result = []
-    
-    for s in settings:
+    statement = _select(SystemSettings, SystemSettings.id, SystemSettings.key, SystemSettings.value,
+                        SystemSettings.description, SystemSettings.updated_at)
+    for s in stream_rows(statement):
         setting_data = {
+            'id': s.id,
             'key': s.key,
             'value': s.value,
             'description': s.description,
-            'updated_at': s.updated_at.isoformat() if s.updated_at else None
+            'updated_at': isoformat(s.updated_at)
         }
         
-        # Wenn es sich um portal_logo handelt, exportiere die Datei als Base64
+        # Wenn es sich um portal_logo handelt, exportiere die Datei als Blob
         if s.key == 'portal_logo' and s.value:
             try:
-                project_root = os.path.dirname(current_app.root_path)
-                logo_path = os.path.join(project_root, current_app.config.get('UPLOAD_FOLDER', 'uploads'), 'system', s.value)
-                if os.path.exists(logo_path):
-                    with open(logo_path, 'rb') as f:
-                        import base64
-                        logo_data = f.read()
-                        setting_data['file_content_base64'] = base64.b64encode(logo_data).decode('utf-8')
-                        setting_data['file_original_name'] = s.value
+                digest = _add_stored_blob(blobs, s.value, 'system')
+                if digest:
+                    setting_data['file_content_blob'] = digest
+                    setting_data['file_original_name'] = s.value
             except Exception as e:
                 current_app.logger.error(f"Fehler beim Exportieren des Portal-Logos: {str(e)}")
         
-        result.append(setting_data)
-    
-    return result
+        yield setting_data
 
 
-def export_whitelist() -> List[Dict]:
+def export_whitelist() -> Iterator[Dict]:
     """Exportiert Whitelist-Einträge."""
-    entries = WhitelistEntry.query.all()
-    return [{
-        'entry': e.entry,
-        'entry_type': e.entry_type,
-        'description': e.description,
-        'is_active': e.is_active,
-        'created_at': e.created_at.isoformat() if e.created_at else None
-    } for e in entries]
+    return stream_dicts(_select(
+        WhitelistEntry, WhitelistEntry.id, WhitelistEntry.entry, WhitelistEntry.entry_type,
+        WhitelistEntry.description, WhitelistEntry.is_active, WhitelistEntry.created_at
+    ))
 
 
-def export_users() -> List[Dict]:
+def export_users(blobs: BackupArchiveWriter) -> Iterator[Dict]:
     """Exportiert Benutzer (inkl. Passwort-Hashes)."""
-    users = User.query.all()
-    result = []
-    
-    for u in users:
-        user_data = {
-            'email': u.email,
-            'password_hash': u.password_hash,  # Passwort-Hash wird exportiert
-            'first_name': u.first_name,
-            'last_name': u.last_name,
-            'phone': u.phone,
-            'is_active': u.is_active,
-            'is_admin': u.is_admin,
-            'is_email_confirmed': u.is_email_confirmed,
-            'profile_picture': u.profile_picture,
-            'accent_color': u.accent_color,
-            'accent_gradient': u.accent_gradient,
-            'dark_mode': u.dark_mode,
-            'notifications_enabled': u.notifications_enabled,
-            'chat_notifications': u.chat_notifications,
-            'email_notifications': u.email_notifications,
-            'can_borrow': u.can_borrow,
-            'created_at': u.created_at.isoformat() if u.created_at else None,
-            'last_login': u.last_login.isoformat() if u.last_login else None
-        }
-        
-        # Exportiere Profilbild als Base64 wenn vorhanden
-        if u.profile_picture:
+    statement = _select(
+        User, User.id, User.email,
+        User.password_hash,  # Passwort-Hash wird exportiert
+        User.first_name, User.last_name, User.phone, User.is_active, User.is_admin,
+        User.is_email_confirmed, User.profile_picture, User.accent_color, User.accent_gradient,
+        User.dark_mode, User.notifications_enabled, User.chat_notifications, User.email_notifications,
+        User.can_borrow, User.created_at, User.last_login
+    )
+    for user_data in stream_dicts(statement):
+        # Exportiere Profilbild als Blob wenn vorhanden
+        if user_data['profile_picture']:
             try:
-                project_root = os.path.dirname(current_app.root_path)
-                pic_path = os.path.join(project_root, current_app.config.get('UPLOAD_FOLDER', 'uploads'), 'profile_pics', u.profile_picture)
-                if os.path.exists(pic_path):
-                    with open(pic_path, 'rb') as f:
-                        import base64
-                        pic_data = f.read()
-                        user_data['profile_picture_content_base64'] = base64.b64encode(pic_data).decode('utf-8')
-                        user_data['profile_picture_original_name'] = u.profile_picture
+                digest = _add_stored_blob(blobs, user_data['profile_picture'], 'profile_pics')
+                if digest:
+                    user_data['profile_picture_content_blob'] = digest
+                    user_data['profile_picture_original_name'] = user_data['profile_picture']
             except Exception as e:
-                current_app.logger.error(f"Fehler beim Exportieren des Profilbilds für {u.email}: {str(e)}")
+                current_app.logger.error(f"Fehler beim Exportieren des Profilbilds für {user_data['email']}: {str(e)}")
         
-        result.append(user_data)
-    
-    return result
+        yield user_data
 
 
-def export_notification_settings() -> List[Dict]:
+def export_notification_settings() -> Iterator[Dict]:
     """Exportiert Notification-Einstellungen."""
-    settings = NotificationSettings.query.all()
-    return [{
-        'user_email': User.query.get(s.user_id).email if User.query.get(s.user_id) else None,
-        'chat_notifications_enabled': s.chat_notifications_enabled,
-        'file_notifications_enabled': s.file_notifications_enabled,
-        'file_new_notifications': s.file_new_notifications,
-        'file_modified_notifications': s.file_modified_notifications,
-        'email_notifications_enabled': s.email_notifications_enabled,
-        'calendar_notifications_enabled': s.calendar_notifications_enabled,
-        'calendar_all_events': s.calendar_all_events,
-        'calendar_participating_only': s.calendar_participating_only,
-        'calendar_not_participating': s.calendar_not_participating,
-        'calendar_no_response': s.calendar_no_response,
-        'reminder_times': s.reminder_times
-    } for s in settings]
-
-
-def export_emails() -> List[Dict]:
+    return stream_dicts(_select(
+        NotificationSettings, NotificationSettings.id,
+        User.email.label('user_email'),
+        NotificationSettings.chat_notifications_enabled,
+        NotificationSettings.file_notifications_enabled,
+        NotificationSettings.file_new_notifications,
+        NotificationSettings.file_modified_notifications,
+        NotificationSettings.email_notifications_enabled,
+        NotificationSettings.calendar_notifications_enabled,
+        NotificationSettings.calendar_all_events,
+        NotificationSettings.calendar_participating_only,
+        NotificationSettings.calendar_not_participating,
+        NotificationSettings.calendar_no_response,
+        NotificationSettings.reminder_times
+    ).outerjoin(User, User.id == NotificationSettings.user_id))
+
+
+def export_emails() -> Iterator[Dict]:
     """Exportiert E-Mails."""
-    emails = EmailMessage.query.all()
-    return [{
-        'uid': e.uid,
-        'message_id': e.message_id,
-        'subject': e.subject,
-        'sender': e.sender,
-        'recipients': e.recipients,
-        'cc': e.cc,
-        'bcc': e.bcc,
-        'body_text': e.body_text,
-        'body_html': e.body_html,
-        'is_read': e.is_read,
-        'is_sent': e.is_sent,
-        'has_attachments': e.has_attachments,
-        'folder': e.folder,
-        'sent_by_user_email': User.query.get(e.sent_by_user_id).email if e.sent_by_user_id and User.query.get(e.sent_by_user_id) else None,
-        'received_at': e.received_at.isoformat() if e.received_at else None,
-        'sent_at': e.sent_at.isoformat() if e.sent_at else None,
-        'created_at': e.created_at.isoformat() if e.created_at else None
-    } for e in emails]
-
-
-def export_email_permissions() -> List[Dict]:
+    return stream_dicts(_select(
+        EmailMessage, EmailMessage.id, EmailMessage.uid, EmailMessage.message_id, EmailMessage.subject,
+        EmailMessage.sender, EmailMessage.recipients, EmailMessage.cc, EmailMessage.bcc,
+        EmailMessage.body_text, EmailMessage.body_html, EmailMessage.is_read, EmailMessage.is_sent,
+        EmailMessage.has_attachments, EmailMessage.folder,
+        User.email.label('sent_by_user_email'),
+        EmailMessage.received_at, EmailMessage.sent_at, EmailMessage.created_at
+    ).outerjoin(User, User.id == EmailMessage.sent_by_user_id))
+
+
+def export_email_permissions() -> Iterator[Dict]:
     """Exportiert E-Mail-Berechtigungen."""
-    permissions = EmailPermission.query.all()
-    return [{
-        'user_email': User.query.get(p.user_id).email if User.query.get(p.user_id) else None,
-        'can_read': p.can_read,
-        'can_send': p.can_send
-    } for p in permissions]
+    return stream_dicts(_select(
+        EmailPermission, EmailPermission.id, User.email.label('user_email'),
+        EmailPermission.can_read, EmailPermission.can_send
+    ).outerjoin(User, User.id == EmailPermission.user_id))
 
 
-def export_email_attachments() -> List[Dict]:
+def export_email_attachments(blobs: BackupArchiveWriter) -> Iterator[Dict]:
     """Exportiert E-Mail-Anhänge."""
-    attachments = EmailAttachment.query.all()
-    result = []
-    for att in attachments:
+    statement = _select(
+        EmailAttachment, EmailAttachment.id, EmailMessage.message_id.label('email_message_id'),
+        EmailAttachment.filename, EmailAttachment.content_type, EmailAttachment.size,
+        EmailAttachment.is_inline, EmailAttachment.created_at,
+        EmailAttachment.file_path, EmailAttachment.content
+    ).outerjoin(EmailMessage, EmailMessage.id == EmailAttachment.email_id)
+    for att in stream_rows(statement):
         att_data = {
-            'email_message_id': att.email.message_id if att.email else None,
+            'id': att.id,
+            'email_message_id': att.email_message_id,
             'filename': att.filename,
             'content_type': att.content_type,
             'size': att.size,
             'is_inline': att.is_inline,
-            'created_at': att.created_at.isoformat() if att.created_at else None
+            'created_at': isoformat(att.created_at)
         }
         # Dateiinhalt nur wenn vorhanden
-        if att.file_path and os.path.exists(att.file_path):
+        if att.file_path and stored_file_exists(att.file_path, 'attachments'):
             try:
-                with open(att.file_path, 'rb') as f:
-                    import base64
-                    att_data['content_base64'] = base64.b64encode(f.read()).decode('utf-8')
+                att_data['content_blob'] = _add_stored_blob(blobs, att.file_path, 'attachments')
             except Exception:
                 pass
         elif att.content:
-            import base64
-            att_data['content_base64'] = base64.b64encode(att.content).decode('utf-8')
-        result.append(att_data)
-    return result
+            att_data['content_blob'] = blobs.add_bytes(att.content)
+        yield att_data
 
 
-def export_calendar_events() -> List[Dict]:
+def export_calendar_events() -> Iterator[Dict]:
     """Exportiert Kalender-Termine."""
-    events = CalendarEvent.query.all()
-    return [{
-        'title': e.title,
-        'description': e.description,
-        'start_time': e.start_time.isoformat() if e.start_time else None,
-        'end_time': e.end_time.isoformat() if e.end_time else None,
-        'location': e.location,
-        'created_by_email': User.query.get(e.created_by).email if User.query.get(e.created_by) else None,
-        'created_at': e.created_at.isoformat() if e.created_at else None,
-        'updated_at': e.updated_at.isoformat() if e.updated_at else None
-    } for e in events]
-
-
-def export_event_participants() -> List[Dict]:
+    return stream_dicts(_select(
+        CalendarEvent, CalendarEvent.id, CalendarEvent.title, CalendarEvent.description,
+        CalendarEvent.start_time, CalendarEvent.end_time, CalendarEvent.location,
+        User.email.label('created_by_email'),
+        CalendarEvent.created_at, CalendarEvent.updated_at
+    ).outerjoin(User, User.id == CalendarEvent.created_by))
+
+
+def export_event_participants() -> Iterator[Dict]:
     """Exportiert Event-Teilnehmer."""
-    participants = EventParticipant.query.all()
-    return [{
-        'event_title': CalendarEvent.query.get(p.event_id).title if CalendarEvent.query.get(p.event_id) else None,
-        'user_email': User.query.get(p.user_id).email if User.query.get(p.user_id) else None,
-        'status': p.status,
-        'responded_at': p.responded_at.isoformat() if p.responded_at else None
-    } for p in participants]
+    return stream_dicts(_select(
+        EventParticipant, EventParticipant.id, CalendarEvent.title.label('event_title'),
+        User.email.label('user_email'), EventParticipant.status, EventParticipant.responded_at
+    ).outerjoin(CalendarEvent, CalendarEvent.id == EventParticipant.event_id)
+     .outerjoin(User, User.id == EventParticipant.user_id))
 
 
-def export_credentials() -> List[Dict]:
+def export_credentials() -> Iterator[Dict]:
     """Exportiert Zugangsdaten (entschlüsselt)."""
-    credentials = Credential.query.all()
+    statement = _select(
+        Credential, Credential.id, Credential.website_url, Credential.website_name, Credential.username,
+        Credential.password_encrypted, Credential.notes, Credential.favicon_url,
+        User.email.label('created_by_email'), Credential.created_at, Credential.updated_at
+    ).outerjoin(User, User.id == Credential.created_by)
     key = get_encryption_key()
-    result = []
-    for cred in credentials:
+    for cred in stream_rows(statement):
         try:
-            decrypted_password = cred.get_password(key)
-            result.append({
+            # Entschlüsselung wie Credential.get_password, direkt auf der Zeile
+            decrypted_password = Credential.get_password(cred, key)
+            yield {
+                'id': cred.id,
                 'website_url': cred.website_url,
                 'website_name': cred.website_name,
                 'username': cred.username,
                 'password': decrypted_password,  # Entschlüsselt
                 'notes': cred.notes,
                 'favicon_url': cred.favicon_url,
-                'created_by_email': User.query.get(cred.created_by).email if User.query.get(cred.created_by) else None,
-                'created_at': cred.created_at.isoformat() if cred.created_at else None,
-                'updated_at': cred.updated_at.isoformat() if cred.updated_at else None
-            })
+                'created_by_email': cred.created_by_email,
+                'created_at': isoformat(cred.created_at),
+                'updated_at': isoformat(cred.updated_at)
+            }
         except Exception as e:
             # Wenn Entschlüsselung fehlschlägt, überspringen
             current_app.logger.error(f"Fehler beim Entschlüsseln von Credential {cred.id}: {str(e)}")
             continue
-    return result
 
 
-def export_manuals() -> List[Dict]:
-    """Exportiert Handbücher (inkl. PDF-Dateien als Base64)."""
-    manuals = Manual.query.all()
-    result = []
-    for m in manuals:
+def export_manuals(blobs: BackupArchiveWriter) -> Iterator[Dict]:
+    """Exportiert Handbücher (inkl. PDF-Dateien als Blob)."""
+    statement = _select(
+        Manual, Manual.id, Manual.title, Manual.filename, Manual.file_size,
+        User.email.label('uploaded_by_email'), Manual.uploaded_at, Manual.file_path
+    ).outerjoin(User, User.id == Manual.uploaded_by)
+    for m in stream_rows(statement):
         manual_data = {
+            'id': m.id,
             'title': m.title,
             'filename': m.filename,
             'file_size': m.file_size,
-            'uploaded_by_email': User.query.get(m.uploaded_by).email if User.query.get(m.uploaded_by) else None,
-            'uploaded_at': m.uploaded_at.isoformat() if m.uploaded_at else None
+            'uploaded_by_email': m.uploaded_by_email,
+            'uploaded_at': isoformat(m.uploaded_at)
         }
         
-        # Exportiere PDF-Datei als Base64 wenn vorhanden
-        if m.file_path and os.path.exists(m.file_path):
+        # Exportiere PDF-Datei als Blob wenn vorhanden
+        if m.file_path and stored_file_exists(m.file_path, 'manuals'):
             try:
-                with open(m.file_path, 'rb') as f:
-                    import base64
-                    file_data = f.read()
-                    manual_data['file_content_base64'] = base64.b64encode(file_data).decode('utf-8')
-                    manual_data['file_original_name'] = m.filename
+                manual_data['file_content_blob'] = _add_stored_blob(blobs, m.file_path, 'manuals')
+                manual_data['file_original_name'] = m.filename
             except Exception as e:
                 current_app.logger.error(f"Fehler beim Exportieren des Handbuchs {m.title}: {str(e)}")
         elif m.file_path:
@@ -396,99 +643,95 @@ def export_manuals() -> List[Dict]:
                 project_root = os.path.dirname(current_app.root_path)
                 manual_path = os.path.join(project_root, m.file_path)
                 if os.path.exists(manual_path):
-                    with open(manual_path, 'rb') as f:
-                        import base64
-                        file_data = f.read()
-                        manual_data['file_content_base64'] = base64.b64encode(file_data).decode('utf-8')
-                        manual_data['file_original_name'] = m.filename
+                    manual_data['file_content_blob'] = blobs.add_file(manual_path)
+                    manual_data['file_original_name'] = m.filename
             except Exception as e:
                 current_app.logger.error(f"Fehler beim Exportieren des Handbuchs {m.title} (relativer Pfad): {str(e)}")
         
-        result.append(manual_data)
-    
-    return result
+        yield manual_data
 
 
-def export_chats() -> List[Dict]:
+def export_chats(blobs: BackupArchiveWriter) -> Iterator[Dict]:
     """Exportiert Chats."""
-    chats = Chat.query.all()
-    result = []
-    for c in chats:
+    statement = _select(
+        Chat, Chat.id, Chat.name, Chat.description, Chat.is_main_chat, Chat.is_direct_message,
+        User.email.label('created_by_email'), Chat.created_at, Chat.updated_at, Chat.group_avatar
+    ).outerjoin(User, User.id == Chat.created_by)
+    for c in stream_rows(statement):
         chat_data = {
+            'id': c.id,
             'name': c.name,
             'description': c.description,
             'is_main_chat': c.is_main_chat,
             'is_direct_message': c.is_direct_message,
-            'created_by_email': User.query.get(c.created_by).email if c.created_by and User.query.get(c.created_by) else None,
-            'created_at': c.created_at.isoformat() if c.created_at else None,
-            'updated_at': c.updated_at.isoformat() if c.updated_at else None
+            'created_by_email': c.created_by_email,
+            'created_at': isoformat(c.created_at),
+            'updated_at': isoformat(c.updated_at)
         }
         
-        # Exportiere Gruppenbild als Base64 wenn vorhanden
+        # Exportiere Gruppenbild als Blob wenn vorhanden
         if c.group_avatar:
             try:
-                project_root = os.path.dirname(current_app.root_path)
-                avatar_path = os.path.join(project_root, current_app.config.get('UPLOAD_FOLDER', 'uploads'), 'chat_avatars', c.group_avatar)
-                if os.path.exists(avatar_path):
-                    with open(avatar_path, 'rb') as f:
-                        import base64
-                        avatar_data = f.read()
-                        chat_data['group_avatar_content_base64'] = base64.b64encode(avatar_data).decode('utf-8')
-                        chat_data['group_avatar_original_name'] = c.group_avatar
+                # Aktueller Ablageort, ältere Importe legten Avatare unter chat_avatars ab
+                digest = (_add_stored_blob(blobs, c.group_avatar, 'chat/avatars')
+                          or blobs.add_file(_upload_path('chat_avatars', c.group_avatar)))
+                if digest:
+                    chat_data['group_avatar_content_blob'] = digest
+                    chat_data['group_avatar_original_name'] = c.group_avatar
             except Exception as e:
                 current_app.logger.error(f"Fehler beim Exportieren des Chat-Avatars für {c.name}: {str(e)}")
         
-        result.append(chat_data)
-    
-    return result
+        yield chat_data
 
 
-def export_chat_members() -> List[Dict]:
+def export_chat_members() -> Iterator[Dict]:
     """Exportiert Chat-Mitglieder."""
-    members = ChatMember.query.all()
-    return [{
-        'chat_name': Chat.query.get(m.chat_id).name if Chat.query.get(m.chat_id) else None,
-        'user_email': User.query.get(m.user_id).email if User.query.get(m.user_id) else None,
-        'joined_at': m.joined_at.isoformat() if m.joined_at else None,
-        'last_read_at': m.last_read_at.isoformat() if m.last_read_at else None
-    } for m in members]
-
-
-def export_chat_messages() -> List[Dict]:
-    """Exportiert Chat-Nachrichten (inkl. Media-Dateien als Base64)."""
-    messages = ChatMessage.query.all()
-    result = []
-    for msg in messages:
+    return stream_dicts(_select(
+        ChatMember, ChatMember.id, Chat.name.label('chat_name'), User.email.label('user_email'),
+        ChatMember.joined_at, ChatMember.last_read_at
+    ).outerjoin(Chat, Chat.id == ChatMember.chat_id)
+     .outerjoin(User, User.id == ChatMember.user_id))
+
+
+def export_chat_messages(blobs: BackupArchiveWriter) -> Iterator[Dict]:
+    """Exportiert Chat-Nachrichten (inkl. Media-Dateien als Blob)."""
+    statement = _select(
+        ChatMessage, ChatMessage.id, Chat.name.label('chat_name'), ChatMessage.chat_id,
+        User.email.label('sender_email'), ChatMessage.content, ChatMessage.message_type,
+        ChatMessage.created_at, ChatMessage.edited_at, ChatMessage.is_deleted, ChatMessage.media_url
+    ).outerjoin(Chat, Chat.id == ChatMessage.chat_id).outerjoin(User, User.id == ChatMessage.sender_id)
+    project_root = os.path.dirname(current_app.root_path)
+    for msg in stream_rows(statement):
         message_data = {
-            'chat_name': Chat.query.get(msg.chat_id).name if Chat.query.get(msg.chat_id) else None,
-            'sender_email': User.query.get(msg.sender_id).email if User.query.get(msg.sender_id) else None,
+            'id': msg.id,
+            'chat_name': msg.chat_name,
+            'chat_id': msg.chat_id,
+            'sender_email': msg.sender_email,
             'content': msg.content,
             'message_type': msg.message_type,
-            'created_at': msg.created_at.isoformat() if msg.created_at else None,
-            'edited_at': msg.edited_at.isoformat() if msg.edited_at else None,
+            'created_at': isoformat(msg.created_at),
+            'edited_at': isoformat(msg.edited_at),
             'is_deleted': msg.is_deleted
         }
         
-        # Exportiere Media-Datei als Base64 wenn vorhanden
+        # Exportiere Media-Datei als Blob wenn vorhanden
         if msg.media_url:
             try:
-                project_root = os.path.dirname(current_app.root_path)
-                # Versuche verschiedene mögliche Pfade
+                # Storage-Backend, danach ältere lokale Ablageorte
+                media_data = _add_stored_blob(blobs, msg.media_url, 'chat')
                 media_paths = [
-                    os.path.join(project_root, current_app.config.get('UPLOAD_FOLDER', 'uploads'), 'chat_media', msg.media_url),
+                    _upload_path('chat_media', msg.media_url),
                     os.path.join(project_root, msg.media_url),
                     msg.media_url
                 ]
-                
-                media_data = None
                 for media_path in media_paths:
+                    if media_data:
+                        break
                     if os.path.exists(media_path):
-                        with open(media_path, 'rb') as f:
-                            import base64
-                            media_data = base64.b64encode(f.read()).decode('utf-8')
-                            message_data['media_content_base64'] = media_data
-                            message_data['media_original_name'] = os.path.basename(msg.media_url)
-                            break
+                        media_data = blobs.add_file(media_path)
+                if media_data:
+                    message_data['media_content_blob'] = media_data
+                    message_data['media_original_name'] = os.path.basename(msg.media_url)
                 
                 if not media_data:
                     # Falls Datei nicht gefunden, speichere URL
@@ -499,21 +742,15 @@ def export_chat_messages() -> List[Dict]:
         else:
             message_data['media_url'] = None
         
-        result.append(message_data)
-    
-    return result
+        yield message_data
 
 
-def export_canvases() -> List[Dict]:
+def export_canvases() -> Iterator[Dict]:
     """Exportiert Canvas."""
-    canvases = Canvas.query.all()
-    return [{
-        'name': c.name,
-        'description': c.description,
-        'created_by_email': User.query.get(c.created_by).email if User.query.get(c.created_by) else None,
-        'created_at': c.created_at.isoformat() if c.created_at else None,
-        'updated_at': c.updated_at.isoformat() if c.updated_at else None
-    } for c in canvases]
+    return stream_dicts(_select(
+        Canvas, Canvas.id, Canvas.name, Canvas.description, User.email.label('created_by_email'),
+        Canvas.created_at, Canvas.updated_at
+    ).outerjoin(User, User.id == Canvas.created_by))
 
 
 def export_canvas_text_fields() -> List[Dict]:
@@ -528,430 +765,568 @@ def export_canvas_elements() -> List[Dict]:
     return []
 
 
-def export_folders() -> List[Dict]:
+def export_folders() -> Iterator[Dict]:
     """Exportiert Ordner."""
-    folders = Folder.query.all()
-    return [{
-        'name': f.name,
-        'parent_name': Folder.query.get(f.parent_id).name if f.parent_id and Folder.query.get(f.parent_id) else None,
-        'created_by_email': User.query.get(f.created_by).email if User.query.get(f.created_by) else None,
-        'is_dropbox': f.is_dropbox,
-        'share_enabled': f.share_enabled,
-        'share_name': f.share_name,
-        'share_expires_at': f.share_expires_at.isoformat() if f.share_expires_at else None,
-        'created_at': f.created_at.isoformat() if f.created_at else None,
-        'updated_at': f.updated_at.isoformat() if f.updated_at else None
-    } for f in folders]
-
-
-def export_files() -> List[Dict]:
+    parent = aliased(Folder)
+    return stream_dicts(_select(
+        Folder, Folder.id, Folder.name, parent.name.label('parent_name'), Folder.parent_id,
+        User.email.label('created_by_email'), Folder.is_dropbox, Folder.share_enabled, Folder.share_name,
+        Folder.share_expires_at, Folder.created_at, Folder.updated_at
+    ).outerjoin(parent, parent.id == Folder.parent_id)
+     .outerjoin(User, User.id == Folder.created_by))
+
+
+def export_files(blobs: BackupArchiveWriter) -> Iterator[Dict]:
     """Exportiert Dateien."""
-    files = File.query.all()
-    result = []
-    for file in files:
-        file_data = {
-            'name': file.name,
-            'original_name': file.original_name,
-            'folder_name': Folder.query.get(file.folder_id).name if file.folder_id and Folder.query.get(file.folder_id) else None,
-            'uploaded_by_email': User.query.get(file.uploaded_by).email if User.query.get(file.uploaded_by) else None,
-            'file_size': file.file_size,
-            'mime_type': file.mime_type,
-            'version_number': file.version_number,
-            'is_current': file.is_current,
-            'share_enabled': file.share_enabled,
-            'share_name': file.share_name,
-            'share_expires_at': file.share_expires_at.isoformat() if file.share_expires_at else None,
-            'created_at': file.created_at.isoformat() if file.created_at else None,
-            'updated_at': file.updated_at.isoformat() if file.updated_at else None
-        }
+    statement = _select(
+        File, File.id, File.name, File.original_name, Folder.name.label('folder_name'), File.folder_id,
+        User.email.label('uploaded_by_email'), File.file_size, File.mime_type, File.version_number,
+        File.is_current, File.share_enabled, File.share_name, File.share_expires_at,
+        File.created_at, File.updated_at, File.file_path
+    ).outerjoin(Folder, Folder.id == File.folder_id).outerjoin(User, User.id == File.uploaded_by)
+    for file_data in stream_dicts(statement):
+        file_path = file_data.pop('file_path')
         # Dateiinhalt hinzufügen wenn vorhanden
-        if file.file_path and os.path.exists(file.file_path):
+        if file_path and stored_file_exists(file_path):
             try:
-                with open(file.file_path, 'rb') as f:
-                    import base64
-                    file_data['content_base64'] = base64.b64encode(f.read()).decode('utf-8')
-                    file_data['file_path'] = file.file_path
+                file_data['content_blob'] = _add_stored_blob(blobs, file_path)
+                file_data['file_path'] = file_path
             except Exception as e:
-                current_app.logger.error(f"Fehler beim Lesen von Datei {file.file_path}: {str(e)}")
-        result.append(file_data)
-    return result
+                current_app.logger.error(f"Fehler beim Lesen von Datei {file_path}: {str(e)}")
+        yield file_data
 
 
-def export_file_versions() -> List[Dict]:
+def export_file_versions(blobs: BackupArchiveWriter) -> Iterator[Dict]:
     """Exportiert Datei-Versionen."""
-    versions = FileVersion.query.all()
-    result = []
-    for v in versions:
+    statement = _select(
+        FileVersion, FileVersion.id, File.name.label('file_name'), FileVersion.file_id,
+        FileVersion.version_number, FileVersion.file_size, User.email.label('uploaded_by_email'),
+        FileVersion.created_at, FileVersion.file_path, FileVersion.delta, FileVersion.base_version_number
+    ).outerjoin(File, File.id == FileVersion.file_id).outerjoin(User, User.id == FileVersion.uploaded_by)
+    for v in stream_rows(statement):
         version_data = {
-            'file_name': File.query.get(v.file_id).name if File.query.get(v.file_id) else None,
+            'id': v.id,
+            'file_name': v.file_name,
+            'file_id': v.file_id,
             'version_number': v.version_number,
             'file_size': v.file_size,
-            'uploaded_by_email': User.query.get(v.uploaded_by).email if User.query.get(v.uploaded_by) else None,
-            'created_at': v.created_at.isoformat() if v.created_at else None
+            'uploaded_by_email': v.uploaded_by_email,
+            'created_at': isoformat(v.created_at)
         }
-        # Dateiinhalt hinzufügen wenn vorhanden
-        if v.file_path and os.path.exists(v.file_path):
-            try:
-                with open(v.file_path, 'rb') as f:
-                    import base64
-                    version_data['content_base64'] = base64.b64encode(f.read()).decode('utf-8')
+        # Dateiinhalt hinzufügen wenn vorhanden (Delta-Versionen werden rekonstruiert)
+        try:
+            content = get_file_version_bytes(v)
+            if content is not None:
+                version_data['content_blob'] = blobs.add_bytes(content)
+                if v.file_path:
                     version_data['file_path'] = v.file_path
-            except Exception as e:
-                current_app.logger.error(f"Fehler beim Lesen von Dateiversion {v.file_path}: {str(e)}")
-        result.append(version_data)
-    return result
+        except Exception as e:
+            current_app.logger.error(f"Fehler beim Lesen von Dateiversion {v.file_id} v{v.version_number}: {str(e)}")
+        yield version_data
 
 
-def export_wiki_categories() -> List[Dict]:
+def export_wiki_categories() -> Iterator[Dict]:
     """Exportiert Wiki-Kategorien."""
-    categories = WikiCategory.query.all()
-    return [{
-        'name': c.name,
-        'description': c.description,
-        'color': c.color,
-        'created_at': c.created_at.isoformat() if c.created_at else None
-    } for c in categories]
+    return stream_dicts(_select(
+        WikiCategory, WikiCategory.id, WikiCategory.name, WikiCategory.description,
+        WikiCategory.color, WikiCategory.created_at
+    ))
 
 
-def export_wiki_tags() -> List[Dict]:
+def export_wiki_tags() -> Iterator[Dict]:
     """Exportiert Wiki-Tags."""
-    tags = WikiTag.query.all()
-    return [{
-        'name': t.name,
-        'created_at': t.created_at.isoformat() if t.created_at else None
-    } for t in tags]
+    return stream_dicts(_select(WikiTag, WikiTag.id, WikiTag.name, WikiTag.created_at))
 
 
-def export_wiki_pages() -> List[Dict]:
+def export_wiki_pages() -> Iterator[Dict]:
     """Exportiert Wiki-Seiten."""
-    pages = WikiPage.query.all()
-    result = []
-    for p in pages:
-        page_data = {
-            'title': p.title,
-            'slug': p.slug,
-            'content': p.content,
-            'category_name': p.category.name if p.category else None,
-            'created_by_email': User.query.get(p.created_by).email if User.query.get(p.created_by) else None,
-            'version_number': p.version_number,
-            'tags': [tag.name for tag in p.tags],
-            'created_at': p.created_at.isoformat() if p.created_at else None,
-            'updated_at': p.updated_at.isoformat() if p.updated_at else None
-        }
+    # Tag-Namen je Seite (eine Abfrage statt einer pro Seite)
+    page_tags = {}
+    for page_id, tag_name in stream_rows(
+            select(wiki_page_tags.c.wiki_page_id, WikiTag.name)
+            .join(WikiTag, WikiTag.id == wiki_page_tags.c.wiki_tag_id)
+            .order_by(wiki_page_tags.c.wiki_page_id, WikiTag.id)):
+        page_tags.setdefault(page_id, []).append(tag_name)
+    
+    statement = _select(
+        WikiPage, WikiPage.id, WikiPage.title, WikiPage.slug, WikiPage.content,
+        WikiCategory.name.label('category_name'), WikiPage.category_id,
+        User.email.label('created_by_email'), WikiPage.version_number,
+        WikiPage.created_at, WikiPage.updated_at, WikiPage.file_path
+    ).outerjoin(WikiCategory, WikiCategory.id == WikiPage.category_id).outerjoin(User, User.id == WikiPage.created_by)
+    for page_data in stream_dicts(statement):
+        file_path = page_data.pop('file_path')
+        page_data['tags'] = page_tags.get(page_data['id'], [])
         # Dateiinhalt hinzufügen wenn vorhanden
-        if p.file_path and os.path.exists(p.file_path):
+        if file_path and stored_file_exists(file_path, 'wiki'):
             try:
-                with open(p.file_path, 'r', encoding='utf-8') as f:
-                    page_data['file_content'] = f.read()
-                    page_data['file_path'] = p.file_path
+                page_data['file_content'] = _read_stored_text(file_path, 'wiki')
+                page_data['file_path'] = file_path
             except Exception as e:
-                current_app.logger.error(f"Fehler beim Lesen von Wiki-Datei {p.file_path}: {str(e)}")
-        result.append(page_data)
-    return result
+                current_app.logger.error(f"Fehler beim Lesen von Wiki-Datei {file_path}: {str(e)}")
+        yield page_data
 
 
-def export_wiki_page_versions() -> List[Dict]:
+def export_wiki_page_versions() -> Iterator[Dict]:
     """Exportiert Wiki-Seiten-Versionen."""
-    versions = WikiPageVersion.query.all()
-    result = []
-    for v in versions:
-        page = WikiPage.query.get(v.wiki_page_id)
+    statement = _select(
+        WikiPageVersion, WikiPageVersion.id, WikiPage.slug.label('page_slug'), WikiPageVersion.wiki_page_id,
+        WikiPageVersion.version_number, WikiPageVersion.content, WikiPageVersion.delta,
+        WikiPageVersion.base_version_number, User.email.label('created_by_email'),
+        WikiPageVersion.created_at, WikiPageVersion.file_path
+    ).outerjoin(WikiPage, WikiPage.id == WikiPageVersion.wiki_page_id).outerjoin(User, User.id == WikiPageVersion.created_by)
+    for v in stream_rows(statement):
         version_data = {
-            'page_slug': page.slug if page else None,
+            'id': v.id,
+            'page_slug': v.page_slug,
+            'wiki_page_id': v.wiki_page_id,
             'version_number': v.version_number,
-            'content': v.content,
-            'created_by_email': User.query.get(v.created_by).email if User.query.get(v.created_by) else None,
-            'created_at': v.created_at.isoformat() if v.created_at else None
+            'content': get_wiki_version_content(v),
+            'created_by_email': v.created_by_email,
+            'created_at': isoformat(v.created_at)
         }
         # Dateiinhalt hinzufügen wenn vorhanden
-        if v.file_path and os.path.exists(v.file_path):
+        if v.file_path and stored_file_exists(v.file_path, 'wiki'):
             try:
-                with open(v.file_path, 'r', encoding='utf-8') as f:
-                    version_data['file_content'] = f.read()
-                    version_data['file_path'] = v.file_path
+                version_data['file_content'] = _read_stored_text(v.file_path, 'wiki')
+                version_data['file_path'] = v.file_path
             except Exception as e:
                 current_app.logger.error(f"Fehler beim Lesen von Wiki-Versionsdatei {v.file_path}: {str(e)}")
-        result.append(version_data)
-    return result
+        yield version_data
+
 
+def _comment_positions() -> Dict[int, int]:
+    """Position jedes nicht gelöschten Kommentars (Referenz zwischen Kommentaren und Mentions)."""
+    statement = select(Comment.id).where(Comment.is_deleted == False).order_by(Comment.id)  # noqa: E712
+    return {comment_id: idx for idx, (comment_id,) in enumerate(stream_rows(statement))}
 
-def export_comments() -> List[Dict]:
-    """Exportiert Kommentare."""
-    comments = Comment.query.filter_by(is_deleted=False).all()
-    result = []
-    for idx, c in enumerate(comments):
-        # Finde parent-Kommentar-ID für Referenzierung
+
+def export_comments(positions: Dict[int, int]) -> Iterator[Dict]:
+    """Exportiert Kommentare.
+    
+    Kommentare werden über ihre Position (`positions`, siehe `_comment_positions`)
+    referenziert, da sich ihre IDs beim Import ändern.
+    """
+    parent = aliased(Comment)
+    statement = select(
+        Comment.id, Comment.content_type, Comment.content_id, Comment.content, Comment.parent_id,
+        User.email.label('author_email'), Comment.created_at, Comment.updated_at,
+        parent.content_type.label('parent_content_type'), parent.content_id.label('parent_content_id'),
+        File.name.label('file_name'), WikiPage.slug.label('wiki_slug'), Canvas.id.label('canvas_id')
+    ).where(Comment.is_deleted == False).order_by(Comment.id) \
+        .outerjoin(User, User.id == Comment.author_id) \
+        .outerjoin(parent, parent.id == Comment.parent_id) \
+        .outerjoin(File, and_(Comment.content_type == 'file', File.id == Comment.content_id)) \
+        .outerjoin(WikiPage, and_(Comment.content_type == 'wiki', WikiPage.id == Comment.content_id)) \
+        .outerjoin(Canvas, and_(Comment.content_type == 'canvas', Canvas.id == Comment.content_id))  # noqa: E712
+    for c in stream_rows(statement):
+        # Referenz zum Parent-Kommentar über content_type, content_id und Position
         parent_content_ref = None
-        if c.parent_id:
-            parent_comment = Comment.query.get(c.parent_id)
-            if parent_comment:
-                # Erstelle eine Referenz basierend auf content_type, content_id und Index
-                # Verwende Index für eindeutige Referenzierung
-                parent_idx = comments.index(parent_comment) if parent_comment in comments else None
-                if parent_idx is not None:
-                    parent_content_ref = f"{parent_comment.content_type}:{parent_comment.content_id}:{parent_idx}"
+        parent_idx = positions.get(c.parent_id) if c.parent_id else None
+        if parent_idx is not None:
+            parent_content_ref = f"{c.parent_content_type}:{c.parent_content_id}:{parent_idx}"
         
         comment_data = {
-            'old_id': idx,  # Index für Referenzierung beim Import
+            'id': c.id,
+            'old_id': positions[c.id],  # Index für Referenzierung beim Import
             'content_type': c.content_type,
             'content_id': c.content_id,
             'content': c.content,
-            'author_email': User.query.get(c.author_id).email if User.query.get(c.author_id) else None,
+            'author_email': c.author_email,
             'parent_content_ref': parent_content_ref,  # Referenz zum Parent-Kommentar
-            'created_at': c.created_at.isoformat() if c.created_at else None,
-            'updated_at': c.updated_at.isoformat() if c.updated_at else None
+            'created_at': isoformat(c.created_at),
+            'updated_at': isoformat(c.updated_at)
         }
         
         # Füge Referenz zum Content-Objekt hinzu für bessere Zuordnung beim Import
-        if c.content_type == 'file':
-            file_obj = File.query.get(c.content_id)
-            if file_obj:
-                comment_data['content_reference'] = f"file:{file_obj.name}"
-        elif c.content_type == 'wiki':
-            wiki_obj = WikiPage.query.get(c.content_id)
-            if wiki_obj:
-                comment_data['content_reference'] = f"wiki:{wiki_obj.slug}"
-        elif c.content_type == 'canvas':
-            from app.models.canvas import Canvas
-            canvas_obj = Canvas.query.get(c.content_id)
-            if canvas_obj:
-                comment_data['content_reference'] = f"canvas:{canvas_obj.id}"
-        
-        result.append(comment_data)
-    return result
-
-
-def export_comment_mentions() -> List[Dict]:
-    """Exportiert Kommentar-Mentions."""
-    mentions = CommentMention.query.all()
-    # Hole alle Kommentare für Index-Referenzierung
-    all_comments = Comment.query.filter_by(is_deleted=False).all()
-    comment_to_idx = {c.id: idx for idx, c in enumerate(all_comments)}
-    
-    result = []
-    for m in mentions:
-        comment = Comment.query.get(m.comment_id)
-        if not comment or comment.is_deleted:
-            continue
-        
-        # Verwende Index für Referenzierung
-        comment_idx = comment_to_idx.get(comment.id)
+        if c.file_name is not None:
+            comment_data['content_reference'] = f"file:{c.file_name}"
+        elif c.wiki_slug is not None:
+            comment_data['content_reference'] = f"wiki:{c.wiki_slug}"
+        elif c.canvas_id is not None:
+            comment_data['content_reference'] = f"canvas:{c.canvas_id}"
+        
+        yield comment_data
+
+
+def export_comment_mentions(positions: Dict[int, int]) -> Iterator[Dict]:
+    """Exportiert Kommentar-Mentions (Kommentare über ihre Position referenziert)."""
+    statement = select(
+        CommentMention.id, CommentMention.comment_id, Comment.content_type, Comment.content_id,
+        User.email.label('user_email'), CommentMention.notification_sent, CommentMention.created_at,
+        CommentMention.notification_sent_at
+    ).join(Comment, Comment.id == CommentMention.comment_id) \
+        .outerjoin(User, User.id == CommentMention.user_id) \
+        .where(Comment.is_deleted == False).order_by(CommentMention.id)  # noqa: E712
+    for m in stream_rows(statement):
+        comment_idx = positions.get(m.comment_id)
         if comment_idx is None:
             continue
-        
-        mention_data = {
-            'comment_content_ref': f"{comment.content_type}:{comment.content_id}:{comment_idx}",
-            'user_email': User.query.get(m.user_id).email if User.query.get(m.user_id) else None,
+        yield {
+            'id': m.id,
+            'comment_content_ref': f"{m.content_type}:{m.content_id}:{comment_idx}",
+            'user_email': m.user_email,
             'notification_sent': m.notification_sent,
-            'created_at': m.created_at.isoformat() if m.created_at else None,
-            'notification_sent_at': m.notification_sent_at.isoformat() if m.notification_sent_at else None
+            'created_at': isoformat(m.created_at),
+            'notification_sent_at': isoformat(m.notification_sent_at)
         }
-        result.append(mention_data)
-    return result
 
 
-def export_product_folders() -> List[Dict]:
+def export_product_folders() -> Iterator[Dict]:
     """Exportiert Produkt-Ordner."""
-    folders = ProductFolder.query.all()
-    return [{
-        'name': f.name,
-        'description': f.description,
-        'color': f.color,
-        'created_by_email': User.query.get(f.created_by).email if User.query.get(f.created_by) else None,
-        'created_at': f.created_at.isoformat() if f.created_at else None,
-        'updated_at': f.updated_at.isoformat() if f.updated_at else None
-    } for f in folders]
-
-
-def export_products() -> List[Dict]:
+    return stream_dicts(_select(
+        ProductFolder, ProductFolder.id, ProductFolder.name, ProductFolder.description, ProductFolder.color,
+        User.email.label('created_by_email'), ProductFolder.created_at, ProductFolder.updated_at
+    ).outerjoin(User, User.id == ProductFolder.created_by))
+
+
+def export_products(blobs: BackupArchiveWriter) -> Iterator[Dict]:
     """Exportiert Produkte."""
-    products = Product.query.all()
-    result = []
-    
-    for p in products:
-        product_data = {
-            'name': p.name,
-            'description': p.description,
-            'category': p.category,
-            'serial_number': p.serial_number,
-            'condition': p.condition,
-            'location': p.location,
-            'length': p.length,
-            'length_meters': parse_length_to_meters(p.length),
-            'purchase_date': p.purchase_date.isoformat() if p.purchase_date else None,
-            'status': p.status,
-            'image_path': p.image_path,
-            'qr_code_data': p.qr_code_data,
-            'folder_name': ProductFolder.query.get(p.folder_id).name if p.folder_id and ProductFolder.query.get(p.folder_id) else None,
-            'created_by_email': User.query.get(p.created_by).email if User.query.get(p.created_by) else None,
-            'created_at': p.created_at.isoformat() if p.created_at else None,
-            'updated_at': p.updated_at.isoformat() if p.updated_at else None
-        }
-        
-        # Exportiere Produktbild als Base64 wenn vorhanden
-        if p.image_path:
+    statement = _select(
+        Product, Product.id, Product.name, Product.description, Product.category, Product.serial_number,
+        Product.condition, Product.location, Product.length, Product.purchase_date, Product.status,
+        Product.image_path, Product.qr_code_data, ProductFolder.name.label('folder_name'), Product.folder_id,
+        User.email.label('created_by_email'), Product.created_at, Product.updated_at, Product.length_meters
+    ).outerjoin(ProductFolder, ProductFolder.id == Product.folder_id).outerjoin(User, User.id == Product.created_by)
+    for product_data in stream_dicts(statement):
+        # Exportiere Produktbild als Blob wenn vorhanden
+        if product_data['image_path']:
             try:
-                project_root = os.path.dirname(current_app.root_path)
-                img_path = os.path.join(project_root, current_app.config.get('UPLOAD_FOLDER', 'uploads'), 'inventory', 'product_images', p.image_path)
-                if os.path.exists(img_path):
-                    with open(img_path, 'rb') as f:
-                        import base64
-                        img_data = f.read()
-                        product_data['image_content_base64'] = base64.b64encode(img_data).decode('utf-8')
-                        product_data['image_original_name'] = p.image_path
+                digest = _add_stored_blob(blobs, product_data['image_path'], 'inventory/product_images')
+                if digest:
+                    product_data['image_content_blob'] = digest
+                    product_data['image_original_name'] = product_data['image_path']
             except Exception as e:
-                current_app.logger.error(f"Fehler beim Exportieren des Produktbilds für {p.name}: {str(e)}")
+                current_app.logger.error(f"Fehler beim Exportieren des Produktbilds für {product_data['name']}: {str(e)}")
         
-        result.append(product_data)
-    
-    return result
+        yield product_data
 
 
-def export_borrow_transactions() -> List[Dict]:
+def export_borrow_transactions() -> Iterator[Dict]:
     """Exportiert Ausleihtransaktionen."""
-    transactions = BorrowTransaction.query.all()
-    return [{
-        'transaction_number': t.transaction_number,
-        'borrow_group_id': t.borrow_group_id,
-        'product_name': Product.query.get(t.product_id).name if Product.query.get(t.product_id) else None,
-        'borrower_email': User.query.get(t.borrower_id).email if User.query.get(t.borrower_id) else None,
-        'borrowed_by_email': User.query.get(t.borrowed_by_id).email if User.query.get(t.borrowed_by_id) else None,
-        'borrow_date': t.borrow_date.isoformat() if t.borrow_date else None,
-        'expected_return_date': t.expected_return_date.isoformat() if t.expected_return_date else None,
-        'actual_return_date': t.actual_return_date.isoformat() if t.actual_return_date else None,
-        'status': t.status,
-        'qr_code_data': t.qr_code_data,
-        'created_at': t.created_at.isoformat() if t.created_at else None,
-        'updated_at': t.updated_at.isoformat() if t.updated_at else None
-    } for t in transactions]
-
-
-def export_product_sets() -> List[Dict]:
+    borrower = aliased(User)
+    borrowed_by = aliased(User)
+    return stream_dicts(_select(
+        BorrowTransaction, BorrowTransaction.id, BorrowTransaction.transaction_number,
+        BorrowTransaction.borrow_group_id, Product.name.label('product_name'), BorrowTransaction.product_id,
+        borrower.email.label('borrower_email'), borrowed_by.email.label('borrowed_by_email'),
+        BorrowTransaction.borrow_date, BorrowTransaction.expected_return_date,
+        BorrowTransaction.actual_return_date, BorrowTransaction.status, BorrowTransaction.qr_code_data,
+        BorrowTransaction.created_at, BorrowTransaction.updated_at
+    ).outerjoin(Product, Product.id == BorrowTransaction.product_id)
+     .outerjoin(borrower, borrower.id == BorrowTransaction.borrower_id)
+     .outerjoin(borrowed_by, borrowed_by.id == BorrowTransaction.borrowed_by_id))
+
+
+def export_product_sets() -> Iterator[Dict]:
     """Exportiert Produktsets."""
-    sets = ProductSet.query.all()
-    return [{
-        'name': s.name,
-        'description': s.description,
-        'created_by_email': User.query.get(s.created_by).email if User.query.get(s.created_by) else None,
-        'created_at': s.created_at.isoformat() if s.created_at else None,
-        'updated_at': s.updated_at.isoformat() if s.updated_at else None
-    } for s in sets]
+    return stream_dicts(_select(
+        ProductSet, ProductSet.id, ProductSet.name, ProductSet.description,
+        User.email.label('created_by_email'), ProductSet.created_at, ProductSet.updated_at
+    ).outerjoin(User, User.id == ProductSet.created_by))
 
 
-def export_product_set_items() -> List[Dict]:
+def export_product_set_items() -> Iterator[Dict]:
     """Exportiert Produktset-Items."""
-    items = ProductSetItem.query.all()
-    return [{
-        'set_name': ProductSet.query.get(i.set_id).name if ProductSet.query.get(i.set_id) else None,
-        'product_name': Product.query.get(i.product_id).name if Product.query.get(i.product_id) else None,
-        'quantity': i.quantity
-    } for i in items]
+    return stream_dicts(_select(
+        ProductSetItem, ProductSetItem.id, ProductSet.name.label('set_name'),
+        Product.name.label('product_name'), ProductSetItem.quantity
+    ).outerjoin(ProductSet, ProductSet.id == ProductSetItem.set_id)
+     .outerjoin(Product, Product.id == ProductSetItem.product_id))
 
 
-def export_product_documents() -> List[Dict]:
+def export_product_documents(blobs: BackupArchiveWriter) -> Iterator[Dict]:
     """Exportiert Produktdokumente."""
-    documents = ProductDocument.query.all()
-    result = []
-    for d in documents:
-        doc_data = {
-            'product_name': Product.query.get(d.product_id).name if Product.query.get(d.product_id) else None,
-            'file_name': d.file_name,
-            'file_type': d.file_type,
-            'file_size': d.file_size,
-            'uploaded_by_email': User.query.get(d.uploaded_by).email if User.query.get(d.uploaded_by) else None,
-            'created_at': d.created_at.isoformat() if d.created_at else None
-        }
+    statement = _select(
+        ProductDocument, ProductDocument.id, Product.name.label('product_name'), ProductDocument.product_id,
+        ProductDocument.file_name, ProductDocument.file_type, ProductDocument.file_size,
+        User.email.label('uploaded_by_email'), ProductDocument.created_at, ProductDocument.file_path
+    ).outerjoin(Product, Product.id == ProductDocument.product_id).outerjoin(User, User.id == ProductDocument.uploaded_by)
+    for doc_data in stream_dicts(statement):
+        file_path = doc_data.pop('file_path')
         # Dateiinhalt hinzufügen wenn vorhanden
-        if d.file_path and os.path.exists(d.file_path):
+        if file_path and stored_file_exists(file_path, 'inventory/product_documents'):
             try:
-                with open(d.file_path, 'rb') as f:
-                    import base64
-                    doc_data['content_base64'] = base64.b64encode(f.read()).decode('utf-8')
-                    doc_data['file_path'] = d.file_path
+                doc_data['content_blob'] = _add_stored_blob(blobs, file_path, 'inventory/product_documents')
+                doc_data['file_path'] = file_path
             except Exception as e:
-                current_app.logger.error(f"Fehler beim Lesen von Produktdokument {d.file_path}: {str(e)}")
-        result.append(doc_data)
-    return result
+                current_app.logger.error(f"Fehler beim Lesen von Produktdokument {file_path}: {str(e)}")
+        yield doc_data
 
 
-def export_saved_filters() -> List[Dict]:
+def export_saved_filters() -> Iterator[Dict]:
     """Exportiert gespeicherte Filter."""
-    filters = SavedFilter.query.all()
-    return [{
-        'user_email': User.query.get(f.user_id).email if User.query.get(f.user_id) else None,
-        'name': f.name,
-        'filter_data': f.filter_data,
-        'created_at': f.created_at.isoformat() if f.created_at else None
-    } for f in filters]
+    return stream_dicts(_select(
+        SavedFilter, SavedFilter.id, User.email.label('user_email'), SavedFilter.name,
+        SavedFilter.filter_data, SavedFilter.created_at
+    ).outerjoin(User, User.id == SavedFilter.user_id))
 
 
-def export_product_favorites() -> List[Dict]:
+def export_product_favorites() -> Iterator[Dict]:
     """Exportiert Produktfavoriten."""
-    favorites = ProductFavorite.query.all()
-    return [{
-        'user_email': User.query.get(f.user_id).email if User.query.get(f.user_id) else None,
-        'product_name': Product.query.get(f.product_id).name if Product.query.get(f.product_id) else None,
-        'created_at': f.created_at.isoformat() if f.created_at else None
-    } for f in favorites]
+    return stream_dicts(_select(
+        ProductFavorite, ProductFavorite.id, User.email.label('user_email'),
+        Product.name.label('product_name'), ProductFavorite.created_at
+    ).outerjoin(User, User.id == ProductFavorite.user_id)
+     .outerjoin(Product, Product.id == ProductFavorite.product_id))
 
 
-def export_inventories() -> List[Dict]:
+def export_inventories() -> Iterator[Dict]:
     """Exportiert Inventuren."""
-    inventories = Inventory.query.all()
-    return [{
-        'name': i.name,
-        'description': i.description,
-        'status': i.status,
-        'started_by_email': User.query.get(i.started_by).email if User.query.get(i.started_by) else None,
-        'started_at': i.started_at.isoformat() if i.started_at else None,
-        'completed_at': i.completed_at.isoformat() if i.completed_at else None,
-        'created_at': i.created_at.isoformat() if i.created_at else None,
-        'updated_at': i.updated_at.isoformat() if i.updated_at else None
-    } for i in inventories]
-
-
-def export_inventory_items() -> List[Dict]:
+    return stream_dicts(_select(
+        Inventory, Inventory.id, Inventory.name, Inventory.description, Inventory.status,
+        User.email.label('started_by_email'), Inventory.started_at, Inventory.completed_at,
+        Inventory.created_at, Inventory.updated_at
+    ).outerjoin(User, User.id == Inventory.started_by))
+
+
+def export_inventory_items() -> Iterator[Dict]:
     """Exportiert Inventur-Items."""
-    items = InventoryItem.query.all()
-    return [{
-        'inventory_name': Inventory.query.get(i.inventory_id).name if Inventory.query.get(i.inventory_id) else None,
-        'product_name': Product.query.get(i.product_id).name if Product.query.get(i.product_id) else None,
-        'checked': i.checked,
-        'notes': i.notes,
-        'location_changed': i.location_changed,
-        'new_location': i.new_location,
-        'condition_changed': i.condition_changed,
-        'new_condition': i.new_condition,
-        'checked_by_email': User.query.get(i.checked_by).email if i.checked_by and User.query.get(i.checked_by) else None,
-        'checked_at': i.checked_at.isoformat() if i.checked_at else None,
-        'created_at': i.created_at.isoformat() if i.created_at else None,
-        'updated_at': i.updated_at.isoformat() if i.updated_at else None
-    } for i in items]
-
-
-def import_backup(file_path: str, categories: List[str], current_user_id: Optional[int] = None) -> Dict:
+    return stream_dicts(_select(
+        InventoryItem, InventoryItem.id, Inventory.name.label('inventory_name'), InventoryItem.inventory_id,
+        Product.name.label('product_name'), InventoryItem.product_id, InventoryItem.checked,
+        InventoryItem.notes, InventoryItem.location_changed, InventoryItem.new_location,
+        InventoryItem.condition_changed, InventoryItem.new_condition,
+        User.email.label('checked_by_email'), InventoryItem.checked_at,
+        InventoryItem.created_at, InventoryItem.updated_at
+    ).outerjoin(Inventory, Inventory.id == InventoryItem.inventory_id)
+     .outerjoin(Product, Product.id == InventoryItem.product_id)
+     .outerjoin(User, User.id == InventoryItem.checked_by))
+
+
+def import_backup(file_path: str, categories: List[str], current_user_id: Optional[int] = None,
+                  progress: Optional[Callable[[str, int, int], None]] = None) -> Dict:
     """
     Importiert ein Backup der ausgewählten Kategorien.
     
+    Archive werden zeilenweise gelesen, große Tabellen blockweise per Bulk-Insert
+    geschrieben (BACKUP_IMPORT_BATCH_SIZE) und Dateiinhalte direkt aus dem Archiv
+    in den Speicher kopiert. Der Speicherbedarf hängt damit nicht von der
+    Backup-Größe ab; der Import bleibt eine Transaktion.
+    
     Args:
         file_path: Pfad zur Backup-Datei
         categories: Liste der zu importierenden Kategorien
         current_user_id: ID des aktuellen Benutzers (für Fallback wenn Benutzer nicht gefunden werden)
+        progress: Optionaler Callback progress(tabelle, verarbeitet, gesamt), der nach
+            jedem Block und am Ende jeder Tabelle aufgerufen wird
     
     Returns:
         Dict mit Import-Ergebnissen
     """
-    # Backup-Datei laden
+    # Backup-Datei laden (Archiv oder altes JSON-Dokument)
+    archive = None
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            backup_data = json.load(f)
+        if is_backup_archive(file_path):
+            archive = BackupArchiveReader(file_path)
+            backup_data = {'version': archive.version, 'data': ArchiveTables(archive)}
+        else:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                backup_data = json.load(f)
     except Exception as e:
         return {'success': False, 'error': f'Fehler beim Lesen der Backup-Datei: {str(e)}'}
     
     # Version prüfen
-    if backup_data.get('version') != BACKUP_VERSION:
+    expected_versions = ARCHIVE_VERSIONS if archive is not None else (LEGACY_BACKUP_VERSION,)
+    if backup_data.get('version') not in expected_versions:
+        if archive is not None:
+            archive.close()
         return {'success': False, 'error': f'Unsupported backup version: {backup_data.get("version")}'}
     
+    if archive is not None and archive.backup_type != 'full':
+        archive.close()
+        return {
+            'success': False,
+            'error': 'Inkrementelle und differentielle Backups können nur zusammen mit dem Vollbackup '
+                     'und den vorherigen Backups der Kette importiert werden.'
+        }
+    
+    return _import_from_archive(archive, backup_data, categories, current_user_id, progress)
+
+
+def import_backup_chain(file_paths: List[str], categories: List[str], current_user_id: Optional[int] = None,
+                        progress: Optional[Callable[[str, int, int], None]] = None) -> Dict:
+    """
+    Stellt eine Backup-Kette wieder her (Vollbackup mit inkrementellen/differentiellen Backups).
+    
+    Die Archive dürfen in beliebiger Reihenfolge übergeben werden. Die Tabellen werden
+    beim Import zusammengeführt und gegen die Prüfsummen im Manifest des jüngsten
+    Backups geprüft (siehe `app.utils.backup_chain`); ansonsten wie `import_backup`.
+    """
+    if len(file_paths) == 1:
+        return import_backup(file_paths[0], categories, current_user_id, progress)
+    try:
+        chain = BackupChain(order_backup_chain(file_paths), references=CHAIN_REFERENCES)
+    except BackupArchiveError as e:
+        return {'success': False, 'error': str(e)}
+    
+    if chain.version not in ARCHIVE_VERSIONS:
+        chain.close()
+        return {'success': False, 'error': f'Unsupported backup version: {chain.version}'}
+    
+    backup_data = {'version': chain.version, 'data': ArchiveTables(chain)}
+    return _import_from_archive(chain, backup_data, categories, current_user_id, progress)
+
+
+def _import_from_archive(archive, backup_data: Dict, categories: List[str], current_user_id: Optional[int],
+                         progress: Optional[Callable[[str, int, int], None]]) -> Dict:
+    """Importiert und schließt das Archiv bzw. die Kette (None beim alten JSON-Format)."""
+    # Dateiinhalte werden beim Import einzeln aus dem Archiv gelesen (siehe _store_row_blob)
+    g.backup_archive = archive
+    try:
+        return _import_backup_data(backup_data, categories, current_user_id, progress)
+    finally:
+        g.pop('backup_archive', None)
+        if archive is not None:
+            archive.close()
+
+
+def _has_blob(data: Dict, field: str) -> bool:
+    """True, wenn ein Datensatz Dateiinhalt enthält (Base64 im alten Format, Blob-Verweis im Archiv)."""
+    return bool(data.get(f'{field}_base64') or data.get(f'{field}_blob'))
+
+
+def _row_blob(data: Dict, field: str) -> Optional[bytes]:
+    """Liefert den Dateiinhalt eines Datensatzes (`<field>_base64` bzw. `<field>_blob`)."""
+    encoded = data.get(f'{field}_base64')
+    if encoded:
+        return base64.b64decode(encoded)
+    digest = data.get(f'{field}_blob')
+    archive = g.get('backup_archive')
+    if not digest or archive is None:
+        return None
+    return archive.read_blob(digest)
+
+
+def _store_row_blob(data: Dict, field: str, subdir: str, filename: str) -> Optional[Tuple[str, int]]:
+    """
+    Schreibt den Dateiinhalt eines Datensatzes direkt in den Speicher.
+    
+    Blobs aus dem Archiv werden blockweise und mit Prüfung des Inhalts-Hashes in das
+    Speicher-Backend kopiert, ohne vollständig im Arbeitsspeicher zu liegen.
+    
+    Returns:
+        (Speicherschlüssel, Größe) oder None, wenn der Datensatz keinen Inhalt hat
+    """
+    encoded = data.get(f'{field}_base64')
+    if encoded:
+        source = base64.b64decode(encoded)
+    else:
+        digest = data.get(f'{field}_blob')
+        archive = g.get('backup_archive')
+        if not digest or archive is None:
+            return None
+        source = archive.open_blob(digest, verify=True)
+    key = unique_key(subdir, filename)
+    try:
+        size = get_storage().save(key, source)
+    finally:
+        if hasattr(source, 'close'):
+            source.close()
+    return key, size
+
+
+def _timestamped_name(name: str) -> str:
+    """Dateiname mit Zeitstempel-Präfix wie bei regulären Uploads."""
+    from werkzeug.utils import secure_filename
+    return f"{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}_{secure_filename(name)}"
+
+
+def _parse_datetime(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+
+def _import_batch_size() -> int:
+    return max(1, int(current_app.config.get('BACKUP_IMPORT_BATCH_SIZE', IMPORT_BATCH_SIZE)))
+
+
+def _chunks(rows: Iterable[Dict]) -> Iterator[List[Dict]]:
+    """Teilt einen (gestreamten) Datensatz-Strom in Blöcke zu BACKUP_IMPORT_BATCH_SIZE."""
+    size = _import_batch_size()
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _bulk_insert(model, rows: List[Dict]):
+    """Schreibt neue Zeilen per bulk_insert_mappings und verbucht ihren Speicherverbrauch."""
+    if not rows:
+        return
+    db.session.bulk_insert_mappings(model, rows)
+    track_bulk_insert(model, rows)
+    if model is Product:
+        bump_product_version()
+    elif model is BorrowTransaction:
+        track_bulk_transactions(rows)
+
+
+def _user_id(user_map: Dict[str, int], email: Optional[str], current_user_id: Optional[int]) -> Optional[int]:
+    """Neue Benutzer-ID zu einer E-Mail; Fallback auf current_user, wenn sie fehlt oder unbekannt ist."""
+    if email and email in user_map:
+        return user_map[email]
+    return current_user_id
+
+
+class _ProgressTable:
+    """Tabelle eines Backups, die beim Iterieren den Fortschritt meldet."""
+
+    def __init__(self, name: str, rows, report: Callable[[str, int, int], None]):
+        self.name = name
+        self.rows = rows
+        self.report = report
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __iter__(self) -> Iterator[Dict]:
+        total = len(self.rows)
+        interval = _import_batch_size()
+        done = 0
+        for row in self.rows:
+            yield row
+            done += 1
+            if done % interval == 0:
+                self.report(self.name, done, total)
+        if done == 0 or done % interval:
+            self.report(self.name, done, total)
+
+
+class _ProgressTables:
+    """Dict-ähnliche Sicht auf die Tabellen eines Backups mit Fortschrittsmeldung."""
+
+    def __init__(self, data, progress: Optional[Callable[[str, int, int], None]] = None):
+        self.data = data
+        self.progress = progress
+
+    def _report(self, name: str, done: int, total: int):
+        if done == total:
+            current_app.logger.info(f"Backup-Import: {name} – {done} Datensätze verarbeitet")
+        if self.progress is not None:
+            self.progress(name, done, total)
+
+    def __contains__(self, name) -> bool:
+        return name in self.data
+
+    def __getitem__(self, name) -> _ProgressTable:
+        return _ProgressTable(name, self.data[name], self._report)
+
+    def get(self, name, default=None):
+        return self[name] if name in self else default
+
+
+def _existing_user_map() -> Dict[str, int]:
+    """E-Mail -> ID aller Benutzer (nur zwei Spalten, keine ORM-Objekte)."""
+    return dict(db.session.query(User.email, User.id).all())
+
+
+def _import_backup_data(backup_data: Dict, categories: List[str], current_user_id: Optional[int] = None,
+                        progress: Optional[Callable[[str, int, int], None]] = None) -> Dict:
+    """Importiert die Tabellen eines geladenen Backups (Archiv oder altes JSON-Format)."""
     try:
         # Stelle sicher, dass keine vorherige Transaktion offen ist
         if hasattr(db.session, "in_transaction") and db.session.in_transaction():
@@ -970,7 +1345,7 @@ def import_backup(file_path: str, categories: List[str], current_user_id: Option
         user_map = {}  # email -> user_id
         
         # Validierung: Prüfe ob benötigte Abhängigkeiten vorhanden sind
-        backup_data_dict = backup_data.get('data', {})
+        backup_data_dict = _ProgressTables(backup_data.get('data', {}), progress)
         
         # Warnung wenn Module importiert werden, die Benutzer benötigen, aber keine Benutzer vorhanden sind
         user_dependent_modules = ['emails', 'appointments', 'credentials', 'files', 'wiki', 'comments', 'inventory']
@@ -978,213 +1353,209 @@ def import_backup(file_path: str, categories: List[str], current_user_id: Option
         
         if needs_users and 'users' not in categories and 'all' not in categories:
             # Prüfe ob Benutzer in der DB existieren
-            existing_users = User.query.all()
-            if not existing_users and not backup_data_dict.get('users'):
+            has_users = db.session.query(User.id).first() is not None
+            if not has_users and not backup_data_dict.get('users'):
                 current_app.logger.warning("Module importiert, die Benutzer benötigen, aber keine Benutzer gefunden. Verwende current_user als Fallback.")
         
         # Benutzer importieren (muss zuerst sein wegen Foreign Keys)
         if 'users' in categories or 'all' in categories:
             if 'users' in backup_data_dict:
-                user_map = import_users(backup_data['data']['users'])
+                user_map = import_users(backup_data_dict['users'])
                 results['imported'].append('users')
             else:
                 # Erstelle user_map aus bestehenden Benutzern in der DB
-                existing_users = User.query.all()
-                for user in existing_users:
-                    user_map[user.email] = user.id
+                user_map = _existing_user_map()
         else:
             # Erstelle user_map aus bestehenden Benutzern in der DB
-            existing_users = User.query.all()
-            for user in existing_users:
-                user_map[user.email] = user.id
+            user_map = _existing_user_map()
         
         # Einstellungen importieren
         if 'settings' in categories or 'all' in categories:
-            if 'settings' in backup_data.get('data', {}):
-                import_settings(backup_data['data']['settings'])
+            if 'settings' in backup_data_dict:
+                import_settings(backup_data_dict['settings'])
                 results['imported'].append('settings')
-            if 'whitelist' in backup_data.get('data', {}):
-                import_whitelist(backup_data['data']['whitelist'])
+            if 'whitelist' in backup_data_dict:
+                import_whitelist(backup_data_dict['whitelist'])
                 results['imported'].append('whitelist')
         
         # Notification Settings importieren (benötigt user_map)
         if 'users' in categories or 'all' in categories:
-            if 'notification_settings' in backup_data.get('data', {}):
-                import_notification_settings(backup_data['data']['notification_settings'], user_map, current_user_id)
+            if 'notification_settings' in backup_data_dict:
+                import_notification_settings(backup_data_dict['notification_settings'], user_map, current_user_id)
                 results['imported'].append('notification_settings')
         
         # E-Mails importieren
         if 'emails' in categories or 'all' in categories:
-            if 'emails' in backup_data.get('data', {}):
-                email_map = import_emails(backup_data['data']['emails'], user_map, current_user_id)
+            if 'emails' in backup_data_dict:
+                email_map = import_emails(backup_data_dict['emails'], user_map, current_user_id)
                 results['imported'].append('emails')
             else:
                 email_map = {}
             
-            if 'email_permissions' in backup_data.get('data', {}):
-                import_email_permissions(backup_data['data']['email_permissions'], user_map, current_user_id)
+            if 'email_permissions' in backup_data_dict:
+                import_email_permissions(backup_data_dict['email_permissions'], user_map, current_user_id)
                 results['imported'].append('email_permissions')
             
-            if 'email_attachments' in backup_data.get('data', {}):
-                import_email_attachments(backup_data['data']['email_attachments'], email_map)
+            if 'email_attachments' in backup_data_dict:
+                import_email_attachments(backup_data_dict['email_attachments'], email_map)
                 results['imported'].append('email_attachments')
         
         # Termine importieren
         if 'appointments' in categories or 'all' in categories:
-            if 'calendar_events' in backup_data.get('data', {}):
-                event_map = import_calendar_events(backup_data['data']['calendar_events'], user_map, current_user_id)
+            if 'calendar_events' in backup_data_dict:
+                event_map = import_calendar_events(backup_data_dict['calendar_events'], user_map, current_user_id)
                 results['imported'].append('calendar_events')
             else:
                 event_map = {}
             
-            if 'event_participants' in backup_data.get('data', {}):
-                import_event_participants(backup_data['data']['event_participants'], event_map, user_map, current_user_id)
+            if 'event_participants' in backup_data_dict:
+                import_event_participants(backup_data_dict['event_participants'], event_map, user_map, current_user_id)
                 results['imported'].append('event_participants')
         
         # Zugangsdaten importieren
         if 'credentials' in categories or 'all' in categories:
-            if 'credentials' in backup_data.get('data', {}):
-                import_credentials(backup_data['data']['credentials'], user_map, current_user_id)
+            if 'credentials' in backup_data_dict:
+                import_credentials(backup_data_dict['credentials'], user_map, current_user_id)
                 results['imported'].append('credentials')
         
         # Handbücher importieren
         if 'manuals' in categories or 'all' in categories:
-            if 'manuals' in backup_data.get('data', {}):
-                import_manuals(backup_data['data']['manuals'], user_map, current_user_id)
+            if 'manuals' in backup_data_dict:
+                import_manuals(backup_data_dict['manuals'], user_map, current_user_id)
                 results['imported'].append('manuals')
         
         # Chats importieren
         if 'chats' in categories or 'all' in categories:
-            if 'chats' in backup_data.get('data', {}):
-                chat_map = import_chats(backup_data['data']['chats'], user_map, current_user_id)
+            if 'chats' in backup_data_dict:
+                chat_map = import_chats(backup_data_dict['chats'], user_map, current_user_id)
                 results['imported'].append('chats')
             else:
                 chat_map = {}
             
-            if 'chat_members' in backup_data.get('data', {}):
-                import_chat_members(backup_data['data']['chat_members'], chat_map, user_map, current_user_id)
+            if 'chat_members' in backup_data_dict:
+                import_chat_members(backup_data_dict['chat_members'], chat_map, user_map, current_user_id)
                 results['imported'].append('chat_members')
             
-            if 'chat_messages' in backup_data.get('data', {}):
-                import_chat_messages(backup_data['data']['chat_messages'], chat_map, user_map, current_user_id)
+            if 'chat_messages' in backup_data_dict:
+                import_chat_messages(backup_data_dict['chat_messages'], chat_map, user_map, current_user_id)
                 results['imported'].append('chat_messages')
         
         # Canvas importieren
         if 'canvas' in categories or 'all' in categories:
-            if 'canvases' in backup_data.get('data', {}):
-                canvas_map = import_canvases(backup_data['data']['canvases'], user_map, current_user_id)
+            if 'canvases' in backup_data_dict:
+                canvas_map = import_canvases(backup_data_dict['canvases'], user_map, current_user_id)
                 results['imported'].append('canvases')
             else:
                 canvas_map = {}
             
-            if 'canvas_text_fields' in backup_data.get('data', {}):
-                import_canvas_text_fields(backup_data['data']['canvas_text_fields'], canvas_map, user_map, current_user_id)
+            if 'canvas_text_fields' in backup_data_dict:
+                import_canvas_text_fields(backup_data_dict['canvas_text_fields'], canvas_map, user_map, current_user_id)
                 results['imported'].append('canvas_text_fields')
             
-            if 'canvas_elements' in backup_data.get('data', {}):
-                import_canvas_elements(backup_data['data']['canvas_elements'], canvas_map, user_map, current_user_id)
+            if 'canvas_elements' in backup_data_dict:
+                import_canvas_elements(backup_data_dict['canvas_elements'], canvas_map, user_map, current_user_id)
                 results['imported'].append('canvas_elements')
         
         # Dateien importieren
         if 'files' in categories or 'all' in categories:
-            if 'folders' in backup_data.get('data', {}):
-                folder_map = import_folders(backup_data['data']['folders'], user_map, current_user_id)
+            if 'folders' in backup_data_dict:
+                folder_map = import_folders(backup_data_dict['folders'], user_map, current_user_id)
                 results['imported'].append('folders')
             else:
                 folder_map = {}
             
-            if 'files' in backup_data.get('data', {}):
-                import_files(backup_data['data']['files'], folder_map, user_map, current_user_id)
+            if 'files' in backup_data_dict:
+                import_files(backup_data_dict['files'], folder_map, user_map, current_user_id)
                 results['imported'].append('files')
             
-            if 'file_versions' in backup_data.get('data', {}):
-                import_file_versions(backup_data['data']['file_versions'], user_map, current_user_id)
+            if 'file_versions' in backup_data_dict:
+                import_file_versions(backup_data_dict['file_versions'], user_map, current_user_id)
                 results['imported'].append('file_versions')
         
         # Wiki importieren
         if 'wiki' in categories or 'all' in categories:
-            if 'wiki_categories' in backup_data.get('data', {}):
-                category_map = import_wiki_categories(backup_data['data']['wiki_categories'])
+            if 'wiki_categories' in backup_data_dict:
+                category_map = import_wiki_categories(backup_data_dict['wiki_categories'])
                 results['imported'].append('wiki_categories')
             else:
                 category_map = {}
             
-            if 'wiki_tags' in backup_data.get('data', {}):
-                tag_map = import_wiki_tags(backup_data['data']['wiki_tags'])
+            if 'wiki_tags' in backup_data_dict:
+                tag_map = import_wiki_tags(backup_data_dict['wiki_tags'])
                 results['imported'].append('wiki_tags')
             else:
                 tag_map = {}
             
-            if 'wiki_pages' in backup_data.get('data', {}):
-                page_map = import_wiki_pages(backup_data['data']['wiki_pages'], category_map, tag_map, user_map, current_user_id)
+            if 'wiki_pages' in backup_data_dict:
+                page_map = import_wiki_pages(backup_data_dict['wiki_pages'], category_map, tag_map, user_map, current_user_id)
                 results['imported'].append('wiki_pages')
             else:
                 page_map = {}
             
-            if 'wiki_page_versions' in backup_data.get('data', {}):
-                import_wiki_page_versions(backup_data['data']['wiki_page_versions'], page_map, user_map, current_user_id)
+            if 'wiki_page_versions' in backup_data_dict:
+                import_wiki_page_versions(backup_data_dict['wiki_page_versions'], page_map, user_map, current_user_id)
                 results['imported'].append('wiki_page_versions')
         
         # Kommentare importieren
         if 'comments' in categories or 'all' in categories:
-            if 'comments' in backup_data.get('data', {}):
-                comment_map = import_comments(backup_data['data']['comments'], user_map, current_user_id)
+            if 'comments' in backup_data_dict:
+                comment_map = import_comments(backup_data_dict['comments'], user_map, current_user_id)
                 results['imported'].append('comments')
             else:
                 comment_map = {}
             
-            if 'comment_mentions' in backup_data.get('data', {}):
-                import_comment_mentions(backup_data['data']['comment_mentions'], comment_map, user_map, current_user_id)
+            if 'comment_mentions' in backup_data_dict:
+                import_comment_mentions(backup_data_dict['comment_mentions'], comment_map, user_map, current_user_id)
                 results['imported'].append('comment_mentions')
         
         # Inventar importieren
         if 'inventory' in categories or 'all' in categories:
-            if 'product_folders' in backup_data.get('data', {}):
-                folder_map = import_product_folders(backup_data['data']['product_folders'], user_map, current_user_id)
+            if 'product_folders' in backup_data_dict:
+                folder_map = import_product_folders(backup_data_dict['product_folders'], user_map, current_user_id)
                 results['imported'].append('product_folders')
             else:
                 folder_map = {}
             
-            if 'products' in backup_data.get('data', {}):
-                product_map = import_products(backup_data['data']['products'], folder_map, user_map, current_user_id)
+            if 'products' in backup_data_dict:
+                product_map = import_products(backup_data_dict['products'], folder_map, user_map, current_user_id)
                 results['imported'].append('products')
             else:
                 product_map = {}
             
-            if 'borrow_transactions' in backup_data.get('data', {}):
-                import_borrow_transactions(backup_data['data']['borrow_transactions'], product_map, user_map, current_user_id)
+            if 'borrow_transactions' in backup_data_dict:
+                import_borrow_transactions(backup_data_dict['borrow_transactions'], product_map, user_map, current_user_id)
                 results['imported'].append('borrow_transactions')
             
-            if 'product_sets' in backup_data.get('data', {}):
-                set_map = import_product_sets(backup_data['data']['product_sets'], user_map, current_user_id)
+            if 'product_sets' in backup_data_dict:
+                set_map = import_product_sets(backup_data_dict['product_sets'], user_map, current_user_id)
                 results['imported'].append('product_sets')
             else:
                 set_map = {}
             
-            if 'product_set_items' in backup_data.get('data', {}):
-                import_product_set_items(backup_data['data']['product_set_items'], set_map, product_map)
+            if 'product_set_items' in backup_data_dict:
+                import_product_set_items(backup_data_dict['product_set_items'], set_map, product_map)
                 results['imported'].append('product_set_items')
             
-            if 'product_documents' in backup_data.get('data', {}):
-                import_product_documents(backup_data['data']['product_documents'], product_map, user_map, current_user_id)
+            if 'product_documents' in backup_data_dict:
+                import_product_documents(backup_data_dict['product_documents'], product_map, user_map, current_user_id)
                 results['imported'].append('product_documents')
             
-            if 'saved_filters' in backup_data.get('data', {}):
-                import_saved_filters(backup_data['data']['saved_filters'], user_map, current_user_id)
+            if 'saved_filters' in backup_data_dict:
+                import_saved_filters(backup_data_dict['saved_filters'], user_map, current_user_id)
                 results['imported'].append('saved_filters')
             
-            if 'product_favorites' in backup_data.get('data', {}):
-                import_product_favorites(backup_data['data']['product_favorites'], product_map, user_map, current_user_id)
+            if 'product_favorites' in backup_data_dict:
+                import_product_favorites(backup_data_dict['product_favorites'], product_map, user_map, current_user_id)
                 results['imported'].append('product_favorites')
             
-            if 'inventories' in backup_data.get('data', {}):
-                inventory_map = import_inventories(backup_data['data']['inventories'], user_map, current_user_id)
+            if 'inventories' in backup_data_dict:
+                inventory_map = import_inventories(backup_data_dict['inventories'], user_map, current_user_id)
                 results['imported'].append('inventories')
             else:
                 inventory_map = {}
             
-            if 'inventory_items' in backup_data.get('data', {}):
-                import_inventory_items(backup_data['data']['inventory_items'], inventory_map, product_map, user_map, current_user_id)
+            if 'inventory_items' in backup_data_dict:
+                import_inventory_items(backup_data_dict['inventory_items'], inventory_map, product_map, user_map, current_user_id)
                 results['imported'].append('inventory_items')
         
         db.session.commit()
@@ -1200,13 +1571,12 @@ def import_settings(settings_data: List[Dict]):
     """Importiert System-Einstellungen."""
     for s_data in settings_data:
         # Spezielle Behandlung für portal_logo: Datei wiederherstellen
-        if s_data['key'] == 'portal_logo' and s_data.get('file_content_base64'):
+        if s_data['key'] == 'portal_logo' and _has_blob(s_data, 'file_content'):
             try:
-                import base64
                 from werkzeug.utils import secure_filename
                 
-                # Dekodiere Base64-Daten
-                file_content = base64.b64decode(s_data['file_content_base64'])
+                # Dateiinhalt aus dem Backup lesen
+                file_content = _row_blob(s_data, 'file_content')
                 
                 # Erstelle Dateiname mit Timestamp
                 original_name = s_data.get('file_original_name', s_data.get('value', 'logo.png'))
@@ -1228,13 +1598,7 @@ def import_settings(settings_data: List[Dict]):
                 filename = f"portal_logo_{timestamp}_{secure_filename(base_name)}{ext}"
                 
                 # Speichere Datei im system-Verzeichnis
-                project_root = os.path.dirname(current_app.root_path)
-                upload_dir = os.path.join(project_root, current_app.config.get('UPLOAD_FOLDER', 'uploads'), 'system')
-                os.makedirs(upload_dir, exist_ok=True)
-                file_path = os.path.join(upload_dir, filename)
-                
-                with open(file_path, 'wb') as f:
-                    f.write(file_content)
+                filename = save_upload(file_content, 'system', filename).rsplit('/', 1)[-1]
                 
                 # Aktualisiere Setting mit neuem Dateinamen
                 existing = SystemSettings.query.filter_by(key='portal_logo').first()
@@ -1243,9 +1607,7 @@ def import_settings(settings_data: List[Dict]):
                     old_logo = existing.value
                     if old_logo and old_logo != filename:
                         try:
-                            old_path = os.path.join(upload_dir, old_logo)
-                            if os.path.exists(old_path):
-                                os.remove(old_path)
+                            delete_stored_file(old_logo, 'system')
                         except Exception as e:
                             current_app.logger.warning(f"Konnte altes Logo nicht löschen: {str(e)}")
                     existing.value = filename
@@ -1313,140 +1675,96 @@ def import_users(users_data: List[Dict]) -> Dict[str, int]:
     """
     user_map = {}  # email -> neue_id
     
-    for u_data in users_data:
-        existing = User.query.filter_by(email=u_data['email']).first()
-        if existing:
-            # Aktualisiere bestehenden Benutzer
-            existing.first_name = u_data['first_name']
-            existing.last_name = u_data['last_name']
-            existing.phone = u_data.get('phone')
-            existing.is_active = u_data.get('is_active', False)
-            existing.is_admin = u_data.get('is_admin', False)
-            existing.is_email_confirmed = u_data.get('is_email_confirmed', False)
-            
-            # Importiere Profilbild wenn vorhanden
-            if u_data.get('profile_picture_content_base64'):
-                try:
-                    import base64
-                    from werkzeug.utils import secure_filename
-                    
-                    file_content = base64.b64decode(u_data['profile_picture_content_base64'])
-                    original_name = u_data.get('profile_picture_original_name', u_data.get('profile_picture', 'profile.png'))
-                    
-                    # Erstelle Dateiname mit Timestamp
-                    if '.' in original_name:
-                        ext = os.path.splitext(original_name)[1]
-                        base_name = os.path.splitext(original_name)[0]
-                        # Entferne mögliche Timestamp-Präfixe
-                        if '_' in base_name:
-                            parts = base_name.split('_')
-                            if len(parts) >= 2:
-                                base_name = '_'.join(parts[1:])
-                    else:
-                        ext = '.png'
-                        base_name = 'profile'
-                    
-                    timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
-                    filename = f"{existing.id}_{timestamp}_{secure_filename(base_name)}{ext}"
-                    
-                    # Speichere Datei
-                    project_root = os.path.dirname(current_app.root_path)
-                    upload_dir = os.path.join(project_root, current_app.config.get('UPLOAD_FOLDER', 'uploads'), 'profile_pics')
-                    os.makedirs(upload_dir, exist_ok=True)
-                    file_path = os.path.join(upload_dir, filename)
-                    
-                    with open(file_path, 'wb') as f:
-                        f.write(file_content)
-                    
-                    existing.profile_picture = filename
-                except Exception as e:
-                    current_app.logger.error(f"Fehler beim Importieren des Profilbilds für {u_data['email']}: {str(e)}")
-                    existing.profile_picture = u_data.get('profile_picture')
-            else:
-                existing.profile_picture = u_data.get('profile_picture')
-            
-            existing.accent_color = u_data.get('accent_color', '#0d6efd')
-            existing.accent_gradient = u_data.get('accent_gradient')
-            existing.dark_mode = u_data.get('dark_mode', False)
-            existing.notifications_enabled = u_data.get('notifications_enabled', True)
-            existing.chat_notifications = u_data.get('chat_notifications', True)
-            existing.email_notifications = u_data.get('email_notifications', True)
-            existing.can_borrow = u_data.get('can_borrow', True)
-            # Passwort-Hash aktualisieren falls vorhanden
-            if u_data.get('password_hash'):
-                existing.password_hash = u_data['password_hash']
-            user_map[u_data['email']] = existing.id
-        else:
-            # Neuer Benutzer (mit Passwort-Hash aus Backup)
-            user = User(
-                email=u_data['email'],
-                password_hash=u_data.get('password_hash'),  # Passwort-Hash wird importiert
-                first_name=u_data['first_name'],
-                last_name=u_data['last_name'],
-                phone=u_data.get('phone'),
-                is_active=u_data.get('is_active', False),
-                is_admin=u_data.get('is_admin', False),
-                is_email_confirmed=u_data.get('is_email_confirmed', False),
-                accent_color=u_data.get('accent_color', '#0d6efd'),
-                accent_gradient=u_data.get('accent_gradient'),
-                dark_mode=u_data.get('dark_mode', False),
-                notifications_enabled=u_data.get('notifications_enabled', True),
-                chat_notifications=u_data.get('chat_notifications', True),
-                email_notifications=u_data.get('email_notifications', True),
-                can_borrow=u_data.get('can_borrow', True)
-            )
-            # Falls kein Passwort-Hash vorhanden, temporäres Passwort setzen
-            if not user.password_hash:
-                user.set_password('TEMPORARY_PASSWORD_RESET_REQUIRED')
-            db.session.add(user)
-            db.session.flush()  # Um die ID zu bekommen
-            
-            # Importiere Profilbild wenn vorhanden
-            if u_data.get('profile_picture_content_base64'):
-                try:
-                    import base64
-                    from werkzeug.utils import secure_filename
-                    
-                    file_content = base64.b64decode(u_data['profile_picture_content_base64'])
-                    original_name = u_data.get('profile_picture_original_name', u_data.get('profile_picture', 'profile.png'))
-                    
-                    # Erstelle Dateiname mit Timestamp
-                    if '.' in original_name:
-                        ext = os.path.splitext(original_name)[1]
-                        base_name = os.path.splitext(original_name)[0]
-                        # Entferne mögliche Timestamp-Präfixe
-                        if '_' in base_name:
-                            parts = base_name.split('_')
-                            if len(parts) >= 2:
-                                base_name = '_'.join(parts[1:])
-                    else:
-                        ext = '.png'
-                        base_name = 'profile'
-                    
-                    timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
-                    filename = f"{user.id}_{timestamp}_{secure_filename(base_name)}{ext}"
-                    
-                    # Speichere Datei
-                    project_root = os.path.dirname(current_app.root_path)
-                    upload_dir = os.path.join(project_root, current_app.config.get('UPLOAD_FOLDER', 'uploads'), 'profile_pics')
-                    os.makedirs(upload_dir, exist_ok=True)
-                    file_path = os.path.join(upload_dir, filename)
-                    
-                    with open(file_path, 'wb') as f:
-                        f.write(file_content)
-                    
-                    user.profile_picture = filename
-                except Exception as e:
-                    current_app.logger.error(f"Fehler beim Importieren des Profilbilds für {u_data['email']}: {str(e)}")
-                    user.profile_picture = u_data.get('profile_picture')
+    for batch in _chunks(users_data):
+        emails = [u_data['email'] for u_data in batch]
+        existing_users = {user.email: user for user in User.query.filter(User.email.in_(emails))}
+        
+        for u_data in batch:
+            existing = existing_users.get(u_data['email'])
+            if existing:
+                # Aktualisiere bestehenden Benutzer
+                existing.first_name = u_data['first_name']
+                existing.last_name = u_data['last_name']
+                existing.phone = u_data.get('phone')
+                existing.is_active = u_data.get('is_active', False)
+                existing.is_admin = u_data.get('is_admin', False)
+                existing.is_email_confirmed = u_data.get('is_email_confirmed', False)
+                _import_profile_picture(existing, u_data)
+                existing.accent_color = u_data.get('accent_color', '#0d6efd')
+                existing.accent_gradient = u_data.get('accent_gradient')
+                existing.dark_mode = u_data.get('dark_mode', False)
+                existing.notifications_enabled = u_data.get('notifications_enabled', True)
+                existing.chat_notifications = u_data.get('chat_notifications', True)
+                existing.email_notifications = u_data.get('email_notifications', True)
+                existing.can_borrow = u_data.get('can_borrow', True)
+                # Passwort-Hash aktualisieren falls vorhanden
+                if u_data.get('password_hash'):
+                    existing.password_hash = u_data['password_hash']
+                user_map[u_data['email']] = existing.id
             else:
-                user.profile_picture = u_data.get('profile_picture')
-            
-            user_map[u_data['email']] = user.id
+                # Neuer Benutzer (mit Passwort-Hash aus Backup)
+                user = User(
+                    email=u_data['email'],
+                    password_hash=u_data.get('password_hash'),  # Passwort-Hash wird importiert
+                    first_name=u_data['first_name'],
+                    last_name=u_data['last_name'],
+                    phone=u_data.get('phone'),
+                    is_active=u_data.get('is_active', False),
+                    is_admin=u_data.get('is_admin', False),
+                    is_email_confirmed=u_data.get('is_email_confirmed', False),
+                    accent_color=u_data.get('accent_color', '#0d6efd'),
+                    accent_gradient=u_data.get('accent_gradient'),
+                    dark_mode=u_data.get('dark_mode', False),
+                    notifications_enabled=u_data.get('notifications_enabled', True),
+                    chat_notifications=u_data.get('chat_notifications', True),
+                    email_notifications=u_data.get('email_notifications', True),
+                    can_borrow=u_data.get('can_borrow', True)
+                )
+                # Falls kein Passwort-Hash vorhanden, temporäres Passwort setzen
+                if not user.password_hash:
+                    user.set_password('TEMPORARY_PASSWORD_RESET_REQUIRED')
+                db.session.add(user)
+                db.session.flush()  # Um die ID zu bekommen
+                _import_profile_picture(user, u_data)
+                existing_users[user.email] = user
+                user_map[u_data['email']] = user.id
     
     return user_map
 
 
+def _import_profile_picture(user: User, u_data: Dict):
+    """Übernimmt das Profilbild eines Benutzers aus dem Backup (Dateiname mit Benutzer-ID)."""
+    if not _has_blob(u_data, 'profile_picture_content'):
+        user.profile_picture = u_data.get('profile_picture')
+        return
+    try:
+        from werkzeug.utils import secure_filename
+        
+        original_name = u_data.get('profile_picture_original_name', u_data.get('profile_picture', 'profile.png'))
+        
+        # Erstelle Dateiname mit Timestamp
+        if '.' in original_name:
+            ext = os.path.splitext(original_name)[1]
+            base_name = os.path.splitext(original_name)[0]
+            # Entferne mögliche Timestamp-Präfixe
+            if '_' in base_name:
+                parts = base_name.split('_')
+                if len(parts) >= 2:
+                    base_name = '_'.join(parts[1:])
+        else:
+            ext = '.png'
+            base_name = 'profile'
+        
+        timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
+        filename = f"{user.id}_{timestamp}_{secure_filename(base_name)}{ext}"
+        
+        key, _ = _store_row_blob(u_data, 'profile_picture_content', 'profile_pics', filename)
+        user.profile_picture = key.rsplit('/', 1)[-1]
+    except Exception as e:
+        current_app.logger.error(f"Fehler beim Importieren des Profilbilds für {u_data['email']}: {str(e)}")
+        user.profile_picture = u_data.get('profile_picture')
+
+
 def import_notification_settings(settings_data: List[Dict], user_map: Dict[str, int], current_user_id: Optional[int] = None):
     """Importiert Notification-Einstellungen."""
     for s_data in settings_data:
@@ -1494,67 +1812,87 @@ def import_notification_settings(settings_data: List[Dict], user_map: Dict[str,
 
 
 def import_emails(emails_data: List[Dict], user_map: Dict[str, int], current_user_id: Optional[int] = None) -> Dict[str, int]:
-    """Importiert E-Mails und gibt ein Mapping von message_id zu neuer ID zurück."""
+    """Importiert E-Mails und gibt ein Mapping von message_id zu neuer ID zurück.
+    
+    Bestehende E-Mails werden je Block mit einer Abfrage gefunden und aktualisiert,
+    neue per Bulk-Insert angelegt; ihre IDs werden anschließend blockweise gelesen.
+    """
     email_map = {}  # message_id -> neue_id
     
-    for e_data in emails_data:
-        sent_by_user_id = None
-        if e_data.get('sent_by_user_email'):
-            sent_by_user_id = user_map.get(e_data['sent_by_user_email'])
-            # Fallback: Wenn Benutzer nicht gefunden wird, verwende current_user
-            if sent_by_user_id is None and current_user_id:
-                sent_by_user_id = current_user_id
-        
-        existing = None
-        if e_data.get('message_id'):
-            existing = EmailMessage.query.filter_by(message_id=e_data['message_id']).first()
-        
-        if existing:
-            # Aktualisiere bestehende E-Mail
-            existing.subject = e_data['subject']
-            existing.sender = e_data['sender']
-            existing.recipients = e_data['recipients']
-            existing.cc = e_data.get('cc')
-            existing.bcc = e_data.get('bcc')
-            existing.body_text = e_data.get('body_text')
-            existing.body_html = e_data.get('body_html')
-            existing.is_read = e_data.get('is_read', False)
-            existing.is_sent = e_data.get('is_sent', False)
-            existing.has_attachments = e_data.get('has_attachments', False)
-            existing.folder = e_data.get('folder', 'INBOX')
-            existing.sent_by_user_id = sent_by_user_id
-            if e_data.get('received_at'):
-                existing.received_at = datetime.fromisoformat(e_data['received_at'])
-            if e_data.get('sent_at'):
-                existing.sent_at = datetime.fromisoformat(e_data['sent_at'])
-            if e_data.get('message_id'):
-                email_map[e_data['message_id']] = existing.id
-        else:
+    for batch in _chunks(emails_data):
+        message_ids = {e_data['message_id'] for e_data in batch if e_data.get('message_id')}
+        existing_emails = {}
+        if message_ids:
+            existing_emails = {
+                email.message_id: email
+                for email in EmailMessage.query.filter(EmailMessage.message_id.in_(message_ids))
+            }
+        
+        new_rows = []
+        pending = {}  # message_id -> Index in new_rows (doppelte message_ids im Block)
+        for e_data in batch:
+            sent_by_user_id = None
+            if e_data.get('sent_by_user_email'):
+                # Fallback: Wenn Benutzer nicht gefunden wird, verwende current_user
+                sent_by_user_id = _user_id(user_map, e_data['sent_by_user_email'], current_user_id)
+            
+            message_id = e_data.get('message_id')
+            existing = existing_emails.get(message_id) if message_id else None
+            if existing:
+                # Aktualisiere bestehende E-Mail
+                existing.subject = e_data['subject']
+                existing.sender = e_data['sender']
+                existing.recipients = e_data['recipients']
+                existing.cc = e_data.get('cc')
+                existing.bcc = e_data.get('bcc')
+                existing.body_text = e_data.get('body_text')
+                existing.body_html = e_data.get('body_html')
+                existing.is_read = e_data.get('is_read', False)
+                existing.is_sent = e_data.get('is_sent', False)
+                existing.has_attachments = e_data.get('has_attachments', False)
+                existing.folder = e_data.get('folder', 'INBOX')
+                existing.sent_by_user_id = sent_by_user_id
+                if e_data.get('received_at'):
+                    existing.received_at = datetime.fromisoformat(e_data['received_at'])
+                if e_data.get('sent_at'):
+                    existing.sent_at = datetime.fromisoformat(e_data['sent_at'])
+                email_map[message_id] = existing.id
+                continue
+            
             # Neue E-Mail
-            email = EmailMessage(
-                uid=e_data.get('uid'),
-                message_id=e_data.get('message_id'),
-                subject=e_data['subject'],
-                sender=e_data['sender'],
-                recipients=e_data['recipients'],
-                cc=e_data.get('cc'),
-                bcc=e_data.get('bcc'),
-                body_text=e_data.get('body_text'),
-                body_html=e_data.get('body_html'),
-                is_read=e_data.get('is_read', False),
-                is_sent=e_data.get('is_sent', False),
-                has_attachments=e_data.get('has_attachments', False),
-                folder=e_data.get('folder', 'INBOX'),
-                sent_by_user_id=sent_by_user_id
+            row = {
+                'uid': e_data.get('uid'),
+                'message_id': message_id,
+                'subject': e_data['subject'],
+                'sender': e_data['sender'],
+                'recipients': e_data['recipients'],
+                'cc': e_data.get('cc'),
+                'bcc': e_data.get('bcc'),
+                'body_text': e_data.get('body_text'),
+                'body_html': e_data.get('body_html'),
+                'is_read': e_data.get('is_read', False),
+                'is_sent': e_data.get('is_sent', False),
+                'has_attachments': e_data.get('has_attachments', False),
+                'folder': e_data.get('folder', 'INBOX'),
+                'sent_by_user_id': sent_by_user_id,
+                'received_at': _parse_datetime(e_data.get('received_at')),
+                'sent_at': _parse_datetime(e_data.get('sent_at')),
+            }
+            if message_id and message_id in pending:
+                # Spätere Einträge überschreiben frühere (wie beim Aktualisieren)
+                new_rows[pending[message_id]] = row
+                continue
+            if message_id:
+                pending[message_id] = len(new_rows)
+            new_rows.append(row)
+        
+        _bulk_insert(EmailMessage, new_rows)
+        if pending:
+            email_map.update(
+                db.session.query(EmailMessage.message_id, EmailMessage.id)
+                .filter(EmailMessage.message_id.in_(list(pending)))
+                .all()
             )
-            if e_data.get('received_at'):
-                email.received_at = datetime.fromisoformat(e_data['received_at'])
-            if e_data.get('sent_at'):
-                email.sent_at = datetime.fromisoformat(e_data['sent_at'])
-            db.session.add(email)
-            db.session.flush()
-            if email.message_id:
-                email_map[email.message_id] = email.id
     
     return email_map
 
@@ -1588,49 +1926,40 @@ def import_email_permissions(permissions_data: List[Dict], user_map: Dict[str, i
 
 
 def import_email_attachments(attachments_data: List[Dict], email_map: Dict[str, int]):
-    """Importiert E-Mail-Anhänge."""
-    for att_data in attachments_data:
-        message_id = att_data.get('email_message_id')
-        if not message_id or message_id not in email_map:
-            continue
-        
-        email_id = email_map[message_id]
-        
-        attachment = EmailAttachment(
-            email_id=email_id,
-            filename=att_data['filename'],
-            content_type=att_data['content_type'],
-            size=att_data.get('size', 0),
-            is_inline=att_data.get('is_inline', False)
-        )
-        
-        # Dateiinhalt speichern wenn vorhanden
-        if att_data.get('content_base64'):
-            try:
-                import base64
-                content = base64.b64decode(att_data['content_base64'])
-                
-                # Speichere Datei im Upload-Verzeichnis
-                from werkzeug.utils import secure_filename
-                filename = secure_filename(att_data['filename'])
-                timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
-                filename = f"{timestamp}_{filename}"
-                
-                upload_dir = os.path.join(current_app.root_path, '..', current_app.config.get('UPLOAD_FOLDER', 'uploads'), 'email_attachments')
-                os.makedirs(upload_dir, exist_ok=True)
-                file_path = os.path.join(upload_dir, filename)
-                
-                with open(file_path, 'wb') as f:
-                    f.write(content)
-                
-                attachment.file_path = file_path
-                attachment.is_large_file = True
-            except Exception as e:
-                current_app.logger.error(f"Fehler beim Speichern von E-Mail-Anhang {att_data['filename']}: {str(e)}")
-                # Fallback: In Datenbank speichern
-                attachment.content = content
+    """Importiert E-Mail-Anhänge (Inhalte direkt in den Speicher, Zeilen per Bulk-Insert)."""
+    for batch in _chunks(attachments_data):
+        rows = []
+        for att_data in batch:
+            message_id = att_data.get('email_message_id')
+            if not message_id or message_id not in email_map:
+                continue
+            
+            row = {
+                'email_id': email_map[message_id],
+                'filename': att_data['filename'],
+                'content_type': att_data['content_type'],
+                'size': att_data.get('size', 0),
+                'is_inline': att_data.get('is_inline', False),
+                'content': None,
+                'file_path': None,
+                'is_large_file': False,
+            }
+            
+            # Dateiinhalt speichern wenn vorhanden
+            if _has_blob(att_data, 'content'):
+                try:
+                    key, _ = _store_row_blob(att_data, 'content', 'email_attachments',
+                                             _timestamped_name(att_data['filename']))
+                    row['file_path'] = path_for_key(key)
+                    row['is_large_file'] = True
+                except Exception as e:
+                    current_app.logger.error(f"Fehler beim Speichern von E-Mail-Anhang {att_data['filename']}: {str(e)}")
+                    # Fallback: In Datenbank speichern
+                    row['content'] = _row_blob(att_data, 'content')
+            
+            rows.append(row)
         
-        db.session.add(attachment)
+        _bulk_insert(EmailAttachment, rows)
 
 
 def import_calendar_events(events_data: List[Dict], user_map: Dict[str, int], current_user_id: Optional[int] = None) -> Dict[str, int]:
@@ -1751,12 +2080,10 @@ def import_manuals(manuals_data: List[Dict], user_map: Dict[str, int], current_u
             )
             
             # Importiere PDF-Datei wenn vorhanden
-            if m_data.get('file_content_base64'):
+            if _has_blob(m_data, 'file_content'):
                 try:
-                    import base64
                     from werkzeug.utils import secure_filename
                     
-                    file_content = base64.b64decode(m_data['file_content_base64'])
                     original_name = m_data.get('file_original_name', m_data.get('filename', 'manual.pdf'))
                     
                     # Erstelle Dateiname mit Timestamp
@@ -1771,30 +2098,18 @@ def import_manuals(manuals_data: List[Dict], user_map: Dict[str, int], current_u
                     filename = f"{timestamp}_{secure_filename(base_name)}{ext}"
                     
                     # Speichere Datei
-                    project_root = os.path.dirname(current_app.root_path)
-                    upload_dir = os.path.join(project_root, current_app.config.get('UPLOAD_FOLDER', 'uploads'), 'manuals')
-                    os.makedirs(upload_dir, exist_ok=True)
-                    file_path = os.path.join(upload_dir, filename)
-                    
-                    with open(file_path, 'wb') as f:
-                        f.write(file_content)
+                    key, size = _store_row_blob(m_data, 'file_content', 'manuals', filename)
                     
-                    manual.file_path = file_path
-                    manual.filename = filename
-                    manual.file_size = len(file_content)
+                    manual.file_path = path_for_key(key)
+                    manual.filename = key.rsplit('/', 1)[-1]
+                    manual.file_size = size
                 except Exception as e:
                     current_app.logger.error(f"Fehler beim Importieren des Handbuchs {m_data['title']}: {str(e)}")
                     # Erstelle trotzdem Manual-Eintrag ohne Datei
-                    project_root = os.path.dirname(current_app.root_path)
-                    upload_dir = os.path.join(project_root, current_app.config.get('UPLOAD_FOLDER', 'uploads'), 'manuals')
-                    os.makedirs(upload_dir, exist_ok=True)
-                    manual.file_path = os.path.join(upload_dir, m_data.get('filename', 'manual.pdf'))
+                    manual.file_path = path_for_key(f"manuals/{m_data.get('filename', 'manual.pdf')}")
             else:
                 # Keine Datei vorhanden, erstelle trotzdem Eintrag
-                project_root = os.path.dirname(current_app.root_path)
-                upload_dir = os.path.join(project_root, current_app.config.get('UPLOAD_FOLDER', 'uploads'), 'manuals')
-                os.makedirs(upload_dir, exist_ok=True)
-                manual.file_path = os.path.join(upload_dir, m_data.get('filename', 'manual.pdf'))
+                manual.file_path = path_for_key(f"manuals/{m_data.get('filename', 'manual.pdf')}")
             
             if m_data.get('uploaded_at'):
                 manual.uploaded_at = datetime.fromisoformat(m_data['uploaded_at'])
@@ -1832,12 +2147,10 @@ def import_chats(chats_data: List[Dict], user_map: Dict[str, int], current_user_
             )
             
             # Importiere Gruppenbild wenn vorhanden
-            if c_data.get('group_avatar_content_base64'):
+            if _has_blob(c_data, 'group_avatar_content'):
                 try:
-                    import base64
                     from werkzeug.utils import secure_filename
                     
-                    file_content = base64.b64decode(c_data['group_avatar_content_base64'])
                     original_name = c_data.get('group_avatar_original_name', 'avatar.png')
                     
                     # Erstelle Dateiname mit Timestamp
@@ -1852,15 +2165,8 @@ def import_chats(chats_data: List[Dict], user_map: Dict[str, int], current_user_
                     filename = f"{timestamp}_{secure_filename(base_name)}{ext}"
                     
                     # Speichere Datei
-                    project_root = os.path.dirname(current_app.root_path)
-                    upload_dir = os.path.join(project_root, current_app.config.get('UPLOAD_FOLDER', 'uploads'), 'chat_avatars')
-                    os.makedirs(upload_dir, exist_ok=True)
-                    file_path = os.path.join(upload_dir, filename)
-                    
-                    with open(file_path, 'wb') as f:
-                        f.write(file_content)
-                    
-                    chat.group_avatar = filename
+                    key, _ = _store_row_blob(c_data, 'group_avatar_content', 'chat/avatars', filename)
+                    chat.group_avatar = key.rsplit('/', 1)[-1]
                 except Exception as e:
                     current_app.logger.error(f"Fehler beim Importieren des Chat-Avatars für {c_data['name']}: {str(e)}")
             
@@ -1913,77 +2219,50 @@ def import_chat_members(members_data: List[Dict], chat_map: Dict[str, int], user
 
 
 def import_chat_messages(messages_data: List[Dict], chat_map: Dict[str, int], user_map: Dict[str, int], current_user_id: Optional[int] = None):
-    """Importiert Chat-Nachrichten (inkl. Media-Dateien)."""
-    for msg_data in messages_data:
-        chat_name = msg_data.get('chat_name')
-        sender_email = msg_data.get('sender_email')
-        
-        if not chat_name or chat_name not in chat_map:
-            continue
-        if not sender_email:
-            continue
-        
-        chat_id = chat_map[chat_name]
-        
-        # Fallback: Wenn Benutzer nicht gefunden wird, verwende current_user
-        if sender_email not in user_map:
-            if current_user_id:
-                sender_id = current_user_id
-            else:
+    """Importiert Chat-Nachrichten (inkl. Media-Dateien) blockweise per Bulk-Insert."""
+    for batch in _chunks(messages_data):
+        rows = []
+        for msg_data in batch:
+            chat_name = msg_data.get('chat_name')
+            sender_email = msg_data.get('sender_email')
+            
+            if not chat_name or chat_name not in chat_map:
                 continue
-        else:
-            sender_id = user_map[sender_email]
-        
-        message = ChatMessage(
-            chat_id=chat_id,
-            sender_id=sender_id,
-            content=msg_data.get('content'),
-            message_type=msg_data.get('message_type', 'text'),
-            is_deleted=msg_data.get('is_deleted', False)
-        )
-        
-        # Importiere Media-Datei wenn vorhanden
-        if msg_data.get('media_content_base64'):
-            try:
-                import base64
-                from werkzeug.utils import secure_filename
-                
-                file_content = base64.b64decode(msg_data['media_content_base64'])
-                original_name = msg_data.get('media_original_name', 'media')
-                
-                # Erstelle Dateiname mit Timestamp
-                if '.' in original_name:
-                    ext = os.path.splitext(original_name)[1]
-                    base_name = os.path.splitext(original_name)[0]
-                else:
-                    ext = ''
-                    base_name = 'media'
-                
-                timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
-                filename = f"{timestamp}_{secure_filename(base_name)}{ext}"
-                
-                # Speichere Datei
-                project_root = os.path.dirname(current_app.root_path)
-                upload_dir = os.path.join(project_root, current_app.config.get('UPLOAD_FOLDER', 'uploads'), 'chat_media')
-                os.makedirs(upload_dir, exist_ok=True)
-                file_path = os.path.join(upload_dir, filename)
-                
-                with open(file_path, 'wb') as f:
-                    f.write(file_content)
-                
-                message.media_url = filename
-            except Exception as e:
-                current_app.logger.error(f"Fehler beim Importieren der Media-Datei für Nachricht: {str(e)}")
-                message.media_url = msg_data.get('media_url')
-        else:
-            message.media_url = msg_data.get('media_url')
-        
-        if msg_data.get('created_at'):
-            message.created_at = datetime.fromisoformat(msg_data['created_at'])
-        if msg_data.get('edited_at'):
-            message.edited_at = datetime.fromisoformat(msg_data['edited_at'])
+            if not sender_email:
+                continue
+            
+            # Fallback: Wenn Benutzer nicht gefunden wird, verwende current_user
+            sender_id = _user_id(user_map, sender_email, current_user_id)
+            if sender_id is None:
+                continue
+            
+            row = {
+                'chat_id': chat_map[chat_name],
+                'sender_id': sender_id,
+                'content': msg_data.get('content'),
+                'message_type': msg_data.get('message_type', 'text'),
+                'is_deleted': msg_data.get('is_deleted', False),
+                'media_url': msg_data.get('media_url'),
+                'media_size': msg_data.get('media_size'),
+                'created_at': _parse_datetime(msg_data.get('created_at')) or datetime.utcnow(),
+                'edited_at': _parse_datetime(msg_data.get('edited_at')),
+            }
+            
+            # Importiere Media-Datei wenn vorhanden (gleiches Verzeichnis wie Chat-Uploads)
+            if _has_blob(msg_data, 'media_content'):
+                try:
+                    original_name = msg_data.get('media_original_name', 'media')
+                    if '.' not in original_name:
+                        original_name = 'media'
+                    key, size = _store_row_blob(msg_data, 'media_content', 'chat', _timestamped_name(original_name))
+                    row['media_url'] = key.rsplit('/', 1)[-1]
+                    row['media_size'] = size
+                except Exception as e:
+                    current_app.logger.error(f"Fehler beim Importieren der Media-Datei für Nachricht: {str(e)}")
+            
+            rows.append(row)
         
-        db.session.add(message)
+        _bulk_insert(ChatMessage, rows)
 
 
 def import_canvases(canvases_data: List[Dict], user_map: Dict[str, int], current_user_id: Optional[int] = None) -> Dict[str, int]:
@@ -2141,144 +2420,128 @@ def import_folders(folders_data: List[Dict], user_map: Dict[str, int], current_u
 
 
 def import_files(files_data: List[Dict], folder_map: Dict[str, int], user_map: Dict[str, int], current_user_id: Optional[int] = None):
-    """Importiert Dateien."""
-    for f_data in files_data:
-        uploaded_by_email = f_data.get('uploaded_by_email')
-        if not uploaded_by_email:
-            if current_user_id:
-                uploaded_by_id = current_user_id
-            else:
+    """Importiert Dateien (bestehende je Block mit einer Abfrage, neue per Bulk-Insert)."""
+    for batch in _chunks(files_data):
+        names = {f_data.get('name') for f_data in batch}
+        existing_files = {
+            (file.name, file.folder_id, file.uploaded_by): file
+            for file in File.query.filter(File.name.in_(names))
+        }
+        
+        rows = []
+        for f_data in batch:
+            # Fallback: Wenn Benutzer fehlt oder nicht gefunden wird, verwende current_user
+            uploaded_by_id = _user_id(user_map, f_data.get('uploaded_by_email'), current_user_id)
+            if uploaded_by_id is None:
                 continue
-        elif uploaded_by_email not in user_map:
-            # Fallback: Wenn Benutzer nicht gefunden wird, verwende current_user
-            if current_user_id:
-                uploaded_by_id = current_user_id
-            else:
+            folder_id = None
+            if f_data.get('folder_name') and f_data['folder_name'] in folder_map:
+                folder_id = folder_map[f_data['folder_name']]
+            
+            # Prüfe ob Datei bereits existiert (nach Name, Ordner und Uploader)
+            existing = existing_files.get((f_data.get('name'), folder_id, uploaded_by_id))
+            
+            if existing:
+                # Aktualisiere bestehende Datei
+                existing.original_name = f_data.get('original_name', f_data['name'])
+                existing.folder_id = folder_id
+                existing.file_size = f_data.get('file_size', 0)
+                existing.mime_type = f_data.get('mime_type')
+                existing.version_number = f_data.get('version_number', 1)
+                existing.is_current = f_data.get('is_current', True)
+                existing.share_enabled = f_data.get('share_enabled', False)
+                existing.share_name = f_data.get('share_name')
+                if f_data.get('share_expires_at'):
+                    existing.share_expires_at = datetime.fromisoformat(f_data['share_expires_at'])
                 continue
-        else:
-            uploaded_by_id = user_map[uploaded_by_email]
-        folder_id = None
-        if f_data.get('folder_name') and f_data['folder_name'] in folder_map:
-            folder_id = folder_map[f_data['folder_name']]
-        
-        # Prüfe ob Datei bereits existiert (nach Name, Ordner und Uploader)
-        existing = File.query.filter_by(
-            name=f_data.get('name'),
-            folder_id=folder_id,
-            uploaded_by=uploaded_by_id
-        ).first()
-        
-        if existing:
-            # Aktualisiere bestehende Datei
-            existing.original_name = f_data.get('original_name', f_data['name'])
-            existing.folder_id = folder_id
-            existing.file_size = f_data.get('file_size', 0)
-            existing.mime_type = f_data.get('mime_type')
-            existing.version_number = f_data.get('version_number', 1)
-            existing.is_current = f_data.get('is_current', True)
-            existing.share_enabled = f_data.get('share_enabled', False)
-            existing.share_name = f_data.get('share_name')
-            if f_data.get('share_expires_at'):
-                existing.share_expires_at = datetime.fromisoformat(f_data['share_expires_at'])
-        else:
+            
             # Neue Datei
-            file = File(
-                name=f_data['name'],
-                original_name=f_data.get('original_name', f_data['name']),
-                folder_id=folder_id,
-                uploaded_by=uploaded_by_id,
-                file_size=f_data.get('file_size', 0),
-                mime_type=f_data.get('mime_type'),
-                version_number=f_data.get('version_number', 1),
-                is_current=f_data.get('is_current', True),
-                share_enabled=f_data.get('share_enabled', False),
-                share_name=f_data.get('share_name')
-            )
-            if f_data.get('share_expires_at'):
-                file.share_expires_at = datetime.fromisoformat(f_data['share_expires_at'])
+            row = {
+                'name': f_data['name'],
+                'original_name': f_data.get('original_name', f_data['name']),
+                'folder_id': folder_id,
+                'uploaded_by': uploaded_by_id,
+                'file_size': f_data.get('file_size', 0),
+                'mime_type': f_data.get('mime_type'),
+                'version_number': f_data.get('version_number', 1),
+                'is_current': f_data.get('is_current', True),
+                'share_enabled': f_data.get('share_enabled', False),
+                'share_name': f_data.get('share_name'),
+                'share_expires_at': _parse_datetime(f_data.get('share_expires_at')),
+                'file_path': None,
+            }
             
             # Dateiinhalt speichern wenn vorhanden
-            if f_data.get('content_base64'):
+            if _has_blob(f_data, 'content'):
                 try:
-                    import base64
-                    content = base64.b64decode(f_data['content_base64'])
-                    # Speichere Datei im Upload-Verzeichnis
-                    from werkzeug.utils import secure_filename
-                    filename = secure_filename(file.name)
-                    timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
-                    filename = f"{timestamp}_{filename}"
-                    
-                    upload_dir = os.path.join(current_app.root_path, '..', current_app.config.get('UPLOAD_FOLDER', 'uploads'), 'files')
-                    os.makedirs(upload_dir, exist_ok=True)
-                    file_path = os.path.join(upload_dir, filename)
-                    
-                    with open(file_path, 'wb') as f:
-                        f.write(content)
-                    
-                    file.file_path = file_path
+                    key, _ = _store_row_blob(f_data, 'content', 'files', _timestamped_name(f_data['name']))
+                    row['file_path'] = path_for_key(key)
                 except Exception as e:
-                    current_app.logger.error(f"Fehler beim Speichern von Datei {file.name}: {str(e)}")
+                    current_app.logger.error(f"Fehler beim Speichern von Datei {f_data['name']}: {str(e)}")
             
-            db.session.add(file)
+            rows.append(row)
+        
+        _bulk_insert(File, rows)
 
 
 def import_file_versions(versions_data: List[Dict], user_map: Dict[str, int], current_user_id: Optional[int] = None):
-    """Importiert Datei-Versionen."""
-    for v_data in versions_data:
-        uploaded_by_email = v_data.get('uploaded_by_email')
-        if not uploaded_by_email:
-            if current_user_id:
-                uploaded_by_id = current_user_id
-            else:
+    """Importiert Datei-Versionen (Datei- und Versions-Lookups je Block)."""
+    file_ids = {}  # Dateiname -> ID
+    
+    for batch in _chunks(versions_data):
+        missing = {v_data.get('file_name') for v_data in batch} - set(file_ids) - {None}
+        if missing:
+            # Wie bisher zählt die erste Datei mit diesem Namen
+            for name, file_id in (db.session.query(File.name, File.id)
+                                  .filter(File.name.in_(missing)).order_by(File.id)):
+                file_ids.setdefault(name, file_id)
+        
+        batch_file_ids = {file_ids[v['file_name']] for v in batch if v.get('file_name') in file_ids}
+        existing_versions = set()
+        if batch_file_ids:
+            existing_versions = set(
+                db.session.query(FileVersion.file_id, FileVersion.version_number)
+                .filter(FileVersion.file_id.in_(batch_file_ids))
+            )
+        
+        rows = []
+        for v_data in batch:
+            # Fallback: Wenn Benutzer fehlt oder nicht gefunden wird, verwende current_user
+            uploaded_by_id = _user_id(user_map, v_data.get('uploaded_by_email'), current_user_id)
+            if uploaded_by_id is None:
                 continue
-        elif uploaded_by_email not in user_map:
-            # Fallback: Wenn Benutzer nicht gefunden wird, verwende current_user
-            if current_user_id:
-                uploaded_by_id = current_user_id
-            else:
+            
+            # Finde Datei nach Name
+            file_id = file_ids.get(v_data.get('file_name'))
+            if not file_id:
                 continue
-        else:
-            uploaded_by_id = user_map[uploaded_by_email]
-        
-        # Finde Datei nach Name
-        file = File.query.filter_by(name=v_data.get('file_name')).first()
-        if not file:
-            continue
-        
-        # Prüfe ob Version bereits existiert
-        existing = FileVersion.query.filter_by(file_id=file.id, version_number=v_data['version_number']).first()
-        if existing:
-            continue
-        
-        version = FileVersion(
-            file_id=file.id,
-            version_number=v_data['version_number'],
-            file_size=v_data.get('file_size', 0),
-            uploaded_by=uploaded_by_id
-        )
-        
-        # Dateiinhalt speichern wenn vorhanden
-        if v_data.get('content_base64'):
-            try:
-                import base64
-                content = base64.b64decode(v_data['content_base64'])
-                from werkzeug.utils import secure_filename
-                filename = secure_filename(f"{file.name}_v{v_data['version_number']}")
-                timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
-                filename = f"{timestamp}_{filename}"
-                
-                upload_dir = os.path.join(current_app.root_path, '..', current_app.config.get('UPLOAD_FOLDER', 'uploads'), 'files')
-                os.makedirs(upload_dir, exist_ok=True)
-                file_path = os.path.join(upload_dir, filename)
-                
-                with open(file_path, 'wb') as f:
-                    f.write(content)
-                
-                version.file_path = file_path
-            except Exception as e:
-                current_app.logger.error(f"Fehler beim Speichern von Dateiversion: {str(e)}")
+            
+            # Prüfe ob Version bereits existiert
+            version_key = (file_id, v_data['version_number'])
+            if version_key in existing_versions:
+                continue
+            existing_versions.add(version_key)
+            
+            row = {
+                'file_id': file_id,
+                'version_number': v_data['version_number'],
+                'file_size': v_data.get('file_size', 0),
+                'uploaded_by': uploaded_by_id,
+                'file_path': None,
+            }
+            
+            # Dateiinhalt speichern wenn vorhanden
+            if _has_blob(v_data, 'content'):
+                try:
+                    filename = _timestamped_name(f"{v_data['file_name']}_v{v_data['version_number']}")
+                    key, _ = _store_row_blob(v_data, 'content', 'files', filename)
+                    row['file_path'] = path_for_key(key)
+                except Exception as e:
+                    current_app.logger.error(f"Fehler beim Speichern von Dateiversion: {str(e)}")
+            
+            rows.append(row)
         
-        db.session.add(version)
+        _bulk_insert(FileVersion, rows)
 
 
 def import_wiki_categories(categories_data: List[Dict]) -> Dict[str, int]:
@@ -2365,24 +2628,19 @@ def import_wiki_pages(pages_data: List[Dict], category_map: Dict[str, int], tag_
             # Erstelle Datei
             timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
             filename = f"{timestamp}_{p_data['slug']}.md"
-            upload_dir = os.path.join('uploads', 'wiki')
-            os.makedirs(upload_dir, exist_ok=True)
-            filepath = os.path.join(upload_dir, filename)
-            absolute_filepath = os.path.abspath(filepath)
             
             # Speichere Markdown-Datei
             try:
-                with open(absolute_filepath, 'w', encoding='utf-8') as f:
-                    f.write(content)
+                stored_path = path_for_key(save_upload(content.encode('utf-8'), 'wiki', filename))
             except Exception as e:
-                current_app.logger.error(f"Fehler beim Speichern von Wiki-Datei {absolute_filepath}: {str(e)}")
-                absolute_filepath = None
+                current_app.logger.error(f"Fehler beim Speichern von Wiki-Datei {filename}: {str(e)}")
+                stored_path = None
             
             page = WikiPage(
                 title=p_data['title'],
                 slug=p_data['slug'],
                 content=content,
-                file_path=absolute_filepath or '',
+                file_path=stored_path or '',
                 category_id=category_id,
                 created_by=created_by_id,
                 version_number=p_data.get('version_number', 1)
@@ -2410,65 +2668,55 @@ def import_wiki_pages(pages_data: List[Dict], category_map: Dict[str, int], tag_
 
 
 def import_wiki_page_versions(versions_data: List[Dict], page_map: Dict[str, int], user_map: Dict[str, int], current_user_id: Optional[int] = None):
-    """Importiert Wiki-Seiten-Versionen."""
-    for v_data in versions_data:
-        page_slug = v_data.get('page_slug')
-        if not page_slug or page_slug not in page_map:
-            continue
+    """Importiert Wiki-Seiten-Versionen blockweise per Bulk-Insert."""
+    for batch in _chunks(versions_data):
+        page_ids = {page_map[v['page_slug']] for v in batch if v.get('page_slug') in page_map}
+        existing_versions = set()
+        if page_ids:
+            existing_versions = set(
+                db.session.query(WikiPageVersion.wiki_page_id, WikiPageVersion.version_number)
+                .filter(WikiPageVersion.wiki_page_id.in_(page_ids))
+            )
         
-        created_by_email = v_data.get('created_by_email')
-        if not created_by_email:
-            if current_user_id:
-                created_by_id = current_user_id
-            else:
+        rows = []
+        for v_data in batch:
+            page_slug = v_data.get('page_slug')
+            if not page_slug or page_slug not in page_map:
                 continue
-        elif created_by_email not in user_map:
-            # Fallback: Wenn Benutzer nicht gefunden wird, verwende current_user
-            if current_user_id:
-                created_by_id = current_user_id
-            else:
+            
+            # Fallback: Wenn Benutzer fehlt oder nicht gefunden wird, verwende current_user
+            created_by_id = _user_id(user_map, v_data.get('created_by_email'), current_user_id)
+            if created_by_id is None:
                 continue
-        else:
-            created_by_id = user_map[created_by_email]
-        
-        page_id = page_map[page_slug]
-        content = v_data.get('content') or v_data.get('file_content', '')
-        
-        # Prüfe ob Version bereits existiert
-        existing = WikiPageVersion.query.filter_by(
-            wiki_page_id=page_id,
-            version_number=v_data['version_number']
-        ).first()
-        
-        if existing:
-            continue
-        
-        # Erstelle Datei
-        timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
-        filename = f"{timestamp}_v{v_data['version_number']}_{page_slug}.md"
-        upload_dir = os.path.join('uploads', 'wiki')
-        filepath = os.path.join(upload_dir, filename)
-        absolute_filepath = os.path.abspath(filepath)
-        
-        # Speichere Markdown-Datei
-        try:
-            with open(absolute_filepath, 'w', encoding='utf-8') as f:
-                f.write(content)
-        except Exception as e:
-            current_app.logger.error(f"Fehler beim Speichern von Wiki-Versionsdatei {absolute_filepath}: {str(e)}")
-            absolute_filepath = None
-        
-        version = WikiPageVersion(
-            wiki_page_id=page_id,
-            version_number=v_data['version_number'],
-            content=content,
-            file_path=absolute_filepath or '',
-            created_by=created_by_id
-        )
-        if v_data.get('created_at'):
-            version.created_at = datetime.fromisoformat(v_data['created_at'])
+            
+            page_id = page_map[page_slug]
+            content = v_data.get('content') or v_data.get('file_content', '')
+            
+            # Prüfe ob Version bereits existiert
+            version_key = (page_id, v_data['version_number'])
+            if version_key in existing_versions:
+                continue
+            existing_versions.add(version_key)
+            
+            # Speichere Markdown-Datei
+            timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
+            filename = f"{timestamp}_v{v_data['version_number']}_{page_slug}.md"
+            try:
+                stored_path = path_for_key(save_upload(content.encode('utf-8'), 'wiki', filename))
+            except Exception as e:
+                current_app.logger.error(f"Fehler beim Speichern von Wiki-Versionsdatei {filename}: {str(e)}")
+                stored_path = None
+            
+            rows.append({
+                'wiki_page_id': page_id,
+                'version_number': v_data['version_number'],
+                'content': content,
+                'file_path': stored_path or '',
+                'created_by': created_by_id,
+                'created_at': _parse_datetime(v_data.get('created_at')) or datetime.utcnow(),
+            })
         
-        db.session.add(version)
+        _bulk_insert(WikiPageVersion, rows)
 
 
 def import_comments(comments_data: List[Dict], user_map: Dict[str, int], current_user_id: Optional[int] = None) -> Dict[str, int]:
@@ -2682,44 +2930,46 @@ def import_product_folders(folders_data: List[Dict], user_map: Dict[str, int], c
 
 
 def import_products(products_data: List[Dict], folder_map: Dict[str, int], user_map: Dict[str, int], current_user_id: Optional[int] = None) -> Dict[str, int]:
-    """Importiert Produkte und gibt ein Mapping von Name zu neuer ID zurück."""
+    """Importiert Produkte und gibt ein Mapping von Name zu neuer ID zurück.
+    
+    Bestehende Produkte werden je Block mit einer Abfrage gefunden, neue per
+    Bulk-Insert angelegt und ihre IDs anschließend blockweise gelesen.
+    """
     product_map = {}  # name -> neue_id
     
-    for p_data in products_data:
-        created_by_email = p_data.get('created_by_email')
-        if not created_by_email:
-            if current_user_id:
-                created_by_id = current_user_id
-            else:
+    for batch in _chunks(products_data):
+        # Absteigend sortiert, damit bei doppelten Namen das älteste Produkt gewinnt
+        names = {p_data['name'] for p_data in batch}
+        product_map.update(
+            db.session.query(Product.name, Product.id).filter(Product.name.in_(names)).order_by(Product.id.desc())
+        )
+        
+        rows = []
+        for p_data in batch:
+            # Fallback: Wenn Benutzer fehlt oder nicht gefunden wird, verwende current_user
+            created_by_id = _user_id(user_map, p_data.get('created_by_email'), current_user_id)
+            if created_by_id is None:
                 continue
-        elif created_by_email not in user_map:
-            # Fallback: Wenn Benutzer nicht gefunden wird, verwende current_user
-            if current_user_id:
-                created_by_id = current_user_id
-            else:
+            folder_id = None
+            folder_name = p_data.get('folder_name')
+            if folder_name:
+                folder_name = folder_name.strip()
+                if folder_name in folder_map:
+                    folder_id = folder_map[folder_name]
+                    current_app.logger.debug(f"Produkt '{p_data['name']}' wird Ordner '{folder_name}' (ID: {folder_id}) zugeordnet.")
+                else:
+                    current_app.logger.warning(f"Produkt '{p_data['name']}' - Ordner '{folder_name}' nicht im folder_map gefunden. Ordner wird nicht zugeordnet.")
+                    # Versuche Ordner in der DB zu finden (falls er bereits existiert)
+                    existing_folder = ProductFolder.query.filter_by(name=folder_name).first()
+                    if existing_folder:
+                        folder_id = existing_folder.id
+                        folder_map[folder_name] = folder_id  # Aktualisiere folder_map für zukünftige Produkte
+                        current_app.logger.info(f"Ordner '{folder_name}' in DB gefunden (ID: {folder_id}) und folder_map aktualisiert.")
+            
+            # Bestehendes (oder bereits in diesem Block angelegtes) Produkt
+            if p_data['name'] in product_map:
                 continue
-        else:
-            created_by_id = user_map[created_by_email]
-        folder_id = None
-        folder_name = p_data.get('folder_name')
-        if folder_name:
-            folder_name = folder_name.strip()
-            if folder_name in folder_map:
-                folder_id = folder_map[folder_name]
-                current_app.logger.debug(f"Produkt '{p_data['name']}' wird Ordner '{folder_name}' (ID: {folder_id}) zugeordnet.")
-            else:
-                current_app.logger.warning(f"Produkt '{p_data['name']}' - Ordner '{folder_name}' nicht im folder_map gefunden. Ordner wird nicht zugeordnet.")
-                # Versuche Ordner in der DB zu finden (falls er bereits existiert)
-                existing_folder = ProductFolder.query.filter_by(name=folder_name).first()
-                if existing_folder:
-                    folder_id = existing_folder.id
-                    folder_map[folder_name] = folder_id  # Aktualisiere folder_map für zukünftige Produkte
-                    current_app.logger.info(f"Ordner '{folder_name}' in DB gefunden (ID: {folder_id}) und folder_map aktualisiert.")
-        
-        existing = Product.query.filter_by(name=p_data['name']).first()
-        if existing:
-            product_map[p_data['name']] = existing.id
-        else:
+            
             normalized_length = None
             if 'length_meters' in p_data and p_data['length_meters'] not in (None, ''):
                 try:
@@ -2732,28 +2982,28 @@ def import_products(products_data: List[Dict], folder_map: Dict[str, int], user_
                     normalized_length, _ = normalize_length_input(raw_length)
                     if normalized_length is None:
                         normalized_length = raw_length
-            product = Product(
-                name=p_data['name'],
-                description=p_data.get('description'),
-                category=p_data.get('category'),
-                serial_number=p_data.get('serial_number'),
-                condition=p_data.get('condition'),
-                location=p_data.get('location'),
-                length=normalized_length,
-                purchase_date=datetime.fromisoformat(p_data['purchase_date']).date() if p_data.get('purchase_date') else None,
-                status=p_data.get('status', 'available'),
-                qr_code_data=p_data.get('qr_code_data'),
-                folder_id=folder_id,
-                created_by=created_by_id
-            )
+            row = {
+                'name': p_data['name'],
+                'description': p_data.get('description'),
+                'category': p_data.get('category'),
+                'serial_number': p_data.get('serial_number'),
+                'condition': p_data.get('condition'),
+                'location': p_data.get('location'),
+                'length': normalized_length,
+                'length_meters': parse_length_to_meters(normalized_length),
+                'purchase_date': datetime.fromisoformat(p_data['purchase_date']).date() if p_data.get('purchase_date') else None,
+                'status': p_data.get('status', 'available'),
+                'qr_code_data': p_data.get('qr_code_data'),
+                'folder_id': folder_id,
+                'created_by': created_by_id,
+                'image_path': p_data.get('image_path'),
+            }
             
             # Importiere Produktbild wenn vorhanden
-            if p_data.get('image_content_base64'):
+            if _has_blob(p_data, 'image_content'):
                 try:
-                    import base64
                     from werkzeug.utils import secure_filename
                     
-                    file_content = base64.b64decode(p_data['image_content_base64'])
                     original_name = p_data.get('image_original_name', p_data.get('image_path', 'product.png'))
                     
                     # Erstelle Dateiname mit Timestamp
@@ -2768,86 +3018,66 @@ def import_products(products_data: List[Dict], folder_map: Dict[str, int], user_
                     filename = f"{timestamp}_{secure_filename(base_name)}{ext}"
                     
                     # Speichere Datei
-                    project_root = os.path.dirname(current_app.root_path)
-                    upload_dir = os.path.join(project_root, current_app.config.get('UPLOAD_FOLDER', 'uploads'), 'inventory', 'product_images')
-                    os.makedirs(upload_dir, exist_ok=True)
-                    file_path = os.path.join(upload_dir, filename)
-                    
-                    with open(file_path, 'wb') as f:
-                        f.write(file_content)
-                    
-                    product.image_path = filename
+                    key, _ = _store_row_blob(p_data, 'image_content', 'inventory/product_images', filename)
+                    row['image_path'] = key.rsplit('/', 1)[-1]
                 except Exception as e:
                     current_app.logger.error(f"Fehler beim Importieren des Produktbilds für {p_data['name']}: {str(e)}")
-                    product.image_path = p_data.get('image_path')
-            else:
-                product.image_path = p_data.get('image_path')
             
-            db.session.add(product)
-            db.session.flush()
-            product_map[p_data['name']] = product.id
+            # Platzhalter, bis die neuen IDs gelesen sind
+            product_map[p_data['name']] = None
+            rows.append(row)
+        
+        _bulk_insert(Product, rows)
+        if rows:
+            names = [row['name'] for row in rows]
+            product_map.update(
+                db.session.query(Product.name, Product.id)
+                .filter(Product.name.in_(names)).order_by(Product.id.desc())
+            )
+            index_products(product_id for (product_id,) in db.session.query(Product.id).filter(Product.name.in_(names)))
     
     return product_map
 
 
 def import_borrow_transactions(transactions_data: List[Dict], product_map: Dict[str, int], user_map: Dict[str, int], current_user_id: Optional[int] = None):
-    """Importiert Ausleihtransaktionen."""
-    for t_data in transactions_data:
-        product_name = t_data.get('product_name')
-        borrower_email = t_data.get('borrower_email')
-        borrowed_by_email = t_data.get('borrowed_by_email')
-        
-        if not product_name or product_name not in product_map:
-            continue
+    """Importiert Ausleihtransaktionen blockweise per Bulk-Insert."""
+    for batch in _chunks(transactions_data):
+        numbers = {t_data['transaction_number'] for t_data in batch}
+        existing_numbers = {
+            number for (number,) in db.session.query(BorrowTransaction.transaction_number)
+            .filter(BorrowTransaction.transaction_number.in_(numbers))
+        }
         
-        # Fallback für borrower_email
-        if not borrower_email:
-            if current_user_id:
-                borrower_id = current_user_id
-            else:
+        rows = []
+        for t_data in batch:
+            product_name = t_data.get('product_name')
+            if not product_name or product_name not in product_map:
                 continue
-        elif borrower_email not in user_map:
-            if current_user_id:
-                borrower_id = current_user_id
-            else:
-                continue
-        else:
-            borrower_id = user_map[borrower_email]
-        
-        # Fallback für borrowed_by_email
-        if not borrowed_by_email:
-            if current_user_id:
-                borrowed_by_id = current_user_id
-            else:
+            
+            # Fallback für borrower_email und borrowed_by_email: current_user
+            borrower_id = _user_id(user_map, t_data.get('borrower_email'), current_user_id)
+            borrowed_by_id = _user_id(user_map, t_data.get('borrowed_by_email'), current_user_id)
+            if borrower_id is None or borrowed_by_id is None:
                 continue
-        elif borrowed_by_email not in user_map:
-            if current_user_id:
-                borrowed_by_id = current_user_id
-            else:
+            
+            if t_data['transaction_number'] in existing_numbers:
                 continue
-        else:
-            borrowed_by_id = user_map[borrowed_by_email]
-        
-        product_id = product_map[product_name]
-        
-        existing = BorrowTransaction.query.filter_by(transaction_number=t_data['transaction_number']).first()
-        if existing:
-            continue
+            existing_numbers.add(t_data['transaction_number'])
+            
+            rows.append({
+                'transaction_number': t_data['transaction_number'],
+                'borrow_group_id': t_data.get('borrow_group_id'),
+                'product_id': product_map[product_name],
+                'borrower_id': borrower_id,
+                'borrowed_by_id': borrowed_by_id,
+                'borrow_date': _parse_datetime(t_data.get('borrow_date')) or datetime.utcnow(),
+                'expected_return_date': datetime.fromisoformat(t_data['expected_return_date']).date() if t_data.get('expected_return_date') else None,
+                'actual_return_date': datetime.fromisoformat(t_data['actual_return_date']).date() if t_data.get('actual_return_date') else None,
+                'status': t_data.get('status', 'active'),
+                'qr_code_data': t_data.get('qr_code_data'),
+            })
         
-        transaction = BorrowTransaction(
-            transaction_number=t_data['transaction_number'],
-            borrow_group_id=t_data.get('borrow_group_id'),
-            product_id=product_id,
-            borrower_id=borrower_id,
-            borrowed_by_id=borrowed_by_id,
-            expected_return_date=datetime.fromisoformat(t_data['expected_return_date']).date() if t_data.get('expected_return_date') else None,
-            actual_return_date=datetime.fromisoformat(t_data['actual_return_date']).date() if t_data.get('actual_return_date') else None,
-            status=t_data.get('status', 'active'),
-            qr_code_data=t_data.get('qr_code_data')
-        )
-        if t_data.get('borrow_date'):
-            transaction.borrow_date = datetime.fromisoformat(t_data['borrow_date'])
-        db.session.add(transaction)
+        _bulk_insert(BorrowTransaction, rows)
 
 
 def import_product_sets(sets_data: List[Dict], user_map: Dict[str, int], current_user_id: Optional[int] = None) -> Dict[str, int]:
@@ -2945,24 +3175,11 @@ def import_product_documents(documents_data: List[Dict], product_map: Dict[str,
         )
         
         # Dateiinhalt speichern wenn vorhanden
-        if d_data.get('content_base64'):
+        if _has_blob(d_data, 'content'):
             try:
-                import base64
-                content = base64.b64decode(d_data['content_base64'])
-                
-                from werkzeug.utils import secure_filename
-                filename = secure_filename(d_data['file_name'])
-                timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
-                filename = f"{timestamp}_{filename}"
-                
-                upload_dir = os.path.join(current_app.root_path, '..', current_app.config.get('UPLOAD_FOLDER', 'uploads'), 'product_documents')
-                os.makedirs(upload_dir, exist_ok=True)
-                file_path = os.path.join(upload_dir, filename)
-                
-                with open(file_path, 'wb') as f:
-                    f.write(content)
-                
-                document.file_path = file_path
+                key, _ = _store_row_blob(d_data, 'content', 'inventory/product_documents',
+                                         _timestamped_name(d_data['file_name']))
+                document.file_path = path_for_key(key)
             except Exception as e:
                 current_app.logger.error(f"Fehler beim Speichern von Produktdokument {d_data['file_name']}: {str(e)}")
         
@@ -3072,44 +3289,53 @@ def import_inventories(inventories_data: List[Dict], user_map: Dict[str, int], c
 
 
 def import_inventory_items(items_data: List[Dict], inventory_map: Dict[str, int], product_map: Dict[str, int], user_map: Dict[str, int], current_user_id: Optional[int] = None):
-    """Importiert Inventur-Items."""
-    for i_data in items_data:
-        inventory_name = i_data.get('inventory_name')
-        product_name = i_data.get('product_name')
-        
-        if not inventory_name or inventory_name not in inventory_map:
-            continue
-        if not product_name or product_name not in product_map:
-            continue
-        
-        inventory_id = inventory_map[inventory_name]
-        product_id = product_map[product_name]
-        
-        existing = InventoryItem.query.filter_by(inventory_id=inventory_id, product_id=product_id).first()
-        if existing:
-            continue
+    """Importiert Inventur-Items blockweise per Bulk-Insert und zählt den Fortschritt neu."""
+    from app.utils.inventory_count import recount_inventory_progress
+    imported_inventories = set()
+    for batch in _chunks(items_data):
+        inventory_ids = {inventory_map[i['inventory_name']] for i in batch if i.get('inventory_name') in inventory_map}
+        existing_items = set()
+        if inventory_ids:
+            existing_items = set(
+                db.session.query(InventoryItem.inventory_id, InventoryItem.product_id)
+                .filter(InventoryItem.inventory_id.in_(inventory_ids))
+            )
         
-        checked_by_id = None
-        checked_by_email = i_data.get('checked_by_email')
-        if checked_by_email:
-            if checked_by_email in user_map:
-                checked_by_id = user_map[checked_by_email]
-            elif current_user_id:
+        rows = []
+        for i_data in batch:
+            inventory_name = i_data.get('inventory_name')
+            product_name = i_data.get('product_name')
+            
+            if not inventory_name or inventory_name not in inventory_map:
+                continue
+            if not product_name or product_name not in product_map:
+                continue
+            
+            item_key = (inventory_map[inventory_name], product_map[product_name])
+            if item_key in existing_items:
+                continue
+            existing_items.add(item_key)
+            imported_inventories.add(item_key[0])
+            
+            checked_by_id = None
+            if i_data.get('checked_by_email'):
                 # Fallback: Wenn Benutzer nicht gefunden wird, verwende current_user
-                checked_by_id = current_user_id
+                checked_by_id = _user_id(user_map, i_data['checked_by_email'], current_user_id)
+            
+            rows.append({
+                'inventory_id': item_key[0],
+                'product_id': item_key[1],
+                'checked': i_data.get('checked', False),
+                'notes': i_data.get('notes'),
+                'location_changed': i_data.get('location_changed', False),
+                'new_location': i_data.get('new_location'),
+                'condition_changed': i_data.get('condition_changed', False),
+                'new_condition': i_data.get('new_condition'),
+                'checked_by': checked_by_id,
+                'checked_at': _parse_datetime(i_data.get('checked_at')),
+            })
         
-        item = InventoryItem(
-            inventory_id=inventory_id,
-            product_id=product_id,
-            checked=i_data.get('checked', False),
-            notes=i_data.get('notes'),
-            location_changed=i_data.get('location_changed', False),
-            new_location=i_data.get('new_location'),
-            condition_changed=i_data.get('condition_changed', False),
-            new_condition=i_data.get('new_condition'),
-            checked_by=checked_by_id
-        )
-        if i_data.get('checked_at'):
-            item.checked_at = datetime.fromisoformat(i_data['checked_at'])
-        db.session.add(item)
+        _bulk_insert(InventoryItem, rows)
+    
+    recount_inventory_progress(imported_inventories)
 
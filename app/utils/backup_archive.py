@@ -0,0 +1,512 @@
+"""
+Container-Format für Backups (.prismateams, Version 2).
+
+Ein Backup ist ein ZIP-Archiv mit folgendem Aufbau:
+
+    manifest.json              Format, Version, Kategorien, Tabellen (Zeilen, SHA-256)
+                               und Blob-Statistik
+    tables/<tabelle>.ndjson    eine JSON-Zeile pro Datensatz
+    ids/<tabelle>.json         IDs der Tabelle als Bereiche (ab Version 2.1, s.u.)
+    blobs/<aa>/<sha256>        Dateiinhalte, nach Inhalt dedupliziert
+
+Datensätze verweisen über Felder mit der Endung `_blob` (SHA-256 des Inhalts) auf
+Dateiinhalte. Geschrieben und gelesen wird blockweise: Tabellen werden zunächst in
+eine temporäre Datei geschrieben (während der Erzeugung können weitere Blobs
+anfallen) und danach in das Archiv kopiert, Blobs werden direkt von der Quelle in
+das Archiv übertragen. Der Speicherbedarf hängt damit nicht von der Backup-Größe ab.
+Tabellen werden mit Deflate komprimiert, Blobs nur, wenn eine Stichprobe ihres
+Inhalts sich merklich verkleinern lässt (Bilder, PDFs und Archive sind meist
+bereits komprimiert). Der Writer ist threadsicher, sodass mehrere Kategorien
+gleichzeitig exportiert werden können.
+
+Ab Version 2.1 bilden Backups Ketten: Das Manifest enthält `backup_id`,
+`backup_type` (full, incremental, differential), `parent_id` und das
+Wasserzeichen (`watermark`, Startzeit des Exports). Inkrementelle und
+differentielle Backups enthalten je Tabelle entweder einen vollständigen Stand
+(`mode: full`) oder nur die seit dem Wasserzeichen des Vorgängers geänderten
+Datensätze (`mode: changes`). `ids/<tabelle>.json` hält dazu die geschriebenen
+IDs (`rows`), die seit dem Vorgänger gelöschten IDs (`tombstones`) und alle IDs,
+die eine Wiederherstellung der Kette bis hierhin ergeben muss (`live`, mit
+Anzahl und SHA-256 im Manifest). Blobs, die bereits in einem Archiv der Kette
+liegen, werden nicht erneut geschrieben. Zusammengeführt wird eine Kette von
+`app.utils.backup_chain`.
+
+Backups im alten Format (Version 1.0, ein JSON-Dokument mit Base64-Inhalten)
+werden weiterhin von `app.utils.backup.import_backup` gelesen.
+"""
+
+import bisect
+import hashlib
+import io
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+import zipfile
+import zlib
+from array import array
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_FORMAT = 'prismateams-backup'
+ARCHIVE_VERSION = '2.1'
+# Lesbare Archiv-Versionen (2.0: ohne Ketten-Metadaten und ID-Bereiche)
+ARCHIVE_VERSIONS = ('2.0', '2.1')
+BACKUP_TYPES = ('full', 'incremental', 'differential')
+MANIFEST_NAME = 'manifest.json'
+CHUNK_SIZE = 1024 * 1024
+DEFAULT_COMPRESSION_LEVEL = 6
+# Blobs werden komprimiert, wenn die Stichprobe auf weniger als 90 % schrumpft
+COMPRESSION_SAMPLE_SIZE = 64 * 1024
+COMPRESSION_MIN_RATIO = 0.9
+
+
+class BackupArchiveError(Exception):
+    """Ungültiges oder beschädigtes Backup-Archiv."""
+
+
+def _table_entry(name: str) -> str:
+    return f'tables/{name}.ndjson'
+
+
+def _ids_entry(name: str) -> str:
+    return f'ids/{name}.json'
+
+
+def _blob_entry(digest: str) -> str:
+    return f'blobs/{digest[:2]}/{digest}'
+
+
+class IdRanges:
+    """Sortierte, disjunkte ID-Bereiche [[von, bis], ...] (bis einschließlich).
+
+    Fortlaufende IDs – der Normalfall bei Autoincrement-Schlüsseln – werden so
+    kompakt gespeichert und lassen sich ohne Mengen pro Datensatz vergleichen.
+    """
+
+    def __init__(self, ranges: Optional[List[List[int]]] = None):
+        self.ranges = [list(r) for r in ranges or []]
+        self._starts = [r[0] for r in self.ranges]
+
+    @classmethod
+    def from_ids(cls, ids: Iterable[int]) -> 'IdRanges':
+        """Bildet Bereiche aus aufsteigend sortierten IDs (Duplikate erlaubt)."""
+        ranges = []
+        for value in ids:
+            if ranges and value <= ranges[-1][1] + 1:
+                ranges[-1][1] = max(ranges[-1][1], value)
+            else:
+                ranges.append([value, value])
+        return cls(ranges)
+
+    @classmethod
+    def from_unsorted(cls, ids: Iterable[int]) -> 'IdRanges':
+        """Bildet Bereiche aus beliebig sortierten IDs (kompakt als array zwischengespeichert)."""
+        values = array('q', ids)
+        return cls.from_ids(sorted(values))
+
+    def __contains__(self, value) -> bool:
+        index = bisect.bisect_right(self._starts, value) - 1
+        return index >= 0 and value <= self.ranges[index][1]
+
+    def __len__(self) -> int:
+        return sum(end - start + 1 for start, end in self.ranges)
+
+    def __bool__(self) -> bool:
+        return bool(self.ranges)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, IdRanges) and self.ranges == other.ranges
+
+    def __or__(self, other: 'IdRanges') -> 'IdRanges':
+        merged = sorted(self.ranges + other.ranges)
+        result = []
+        for start, end in merged:
+            if result and start <= result[-1][1] + 1:
+                result[-1][1] = max(result[-1][1], end)
+            else:
+                result.append([start, end])
+        return IdRanges(result)
+
+    def __sub__(self, other: 'IdRanges') -> 'IdRanges':
+        result = []
+        others = other.ranges
+        j = 0
+        for start, end in self.ranges:
+            while j < len(others) and others[j][1] < start:
+                j += 1
+            k = j
+            while start <= end and k < len(others) and others[k][0] <= end:
+                if others[k][0] > start:
+                    result.append([start, others[k][0] - 1])
+                start = max(start, others[k][1] + 1)
+                k += 1
+            if start <= end:
+                result.append([start, end])
+        return IdRanges(result)
+
+    def __and__(self, other: 'IdRanges') -> 'IdRanges':
+        return self - (self - other)
+
+    def digest(self) -> str:
+        return hashlib.sha256(json.dumps(self.ranges, separators=(',', ':')).encode('utf-8')).hexdigest()
+
+
+def is_backup_archive(path: str) -> bool:
+    """True, wenn die Datei ein Backup im Container-Format (ZIP) ist."""
+    return zipfile.is_zipfile(path)
+
+
+class BackupArchiveWriter:
+    """Schreibt ein Backup-Archiv blockweise (als Kontextmanager verwenden).
+
+    Für inkrementelle und differentielle Backups übergibt der Aufrufer das Manifest
+    des Vorgängers (`parent`), den Beginn des Änderungszeitraums (`since`) und die
+    Blobs der bisherigen Kette (`known_blobs`), die nicht erneut geschrieben werden.
+    `on_table(name, rows)` wird nach jeder geschriebenen Tabelle aufgerufen.
+    """
+
+    def __init__(self, path: str, categories: List[str], backup_type: str = 'full',
+                 parent: Optional[Dict] = None, since: Optional[str] = None,
+                 known_blobs: Optional[Iterable[str]] = None,
+                 compresslevel: int = DEFAULT_COMPRESSION_LEVEL,
+                 on_table: Optional[Callable[[str, int], None]] = None):
+        if backup_type not in BACKUP_TYPES:
+            raise ValueError(f'Unbekannte Backup-Art: {backup_type}')
+        self.path = path
+        self.categories = categories
+        self.created_at = datetime.utcnow().isoformat()
+        self.backup_id = uuid.uuid4().hex
+        self.backup_type = backup_type
+        self.parent_id = parent.get('backup_id') if parent else None
+        self.base_id = (parent.get('base_id') or parent.get('backup_id')) if parent else None
+        self.since = since
+        self.tables: Dict[str, Dict] = {}
+        self.blob_count = 0
+        self.blob_bytes = 0
+        self.compresslevel = compresslevel
+        self.on_table = on_table
+        self._blobs = set(known_blobs or ())
+        # Schützt Einträge des ZIP-Archivs (nur ein offener Schreib-Handle) und die Zähler
+        self._lock = threading.Lock()
+        self._zip = zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED, allowZip64=True,
+                                    compresslevel=compresslevel)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._zip.close()
+        return False
+
+    # Blobs
+
+    def _compressible(self, source) -> bool:
+        """Prüft anhand einer Stichprobe, ob sich Komprimieren lohnt (Quelle wird zurückgesetzt)."""
+        if self.compresslevel <= 0:
+            return False
+        sample = source.read(COMPRESSION_SAMPLE_SIZE)
+        source.seek(0)
+        return bool(sample) and len(zlib.compress(sample, 1)) < len(sample) * COMPRESSION_MIN_RATIO
+
+    def _write_blob(self, digest: str, source, size: int):
+        """Schreibt einen Blob, sofern er nicht bereits im Archiv bzw. in der Kette liegt."""
+        with self._lock:
+            if digest in self._blobs:
+                return
+            if self._compressible(source):
+                entry = _blob_entry(digest)
+            else:
+                entry = zipfile.ZipInfo(_blob_entry(digest), date_time=datetime.utcnow().timetuple()[:6])
+                entry.compress_type = zipfile.ZIP_STORED
+                entry.file_size = size
+            with self._zip.open(entry, 'w', force_zip64=size > 0x7FFFFFFF) as target:
+                shutil.copyfileobj(source, target, CHUNK_SIZE)
+            self._blobs.add(digest)
+            self.blob_count += 1
+            self.blob_bytes += size
+
+    def add_file(self, path: Optional[str]) -> Optional[str]:
+        """Übernimmt eine lokale Datei als Blob und gibt den Inhalts-Hash zurück (None, wenn sie fehlt)."""
+        if not path or not os.path.isfile(path):
+            return None
+        sha = hashlib.sha256()
+        size = 0
+        with open(path, 'rb') as source:
+            for chunk in iter(lambda: source.read(CHUNK_SIZE), b''):
+                sha.update(chunk)
+                size += len(chunk)
+        digest = sha.hexdigest()
+        if digest not in self._blobs:
+            with open(path, 'rb') as source:
+                self._write_blob(digest, source, size)
+        return digest
+
+    def add_bytes(self, data: Optional[bytes]) -> Optional[str]:
+        """Übernimmt bereits geladene Inhalte (z.B. rekonstruierte Versionen) als Blob."""
+        if data is None:
+            return None
+        digest = hashlib.sha256(data).hexdigest()
+        if digest not in self._blobs:
+            self._write_blob(digest, io.BytesIO(data), len(data))
+        return digest
+
+    # Tabellen
+
+    def write_table(self, name: str, rows: Iterable[Dict], previous: Optional[IdRanges] = None,
+                    current_ids: Optional[Iterable[int]] = None) -> int:
+        """Schreibt eine Tabelle als NDJSON; `rows` darf ein Generator sein.
+
+        Ohne `previous` ist die Tabelle ein vollständiger Stand. Mit `previous` (IDs,
+        die die Kette bis zum Vorgänger ergibt) enthält `rows` nur Änderungen;
+        `current_ids` liefert dann alle derzeit vorhandenen IDs in aufsteigender
+        Reihenfolge, woraus sich die gelöschten IDs (Tombstones) ergeben.
+        """
+        sha = hashlib.sha256()
+        count = 0
+        written = array('q')
+        with tempfile.TemporaryFile() as spool:
+            for row in rows:
+                line = (json.dumps(row, ensure_ascii=False, default=str) + '\n').encode('utf-8')
+                sha.update(line)
+                spool.write(line)
+                count += 1
+                if row.get('id') is not None:
+                    written.append(row['id'])
+            size = spool.tell()
+            spool.seek(0)
+            with self._lock:
+                with self._zip.open(_table_entry(name), 'w', force_zip64=size > 0x7FFFFFFF) as target:
+                    shutil.copyfileobj(spool, target, CHUNK_SIZE)
+
+        written = IdRanges.from_unsorted(written)
+        if previous is None:
+            tombstones = IdRanges()
+            live = written
+        else:
+            tombstones = previous - IdRanges.from_ids(current_ids or ())
+            live = (previous - tombstones) | written
+        ids = json.dumps({
+            'rows': written.ranges,
+            'tombstones': tombstones.ranges,
+            'live': live.ranges,
+        }, separators=(',', ':')).encode('utf-8')
+        with self._lock:
+            self._zip.writestr(_ids_entry(name), ids)
+
+        self.tables[name] = {
+            'rows': count,
+            'sha256': sha.hexdigest(),
+            'mode': 'full' if previous is None else 'changes',
+            'tombstones': len(tombstones),
+            'live': {'rows': len(live), 'sha256': live.digest()},
+            'ids_sha256': hashlib.sha256(ids).hexdigest(),
+        }
+        if self.on_table is not None:
+            self.on_table(name, count)
+        return count
+
+    def close(self):
+        manifest = {
+            'format': ARCHIVE_FORMAT,
+            'version': ARCHIVE_VERSION,
+            'created_at': self.created_at,
+            'backup_id': self.backup_id,
+            'backup_type': self.backup_type,
+            'parent_id': self.parent_id,
+            'base_id': self.base_id,
+            'since': self.since,
+            'watermark': self.created_at,
+            'categories': self.categories,
+            'tables': self.tables,
+            'blobs': {'count': self.blob_count, 'bytes': self.blob_bytes},
+        }
+        self._zip.writestr(MANIFEST_NAME, json.dumps(manifest, indent=2, ensure_ascii=False))
+        self._zip.close()
+
+
+class BackupArchiveReader:
+    """Liest ein Backup-Archiv; Tabellen werden zeilenweise, Blobs einzeln gelesen."""
+
+    def __init__(self, path: str):
+        self.path = path
+        try:
+            self._zip = zipfile.ZipFile(path, 'r')
+            self.manifest = json.loads(self._zip.read(MANIFEST_NAME).decode('utf-8'))
+        except (zipfile.BadZipFile, KeyError, ValueError) as e:
+            raise BackupArchiveError(f'Ungültiges Backup-Archiv: {e}') from e
+        if self.manifest.get('format') != ARCHIVE_FORMAT:
+            self._zip.close()
+            raise BackupArchiveError(f"Unbekanntes Archivformat: {self.manifest.get('format')}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def close(self):
+        self._zip.close()
+
+    @property
+    def version(self) -> Optional[str]:
+        return self.manifest.get('version')
+
+    @property
+    def backup_id(self) -> Optional[str]:
+        return self.manifest.get('backup_id')
+
+    @property
+    def backup_type(self) -> str:
+        return self.manifest.get('backup_type') or 'full'
+
+    @property
+    def parent_id(self) -> Optional[str]:
+        return self.manifest.get('parent_id')
+
+    def has_table(self, name: str) -> bool:
+        return name in self.manifest.get('tables', {})
+
+    def table_mode(self, name: str) -> str:
+        """'full' (vollständiger Stand) oder 'changes' (nur Änderungen seit dem Vorgänger)."""
+        return self.manifest['tables'][name].get('mode', 'full')
+
+    def table_rows(self, name: str) -> int:
+        return self.manifest['tables'][name].get('rows', 0)
+
+    def table_ids(self, name: str) -> Optional[Dict[str, IdRanges]]:
+        """ID-Bereiche einer Tabelle ('rows', 'tombstones', 'live'); None bei Version 2.0."""
+        expected = self.manifest['tables'][name].get('ids_sha256')
+        if not expected:
+            return None
+        try:
+            data = self._zip.read(_ids_entry(name))
+        except KeyError as e:
+            raise BackupArchiveError(f"ID-Liste der Tabelle '{name}' fehlt im Archiv") from e
+        if hashlib.sha256(data).hexdigest() != expected:
+            raise BackupArchiveError(f"ID-Liste der Tabelle '{name}' ist beschädigt (Prüfsumme stimmt nicht)")
+        return {key: IdRanges(value) for key, value in json.loads(data).items()}
+
+    def blob_digests(self) -> Iterator[str]:
+        """Inhalts-Hashes aller Blobs dieses Archivs."""
+        for name in self._zip.namelist():
+            if name.startswith('blobs/'):
+                yield name.rsplit('/', 1)[-1]
+
+    def iter_table(self, name: str) -> Iterator[Dict]:
+        """Liefert die Datensätze einer Tabelle und prüft am Ende die Prüfsumme."""
+        expected = self.manifest['tables'][name]
+        sha = hashlib.sha256()
+        count = 0
+        with self._zip.open(_table_entry(name)) as source:
+            for line in source:
+                sha.update(line)
+                count += 1
+                yield json.loads(line)
+        if count != expected.get('rows') or sha.hexdigest() != expected.get('sha256'):
+            raise BackupArchiveError(f"Tabelle '{name}' ist beschädigt (Prüfsumme stimmt nicht)")
+
+    def has_blob(self, digest: Optional[str]) -> bool:
+        if not digest:
+            return False
+        try:
+            self._zip.getinfo(_blob_entry(digest))
+            return True
+        except KeyError:
+            return False
+
+    def open_blob(self, digest: str, verify: bool = False):
+        """Öffnet einen Blob als Stream (Aufrufer schließt ihn).
+
+        Mit `verify=True` wird der Inhalts-Hash beim Lesen mitgerechnet; am Ende des
+        Streams wird bei Abweichung ein BackupArchiveError ausgelöst.
+        """
+        try:
+            source = self._zip.open(_blob_entry(digest))
+        except KeyError as e:
+            raise BackupArchiveError(f'Blob {digest} fehlt im Archiv') from e
+        return _VerifiedBlob(source, digest) if verify else source
+
+    def read_blob(self, digest: str) -> bytes:
+        """Liest einen Blob vollständig und prüft den Inhalts-Hash."""
+        with self.open_blob(digest) as source:
+            data = source.read()
+        if hashlib.sha256(data).hexdigest() != digest:
+            raise BackupArchiveError(f'Blob {digest} ist beschädigt (Prüfsumme stimmt nicht)')
+        return data
+
+
+class _VerifiedBlob:
+    """Lesestream eines Blobs, der den SHA-256 beim Lesen prüft."""
+
+    def __init__(self, source, digest: str):
+        self._source = source
+        self._digest = digest
+        self._sha = hashlib.sha256()
+        self._checked = False
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._source.read(size)
+        if data:
+            self._sha.update(data)
+        elif not self._checked:
+            self._checked = True
+            if self._sha.hexdigest() != self._digest:
+                raise BackupArchiveError(f'Blob {self._digest} ist beschädigt (Prüfsumme stimmt nicht)')
+        return data
+
+    def close(self):
+        self._source.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+class ArchiveTable:
+    """Eine Tabelle des Archivs: iterierbar (zeilenweise) und mit bekannter Zeilenzahl."""
+
+    def __init__(self, reader, name: str):
+        self.reader = reader
+        self.name = name
+
+    def __iter__(self) -> Iterator[Dict]:
+        return self.reader.iter_table(self.name)
+
+    def __len__(self) -> int:
+        return self.reader.table_rows(self.name)
+
+
+class ArchiveTables:
+    """Dict-ähnliche Sicht auf die Tabellen eines Archivs für den Import.
+
+    Ein Zugriff liefert eine `ArchiveTable`, deren Datensätze erst beim Iterieren
+    gelesen werden; es liegt also nie eine ganze Tabelle im Speicher. Statt eines
+    einzelnen Archivs kann auch eine `BackupChain` übergeben werden.
+    """
+
+    def __init__(self, reader):
+        self.reader = reader
+
+    def __contains__(self, name) -> bool:
+        return self.reader.has_table(name)
+
+    def __getitem__(self, name) -> ArchiveTable:
+        if not self.reader.has_table(name):
+            raise KeyError(name)
+        return ArchiveTable(self.reader, name)
+
+    def get(self, name, default=None):
+        return self[name] if name in self else default
@@ -0,0 +1,310 @@
+"""
+Backup-Ketten aus Vollbackup und inkrementellen bzw. differentiellen Backups.
+
+Ein inkrementelles Backup enthält die seit dem vorherigen Backup geänderten
+Datensätze, ein differentielles die seit dem letzten Vollbackup geänderten
+(siehe `app.utils.backup_archive`). Zur Wiederherstellung werden das Vollbackup
+und die nachfolgenden Backups der Kette tabellenweise zusammengeführt:
+
+- Ausgangspunkt ist das jüngste Archiv mit vollständigem Stand der Tabelle.
+- Ein Datensatz wird aus dem jüngsten Archiv übernommen, das ihn enthält;
+  Datensätze, deren ID ein späteres Archiv als gelöscht führt, entfallen.
+- Die IDs des Ergebnisses werden gegen die Prüfsumme (`live`) im Manifest des
+  jüngsten Archivs geprüft; Abweichungen lösen einen BackupArchiveError aus.
+
+Datensätze verweisen im Backup über Namen aufeinander (z.B. `folder_name`). Da
+unveränderte Datensätze aus älteren Archiven stammen, werden solche Verweise
+anhand der mitgeschriebenen IDs auf den zusammengeführten Stand gebracht
+(`references`, vom Aufrufer vorgegeben).
+
+Zusammengeführt wird zeilenweise; im Speicher liegen nur ID-Bereiche und für
+Verweise die Zuordnung ID -> Name der referenzierten Tabelle.
+"""
+
+import heapq
+import logging
+import os
+from array import array
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from app.utils.backup_archive import BackupArchiveError, BackupArchiveReader, IdRanges, is_backup_archive
+
+logger = logging.getLogger(__name__)
+
+BACKUP_SUFFIX = '.prismateams'
+
+# Tabelle -> {Namensfeld: (ID-Feld, referenzierte Tabelle, Schlüsselfeld)}
+References = Dict[str, Dict[str, Tuple[str, str, str]]]
+
+
+def read_manifest(path: str) -> Optional[Dict]:
+    """Manifest eines Backup-Archivs oder None, wenn die Datei kein gültiges Archiv ist."""
+    if not os.path.isfile(path) or not is_backup_archive(path):
+        return None
+    try:
+        with BackupArchiveReader(path) as reader:
+            return reader.manifest
+    except BackupArchiveError:
+        return None
+
+
+def list_backups(folder: str) -> List[Dict]:
+    """Backups in einem Verzeichnis (Pfad und Manifest-Angaben), älteste zuerst."""
+    backups = []
+    if not folder or not os.path.isdir(folder):
+        return backups
+    for name in os.listdir(folder):
+        if not name.endswith(BACKUP_SUFFIX):
+            continue
+        path = os.path.join(folder, name)
+        manifest = read_manifest(path)
+        if manifest is None:
+            continue
+        backups.append({
+            'path': path,
+            'filename': name,
+            'size': os.path.getsize(path),
+            'backup_id': manifest.get('backup_id'),
+            'backup_type': manifest.get('backup_type') or 'full',
+            'parent_id': manifest.get('parent_id'),
+            'base_id': manifest.get('base_id'),
+            'created_at': manifest.get('created_at'),
+            'categories': manifest.get('categories', []),
+        })
+    backups.sort(key=lambda backup: backup['created_at'] or '')
+    return backups
+
+
+def rotate_backups(folder: str, keep_full: int) -> List[str]:
+    """Löscht alte Backup-Ketten und gibt die gelöschten Pfade zurück.
+
+    Erhalten bleiben die `keep_full` jüngsten Vollbackups, die auf ihnen aufbauenden
+    Backups sowie alles, was nach dem ältesten davon entstanden ist.
+    """
+    backups = list_backups(folder)
+    full_backups = [backup for backup in backups if backup['backup_type'] == 'full']
+    if keep_full <= 0 or len(full_backups) <= keep_full:
+        return []
+
+    kept = full_backups[-keep_full:]
+    kept_ids = {backup['backup_id'] for backup in kept if backup['backup_id']}
+    cutoff = kept[0]['created_at'] or ''
+    removed = []
+    for backup in backups:
+        if (backup['created_at'] or '') >= cutoff or backup['base_id'] in kept_ids:
+            continue
+        try:
+            os.unlink(backup['path'])
+            removed.append(backup['path'])
+        except OSError as e:
+            logger.warning(f"Backup {backup['filename']} konnte nicht gelöscht werden: {e}")
+    return removed
+
+
+def find_backup_chain(path: str, folder: Optional[str] = None) -> List[str]:
+    """Pfade der Kette bis einschließlich `path` (Vollbackup zuerst).
+
+    Vorgänger werden anhand ihrer `backup_id` in `folder` gesucht (Standard: das
+    Verzeichnis von `path`).
+    """
+    manifest = read_manifest(path)
+    if manifest is None:
+        raise BackupArchiveError(f'Ungültiges Backup-Archiv: {path}')
+    by_id = {backup['backup_id']: backup['path']
+             for backup in list_backups(folder or os.path.dirname(os.path.abspath(path)))
+             if backup['backup_id']}
+
+    chain = [path]
+    parent_id = manifest.get('parent_id')
+    while parent_id:
+        parent_path = by_id.get(parent_id)
+        if parent_path is None:
+            raise BackupArchiveError(f'Vorgänger {parent_id} der Backup-Kette wurde nicht gefunden')
+        if parent_path in chain:
+            raise BackupArchiveError('Backup-Kette enthält einen Zyklus')
+        chain.insert(0, parent_path)
+        parent_id = read_manifest(parent_path).get('parent_id')
+    return chain
+
+
+def order_backup_chain(paths: List[str]) -> List[str]:
+    """Sortiert die Archive einer Kette (z.B. mehrere hochgeladene Dateien), Vollbackup zuerst.
+
+    Die Archive müssen genau eine lückenlose Kette bilden.
+    """
+    manifests = {}
+    for path in paths:
+        manifest = read_manifest(path)
+        if manifest is None or not manifest.get('backup_id'):
+            raise BackupArchiveError(f'{os.path.basename(path)} ist kein Backup mit Ketten-Angaben')
+        manifests[manifest['backup_id']] = (path, manifest)
+
+    parent_ids = {manifest.get('parent_id') for _, manifest in manifests.values()}
+    heads = [backup_id for backup_id in manifests if backup_id not in parent_ids]
+    if len(heads) != 1:
+        raise BackupArchiveError('Die Backups bilden keine eindeutige Kette')
+
+    chain = []
+    backup_id = heads[0]
+    while backup_id:
+        if backup_id not in manifests:
+            raise BackupArchiveError(f'Vorgänger {backup_id} fehlt in der Backup-Kette')
+        path, manifest = manifests[backup_id]
+        chain.insert(0, path)
+        backup_id = manifest.get('parent_id')
+    if len(chain) != len(paths):
+        raise BackupArchiveError('Nicht alle Backups gehören zur selben Kette')
+    return chain
+
+
+class BackupChain:
+    """Liest eine Backup-Kette wie ein einzelnes Archiv (siehe `BackupArchiveReader`)."""
+
+    def __init__(self, paths: List[str], references: Optional[References] = None):
+        self.readers: List[BackupArchiveReader] = []
+        try:
+            for path in paths:
+                self.readers.append(BackupArchiveReader(path))
+            self._validate()
+        except Exception:
+            self.close()
+            raise
+        self.references = references or {}
+        self._key_maps: Dict[Tuple[str, str], Dict[int, Optional[str]]] = {}
+
+    def _validate(self):
+        if not self.readers:
+            raise BackupArchiveError('Leere Backup-Kette')
+        if self.readers[0].backup_type != 'full':
+            raise BackupArchiveError('Eine Backup-Kette muss mit einem Vollbackup beginnen')
+        for previous, reader in zip(self.readers, self.readers[1:]):
+            if reader.parent_id is None or reader.parent_id != previous.backup_id:
+                raise BackupArchiveError(
+                    f'{os.path.basename(reader.path)} folgt nicht auf {os.path.basename(previous.path)}'
+                )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def close(self):
+        for reader in self.readers:
+            reader.close()
+
+    @property
+    def head(self) -> BackupArchiveReader:
+        return self.readers[-1]
+
+    @property
+    def manifest(self) -> Dict:
+        return self.head.manifest
+
+    @property
+    def version(self) -> Optional[str]:
+        return self.head.version
+
+    # Tabellen
+
+    def has_table(self, name: str) -> bool:
+        return any(reader.has_table(name) for reader in self.readers)
+
+    def _members(self, name: str) -> List[BackupArchiveReader]:
+        """Archive, aus denen die Tabelle zusammengeführt wird (ab dem letzten vollständigen Stand)."""
+        members = [reader for reader in self.readers if reader.has_table(name)]
+        start = max((i for i, reader in enumerate(members) if reader.table_mode(name) == 'full'), default=None)
+        if start is None:
+            raise BackupArchiveError(f"Kein vollständiger Stand der Tabelle '{name}' in der Backup-Kette")
+        return members[start:]
+
+    def table_rows(self, name: str) -> int:
+        head = self._members(name)[-1]
+        live = head.manifest['tables'][name].get('live')
+        return live['rows'] if live else head.table_rows(name)
+
+    def iter_table(self, name: str) -> Iterator[Dict]:
+        """Zusammengeführte Datensätze einer Tabelle (Verweise auf den aktuellen Stand gebracht)."""
+        references = self.references.get(name) if len(self.readers) > 1 else None
+        if not references:
+            yield from self._merged_rows(name)
+            return
+        key_maps = {
+            field: (id_field, self._key_map(table, key))
+            for field, (id_field, table, key) in references.items()
+            if self.has_table(table)
+        }
+        for row in self._merged_rows(name):
+            for field, (id_field, key_map) in key_maps.items():
+                ref_id = row.get(id_field)
+                if ref_id in key_map:
+                    row[field] = key_map[ref_id]
+            yield row
+
+    def _key_map(self, table: str, key: str) -> Dict[int, Optional[str]]:
+        if (table, key) not in self._key_maps:
+            self._key_maps[(table, key)] = {row['id']: row.get(key) for row in self._merged_rows(table)}
+        return self._key_maps[(table, key)]
+
+    def _merged_rows(self, name: str) -> Iterator[Dict]:
+        members = self._members(name)
+        if len(members) == 1:
+            yield from members[0].iter_table(name)
+            return
+
+        ids = [reader.table_ids(name) for reader in members]
+        if any(entry is None for entry in ids):
+            raise BackupArchiveError(f"ID-Listen der Tabelle '{name}' fehlen in der Backup-Kette")
+
+        # IDs, die in einem späteren Archiv neu geschrieben oder gelöscht wurden
+        superseded = [IdRanges()] * len(members)
+        for i in range(len(members) - 2, -1, -1):
+            later = ids[i + 1]
+            superseded[i] = superseded[i + 1] | later['rows'] | later['tombstones']
+
+        def current_rows(i):
+            for row in members[i].iter_table(name):
+                if row.get('id') not in superseded[i]:
+                    yield row
+
+        emitted = array('q')
+        for row in heapq.merge(*(current_rows(i) for i in range(len(members))),
+                               key=lambda row: row.get('id') or 0):
+            emitted.append(row['id'])
+            yield row
+
+        expected = members[-1].manifest['tables'][name]['live']
+        result = IdRanges.from_unsorted(emitted)
+        if len(emitted) != expected['rows'] or result.digest() != expected['sha256']:
+            raise BackupArchiveError(
+                f"Tabelle '{name}' stimmt nach dem Zusammenführen nicht mit dem Manifest überein"
+            )
+        logger.debug(f"Backup-Kette: {name} aus {len(members)} Archiven zusammengeführt ({len(emitted)} Datensätze)")
+
+    # Blobs (jüngstes Archiv zuerst)
+
+    def _blob_reader(self, digest: Optional[str]) -> Optional[BackupArchiveReader]:
+        for reader in reversed(self.readers):
+            if reader.has_blob(digest):
+                return reader
+        return None
+
+    def has_blob(self, digest: Optional[str]) -> bool:
+        return self._blob_reader(digest) is not None
+
+    def open_blob(self, digest: str, verify: bool = False):
+        reader = self._blob_reader(digest)
+        if reader is None:
+            raise BackupArchiveError(f'Blob {digest} fehlt in der Backup-Kette')
+        return reader.open_blob(digest, verify)
+
+    def read_blob(self, digest: str) -> bytes:
+        reader = self._blob_reader(digest)
+        if reader is None:
+            raise BackupArchiveError(f'Blob {digest} fehlt in der Backup-Kette')
+        return reader.read_blob(digest)
+
+    def blob_digests(self) -> Iterator[str]:
+        for reader in self.readers:
+            yield from reader.blob_digests()
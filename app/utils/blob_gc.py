@@ -0,0 +1,257 @@
+"""
+Garbage Collection für hochgeladene Dateien (Blobs).
+
+Löschvorgänge in Requests entfernen Dateien nicht mehr direkt von der Festplatte,
+sondern markieren sie nur als nicht mehr referenziert (`PendingBlobDeletion`).
+Der Blob-Collector entfernt markierte Dateien nach einer Karenzzeit in Batches.
+Ein periodischer Abgleich vergleicht zusätzlich den `uploads/`-Baum mit allen
+Datenbank-Referenzen und meldet bzw. entfernt verwaiste Dateien.
+"""
+
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional, Set
+
+from flask import current_app
+
+from app import db
+from app.models.storage import PendingBlobDeletion
+from app.utils.storage import get_storage, get_upload_root, storage_key
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_GRACE_PERIOD_SECONDS = 3600
+DEFAULT_BATCH_SIZE = 200
+MAX_DELETE_ATTEMPTS = 5
+
+# Unterverzeichnisse von UPLOAD_FOLDER, deren Inhalt vollständig über DB-Referenzen verwaltet wird
+MANAGED_UPLOAD_DIRS = (
+    'files',
+    'chat',
+    'manuals',
+    os.path.join('inventory', 'product_images'),
+    os.path.join('inventory', 'product_documents'),
+    'wiki',
+    'attachments',
+)
+
+# Erste Pfadkomponente von Altbestand, der relativ zum Arbeitsverzeichnis gespeichert wurde
+LEGACY_RELATIVE_ROOTS = ('uploads', '.', '..')
+
+
+def resolve_blob_path(stored_path: Optional[str], subdir: Optional[str] = None) -> Optional[str]:
+    """
+    Wandelt einen in der Datenbank gespeicherten Pfad in einen absoluten Pfad um.
+
+    Neue Datensätze speichern den Speicherschlüssel relativ zum Upload-Verzeichnis
+    (z.B. 'files/20250101_bericht.docx'). Ältere Datensätze enthalten absolute Pfade,
+    relativ zum Arbeitsverzeichnis gespeicherte Pfade (z.B. 'uploads/attachments/x')
+    oder nur Dateinamen (Chat-Medien, Produktbilder). Reine Dateinamen werden
+    relativ zu `UPLOAD_FOLDER/<subdir>` aufgelöst.
+    """
+    if not stored_path:
+        return None
+    if os.path.isabs(stored_path):
+        return os.path.normpath(stored_path)
+    parts = stored_path.replace('\\', '/').split('/')
+    if len(parts) == 1:
+        if subdir:
+            return os.path.normpath(os.path.join(get_upload_root(), subdir, stored_path))
+        return os.path.abspath(stored_path)
+    if parts[0] in _legacy_relative_roots():
+        return os.path.abspath(stored_path)
+    return os.path.normpath(os.path.join(get_upload_root(), *parts))
+
+
+def _legacy_relative_roots() -> Set[str]:
+    """Präfixe relativer Altbestand-Pfade (inkl. eines relativ konfigurierten UPLOAD_FOLDER)."""
+    roots = set(LEGACY_RELATIVE_ROOTS)
+    folder = current_app.config.get('UPLOAD_FOLDER', 'uploads')
+    if not os.path.isabs(folder):
+        roots.add(folder.replace('\\', '/').split('/')[0])
+    return roots
+
+
+def mark_blob_unreferenced(stored_path: Optional[str], subdir: Optional[str] = None,
+                           source: Optional[str] = None) -> Optional[PendingBlobDeletion]:
+    """
+    Markiert eine Datei zur späteren Löschung.
+
+    Der Eintrag wird der aktuellen Session hinzugefügt und damit zusammen mit dem
+    Löschen des Datensatzes committet – schlägt die Transaktion fehl, bleibt die
+    Datei erhalten.
+    """
+    key = storage_key(stored_path, subdir)
+    if not key:
+        return None
+    entry = PendingBlobDeletion(file_path=key, source=source)
+    db.session.add(entry)
+    return entry
+
+
+def _blob_references():
+    """Alle Spalten, die auf Dateien im Upload-Verzeichnis verweisen, mit ihrem Unterordner."""
+    from app.models.file import File, FileVersion
+    from app.models.chat import Chat, ChatMessage
+    from app.models.manual import Manual
+    from app.models.inventory import Product, ProductDocument
+    from app.models.wiki import WikiPage, WikiPageVersion
+    from app.models.email import EmailAttachment
+
+    return [
+        (File.file_path, None),
+        (FileVersion.file_path, None),
+        (ChatMessage.media_url, 'chat'),
+        (Chat.group_avatar, os.path.join('chat', 'avatars')),
+        (Manual.file_path, 'manuals'),
+        (Product.image_path, os.path.join('inventory', 'product_images')),
+        (ProductDocument.file_path, os.path.join('inventory', 'product_documents')),
+        (WikiPage.file_path, 'wiki'),
+        (WikiPageVersion.file_path, 'wiki'),
+        (EmailAttachment.file_path, 'attachments'),
+    ]
+
+
+def get_referenced_paths() -> Set[str]:
+    """Menge aller absoluten Dateipfade, die aktuell von Datensätzen referenziert werden."""
+    referenced = set()
+    for column, subdir in _blob_references():
+        query = db.session.query(column).filter(column.isnot(None)).execution_options(yield_per=1000)
+        for (stored_path,) in query:
+            path = resolve_blob_path(stored_path, subdir)
+            if path:
+                referenced.add(path)
+    return referenced
+
+
+def _filter_referenced(paths: Iterable[str]) -> Set[str]:
+    """Gibt die Teilmenge der Pfade zurück, die noch (oder wieder) referenziert sind."""
+    paths = set(paths)
+    if not paths:
+        return set()
+
+    # Gespeichert werden Schlüssel, absolute Pfade, relative Pfade oder reine Dateinamen
+    stored_forms = set(paths)
+    stored_forms.update(storage_key(path) for path in paths)
+    stored_forms.update(os.path.basename(path) for path in paths)
+    stored_forms.update(os.path.relpath(path) for path in paths)
+
+    referenced = set()
+    for column, subdir in _blob_references():
+        for (stored_path,) in db.session.query(column).filter(column.in_(stored_forms)).all():
+            path = resolve_blob_path(stored_path, subdir)
+            if path in paths:
+                referenced.add(path)
+    return referenced
+
+
+def collect_pending_blobs(grace_period_seconds: Optional[int] = None,
+                          batch_size: Optional[int] = None) -> Dict[str, int]:
+    """
+    Entfernt markierte Dateien, deren Karenzzeit abgelaufen ist, in Batches.
+
+    Returns:
+        dict: Anzahl gelöschter, wieder referenzierter und fehlgeschlagener Einträge
+    """
+    if grace_period_seconds is None:
+        grace_period_seconds = current_app.config.get('BLOB_GC_GRACE_PERIOD', DEFAULT_GRACE_PERIOD_SECONDS)
+    if batch_size is None:
+        batch_size = current_app.config.get('BLOB_GC_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+
+    cutoff = datetime.utcnow() - timedelta(seconds=grace_period_seconds)
+    stats = {'deleted': 0, 'still_referenced': 0, 'failed': 0}
+    last_id = 0
+
+    while True:
+        batch = PendingBlobDeletion.query.filter(
+            PendingBlobDeletion.id > last_id,
+            PendingBlobDeletion.created_at <= cutoff,
+            PendingBlobDeletion.attempts < MAX_DELETE_ATTEMPTS
+        ).order_by(PendingBlobDeletion.id).limit(batch_size).all()
+        if not batch:
+            break
+        last_id = batch[-1].id
+
+        resolved = {entry.id: resolve_blob_path(entry.file_path) for entry in batch}
+        still_referenced = _filter_referenced(resolved.values())
+        for entry in batch:
+            if resolved[entry.id] in still_referenced:
+                stats['still_referenced'] += 1
+                db.session.delete(entry)
+                continue
+            try:
+                get_storage().delete(storage_key(entry.file_path))
+                stats['deleted'] += 1
+                db.session.delete(entry)
+            except Exception as e:
+                entry.attempts += 1
+                entry.last_error = str(e)
+                stats['failed'] += 1
+                logger.warning(f"Blob konnte nicht gelöscht werden ({entry.file_path}): {e}")
+
+        db.session.commit()
+        if len(batch) < batch_size:
+            break
+
+    if any(stats.values()):
+        logger.info(f"Blob-Collector: {stats}")
+    return stats
+
+
+def reconcile_upload_tree(reclaim: bool = False, min_age_seconds: Optional[int] = None) -> Dict:
+    """
+    Vergleicht den Upload-Baum mit allen Datenbank-Referenzen.
+
+    Dateien, die älter als `min_age_seconds` sind und von keinem Datensatz referenziert
+    werden, gelten als verwaist. Mit `reclaim=True` werden sie zur Löschung markiert
+    (und im nächsten Collector-Lauf entfernt), sonst nur gemeldet.
+
+    Returns:
+        dict: {'scanned': int, 'orphans': [Pfade], 'orphan_bytes': int, 'reclaimed': int}
+    """
+    if min_age_seconds is None:
+        min_age_seconds = current_app.config.get('BLOB_GC_GRACE_PERIOD', DEFAULT_GRACE_PERIOD_SECONDS)
+
+    report = {'scanned': 0, 'orphans': [], 'orphan_bytes': 0, 'reclaimed': 0}
+    if get_storage().name != 'local':
+        # Entfernte Backends verwalten verwaiste Objekte über Lifecycle-Regeln des Buckets
+        logger.info("Upload-Abgleich übersprungen: Storage-Backend ist nicht lokal")
+        return report
+
+    referenced = get_referenced_paths()
+    pending = {resolve_blob_path(row[0]) for row in db.session.query(PendingBlobDeletion.file_path).all()}
+    upload_root = get_upload_root()
+    newest_allowed_mtime = time.time() - min_age_seconds
+
+    for subdir in MANAGED_UPLOAD_DIRS:
+        base = os.path.join(upload_root, subdir)
+        if not os.path.isdir(base):
+            continue
+        for dirpath, _, filenames in os.walk(base):
+            for name in filenames:
+                path = os.path.normpath(os.path.join(dirpath, name))
+                report['scanned'] += 1
+                if path in referenced or path in pending:
+                    continue
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if stat.st_mtime > newest_allowed_mtime:
+                    continue
+                report['orphans'].append(path)
+                report['orphan_bytes'] += stat.st_size
+                if reclaim:
+                    db.session.add(PendingBlobDeletion(file_path=storage_key(path), source='orphan'))
+                    report['reclaimed'] += 1
+
+    if reclaim:
+        db.session.commit()
+
+    logger.info(
+        f"Upload-Abgleich: {report['scanned']} Dateien geprüft, {len(report['orphans'])} verwaist "
+        f"({report['orphan_bytes'] / (1024*1024):.1f} MB), {report['reclaimed']} zur Löschung markiert"
+    )
+    return report
@@ -1,7 +1,7 @@
 """Farbzuordnungs-Logik für Längen in QR-Code-Labels."""
 
 import colorsys
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 from app import db
 from app.models.inventory import Product, LengthColorMapping
 from app.utils.lengths import parse_length_to_meters
@@ -39,6 +39,12 @@ def generate_color_for_index(index: int, total: int) -> str:
     return f"#{r:02X}{g:02X}{b:02X}"
 
 
+def _distinct_lengths_meters() -> List[float]:
+    """Alle vorhandenen Produktlängen in Metern (auf 2 Stellen gerundet, sortiert, ohne Duplikate)."""
+    rows = db.session.query(Product.length_meters).filter(Product.length_meters.isnot(None)).distinct()
+    return sorted({round(meters, 2) for (meters,) in rows})
+
+
 def get_or_create_color_mapping(length_meters: float) -> str:
     """
     Holt die Farbe für eine Länge oder erstellt eine neue Zuordnung.
@@ -63,16 +69,7 @@ def get_or_create_color_mapping(length_meters: float) -> str:
     
     # Erstelle neue Zuordnung
     # Hole alle vorhandenen Längen für Farbverteilung
-    all_lengths = db.session.query(Product.length).distinct().all()
-    all_lengths_meters = []
-    for length_tuple in all_lengths:
-        if length_tuple[0]:
-            meters = parse_length_to_meters(length_tuple[0])
-            if meters is not None:
-                all_lengths_meters.append(round(meters, 2))
-    
-    # Entferne Duplikate und sortiere
-    all_lengths_meters = sorted(set(all_lengths_meters))
+    all_lengths_meters = _distinct_lengths_meters()
     
     # Finde Index der aktuellen Länge
     try:
@@ -178,25 +175,20 @@ def initialize_color_mappings():
     
     try:
         # Hole alle eindeutigen Längen aus der Datenbank
-        all_lengths = db.session.query(Product.length).distinct().all()
-        all_lengths_meters = []
-        
-        for length_tuple in all_lengths:
-            if length_tuple[0]:
-                meters = parse_length_to_meters(length_tuple[0])
-                if meters is not None:
-                    all_lengths_meters.append(round(meters, 2))
+        all_lengths_meters = _distinct_lengths_meters()
         
-        # Entferne Duplikate und sortiere
-        all_lengths_meters = sorted(set(all_lengths_meters))
+        # Vorhandene Zuordnungen mit einer Abfrage laden; meist fehlt keine
+        existing_lengths = {
+            round(meters, 2) for (meters,) in db.session.query(LengthColorMapping.length_meters)
+        }
+        if existing_lengths.issuperset(all_lengths_meters):
+            return
         
         # Verwende no_autoflush, um vorzeitige Flushes zu vermeiden
         with db.session.no_autoflush:
             # Erstelle Zuordnungen für alle Längen
             for index, length_meters in enumerate(all_lengths_meters):
-                # Prüfe ob bereits existiert
-                existing = LengthColorMapping.query.filter_by(length_meters=length_meters).first()
-                if not existing:
+                if length_meters not in existing_lengths:
                     color = generate_color_for_index(index, len(all_lengths_meters))
                     mapping = LengthColorMapping(
                         length_meters=length_meters,
@@ -24,12 +24,10 @@ def get_logo_base64():
         portal_logo_setting = SystemSettings.query.filter_by(key='portal_logo').first()
         if portal_logo_setting and portal_logo_setting.value:
             # Portal-Logo ist in uploads/system/ gespeichert
-            project_root = os.path.dirname(current_app.root_path)
-            logo_path = os.path.join(project_root, current_app.config['UPLOAD_FOLDER'], 'system', portal_logo_setting.value)
-            if os.path.exists(logo_path):
+            from app.utils.storage import read_stored_file, stored_file_exists
+            if stored_file_exists(portal_logo_setting.value, 'system'):
                 try:
-                    with open(logo_path, 'rb') as f:
-                        logo_data = f.read()
+                    logo_data = read_stored_file(portal_logo_setting.value, 'system')
                     # Bestimme MIME-Type basierend auf Dateierweiterung
                     ext = os.path.splitext(portal_logo_setting.value)[1].lower()
                     mime_types = {
@@ -236,8 +234,8 @@ def send_borrow_receipt_email(borrow_transactions):
     """Sendet eine E-Mail mit Ausleihschein-PDF nach erfolgreicher Ausleihe."""
     try:
         from app.models.inventory import BorrowTransaction, Product
-        from app.utils.pdf_generator import generate_borrow_receipt_pdf
-        from io import BytesIO
+        from app.utils.pdf_generator import borrow_receipt_document
+        from app.tasks.pdf_jobs import submit_pdf_job
         
         # Normalisiere zu Liste
         if not isinstance(borrow_transactions, list):
@@ -301,23 +299,22 @@ def send_borrow_receipt_email(borrow_transactions):
         
         msg.html = html_content
         
-        # PDF-Anhang generieren
-        pdf_buffer = BytesIO()
-        generate_borrow_receipt_pdf(borrow_transactions, pdf_buffer)
-        pdf_buffer.seek(0)
-        
-        # PDF als Anhang hinzufügen
+        # PDF-Anhang wird im Hintergrund gesetzt, die E-Mail danach versendet
         filename = f"Ausleihschein_{first_transaction.transaction_number}.pdf"
-        msg.attach(filename, "application/pdf", pdf_buffer.read())
+        recipient = borrower.email
+        transaction_number = first_transaction.transaction_number
         
-        # E-Mail senden
-        try:
-            mail.send(msg)
-            logging.info(f"Borrow receipt email sent to {borrower.email} for transaction {first_transaction.transaction_number}")
-            return True
-        except Exception as send_error:
-            logging.error(f"Failed to send borrow receipt email to {borrower.email}: {str(send_error)}")
-            return False
+        def send_with_receipt(pdf_bytes):
+            msg.attach(filename, "application/pdf", pdf_bytes)
+            try:
+                mail.send(msg)
+                logging.info(f"Borrow receipt email sent to {recipient} for transaction {transaction_number}")
+            except Exception as send_error:
+                logging.error(f"Failed to send borrow receipt email to {recipient}: {str(send_error)}")
+        
+        submit_pdf_job(current_app._get_current_object(), 'borrow_receipts',
+                       borrow_receipt_document(borrow_transactions), filename, on_done=send_with_receipt)
+        return True
         
     except Exception as e:
         logging.error(f"Failed to send borrow receipt email: {str(e)}")
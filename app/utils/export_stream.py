@@ -0,0 +1,49 @@
+"""
+Gestreamte Exporte großer Tabellen
+
+Exporte (Backup, Inventurliste, iCal-Export) lesen ihre Datensätze nicht als
+vollständige ORM-Objekte, sondern als Spalten-Tupel einer `select()`-Abfrage, die
+über einen serverseitigen Cursor (`stream_results`) blockweise (`yield_per`)
+abgerufen und Zeile für Zeile weiterverarbeitet werden. Verweise auf andere
+Tabellen (z.B. die E-Mail-Adresse des Erstellers) werden per JOIN in derselben
+Abfrage aufgelöst statt pro Zeile nachgeladen.
+
+Die Abfrage läuft auf einer eigenen Verbindung aus dem Pool: Unter MySQL belegt ein
+offener ungepufferter Cursor seine Verbindung, weitere Abfragen über
+`db.session` bleiben so während der Iteration möglich. Die Verbindung sieht nur
+bereits committete Daten.
+"""
+
+from datetime import date
+from typing import Any, Dict, Iterator, Optional
+
+from sqlalchemy.engine import Row
+
+from app import db
+
+# Zeilen pro Abruf vom serverseitigen Cursor
+STREAM_BATCH_SIZE = 1000
+
+
+def stream_rows(statement, batch_size: int = STREAM_BATCH_SIZE) -> Iterator[Row]:
+    """Zeilen einer Abfrage, blockweise über einen serverseitigen Cursor gelesen.
+
+    Spalten sind über ihren Namen bzw. ihr Label als Attribut ansprechbar
+    (`row.name`), sodass Zeilen an Stellen verwendet werden können, die bisher
+    ORM-Objekte mit denselben Attributen erhielten.
+    """
+    with db.engine.connect() as connection:
+        result = connection.execution_options(stream_results=True, yield_per=batch_size).execute(statement)
+        yield from result
+
+
+def stream_dicts(statement, batch_size: int = STREAM_BATCH_SIZE) -> Iterator[Dict[str, Any]]:
+    """Zeilen einer Abfrage als Dicts (Label -> Wert), Datumswerte im ISO-Format."""
+    for row in stream_rows(statement, batch_size):
+        yield {key: isoformat(value) if isinstance(value, date) else value
+               for key, value in row._mapping.items()}
+
+
+def isoformat(value: Optional[date]) -> Optional[str]:
+    """ISO-Darstellung eines Datums bzw. Zeitpunkts (None bleibt None)."""
+    return value.isoformat() if value else None
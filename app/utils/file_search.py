@@ -0,0 +1,388 @@
+"""
+Volltextsuche für das Dateimodul.
+
+Indexiert werden Dateiname, Ordnerpfad und der extrahierte Text der aktuellen
+Version (PDF, DOCX, XLSX, PPTX, Markdown, TXT und weitere Textformate). Die
+Daten liegen in `file_search_documents`; je nach Datenbank wird darüber ein
+FTS5-Index (SQLite) oder ein FULLTEXT-Index (MySQL/MariaDB) gepflegt. Andere
+Datenbanken fallen auf eine LIKE-Suche zurück.
+"""
+
+import html
+import logging
+import os
+import re
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from flask import current_app
+from sqlalchemy import bindparam, inspect, text
+
+from app import db
+from app.models.file import File, Folder, FileSearchDocument
+from app.utils.storage import get_storage, storage_key, stored_file_exists
+
+logger = logging.getLogger(__name__)
+
+try:
+    from pypdf import PdfReader
+    PDF_AVAILABLE = True
+except ImportError:
+    PDF_AVAILABLE = False
+
+FTS_TABLE = 'file_search_fts'
+FULLTEXT_INDEX = 'ft_file_search_documents'
+DEFAULT_MAX_CONTENT_CHARS = 1_000_000
+SNIPPET_RADIUS = 80
+
+TEXT_EXTENSIONS = {'.txt', '.md', '.markdown', '.json', '.xml', '.csv', '.log'}
+OFFICE_EXTENSIONS = {'.docx', '.xlsx', '.pptx'}
+
+_backend = None
+
+
+def _get_backend() -> str:
+    """Ermittelt die Suchimplementierung: 'fts5', 'fulltext' oder 'like'."""
+    global _backend
+    if _backend is None:
+        dialect = db.engine.dialect.name
+        if dialect == 'sqlite':
+            _backend = 'fts5'
+        elif dialect in ('mysql', 'mariadb'):
+            _backend = 'fulltext'
+        else:
+            _backend = 'like'
+    return _backend
+
+
+def ensure_search_index():
+    """Legt den datenbankspezifischen Volltextindex an, falls er fehlt."""
+    global _backend
+    backend = _get_backend()
+    try:
+        if backend == 'fts5':
+            with db.engine.begin() as conn:
+                conn.execute(text(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+                    "USING fts5(name, folder_path, content, tokenize='unicode61 remove_diacritics 2')"
+                ))
+        elif backend == 'fulltext':
+            inspector = inspect(db.engine)
+            existing = {idx['name'] for idx in inspector.get_indexes(FileSearchDocument.__tablename__)}
+            if FULLTEXT_INDEX not in existing:
+                with db.engine.begin() as conn:
+                    conn.execute(text(
+                        f"ALTER TABLE {FileSearchDocument.__tablename__} "
+                        f"ADD FULLTEXT INDEX {FULLTEXT_INDEX} (name, folder_path, content)"
+                    ))
+    except Exception as e:
+        logger.warning(f"Volltextindex konnte nicht angelegt werden, verwende LIKE-Suche: {e}")
+        _backend = 'like'
+
+
+# =========================
+# Textextraktion
+# =========================
+
+def extract_text(file_path: str, filename: str, max_chars: Optional[int] = None) -> str:
+    """Extrahiert durchsuchbaren Text aus einer Datei (leer bei nicht unterstützten Formaten)."""
+    if max_chars is None:
+        max_chars = current_app.config.get('FILE_SEARCH_MAX_CONTENT_CHARS', DEFAULT_MAX_CONTENT_CHARS)
+    if not stored_file_exists(file_path):
+        return ''
+
+    try:
+        # Entfernte Backends laden die Datei dafür in eine temporäre Datei
+        with get_storage().local_file(storage_key(file_path)) as local_path:
+            return _extract_local_text(local_path, filename, max_chars)
+    except Exception as e:
+        logger.warning(f"Text konnte nicht aus {filename} extrahiert werden: {e}")
+        return ''
+
+
+def _extract_local_text(file_path: str, filename: str, max_chars: int) -> str:
+    ext = os.path.splitext(filename)[1].lower()
+    parts = []
+    length = 0
+
+    def add(value):
+        nonlocal length
+        if value is None:
+            return True
+        value = str(value).strip()
+        if value:
+            parts.append(value)
+            length += len(value) + 1
+        return length < max_chars
+
+    try:
+        if ext in TEXT_EXTENSIONS:
+            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+                return f.read(max_chars)
+
+        if ext == '.docx':
+            from docx import Document
+            document = Document(file_path)
+            for paragraph in document.paragraphs:
+                if not add(paragraph.text):
+                    break
+            for table in document.tables:
+                for row in table.rows:
+                    for cell in row.cells:
+                        add(cell.text)
+
+        elif ext == '.xlsx':
+            from openpyxl import load_workbook
+            workbook = load_workbook(file_path, read_only=True, data_only=True)
+            try:
+                for sheet in workbook.worksheets:
+                    add(sheet.title)
+                    for row in sheet.iter_rows(values_only=True):
+                        if not add(' '.join(str(value) for value in row if value is not None)):
+                            break
+                    if length >= max_chars:
+                        break
+            finally:
+                workbook.close()
+
+        elif ext == '.pptx':
+            from pptx import Presentation
+            presentation = Presentation(file_path)
+            for slide in presentation.slides:
+                for shape in slide.shapes:
+                    if shape.has_text_frame and not add(shape.text_frame.text):
+                        break
+
+        elif ext == '.pdf' and PDF_AVAILABLE:
+            reader = PdfReader(file_path)
+            for page in reader.pages:
+                if not add(page.extract_text()):
+                    break
+    except Exception as e:
+        logger.warning(f"Text konnte nicht aus {filename} extrahiert werden: {e}")
+
+    return '\n'.join(parts)[:max_chars]
+
+
+# =========================
+# Indexpflege
+# =========================
+
+def _folder_paths(folder_ids: Iterable[int]) -> Dict[int, str]:
+    """Löst Ordnerpfade (Namen) für mehrere Ordner mit einer Abfrage auf."""
+    folders = Folder.query.filter(Folder.id.in_(set(folder_ids))).all()
+    ancestor_ids = set()
+    for folder in folders:
+        ancestor_ids.update(folder.ancestor_ids or [folder.id])
+    names = dict(db.session.query(Folder.id, Folder.name).filter(Folder.id.in_(ancestor_ids)).all())
+    return {
+        folder.id: '/'.join(names.get(ancestor_id, '') for ancestor_id in (folder.ancestor_ids or [folder.id]))
+        for folder in folders
+    }
+
+
+def _write_fts_row(conn, document: FileSearchDocument):
+    backend = _get_backend()
+    if backend != 'fts5':
+        return
+    conn.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :id"), {'id': document.file_id})
+    conn.execute(
+        text(f"INSERT INTO {FTS_TABLE}(rowid, name, folder_path, content) VALUES (:id, :name, :folder_path, :content)"),
+        {'id': document.file_id, 'name': document.name, 'folder_path': document.folder_path or '',
+         'content': document.content or ''}
+    )
+
+
+def index_files(file_ids: Iterable[int], refresh_content: bool = True) -> int:
+    """
+    Aktualisiert die Suchdokumente der angegebenen Dateien.
+
+    Bei `refresh_content=False` werden nur Name und Ordnerpfad neu geschrieben
+    (z.B. nach Umbenennen oder Verschieben), der extrahierte Text bleibt erhalten.
+    """
+    file_ids = list(set(file_ids))
+    if not file_ids:
+        return 0
+
+    files = File.query.filter(File.id.in_(file_ids), File.is_current == True).all()
+    found_ids = {file.id for file in files}
+    remove_files_from_index(set(file_ids) - found_ids, commit=False)
+
+    paths = _folder_paths(file.folder_id for file in files if file.folder_id)
+    documents = {doc.file_id: doc for doc in FileSearchDocument.query.filter(FileSearchDocument.file_id.in_(found_ids)).all()}
+
+    for file in files:
+        document = documents.get(file.id)
+        if document is None:
+            document = FileSearchDocument(file_id=file.id)
+            db.session.add(document)
+            refresh = True
+        else:
+            refresh = refresh_content or document.version_number != file.version_number
+
+        document.name = file.name
+        document.folder_path = paths.get(file.folder_id, '')
+        if refresh:
+            document.content = extract_text(file.file_path, file.original_name)
+            document.version_number = file.version_number
+        document.indexed_at = datetime.utcnow()
+        db.session.flush()
+        _write_fts_row(db.session.connection(), document)
+
+    db.session.commit()
+    return len(files)
+
+
+def remove_files_from_index(file_ids: Iterable[int], commit: bool = True):
+    """Entfernt Dateien aus dem Suchindex."""
+    file_ids = list(set(file_ids))
+    if not file_ids:
+        return
+    FileSearchDocument.query.filter(FileSearchDocument.file_id.in_(file_ids)).delete(synchronize_session=False)
+    if _get_backend() == 'fts5':
+        db.session.execute(
+            text(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({','.join(str(int(i)) for i in file_ids)})")
+        )
+    if commit:
+        db.session.commit()
+
+
+def find_unindexed_file_ids(limit: int = 500) -> List[int]:
+    """IDs aktueller Dateien ohne oder mit veraltetem Suchdokument."""
+    rows = db.session.query(File.id).outerjoin(
+        FileSearchDocument, FileSearchDocument.file_id == File.id
+    ).filter(
+        File.is_current == True,
+        db.or_(
+            FileSearchDocument.file_id.is_(None),
+            FileSearchDocument.version_number != File.version_number
+        )
+    ).limit(limit).all()
+    return [row[0] for row in rows]
+
+
+# =========================
+# Suche
+# =========================
+
+def _terms(query: str) -> List[str]:
+    return [term for term in re.findall(r'\w+', query.lower(), flags=re.UNICODE) if term][:10]
+
+
+def _make_snippet(content: Optional[str], terms: List[str]) -> str:
+    """Erzeugt einen HTML-Ausschnitt um den ersten Treffer (Treffer in <mark>)."""
+    if not content:
+        return ''
+    lowered = content.lower()
+    positions = [lowered.find(term) for term in terms if lowered.find(term) >= 0]
+    start = max(min(positions) - SNIPPET_RADIUS, 0) if positions else 0
+    excerpt = ' '.join(content[start:start + 2 * SNIPPET_RADIUS].split())
+    pattern = re.compile('(' + '|'.join(re.escape(term) for term in terms) + ')', re.IGNORECASE)
+    snippet = ''.join(
+        f'<mark>{html.escape(part)}</mark>' if i % 2 else html.escape(part)
+        for i, part in enumerate(pattern.split(excerpt))
+    )
+    prefix = '… ' if start > 0 else ''
+    suffix = ' …' if start + 2 * SNIPPET_RADIUS < len(content) else ''
+    return f'{prefix}{snippet}{suffix}'
+
+
+def search_files(query: str, folder_ids: Optional[Iterable[int]] = None, limit: int = 50) -> List[Dict]:
+    """
+    Durchsucht Dateinamen, Ordnerpfade und Dateiinhalte.
+
+    Args:
+        query: Suchbegriff(e); alle Begriffe müssen (als Präfix) vorkommen
+        folder_ids: Schränkt die Suche auf diese Ordner ein (z.B. Teilbaum eines
+            Ordners oder der Inhalt einer öffentlichen Ordnerfreigabe)
+        limit: Maximale Trefferanzahl
+
+    Returns:
+        Liste von Dicts mit 'file', 'folder_path', 'snippet' und 'score', bestes Ergebnis zuerst
+    """
+    terms = _terms(query)
+    if not terms:
+        return []
+
+    backend = _get_backend()
+    scope_sql = ''
+    params = {'limit': limit, 'is_current': True}
+    if folder_ids is not None:
+        folder_ids = list(folder_ids)
+        if not folder_ids:
+            return []
+        scope_sql = "AND f.folder_id IN :folder_ids"
+        params['folder_ids'] = folder_ids
+
+    if backend == 'fts5':
+        params['match'] = ' '.join('"' + term.replace('"', '""') + '"*' for term in terms)
+        sql = f"""
+            SELECT f.id AS file_id,
+                   bm25({FTS_TABLE}, 10.0, 4.0, 1.0) AS score,
+                   snippet({FTS_TABLE}, 2, '\x02', '\x03', '…', 16) AS snippet
+            FROM {FTS_TABLE}
+            JOIN files f ON f.id = {FTS_TABLE}.rowid
+            WHERE {FTS_TABLE} MATCH :match AND f.is_current = :is_current {scope_sql}
+            ORDER BY score
+            LIMIT :limit
+        """
+    elif backend == 'fulltext':
+        params['match'] = ' '.join(f'+{term}*' for term in terms)
+        sql = f"""
+            SELECT f.id AS file_id,
+                   MATCH(d.name, d.folder_path, d.content) AGAINST (:match IN BOOLEAN MODE) AS score,
+                   NULL AS snippet
+            FROM file_search_documents d
+            JOIN files f ON f.id = d.file_id
+            WHERE MATCH(d.name, d.folder_path, d.content) AGAINST (:match IN BOOLEAN MODE)
+              AND f.is_current = :is_current {scope_sql}
+            ORDER BY score DESC
+            LIMIT :limit
+        """
+    else:
+        conditions = []
+        for i, term in enumerate(terms):
+            params[f'term{i}'] = f'%{term}%'
+            conditions.append(
+                f"(LOWER(d.name) LIKE :term{i} OR LOWER(d.folder_path) LIKE :term{i} OR LOWER(d.content) LIKE :term{i})"
+            )
+        sql = f"""
+            SELECT f.id AS file_id, 0 AS score, NULL AS snippet
+            FROM file_search_documents d
+            JOIN files f ON f.id = d.file_id
+            WHERE {' AND '.join(conditions)} AND f.is_current = :is_current {scope_sql}
+            ORDER BY f.updated_at DESC
+            LIMIT :limit
+        """
+
+    statement = text(sql)
+    if folder_ids is not None:
+        statement = statement.bindparams(bindparam('folder_ids', expanding=True))
+    rows = db.session.execute(statement, params).fetchall()
+    if not rows:
+        return []
+
+    ids = [row.file_id for row in rows]
+    files = {file.id: file for file in File.query.filter(File.id.in_(ids)).all()}
+    documents = {
+        doc.file_id: doc for doc in
+        FileSearchDocument.query.filter(FileSearchDocument.file_id.in_(ids)).all()
+    }
+
+    results = []
+    for row in rows:
+        file = files.get(row.file_id)
+        if file is None:
+            continue
+        document = documents.get(row.file_id)
+        if row.snippet:
+            snippet = html.escape(row.snippet).replace('\x02', '<mark>').replace('\x03', '</mark>')
+        else:
+            snippet = _make_snippet(document.content if document else '', terms)
+        results.append({
+            'file': file,
+            'folder_path': document.folder_path if document else '',
+            'snippet': snippet,
+            'score': float(row.score or 0),
+        })
+    return results
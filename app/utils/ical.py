@@ -5,9 +5,13 @@ iCal Import/Export Utility Functions
 from icalendar import Calendar, Event as ICalEvent
 from datetime import datetime, timedelta
 from dateutil.relativedelta import relativedelta
+from typing import Iterator
+from sqlalchemy import and_, select
 from app.models.calendar import CalendarEvent
 from pytz import UTC
 
+_CALENDAR_END = b'END:VCALENDAR\r\n'
+
 
 def export_event_to_ical(event: CalendarEvent) -> ICalEvent:
     """
@@ -100,6 +104,20 @@ def generate_ical_feed(events, feed_name='Kalender') -> str:
     Returns:
         iCal-String
     """
+    return b''.join(generate_ical_stream(events, feed_name)).decode('utf-8')
+
+
+def generate_ical_stream(events, feed_name='Kalender') -> Iterator[bytes]:
+    """
+    Generiert einen iCal-Feed stückweise (Kopf, ein Block je Event, Abschluss).
+    
+    Args:
+        events: CalendarEvent-Objekte oder Zeilen aus `ical_event_query()`
+        feed_name: Name des Kalenders
+    
+    Returns:
+        Iterator über die Bytes des Feeds
+    """
     cal = Calendar()
     cal.add('prodid', '-//Prismateams//Kalender//DE')
     cal.add('version', '2.0')
@@ -107,11 +125,27 @@ def generate_ical_feed(events, feed_name='Kalender') -> str:
     cal.add('X-WR-CALNAME', feed_name)
     cal.add('X-WR-TIMEZONE', 'Europe/Berlin')
     
+    yield cal.to_ical()[:-len(_CALENDAR_END)]
     for event in events:
-        ical_event = export_event_to_ical(event)
-        cal.add_component(ical_event)
+        yield export_event_to_ical(event).to_ical()
+    yield _CALENDAR_END
+
+
+def ical_event_query():
+    """
+    Abfrage der für den iCal-Export benötigten Spalten aller Termine (ohne Instanzen).
     
-    return cal.to_ical().decode('utf-8')
+    Die Zeilen (z.B. über `app.utils.export_stream.stream_rows`) haben dieselben
+    Attribute wie CalendarEvent-Objekte, soweit `export_event_to_ical` sie verwendet.
+    """
+    return select(
+        CalendarEvent.id, CalendarEvent.title, CalendarEvent.description, CalendarEvent.location,
+        CalendarEvent.start_time, CalendarEvent.end_time, CalendarEvent.created_at, CalendarEvent.updated_at,
+        CalendarEvent.recurrence_type, CalendarEvent.recurrence_interval, CalendarEvent.recurrence_days,
+        CalendarEvent.recurrence_end_date,
+        and_(CalendarEvent.recurrence_type != 'none',
+             CalendarEvent.is_recurring_instance == False).label('is_master_event')  # noqa: E712
+    ).where(CalendarEvent.is_recurring_instance == False).order_by(CalendarEvent.start_time)  # noqa: E712
 
 
 def import_events_from_ical(ical_data: str, user_id: int):
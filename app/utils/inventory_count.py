@@ -0,0 +1,332 @@
+"""
+Inventur-Zählung: Anlegen der Inventur-Items, gepuffertes Abhaken per Scan und
+Live-Ereignisse für alle Zählenden
+
+Beim Start einer Inventur werden die Items aller Produkte mit einem einzigen
+INSERT ... SELECT angelegt, ohne Produkte in die Session zu laden.
+
+Scans werden über eine Zuordnung Produkt-ID -> Item-ID je Inventur aufgelöst, die
+pro Prozess einmal mit einer Abfrage geladen wird (die Items einer Inventur
+ändern sich nach dem Start nicht). Das Abhaken wird nicht sofort committet,
+sondern gesammelt und alle INVENTORY_SCAN_FLUSH_INTERVAL Millisekunden
+geschrieben. Routen, die Items derselben Inventur lesen oder ändern, schreiben
+die ausstehenden Scans ihres Prozesses vorher weg.
+
+Jede Änderung eines Items zählt den Fortschritt der Inventur (`items_checked`)
+und die Ereignisnummer (`event_seq`) in derselben Transaktion hoch und wird
+danach als kleines Delta an den Socket.IO-Raum der Inventur gesendet. Clients
+laden einmal einen kompakten Snapshot und erkennen verpasste Ereignisse an
+Lücken in den Nummern.
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import false, func, insert, literal, select, update
+
+from app import db
+from app.models.inventory import Inventory, InventoryItem, Product
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FLUSH_INTERVAL = 250
+# Gültigkeit einer geladenen Zuordnung in Sekunden (z.B. nach einem Backup-Import)
+INDEX_TTL = 300
+# Höchstens so viele Inventuren gleichzeitig im Speicher
+MAX_INDEXES = 4
+
+# Spalten des Snapshots (Reihenfolge der Werte in jeder Zeile)
+SNAPSHOT_COLUMNS = (
+    'id', 'product_id', 'product_name', 'product_category', 'product_location', 'product_condition',
+    'checked', 'checked_by', 'checked_at', 'notes', 'location_changed', 'new_location',
+    'condition_changed', 'new_condition',
+)
+
+
+def inventory_room(inventory_id: int) -> str:
+    return f'inventory_{inventory_id}'
+
+
+def create_inventory_items(inventory_id: int) -> int:
+    """Legt für alle Produkte ein Item der Inventur an (eine Anweisung); gibt die Anzahl zurück."""
+    now = datetime.utcnow()
+    rows = select(
+        literal(inventory_id), Product.id, false(), false(), false(), literal(now), literal(now)
+    )
+    statement = insert(InventoryItem).from_select(
+        ['inventory_id', 'product_id', 'checked', 'location_changed', 'condition_changed',
+         'created_at', 'updated_at'],
+        rows,
+    )
+    return db.session.execute(statement).rowcount
+
+
+def recount_inventory_progress(inventory_ids: Optional[Iterable[int]] = None) -> int:
+    """Berechnet die Fortschrittszähler aus den Items neu (Migration, Backup-Import)."""
+    items = InventoryItem.__table__
+    total = (select(func.count()).select_from(items)
+             .where(items.c.inventory_id == Inventory.id).scalar_subquery())
+    checked = (select(func.count()).select_from(items)
+               .where(items.c.inventory_id == Inventory.id, items.c.checked.is_(True)).scalar_subquery())
+    statement = update(Inventory).values(items_total=total, items_checked=checked)
+    if inventory_ids is not None:
+        inventory_ids = list(inventory_ids)
+        if not inventory_ids:
+            return 0
+        statement = statement.where(Inventory.id.in_(inventory_ids))
+    return db.session.execute(statement).rowcount
+
+
+def apply_item_changes(connection, inventory_id: int, changes: List[Dict]) -> Tuple[List[Dict], Optional[Dict]]:
+    """
+    Schreibt den Abhak-Status von Items und zählt Fortschritt und Ereignisnummer hoch.
+
+    Jede Änderung enthält `item_id`, `product_id`, `checked`, `by` und `at`, optional
+    `fields` (weitere geänderte Felder, werden bereits vom Aufrufer geschrieben). Der
+    Status wird nur geschrieben, wenn er sich ändert (bedingtes UPDATE je Item), sodass
+    parallele Scans desselben Produkts nur einmal zählen. Ein Ereignis entsteht für
+    jede Statusänderung und jede Änderung mit `fields`.
+
+    Returns:
+        (Ereignisse mit `seq`, Fortschritt) bzw. ([], None), wenn sich nichts geändert hat
+    """
+    events = []
+    delta = 0
+    for change in changes:
+        checked = bool(change['checked'])
+        result = connection.execute(
+            update(InventoryItem)
+            .where(InventoryItem.id == change['item_id'], InventoryItem.checked.is_(not checked))
+            .values(checked=checked,
+                    checked_by=change['by'] if checked else None,
+                    checked_at=change['at'] if checked else None,
+                    updated_at=change['at'])
+        )
+        if result.rowcount:
+            delta += 1 if checked else -1
+        elif not change.get('fields'):
+            continue
+        event = {
+            'item_id': change['item_id'],
+            'product_id': change['product_id'],
+            'checked': checked,
+            'by': change['by'] if checked else None,
+            'at': change['at'].isoformat() if checked and change['at'] else None,
+        }
+        if result.rowcount == 0 and checked:
+            # Bereits abgehakt: ursprünglichen Zählenden behalten
+            event.pop('by')
+            event.pop('at')
+        event.update(change.get('fields') or {})
+        events.append(event)
+
+    if not events:
+        return [], None
+    connection.execute(
+        update(Inventory).where(Inventory.id == inventory_id)
+        .values(items_checked=Inventory.items_checked + delta, event_seq=Inventory.event_seq + len(events))
+    )
+    seq, checked_count, total_count = connection.execute(
+        select(Inventory.event_seq, Inventory.items_checked, Inventory.items_total)
+        .where(Inventory.id == inventory_id)
+    ).one()
+    first_seq = seq - len(events) + 1
+    for offset, event in enumerate(events):
+        event['seq'] = first_seq + offset
+    return events, {'seq': seq, 'checked_count': checked_count, 'total_count': total_count}
+
+
+def publish_inventory_events(inventory_id: int, events: List[Dict], progress: Optional[Dict]):
+    """Sendet Ereignisse (nach dem Commit) an alle Clients der Inventur."""
+    if not events:
+        return
+    try:
+        from app import socketio
+        payload = dict(progress or {}, inventory_id=inventory_id, events=events)
+        socketio.emit('inventory:events', payload, room=inventory_room(inventory_id))
+    except Exception as e:
+        logger.debug(f"Inventur-Ereignisse konnten nicht gesendet werden: {e}")
+
+
+def publish_inventory_status(inventory_id: int, status: str):
+    """Meldet eine Statusänderung (z.B. Abschluss) an alle Clients der Inventur."""
+    try:
+        from app import socketio
+        socketio.emit('inventory:status', {'inventory_id': inventory_id, 'status': status},
+                      room=inventory_room(inventory_id))
+    except Exception as e:
+        logger.debug(f"Inventur-Status konnte nicht gesendet werden: {e}")
+
+
+def inventory_snapshot(inventory: Inventory) -> Dict:
+    """Kompakter Stand einer Inventur: Fortschritt, Ereignisnummer und Items als Wertelisten."""
+    flush_inventory_checks(inventory.id)
+    # Nummer vor den Items lesen: spätere Ereignisse setzen absolute Werte und
+    # dürfen vom Client erneut angewendet werden
+    seq, checked_count, total_count = db.session.execute(
+        select(Inventory.event_seq, Inventory.items_checked, Inventory.items_total)
+        .where(Inventory.id == inventory.id)
+    ).one()
+    rows = db.session.execute(
+        select(InventoryItem.id, InventoryItem.product_id, Product.name, Product.category,
+               Product.location, Product.condition, InventoryItem.checked, InventoryItem.checked_by,
+               InventoryItem.checked_at, InventoryItem.notes, InventoryItem.location_changed,
+               InventoryItem.new_location, InventoryItem.condition_changed, InventoryItem.new_condition)
+        .join(Product, Product.id == InventoryItem.product_id)
+        .where(InventoryItem.inventory_id == inventory.id)
+    )
+    items = []
+    for row in rows:
+        row = list(row)
+        row[8] = row[8].isoformat() if row[8] else None
+        items.append(row)
+    return {
+        'inventory': {
+            'id': inventory.id,
+            'name': inventory.name,
+            'status': inventory.status,
+            'seq': seq,
+            'checked_count': checked_count,
+            'total_count': total_count,
+        },
+        'columns': SNAPSHOT_COLUMNS,
+        'items': items,
+    }
+
+
+class _ScanIndex:
+    """Threadsicherer Speicher: Inventur-ID -> (Ladezeitpunkt, {Produkt-ID: Item-ID})."""
+
+    def __init__(self):
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def item_id(self, inventory_id: int, product_id: int) -> Optional[int]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._indexes.get(inventory_id)
+        if entry is None or now - entry[0] > INDEX_TTL:
+            rows = db.session.execute(
+                select(InventoryItem.product_id, InventoryItem.id)
+                .where(InventoryItem.inventory_id == inventory_id)
+            )
+            entry = (now, {product: item for product, item in rows})
+            with self._lock:
+                self._indexes[inventory_id] = entry
+                while len(self._indexes) > MAX_INDEXES:
+                    oldest = min(self._indexes, key=lambda key: self._indexes[key][0])
+                    del self._indexes[oldest]
+        return entry[1].get(product_id)
+
+    def forget(self, inventory_id: int):
+        with self._lock:
+            self._indexes.pop(inventory_id, None)
+
+
+class _CheckBuffer:
+    """Ausstehende Scans: Item-ID -> (Inventur-ID, Produkt-ID, Benutzer-ID, Zeitpunkt)."""
+
+    def __init__(self):
+        self._pending: Dict[int, tuple] = {}
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._app = None
+
+    def add(self, inventory_id: int, product_id: int, item_id: int, user_id: int, checked_at: datetime):
+        with self._lock:
+            # Erster Scan zählt, bis er geschrieben ist
+            self._pending.setdefault(item_id, (inventory_id, product_id, user_id, checked_at))
+            if self._thread is None or not self._thread.is_alive():
+                self._app = current_app._get_current_object()
+                self._thread = threading.Thread(target=self._run, name='inventory-scan-flush', daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+
+    def _take(self, inventory_id: Optional[int]):
+        with self._lock:
+            if inventory_id is None:
+                taken, self._pending = self._pending, {}
+            else:
+                taken = {item_id: entry for item_id, entry in self._pending.items() if entry[0] == inventory_id}
+                for item_id in taken:
+                    del self._pending[item_id]
+            return taken
+
+    def flush(self, inventory_id: Optional[int] = None):
+        """Schreibt ausstehende Scans (einer oder aller Inventuren), je Inventur eine Transaktion."""
+        # Serialisiert mit dem Hintergrund-Thread, damit ein bereits entnommener
+        # Block geschrieben ist, bevor der Aufrufer Items liest oder ändert
+        with self._write_lock:
+            taken = self._take(inventory_id)
+            by_inventory: Dict[int, List[Dict]] = {}
+            for item_id, (entry_inventory_id, product_id, user_id, checked_at) in taken.items():
+                by_inventory.setdefault(entry_inventory_id, []).append({
+                    'item_id': item_id, 'product_id': product_id, 'checked': True,
+                    'by': user_id, 'at': checked_at,
+                })
+            for entry_inventory_id, changes in by_inventory.items():
+                try:
+                    with db.engine.begin() as connection:
+                        events, progress = apply_item_changes(connection, entry_inventory_id, changes)
+                except Exception:
+                    # Zurücklegen, sofern das Item nicht inzwischen erneut gescannt wurde
+                    with self._lock:
+                        for change in changes:
+                            self._pending.setdefault(change['item_id'], (
+                                entry_inventory_id, change['product_id'], change['by'], change['at']))
+                    raise
+                publish_inventory_events(entry_inventory_id, events, progress)
+
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            with self._app.app_context():
+                time.sleep(_flush_interval() / 1000)
+                try:
+                    self.flush()
+                except Exception as e:
+                    logger.error(f"Fehler beim Schreiben der Inventur-Scans: {e}")
+                    time.sleep(1)
+                    self._wakeup.set()
+
+
+_index = _ScanIndex()
+_buffer = _CheckBuffer()
+
+
+def _flush_interval() -> int:
+    try:
+        return current_app.config.get('INVENTORY_SCAN_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL)
+    except RuntimeError:
+        return DEFAULT_FLUSH_INTERVAL
+
+
+def find_inventory_item_id(inventory_id: int, product_id: int) -> Optional[int]:
+    """Item-ID eines Produkts in der Inventur (None, falls nicht enthalten)."""
+    return _index.item_id(inventory_id, product_id)
+
+
+def queue_inventory_check(inventory_id: int, product_id: int, item_id: int, user_id: int) -> datetime:
+    """Hakt ein Item ab; geschrieben wird gesammelt im Hintergrund (bei Intervall 0 sofort)."""
+    checked_at = datetime.utcnow()
+    _buffer.add(inventory_id, product_id, item_id, user_id, checked_at)
+    if _flush_interval() <= 0:
+        _buffer.flush(inventory_id)
+    return checked_at
+
+
+def flush_inventory_checks(inventory_id: Optional[int] = None):
+    """Schreibt die ausstehenden Scans dieses Prozesses (vor dem Lesen/Ändern von Items)."""
+    _buffer.flush(inventory_id)
+
+
+def forget_inventory(inventory_id: int):
+    """Verwirft die Zuordnung einer abgeschlossenen Inventur."""
+    _index.forget(inventory_id)
@@ -0,0 +1,511 @@
+"""
+Materialisierte Ausleihstatistik für das Inventar.
+
+`inventory_daily_stats` enthält pro Tag und Produkt die Zahl der Ausleihen, der
+Rückgaben und der an diesem Tag überfällig gewordenen Ausleihen (Rückgabedatum
+am Vortag verstrichen, bis dahin nicht zurückgegeben), dazu je Tag eine
+Summenzeile (`product_id` 0) für die Zeitreihen. Die Zeilen werden wie die
+Speicherverbrauchs-Zähler im selben Transaktionskontext wie die Änderung
+fortgeschrieben: Mapper-Events auf `BorrowTransaction` sammeln die Beiträge der
+geänderten Ausleihen, `after_flush` schreibt sie gebündelt per Upsert.
+Bulk-Importe melden ihre Zeilen über `track_bulk_transactions`.
+
+Ob eine Ausleihe überfällig wird, hängt vom Datum ab und nicht von einer
+Änderung. Der tägliche Abschluss (`close_inventory_stats`) berechnet deshalb alle
+Tage seit dem letzten Abschluss aus `borrow_transactions` neu und merkt sich den
+letzten abgeschlossenen Tag in `system_settings`. Beim ersten Lauf werden so alle
+bisherigen Ausleihen übernommen.
+
+Die Statistik-Endpunkte lesen abgeschlossene Tage aus den Rollups und berechnen
+nur die offenen Tage (normalerweise nur heute) live über die indizierten
+Datumsspalten der Ausleihen. Zahlen je Kategorie ergeben sich bei Bedarf aus den
+Produktzeilen und der aktuellen Kategorie des Produkts; eigene Kategoriezeilen
+würden nach dem Umsortieren eines Produkts veralten. Bestandszahlen stammen aus
+einer nach Status und Kategorie gruppierten Abfrage über `products`.
+
+Das fertige JSON wird samt ETag im Speicher gehalten; Änderungen in diesem
+Prozess machen es ungültig, andere Worker-Prozesse sehen neue Zahlen spätestens
+nach INVENTORY_STATS_CACHE_TTL Sekunden. Der ETag ist ein Hash der Antwort,
+unveränderte Dashboards erhalten daher auch über Prozessgrenzen hinweg 304.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from flask import current_app, request
+from sqlalchemy import and_, event, func, or_, select
+from sqlalchemy.orm import Session, attributes
+
+from app import db
+from app.models.inventory import BorrowTransaction, InventoryDailyStat, Product
+from app.models.settings import SystemSettings
+from app.utils.export_stream import stream_rows
+from app.utils.product_listing import product_table_version
+
+logger = logging.getLogger(__name__)
+
+CLOSED_THROUGH_KEY = 'inventory_stats_closed_through'
+DEFAULT_CACHE_TTL = 30
+TOP_BORROWED_LIMIT = 10
+TREND_DAYS = 365
+# product_id der Summenzeilen
+TOTAL_ID = 0
+INSERT_BATCH_SIZE = 1000
+
+_SESSION_DELTAS = 'inventory_stats_deltas'
+_TRACKED_ATTRS = ('product_id', 'borrow_date', 'expected_return_date', 'actual_return_date', 'status')
+
+# (Tag, Produkt-ID) -> [Ausleihen, Rückgaben, überfällig]
+Deltas = Dict[Tuple[date, int], List[int]]
+
+_listeners_registered = False
+_version = 0
+_version_lock = threading.Lock()
+
+
+def stats_version() -> int:
+    """Zähler, der bei jeder Änderung der Rollups (in diesem Prozess) steigt."""
+    return _version
+
+
+def bump_stats_version():
+    global _version
+    with _version_lock:
+        _version += 1
+
+
+# ---------------------------------------------------------------------------
+# Beiträge einzelner Ausleihen
+# ---------------------------------------------------------------------------
+
+def _contributions(values, today: date) -> List[Tuple[date, int, int, int, int]]:
+    """Beiträge einer Ausleihe: (Tag, Produkt-ID, Ausleihen, Rückgaben, überfällig).
+
+    Eine Rückgabe ohne Rückgabedatum zählt am Ausleihtag. Überfällig wird eine
+    Ausleihe am Tag nach dem erwarteten Rückgabedatum, sofern dieser Tag nicht in
+    der Zukunft liegt und sie bis dahin nicht zurückgegeben wurde.
+    """
+    product_id = values['product_id']
+    borrow_date = values['borrow_date']
+    if not product_id or borrow_date is None:
+        return []
+    borrow_day = borrow_date.date() if isinstance(borrow_date, datetime) else borrow_date
+    entries = [(borrow_day, product_id, 1, 0, 0)]
+
+    returned = values['status'] == 'returned'
+    returned_on = values['actual_return_date'] if returned else None
+    if returned:
+        entries.append((returned_on or borrow_day, product_id, 0, 1, 0))
+
+    expected = values['expected_return_date']
+    if expected is not None:
+        overdue_day = expected + timedelta(days=1)
+        returned_in_time = returned and (returned_on is None or returned_on <= expected)
+        if overdue_day <= today and not returned_in_time:
+            entries.append((overdue_day, product_id, 0, 0, 1))
+    return entries
+
+
+def _add_deltas(deltas: Deltas, entries, sign: int, since: Optional[date] = None):
+    """Verbucht Beiträge in der Produktzeile und der Summenzeile des Tages."""
+    for day, product_id, borrowed, returned, overdue in entries:
+        if since is not None and day < since:
+            continue
+        for key in ((day, product_id), (day, TOTAL_ID)):
+            current = deltas.setdefault(key, [0, 0, 0])
+            current[0] += sign * borrowed
+            current[1] += sign * returned
+            current[2] += sign * overdue
+
+
+def _contributing_transactions(since: Optional[date], today: date):
+    """Abfrage der Ausleihen, die zu Tagen ab `since` beitragen (None = alle)."""
+    statement = select(*[getattr(BorrowTransaction, attr) for attr in _TRACKED_ATTRS])
+    if since is not None:
+        statement = statement.where(or_(
+            BorrowTransaction.borrow_date >= datetime.combine(since, datetime.min.time()),
+            BorrowTransaction.actual_return_date >= since,
+            and_(BorrowTransaction.expected_return_date >= since - timedelta(days=1),
+                 BorrowTransaction.expected_return_date < today),
+        ))
+    return statement
+
+
+# ---------------------------------------------------------------------------
+# Sammeln und Schreiben der Änderungen
+# ---------------------------------------------------------------------------
+
+def _session_deltas(target) -> Optional[Deltas]:
+    session = attributes.instance_state(target).session
+    if session is None:
+        return None
+    return session.info.setdefault(_SESSION_DELTAS, {})
+
+
+def _current_values(target) -> Dict:
+    return {attr: getattr(target, attr) for attr in _TRACKED_ATTRS}
+
+
+def _previous_values(target) -> Optional[Dict]:
+    """Werte vor der Änderung; None, wenn sich kein relevantes Attribut geändert hat."""
+    values = {}
+    changed = False
+    for attr in _TRACKED_ATTRS:
+        history = attributes.get_history(target, attr)
+        if history.added or history.deleted:
+            values[attr] = history.deleted[0] if history.deleted else None
+            changed = True
+        else:
+            values[attr] = getattr(target, attr)
+    return values if changed else None
+
+
+def _after_insert(mapper, connection, target):
+    deltas = _session_deltas(target)
+    if deltas is not None:
+        _add_deltas(deltas, _contributions(_current_values(target), date.today()), 1)
+
+
+def _after_update(mapper, connection, target):
+    deltas = _session_deltas(target)
+    if deltas is None:
+        return
+    previous = _previous_values(target)
+    if previous is None:
+        return
+    today = date.today()
+    _add_deltas(deltas, _contributions(previous, today), -1)
+    _add_deltas(deltas, _contributions(_current_values(target), today), 1)
+
+
+def _before_delete(mapper, connection, target):
+    # Vor dem DELETE, damit abgelaufene Attribute noch nachgeladen werden können
+    deltas = _session_deltas(target)
+    if deltas is not None:
+        _add_deltas(deltas, _contributions(_current_values(target), date.today()), -1)
+
+
+def _after_flush(session, flush_context):
+    deltas = session.info.pop(_SESSION_DELTAS, None)
+    if deltas:
+        apply_stat_deltas(session.connection(), deltas)
+
+
+def _after_rollback(session):
+    session.info.pop(_SESSION_DELTAS, None)
+
+
+def apply_stat_deltas(connection, deltas: Deltas):
+    """Schreibt aufsummierte Änderungen {(Tag, Produkt-ID): [Ausleihen, Rückgaben, überfällig]} per Upsert fort."""
+    deltas = {key: counts for key, counts in deltas.items() if any(counts)}
+    if not deltas:
+        return
+    table = InventoryDailyStat.__table__
+    dialect = connection.dialect.name
+
+    for (day, product_id), (borrowed, returned, overdue) in deltas.items():
+        values = {
+            'day': day,
+            'product_id': product_id,
+            'borrowed': borrowed,
+            'returned': returned,
+            'overdue': overdue,
+        }
+        increments = {
+            'borrowed': table.c.borrowed + borrowed,
+            'returned': table.c.returned + returned,
+            'overdue': table.c.overdue + overdue,
+        }
+        if dialect in ('mysql', 'mariadb'):
+            from sqlalchemy.dialects.mysql import insert as mysql_insert
+            connection.execute(mysql_insert(table).values(**values).on_duplicate_key_update(**increments))
+        elif dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+            connection.execute(
+                sqlite_insert(table).values(**values)
+                .on_conflict_do_update(index_elements=['day', 'product_id'], set_=increments)
+            )
+        else:
+            result = connection.execute(
+                table.update()
+                .where(table.c.day == day, table.c.product_id == product_id)
+                .values(**increments)
+            )
+            if result.rowcount == 0:
+                connection.execute(table.insert().values(**values))
+    bump_stats_version()
+
+
+def _keep_history(target, value, oldvalue, initiator):
+    return value
+
+
+def init_inventory_stats():
+    """Registriert die Event-Listener (einmalig pro Prozess)."""
+    global _listeners_registered
+    if _listeners_registered:
+        return
+    for attr in _TRACKED_ATTRS:
+        event.listen(getattr(BorrowTransaction, attr), 'set', _keep_history, active_history=True)
+    event.listen(BorrowTransaction, 'after_insert', _after_insert)
+    event.listen(BorrowTransaction, 'after_update', _after_update)
+    event.listen(BorrowTransaction, 'before_delete', _before_delete)
+    event.listen(Session, 'after_flush', _after_flush)
+    event.listen(Session, 'after_soft_rollback', lambda session, previous_transaction: _after_rollback(session))
+    _listeners_registered = True
+
+
+def track_bulk_transactions(rows: Iterable[Dict]):
+    """Verbucht per `bulk_insert_mappings` angelegte Ausleihen (Dicts mit BorrowTransaction-Spalten)."""
+    today = date.today()
+    deltas = {}
+    for row in rows:
+        _add_deltas(deltas, _contributions({attr: row.get(attr) for attr in _TRACKED_ATTRS}, today), 1)
+    apply_stat_deltas(db.session.connection(), deltas)
+
+
+# ---------------------------------------------------------------------------
+# Täglicher Abschluss
+# ---------------------------------------------------------------------------
+
+def get_closed_through() -> Optional[date]:
+    """Letzter abgeschlossener Tag oder None, wenn die Rollups noch nie berechnet wurden."""
+    value = db.session.query(SystemSettings.value).filter_by(key=CLOSED_THROUGH_KEY).scalar()
+    try:
+        return date.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+
+
+def _set_closed_through(day: date):
+    setting = SystemSettings.query.filter_by(key=CLOSED_THROUGH_KEY).first()
+    if setting is None:
+        setting = SystemSettings(key=CLOSED_THROUGH_KEY,
+                                 description='Letzter abgeschlossener Tag der Inventar-Statistik')
+        db.session.add(setting)
+    setting.value = day.isoformat()
+
+
+def close_inventory_stats(through: Optional[date] = None, rebuild: bool = False) -> Dict:
+    """
+    Berechnet alle Tage seit dem letzten Abschluss bis einschließlich `through`
+    (Standard: gestern) aus den Ausleihen neu. Mit `rebuild` werden alle Tage neu
+    berechnet (z.B. nach manuellen Eingriffen in die Datenbank).
+
+    Returns:
+        Bericht mit neu berechnetem Zeitraum und Anzahl geschriebener Zeilen
+    """
+    through = through or date.today() - timedelta(days=1)
+    closed_through = None if rebuild else get_closed_through()
+    if closed_through is not None and closed_through >= through:
+        return {'from': None, 'through': closed_through.isoformat(), 'rows': 0}
+    since = closed_through + timedelta(days=1) if closed_through else None
+
+    today = date.today()
+    totals = {}
+    for row in stream_rows(_contributing_transactions(since, today)):
+        _add_deltas(totals, [entry for entry in _contributions(row._mapping, today) if entry[0] <= through],
+                    1, since)
+
+    table = InventoryDailyStat.__table__
+    delete = table.delete().where(table.c.day <= through)
+    if since is not None:
+        delete = delete.where(table.c.day >= since)
+    db.session.execute(delete)
+
+    rows = [
+        {'day': day, 'product_id': product_id, 'borrowed': borrowed, 'returned': returned, 'overdue': overdue}
+        for (day, product_id), (borrowed, returned, overdue) in sorted(totals.items())
+        if borrowed or returned or overdue
+    ]
+    for start in range(0, len(rows), INSERT_BATCH_SIZE):
+        db.session.execute(table.insert(), rows[start:start + INSERT_BATCH_SIZE])
+    _set_closed_through(through)
+    db.session.commit()
+    bump_stats_version()
+
+    report = {'from': since.isoformat() if since else None, 'through': through.isoformat(), 'rows': len(rows)}
+    logger.info(f"Inventar-Statistik abgeschlossen: {report}")
+    return report
+
+
+# ---------------------------------------------------------------------------
+# Statistiken
+# ---------------------------------------------------------------------------
+
+def _product_snapshot() -> Dict:
+    """Bestandszahlen nach Status und Kategorie aus einer gruppierten Abfrage."""
+    statuses = {}
+    categories = {}
+    for status, category, count in db.session.query(
+            Product.status, Product.category, func.count(Product.id)
+    ).group_by(Product.status, Product.category):
+        statuses[status] = statuses.get(status, 0) + count
+        if category is not None:
+            categories[category] = categories.get(category, 0) + count
+    return {
+        'total': sum(statuses.values()),
+        'statuses': statuses,
+        'categories': categories,
+    }
+
+
+def _live_deltas(closed_through: Optional[date], today: date) -> Deltas:
+    """Beiträge der noch nicht abgeschlossenen Tage, direkt aus den Ausleihen."""
+    since = closed_through + timedelta(days=1) if closed_through else None
+    deltas = {}
+    for row in db.session.execute(_contributing_transactions(since, today)):
+        _add_deltas(deltas, _contributions(row._mapping, today), 1, since)
+    return deltas
+
+
+def _top_borrowed(closed_through: Optional[date], live: Deltas) -> List[Dict]:
+    """Produkte mit den meisten Rückgaben (abgeschlossene Ausleihen)."""
+    live_returned = {}
+    for (_, product_id), (_, returned, _) in live.items():
+        if returned and product_id != TOTAL_ID:
+            live_returned[product_id] = live_returned.get(product_id, 0) + returned
+
+    counts = {}
+    if closed_through is not None:
+        stats = InventoryDailyStat
+        total = func.sum(stats.returned)
+        query = db.session.query(stats.product_id, total).filter(
+            stats.product_id > TOTAL_ID, stats.day <= closed_through
+        ).group_by(stats.product_id)
+        # Ohne Live-Anteil genügen die ersten Zeilen; Produkte mit Live-Anteil werden gezielt nachgeladen
+        counts.update(query.having(total > 0).order_by(total.desc()).limit(TOP_BORROWED_LIMIT + len(live_returned)))
+        missing = [product_id for product_id in live_returned if product_id not in counts]
+        if missing:
+            counts.update(query.filter(stats.product_id.in_(missing)))
+    counts = {product_id: int(count or 0) for product_id, count in counts.items()}
+    for product_id, returned in live_returned.items():
+        counts[product_id] = counts.get(product_id, 0) + returned
+
+    counts = {product_id: count for product_id, count in counts.items() if count > 0}
+    if not counts:
+        return []
+    names = dict(db.session.query(Product.id, Product.name).filter(Product.id.in_(counts)))
+    ranked = sorted((product_id for product_id in counts if product_id in names),
+                    key=lambda product_id: (-counts[product_id], names[product_id] or ''))
+    return [{'id': product_id, 'name': names[product_id], 'borrow_count': counts[product_id]}
+            for product_id in ranked[:TOP_BORROWED_LIMIT]]
+
+
+def _monthly_trends(closed_through: Optional[date], live: Deltas, today: date) -> List[Dict]:
+    """Ausleihen, Rückgaben und Überfälligkeiten pro Monat (letzte 12 Monate) aus den Summenzeilen."""
+    window_start = today - timedelta(days=TREND_DAYS)
+    days = []
+    if closed_through is not None:
+        stats = InventoryDailyStat
+        days = db.session.query(stats.day, stats.borrowed, stats.returned, stats.overdue).filter(
+            stats.product_id == TOTAL_ID, stats.day >= window_start, stats.day <= closed_through
+        ).all()
+    days += [(day, *counts) for (day, product_id), counts in live.items()
+             if product_id == TOTAL_ID and day >= window_start]
+
+    months = {}
+    for day, borrowed, returned, overdue in days:
+        counts = months.setdefault((day.year, day.month), [0, 0, 0])
+        counts[0] += borrowed
+        counts[1] += returned
+        counts[2] += overdue
+    return [
+        {'month': f"{month:02d}/{year}", 'count': counts[0], 'returned': counts[1], 'overdue': counts[2]}
+        for (year, month), counts in sorted(months.items())
+        if any(counts)
+    ]
+
+
+def inventory_statistics() -> Dict:
+    """Aggregierte Statistiken für das Inventar-Dashboard."""
+    today = date.today()
+    snapshot = _product_snapshot()
+    total = snapshot['total']
+    available_count = snapshot['statuses'].get('available', 0)
+    overdue_count = BorrowTransaction.query.filter(
+        BorrowTransaction.status == 'active',
+        BorrowTransaction.expected_return_date < today
+    ).count()
+
+    closed_through = get_closed_through()
+    live = _live_deltas(closed_through, today)
+
+    return {
+        'overview': {
+            'total_products': total,
+            'borrowed_count': snapshot['statuses'].get('borrowed', 0),
+            'overdue_count': overdue_count,
+            'available_count': available_count,
+            'availability_rate': round(available_count / total * 100, 2) if total > 0 else 0,
+        },
+        'top_borrowed': _top_borrowed(closed_through, live),
+        'category_distribution': [
+            {'category': category, 'count': count}
+            for category, count in sorted(snapshot['categories'].items())
+        ],
+        'monthly_trends': _monthly_trends(closed_through, live, today),
+        'status_distribution': [
+            {'status': status, 'count': count}
+            for status, count in sorted(snapshot['statuses'].items(), key=lambda item: item[0] or '')
+        ],
+        'closed_through': closed_through.isoformat() if closed_through else None,
+    }
+
+
+def mobile_statistics() -> Dict:
+    """Basis-Bestandszahlen für die Mobile-API."""
+    snapshot = _product_snapshot()
+    return {
+        'total_products': snapshot['total'],
+        'borrowed_count': snapshot['statuses'].get('borrowed', 0),
+        'available_count': snapshot['statuses'].get('available', 0),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Antwort mit ETag
+# ---------------------------------------------------------------------------
+
+_responses: Dict[str, Tuple[Tuple, bytes, str, float]] = {}
+_responses_lock = threading.Lock()
+
+
+def _cache_ttl() -> int:
+    try:
+        return current_app.config.get('INVENTORY_STATS_CACHE_TTL', DEFAULT_CACHE_TTL)
+    except RuntimeError:
+        return DEFAULT_CACHE_TTL
+
+
+def _cached_body(name: str, build: Callable[[], Dict]) -> Tuple[bytes, str]:
+    """JSON und ETag einer Statistik, bis zur nächsten Änderung bzw. höchstens TTL Sekunden zwischengespeichert."""
+    key = (product_table_version(), stats_version(), date.today())
+    now = time.monotonic()
+    with _responses_lock:
+        entry = _responses.get(name)
+        if entry is not None and entry[0] == key and now < entry[3]:
+            return entry[1], entry[2]
+
+    body = json.dumps(build(), ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    etag = hashlib.sha1(body).hexdigest()
+    ttl = _cache_ttl()
+    if ttl > 0:
+        with _responses_lock:
+            _responses[name] = (key, body, etag, now + ttl)
+    return body, etag
+
+
+def statistics_response(name: str, build: Callable[[], Dict]):
+    """JSON-Antwort mit ETag; stimmt If-None-Match überein, folgt 304 ohne Inhalt."""
+    body, etag = _cached_body(name, build)
+    response = current_app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
@@ -0,0 +1,94 @@
+"""
+Threadsicherer LRU-Cache mit optionaler Ablaufzeit.
+
+Gemeinsame Grundlage der Caches im Speicher eines Prozesses (Textversionen,
+Datei-Vorschauen, Freigabe-Tokens, Produktzahlen, QR-Codes, Produktsuche).
+Größe und Ablaufzeit stehen in der App-Konfiguration und werden bei jedem
+Schreiben gelesen; außerhalb eines App-Kontexts gelten die Standardwerte.
+Eine Größe (bzw. Ablaufzeit) von 0 deaktiviert den Cache.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Iterable, Optional, Tuple
+
+from flask import current_app
+
+
+class LRUCache:
+    """
+    Threadsicherer LRU-Cache: Schlüssel -> Wert.
+
+    Args:
+        size_key: Konfigurationsschlüssel der maximalen Anzahl Einträge
+        default_size: Anzahl Einträge ohne Konfiguration
+        ttl_key: Konfigurationsschlüssel der Ablaufzeit in Sekunden (None = kein Ablauf)
+        default_ttl: Ablaufzeit ohne Konfiguration
+        accept: Prüft, ob ein Wert aufgenommen wird (z.B. Größenbegrenzung)
+    """
+
+    def __init__(self, size_key: str, default_size: int, ttl_key: Optional[str] = None,
+                 default_ttl: Optional[float] = None, accept: Optional[Callable[[Any], bool]] = None):
+        self._size_key = size_key
+        self._default_size = default_size
+        self._ttl_key = ttl_key
+        self._default_ttl = default_ttl
+        self._accept = accept
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _settings(self) -> Tuple[int, Optional[float]]:
+        try:
+            config = current_app.config
+            size = config.get(self._size_key, self._default_size)
+            ttl = config.get(self._ttl_key, self._default_ttl) if self._ttl_key else None
+        except RuntimeError:
+            size = self._default_size
+            ttl = self._default_ttl if self._ttl_key else None
+        return size, ttl
+
+    def _lookup(self, key: Hashable, default=None):
+        """Wie `get`, aber ohne Sperre (Aufrufer hält `_lock`)."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        value, valid_until = entry
+        if valid_until is not None and time.monotonic() > valid_until:
+            del self._entries[key]
+            return default
+        self._entries.move_to_end(key)
+        return value
+
+    def get(self, key: Hashable, default=None):
+        """Gibt den Wert zurück; `default` bei fehlendem oder abgelaufenem Eintrag."""
+        with self._lock:
+            return self._lookup(key, default)
+
+    def put(self, key: Hashable, value):
+        max_size, ttl = self._settings()
+        if max_size <= 0 or (ttl is not None and ttl <= 0):
+            return
+        if self._accept is not None and not self._accept(value):
+            return
+        valid_until = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._entries[key] = (value, valid_until)
+            self._entries.move_to_end(key)
+            while len(self._entries) > max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, keys: Iterable[Hashable]):
+        """Entfernt einzelne Schlüssel."""
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def invalidate(self, predicate: Optional[Callable[[Hashable], bool]] = None):
+        """Entfernt alle Einträge, deren Schlüssel `predicate` erfüllt (ohne Prädikat: alle)."""
+        with self._lock:
+            if predicate is None:
+                self._entries.clear()
+                return
+            for key in [key for key in self._entries if predicate(key)]:
+                del self._entries[key]
@@ -2,25 +2,36 @@
 Gemeinsame Markdown-Verarbeitungsfunktionen für Files und Wiki.
 """
 import re
+import threading
 from flask import current_app
 
 
-def process_markdown(content, wiki_mode=False):
+# Bei Änderungen an Extensions oder Konfiguration erhöhen (macht gecachte Vorschauen ungültig)
+MARKDOWN_RENDERER_VERSION = 1
+
+_extension_config = None
+_extension_config_lock = threading.Lock()
+_renderer_local = threading.local()
+
+
+def _mermaid_formatter(source, *args, **kwargs):
+    return f'<div class="mermaid">{source}</div>'
+
+
+def _get_extension_config():
     """
-    Verarbeitet Markdown-Text zu HTML mit erweiterten Extensions.
-    
-    Args:
-        content: Markdown-Text als String
-        wiki_mode: Wenn True, werden Wiki-Links [[Seitenname]] verarbeitet
+    Ermittelt einmalig die verfügbaren Markdown-Extensions.
     
     Returns:
-        Verarbeiteter HTML-String
+        (extensions, extension_configs)
     """
-    try:
-        import markdown
-        
-        def mermaid_formatter(source):
-            return f'<div class="mermaid">{source}</div>'
+    global _extension_config
+    if _extension_config is not None:
+        return _extension_config
+    
+    with _extension_config_lock:
+        if _extension_config is not None:
+            return _extension_config
         
         extensions = [
             'fenced_code',      # Code-Blöcke mit ```
@@ -68,7 +79,7 @@ def process_markdown(content, wiki_mode=False):
                         {
                             'name': 'mermaid',
                             'class': 'mermaid',
-                            'format': mermaid_formatter
+                            'format': _mermaid_formatter
                         }
                     ]
                 }
@@ -82,12 +93,44 @@ def process_markdown(content, wiki_mode=False):
         except ImportError:
             current_app.logger.debug("pymdownx nicht verfügbar, nutze Standard-Markdown-Extensions")
         
+        _extension_config = (extensions, extension_configs)
+        return _extension_config
+
+
+def _get_renderer():
+    """Liefert eine Markdown-Instanz pro Thread (Instanzen sind nicht threadsicher)."""
+    md = getattr(_renderer_local, 'md', None)
+    if md is None:
+        import markdown
+        extensions, extension_configs = _get_extension_config()
         md = markdown.Markdown(extensions=extensions, extension_configs=extension_configs)
+        _renderer_local.md = md
+    return md
+
+
+def process_markdown(content, wiki_mode=False):
+    """
+    Verarbeitet Markdown-Text zu HTML mit erweiterten Extensions.
+    
+    Args:
+        content: Markdown-Text als String
+        wiki_mode: Wenn True, werden Wiki-Links [[Seitenname]] verarbeitet
+    
+    Returns:
+        Verarbeiteter HTML-String
+    """
+    try:
+        md = _get_renderer()
         
         if wiki_mode:
             content = process_wiki_links(content)
         
-        html = md.convert(content)
+        try:
+            html = md.reset().convert(content)
+        except Exception:
+            # Instanz nach einem Fehler nicht weiterverwenden
+            _renderer_local.md = None
+            raise
         
         return html
         
@@ -360,7 +360,7 @@ def send_file_notification(
             continue
         
         # Überspringe den Uploader
-        if user.id == file.uploader_id:
+        if user.id == file.uploaded_by:
             continue
         
         title = f"Neue Datei" if notification_type == 'new' else f"Datei geändert"
@@ -378,6 +378,66 @@ def send_file_notification(
     return sent_count
 
 
+def send_files_uploaded_notification(
+    file_count: int,
+    folder_id: Optional[int],
+    uploader_id: int
+) -> int:
+    """
+    Sendet eine zusammengefasste Push-Benachrichtigung pro Empfänger für einen
+    Mehrfach-Upload ("N Dateien hochgeladen nach X").
+    
+    Empfänger und ihre Einstellungen werden mit einer einzigen Abfrage geladen.
+    
+    Args:
+        file_count: Anzahl der hochgeladenen Dateien
+        folder_id: Zielordner des Uploads (None = Wurzel)
+        uploader_id: ID des Uploaders (erhält keine Benachrichtigung)
+    
+    Returns:
+        int: Anzahl der gesendeten Benachrichtigungen
+    """
+    if file_count <= 0:
+        return 0
+    
+    from app.models.file import Folder
+    folder_name = None
+    if folder_id:
+        folder_name = db.session.query(Folder.name).filter(Folder.id == folder_id).scalar()
+    target_name = folder_name or 'Dateien'
+    
+    recipient_ids = [
+        row[0] for row in db.session.query(User.id).join(NotificationSettings).filter(
+            NotificationSettings.file_notifications_enabled == True,
+            NotificationSettings.file_new_notifications == True,
+            User.notifications_enabled == True,
+            User.is_active == True,
+            User.id != uploader_id
+        ).distinct().all()
+    ]
+    
+    if file_count == 1:
+        title = "Neue Datei"
+        body = f"1 Datei wurde nach {target_name} hochgeladen"
+    else:
+        title = "Neue Dateien"
+        body = f"{file_count} Dateien wurden nach {target_name} hochgeladen"
+    url = f"/files/folder/{folder_id}" if folder_id else "/files/"
+    
+    sent_count = 0
+    for user_id in recipient_ids:
+        if send_push_notification(
+            user_id=user_id,
+            title=title,
+            body=body,
+            url=url,
+            data={'folder_id': folder_id, 'file_count': file_count, 'type': 'file', 'action': 'new'}
+        ):
+            sent_count += 1
+    
+    return sent_count
+
+
 def send_email_notification(
     email_id: int
 ) -> int:
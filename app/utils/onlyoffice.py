@@ -4,8 +4,13 @@ ONLYOFFICE helper functions and utilities.
 import os
 import secrets
 import hashlib
+import tempfile
+import threading
 from datetime import datetime, timedelta
 from flask import current_app
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 try:
     import jwt
@@ -235,3 +240,91 @@ def validate_onlyoffice_access_token(token, file_id):
     current_app.logger.debug(f"ONLYOFFICE access token validated successfully for file {file_id}")
     return True
 
+
+
+_http_session = None
+_http_session_lock = threading.Lock()
+
+
+def get_onlyoffice_http_session():
+    """
+    Shared HTTP session for downloads from the Document Server.
+    
+    Connections are pooled and reused; transient errors are retried.
+    """
+    global _http_session
+    with _http_session_lock:
+        if _http_session is None:
+            session = requests.Session()
+            retries = Retry(total=3, backoff_factor=0.5, status_forcelist=(502, 503, 504),
+                            allowed_methods=frozenset(['GET']))
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=retries)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _http_session = session
+        return _http_session
+
+
+def download_onlyoffice_document(url, target_dir):
+    """
+    Streams a document from the Document Server into a temporary file.
+    
+    The download is written in chunks (bounded memory) and hashed on the fly.
+    With local storage the temporary file is created in the upload directory,
+    so it can later be moved into place atomically with `os.replace`.
+    
+    Args:
+        url: Download URL from the ONLYOFFICE callback
+        target_dir: Directory for the temporary file (same filesystem as the target)
+        
+    Returns:
+        tuple: (temp_path, sha256 hex digest, size in bytes)
+        
+    Raises:
+        requests.RequestException: On network errors or HTTP error status
+        ValueError: If the document exceeds ONLYOFFICE_MAX_DOWNLOAD_SIZE
+    """
+    connect_timeout = current_app.config.get('ONLYOFFICE_CONNECT_TIMEOUT', 5)
+    read_timeout = current_app.config.get('ONLYOFFICE_READ_TIMEOUT', 60)
+    chunk_size = current_app.config.get('ONLYOFFICE_DOWNLOAD_CHUNK_SIZE', 1024 * 1024)
+    max_size = current_app.config.get('ONLYOFFICE_MAX_DOWNLOAD_SIZE', 0)
+    
+    os.makedirs(target_dir, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    fd, temp_path = tempfile.mkstemp(prefix='.onlyoffice_', suffix='.part', dir=target_dir)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            with get_onlyoffice_http_session().get(url, stream=True, timeout=(connect_timeout, read_timeout)) as response:
+                response.raise_for_status()
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    if not chunk:
+                        continue
+                    size += len(chunk)
+                    if max_size and size > max_size:
+                        raise ValueError(f"Dokument überschreitet die maximale Größe von {max_size} Bytes")
+                    digest.update(chunk)
+                    f.write(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+    
+    return temp_path, digest.hexdigest(), size
+
+
+def stored_file_sha256(stored_path, chunk_size=1024 * 1024):
+    """SHA-256 of a stored upload (streamed from the storage backend)."""
+    from app.utils.storage import get_storage, storage_key
+    digest = hashlib.sha256()
+    source = get_storage().open(storage_key(stored_path))
+    try:
+        for chunk in iter(lambda: source.read(chunk_size), b''):
+            digest.update(chunk)
+    finally:
+        source.close()
+    return digest.hexdigest()
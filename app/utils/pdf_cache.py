@@ -0,0 +1,145 @@
+"""
+Cache für fertig erzeugte PDF-Dokumente.
+
+PDFs werden unter uploads/pdf_cache/<Art>/<Schlüssel>.pdf abgelegt. Der Schlüssel
+ist ein Hash über alle Daten, die in das Dokument einfließen (inklusive einer
+Vorlagen-Version), sodass geänderte Daten automatisch einen neuen Eintrag ergeben
+und veraltete Einträge nie ausgeliefert werden. Pro Art bleiben die
+PDF_CACHE_MAX_FILES zuletzt verwendeten Dokumente erhalten.
+
+Neben dem Eintrag hält `<Schlüssel>.job` den Zustand eines laufenden bzw.
+fehlgeschlagenen Auftrags fest (auch bei deaktiviertem Cache), damit alle
+Worker-Prozesse des Servers den Status eines Auftrags melden können.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Optional, Tuple
+
+from flask import current_app
+
+from app.utils.storage import get_upload_root
+
+logger = logging.getLogger(__name__)
+
+PDF_CACHE_DIR = 'pdf_cache'
+DEFAULT_MAX_FILES = 200
+# Auftragsmarker, die älter sind, werden beim nächsten Schreiben entfernt
+JOB_MARKER_MAX_AGE = 24 * 3600
+
+
+def cache_key(*parts) -> str:
+    """Hash über beliebige JSON-serialisierbare Bestandteile (Datumswerte als String)."""
+    payload = json.dumps(parts, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _cache_dir(kind: str) -> str:
+    return os.path.join(get_upload_root(), PDF_CACHE_DIR, kind)
+
+
+def _max_files() -> int:
+    return current_app.config.get('PDF_CACHE_MAX_FILES', DEFAULT_MAX_FILES)
+
+
+def get_cached_pdf(kind: str, key: str) -> Optional[bytes]:
+    """Gecachtes PDF oder None; ein Treffer zählt als Verwendung (für die Verdrängung)."""
+    if _max_files() <= 0:
+        return None
+    path = os.path.join(_cache_dir(kind), f"{key}.pdf")
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+        os.utime(path)
+        return data
+    except OSError:
+        return None
+
+
+def put_cached_pdf(kind: str, key: str, data: bytes):
+    """Legt ein PDF atomar ab und entfernt die am längsten nicht verwendeten Einträge."""
+    max_files = _max_files()
+    if max_files <= 0:
+        return
+    directory = _cache_dir(kind)
+    path = os.path.join(directory, f"{key}.pdf")
+    try:
+        os.makedirs(directory, exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+        _prune(directory, max_files)
+    except OSError as e:
+        logger.warning(f"PDF-Cache ({kind}) konnte nicht geschrieben werden: {e}")
+
+
+def _prune(directory: str, max_files: int):
+    entries = []
+    for entry in os.scandir(directory):
+        if entry.name.endswith('.pdf'):
+            try:
+                entries.append((entry.stat().st_mtime, entry.path))
+            except OSError:
+                continue
+    if len(entries) <= max_files:
+        return
+    entries.sort()
+    for _, path in entries[:len(entries) - max_files]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _job_marker_path(kind: str, key: str) -> str:
+    return os.path.join(_cache_dir(kind), f"{key}.job")
+
+
+def write_job_marker(kind: str, key: str, status: str, error: Optional[str] = None):
+    """Hält den Zustand eines Auftrags fest ('running' oder 'failed')."""
+    directory = _cache_dir(kind)
+    path = _job_marker_path(kind, key)
+    try:
+        os.makedirs(directory, exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'status': status, 'error': error}, f)
+        os.replace(temp_path, path)
+        _prune_job_markers(directory)
+    except OSError as e:
+        logger.warning(f"PDF-Auftragsmarker ({kind}) konnte nicht geschrieben werden: {e}")
+
+
+def read_job_marker(kind: str, key: str) -> Optional[Tuple[str, Optional[str], float]]:
+    """(Status, Fehler, Alter in Sekunden) des Auftragsmarkers oder None."""
+    path = _job_marker_path(kind, key)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            marker = json.load(f)
+        age = time.time() - os.path.getmtime(path)
+    except (OSError, ValueError):
+        return None
+    return marker.get('status'), marker.get('error'), age
+
+
+def remove_job_marker(kind: str, key: str):
+    try:
+        os.remove(_job_marker_path(kind, key))
+    except OSError:
+        pass
+
+
+def _prune_job_markers(directory: str):
+    oldest_allowed = time.time() - JOB_MARKER_MAX_AGE
+    for entry in os.scandir(directory):
+        if entry.name.endswith('.job'):
+            try:
+                if entry.stat().st_mtime < oldest_allowed:
+                    os.remove(entry.path)
+            except OSError:
+                continue
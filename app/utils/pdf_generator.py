@@ -6,12 +6,28 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
 from flask import current_app
 from io import BytesIO
-from datetime import datetime
+from datetime import date, datetime
+from functools import lru_cache
+import logging
 import os
+import shutil
+import tempfile
 from PIL import Image as PILImage
-from app.utils.qr_code import generate_qr_code_bytes, generate_qr_code_inverted_bytes, generate_product_qr_code, generate_borrow_qr_code
-from app.utils.lengths import format_length_from_meters, parse_length_to_meters
-from app.utils.color_mapping import get_color_for_length, initialize_color_mappings
+from app.utils.qr_code import generate_product_qr_code, generate_borrow_qr_code, qr_code_matrix, qr_code_matrices
+from app.utils.lengths import format_length_from_meters
+from app.utils.color_mapping import get_all_color_mappings, get_or_create_color_mapping, initialize_color_mappings
+from app.utils.pdf_cache import cache_key, get_cached_pdf, put_cached_pdf
+
+logger = logging.getLogger(__name__)
+
+# Vorlagen-Version je Dokumentart; bei Layout-Änderungen erhöhen (verwirft gecachte PDFs)
+TEMPLATE_VERSIONS = {
+    'borrow_receipts': 1,
+    'inventories': 1,
+    'inventory_lists': 1,
+    'qr_sheets': 2,
+    'color_codes': 1,
+}
 
 
 class DashedLine(Flowable):
@@ -41,15 +57,70 @@ class DashedLine(Flowable):
         self.canv.restoreState()
 
 
-def _format_length(value):
-    """Gibt eine konsistente Meter-Darstellung zurück."""
-    meters = parse_length_to_meters(value)
+class QRCodeFlowable(Flowable):
+    """QR-Code als Vektorgrafik: dunkle Module werden zeilenweise zu Rechtecken zusammengefasst."""
+    def __init__(self, matrix, size, color=colors.black, background=colors.white):
+        Flowable.__init__(self)
+        self.matrix = matrix
+        self.width = size
+        self.height = size
+        self.color = color
+        self.background = background
+    
+    def wrap(self, availWidth, availHeight):
+        return (self.width, self.height)
+    
+    def draw(self):
+        """Zeichnet Hintergrund und alle Modul-Rechtecke als einen Pfad (Zeile 0 oben)."""
+        canv = self.canv
+        module = self.width / len(self.matrix)
+        canv.saveState()
+        canv.setFillColor(self.background)
+        canv.rect(0, 0, self.width, self.height, stroke=0, fill=1)
+        path = canv.beginPath()
+        for row_index, row in enumerate(self.matrix):
+            y = self.height - (row_index + 1) * module
+            start = None
+            for col_index, dark in enumerate(row):
+                if dark and start is None:
+                    start = col_index
+                elif not dark and start is not None:
+                    path.rect(start * module, y, (col_index - start) * module, module)
+                    start = None
+            if start is not None:
+                path.rect(start * module, y, (len(row) - start) * module, module)
+        canv.setFillColor(self.color)
+        canv.drawPath(path, stroke=0, fill=1)
+        canv.restoreState()
+
+
+def _format_length(value, meters):
+    """Gibt eine konsistente Meter-Darstellung zurück (`meters`: gespeicherter Meter-Wert)."""
     if meters is None:
         return value or '-'
     formatted = format_length_from_meters(meters)
     return formatted or (value or '-')
 
 
+def _local_portal_logo(filename):
+    """Lokaler Pfad zum Portal-Logo; bei entferntem Storage eine Kopie im Temp-Verzeichnis."""
+    from app.utils.storage import get_storage, storage_key
+    storage = get_storage()
+    key = storage_key(filename, 'system')
+    local_path = storage.local_path(key)
+    if local_path is not None:
+        return local_path if os.path.exists(local_path) else None
+    
+    # Logo-Dateinamen enthalten einen Zeitstempel, die Kopie bleibt daher gültig
+    cached_path = os.path.join(tempfile.gettempdir(), f"prismateams_logo_{os.path.basename(key)}")
+    if not os.path.exists(cached_path):
+        if not storage.exists(key):
+            return None
+        with storage.local_file(key) as temp_path:
+            shutil.copyfile(temp_path, cached_path)
+    return cached_path
+
+
 def get_logo_path():
     """Holt den Pfad zum Portal-Logo aus SystemSettings oder Konfiguration."""
     # Try to get portal logo from SystemSettings first
@@ -58,9 +129,8 @@ def get_logo_path():
         portal_logo_setting = SystemSettings.query.filter_by(key='portal_logo').first()
         if portal_logo_setting and portal_logo_setting.value:
             # Portal logo is stored in uploads/system/
-            project_root = os.path.dirname(current_app.root_path)
-            logo_path = os.path.join(project_root, current_app.config['UPLOAD_FOLDER'], 'system', portal_logo_setting.value)
-            if os.path.exists(logo_path):
+            logo_path = _local_portal_logo(portal_logo_setting.value)
+            if logo_path:
                 return logo_path
     except:
         pass
@@ -82,6 +152,93 @@ def get_logo_path():
     return None
 
 
+def _portal_name():
+    """Portalname aus den SystemSettings (Fallback: APP_NAME)."""
+    try:
+        from app.models.settings import SystemSettings
+        portal_name_setting = SystemSettings.query.filter_by(key='portal_name').first()
+        if portal_name_setting and portal_name_setting.value:
+            return portal_name_setting.value
+    except Exception:
+        pass
+    return current_app.config.get('APP_NAME', 'Prismateams')
+
+
+@lru_cache(maxsize=8)
+def _image_size(path, mtime):
+    """Pixelgröße eines Bildes; wird je Datei und Änderungszeit nur einmal gelesen."""
+    with PILImage.open(path) as image:
+        return image.size
+
+
+def _logo_info():
+    """Logo für die Dokumentdaten (Pfad, Änderungszeit, Pixelgröße) oder None."""
+    logo_path = get_logo_path()
+    if not logo_path:
+        return None
+    try:
+        mtime = os.path.getmtime(logo_path)
+        width, height = _image_size(logo_path, mtime)
+    except Exception as e:
+        current_app.logger.warning(f"Konnte Logo nicht laden: {e}")
+        return None
+    return {'path': logo_path, 'mtime': mtime, 'width': width, 'height': height}
+
+
+def _logo_image(logo, max_width, max_height):
+    """Logo proportional in die angegebene Box eingepasst (None ohne Logo)."""
+    if not logo:
+        return None
+    scale = min(max_width / logo['width'], max_height / logo['height'])
+    try:
+        return Image(logo['path'], width=logo['width'] * scale, height=logo['height'] * scale)
+    except Exception as e:
+        logger.warning(f"Konnte Logo nicht laden: {e}")
+        return None
+
+
+def pdf_cache_key(kind, data, day=None):
+    """Cache-Schlüssel aus Dokumentart, Vorlagen-Version, Datum der Fußzeile und Dokumentdaten."""
+    return cache_key(kind, TEMPLATE_VERSIONS[kind], day or date.today(), data)
+
+
+def render_pdf(kind, data, generated_at=None):
+    """
+    Setzt ein Dokument aus seinen Daten.
+    
+    Greift weder auf die Datenbank noch auf den App-Kontext zu und kann daher in
+    einem Hilfsprozess laufen (siehe app.tasks.pdf_jobs).
+    
+    Returns:
+        PDF als Bytes
+    """
+    output = BytesIO()
+    _RENDERERS[kind](output, data, generated_at or datetime.now())
+    return output.getvalue()
+
+
+def cached_pdf(kind, data):
+    """PDF aus dem Cache; fehlt es, wird es im aufrufenden Prozess gesetzt und abgelegt."""
+    key = pdf_cache_key(kind, data)
+    pdf_bytes = get_cached_pdf(kind, key)
+    if pdf_bytes is None:
+        pdf_bytes = render_pdf(kind, data)
+        put_cached_pdf(kind, key, pdf_bytes)
+    return pdf_bytes
+
+
+def _write_output(output, pdf_bytes):
+    """Schreibt PDF-Bytes in einen BytesIO-Puffer (zurückgespult) oder eine Datei."""
+    if isinstance(output, BytesIO):
+        output.write(pdf_bytes)
+        output.seek(0)
+        return output
+    
+    with open(output, 'wb') as f:
+        f.write(pdf_bytes)
+    return output
+
+
 def generate_borrow_receipt_pdf(borrow_transactions, output=None):
     """
     Generiert einen Ausleihschein als PDF im Rechnungsformat.
@@ -97,6 +254,11 @@ def generate_borrow_receipt_pdf(borrow_transactions, output=None):
     if output is None:
         output = BytesIO()
     
+    return _write_output(output, cached_pdf('borrow_receipts', borrow_receipt_document(borrow_transactions)))
+
+
+def borrow_receipt_document(borrow_transactions):
+    """Daten des Ausleihscheins (Transaktion oder Liste von Transaktionen)."""
     # Normalisiere zu Liste
     if not isinstance(borrow_transactions, list):
         borrow_transactions = [borrow_transactions]
@@ -104,65 +266,56 @@ def generate_borrow_receipt_pdf(borrow_transactions, output=None):
     if not borrow_transactions:
         raise ValueError("Mindestens eine Transaktion erforderlich")
     
+    first_transaction = borrow_transactions[0]
+    borrower = first_transaction.borrower
+    borrowed_by = first_transaction.borrowed_by
+    
+    rows = []
+    for idx, transaction in enumerate(borrow_transactions, 1):
+        product = transaction.product
+        rows.append([
+            str(idx),
+            product.name or '-',
+            str(product.id),
+            _format_length(product.length, product.length_meters),
+            product.serial_number or '-'
+        ])
+    
+    return {
+        'app_name': _portal_name(),
+        'logo': _logo_info(),
+        'qr_data': first_transaction.qr_code_data,
+        'borrower_name': f"{borrower.first_name} {borrower.last_name}",
+        'borrower_email': borrower.email,
+        'borrow_date': first_transaction.borrow_date.strftime('%d.%m.%Y %H:%M'),
+        'transaction_number': first_transaction.transaction_number,
+        'expected_return_date': first_transaction.expected_return_date.strftime('%d.%m.%Y'),
+        'borrowed_by': f"{borrowed_by.first_name} {borrowed_by.last_name}" if borrowed_by else '-',
+        'rows': rows,
+    }
+
+
+def _render_borrow_receipt(output, data, generated_at):
+    """Setzt den Ausleihschein im Rechnungsformat."""
     doc = SimpleDocTemplate(output, pagesize=A4, topMargin=2*cm, bottomMargin=2*cm, 
                            leftMargin=2*cm, rightMargin=2*cm)
     story = []
     
     styles = getSampleStyleSheet()
     
-    # Get portal name from SystemSettings
-    try:
-        from app.models.settings import SystemSettings
-        portal_name_setting = SystemSettings.query.filter_by(key='portal_name').first()
-        app_name = portal_name_setting.value if portal_name_setting and portal_name_setting.value else current_app.config.get('APP_NAME', 'Prismateams')
-    except:
-        app_name = current_app.config.get('APP_NAME', 'Prismateams')
-    
-    # Header mit Logo links und QR-Code rechts
-    logo_path = get_logo_path()
-    first_transaction = borrow_transactions[0]
-    borrower = first_transaction.borrower
-    
     # Header-Tabelle: Logo links, QR-Code rechts
     header_data = []
     header_row = []
     
-    # Logo links - nur Breite angeben, Höhe wird proportional berechnet
-    if logo_path:
-        try:
-            # Lade Logo mit PIL um natürliche Dimensionen zu erhalten
-            pil_img = PILImage.open(logo_path)
-            img_width, img_height = pil_img.size
-            aspect_ratio = img_height / img_width
-            
-            # Setze maximale Breite, Höhe wird proportional berechnet
-            max_width = 4*cm
-            calculated_height = max_width * aspect_ratio
-            
-            # Begrenze maximale Höhe falls Logo sehr hoch ist
-            max_height = 3*cm
-            if calculated_height > max_height:
-                calculated_height = max_height
-                max_width = calculated_height / aspect_ratio
-            
-            logo = Image(logo_path, width=max_width, height=calculated_height)
-            header_row.append(logo)
-        except Exception as e:
-            current_app.logger.warning(f"Konnte Logo nicht laden: {e}")
-            header_row.append('')
-    else:
-        header_row.append('')
+    # Logo links: höchstens 4cm breit und 3cm hoch, proportional
+    header_row.append(_logo_image(data['logo'], 4*cm, 3*cm) or '')
     
-    # QR-Code rechts (erster QR-Code)
-    qr_image = None
-    if first_transaction.qr_code_data:
+    # QR-Code rechts (erster QR-Code, als Vektorgrafik)
+    if data['qr_data']:
         try:
-            qr_data = first_transaction.qr_code_data
-            qr_bytes = generate_qr_code_bytes(qr_data, box_size=6)
-            qr_image = Image(BytesIO(qr_bytes), width=3*cm, height=3*cm)
-            header_row.append(qr_image)
+            header_row.append(QRCodeFlowable(qr_code_matrix(data['qr_data']), 3*cm))
         except Exception as e:
-            current_app.logger.error(f"Fehler beim Generieren des QR-Codes: {e}")
+            logger.error(f"Fehler beim Generieren des QR-Codes: {e}")
             header_row.append('')
     else:
         header_row.append('')
@@ -201,18 +354,18 @@ def generate_borrow_receipt_pdf(borrow_transactions, output=None):
     )
     
     # Ausleihender Information
-    borrower_info = f"<b>Ausleihender:</b><br/>{borrower.first_name} {borrower.last_name}"
-    if borrower.email:
-        borrower_info += f"<br/>{borrower.email}"
+    borrower_info = f"<b>Ausleihender:</b><br/>{data['borrower_name']}"
+    if data['borrower_email']:
+        borrower_info += f"<br/>{data['borrower_email']}"
     story.append(Paragraph(borrower_info, briefkopf_style))
     story.append(Spacer(1, 0.3*cm))
     
     # Ausleihdatum und Vorgangsnummer
     info_data = [
-        ['Ausleihdatum:', first_transaction.borrow_date.strftime('%d.%m.%Y %H:%M')],
-        ['Vorgangsnummer:', first_transaction.transaction_number],
-        ['Voraussichtliche Rückgabe:', first_transaction.expected_return_date.strftime('%d.%m.%Y')],
-        ['Bearbeitender Nutzer:', f"{first_transaction.borrowed_by.first_name} {first_transaction.borrowed_by.last_name}" if first_transaction.borrowed_by else '-'],
+        ['Ausleihdatum:', data['borrow_date']],
+        ['Vorgangsnummer:', data['transaction_number']],
+        ['Voraussichtliche Rückgabe:', data['expected_return_date']],
+        ['Bearbeitender Nutzer:', data['borrowed_by']],
     ]
     
     info_table = Table(info_data, colWidths=[5*cm, 12*cm])
@@ -229,18 +382,7 @@ def generate_borrow_receipt_pdf(borrow_transactions, output=None):
     story.append(Spacer(1, 0.8*cm))
     
     # Artikel-Tabelle (wie Rechnung)
-    table_data = [['#', 'Produktname', 'Produkt-ID', 'Länge', 'Seriennummer']]
-    
-    for idx, transaction in enumerate(borrow_transactions, 1):
-        product = transaction.product
-        row = [
-            str(idx),
-            product.name or '-',
-            str(product.id),
-            _format_length(product.length),
-            product.serial_number or '-'
-        ]
-        table_data.append(row)
+    table_data = [['#', 'Produktname', 'Produkt-ID', 'Länge', 'Seriennummer']] + data['rows']
     
     # Tabelle erstellen
     col_widths = [1*cm, 7*cm, 2.5*cm, 2.5*cm, 4*cm]
@@ -283,7 +425,7 @@ def generate_borrow_receipt_pdf(borrow_transactions, output=None):
         fontSize=10,
         spaceBefore=10
     )
-    summary_text = f"<b>Gesamtanzahl ausgeliehener Artikel:</b> {len(borrow_transactions)}"
+    summary_text = f"<b>Gesamtanzahl ausgeliehener Artikel:</b> {len(data['rows'])}"
     story.append(Paragraph(summary_text, summary_style))
     story.append(Spacer(1, 1*cm))
     
@@ -295,7 +437,7 @@ def generate_borrow_receipt_pdf(borrow_transactions, output=None):
         textColor=colors.grey,
         alignment=TA_CENTER,
     )
-    footer_text = f"Erstellt am {datetime.now().strftime('%d.%m.%Y %H:%M')} - {app_name}"
+    footer_text = f"Erstellt am {generated_at.strftime('%d.%m.%Y %H:%M')} - {data['app_name']}"
     story.append(Paragraph(footer_text, footer_style))
     story.append(Spacer(1, 0.3*cm))
     
@@ -313,12 +455,6 @@ def generate_borrow_receipt_pdf(borrow_transactions, output=None):
     
     # PDF bauen
     doc.build(story)
-    
-    if isinstance(output, BytesIO):
-        output.seek(0)
-        return output
-    
-    return output
 
 
 def generate_inventory_tool_pdf(inventory, items, output=None):
@@ -336,20 +472,46 @@ def generate_inventory_tool_pdf(inventory, items, output=None):
     if output is None:
         output = BytesIO()
     
+    return _write_output(output, cached_pdf('inventories', inventory_tool_document(inventory, items)))
+
+
+def inventory_tool_document(inventory, items):
+    """Daten der Inventurliste einer Inventur (Items in Druckreihenfolge)."""
+    rows = []
+    for item in items:
+        product = item.product
+        rows.append([
+            str(product.id),
+            product.name or '-',
+            product.category or '-',
+            product.location or '-',
+            product.condition or '-',
+            bool(item.checked),
+            item.notes or ''  # Anmerkungen können leer sein
+        ])
+    
+    return {
+        'logo': _logo_info(),
+        'name': inventory.name,
+        'started_at': inventory.started_at.strftime('%d.%m.%Y %H:%M'),
+        'completed_at': inventory.completed_at.strftime('%d.%m.%Y %H:%M') if inventory.completed_at else None,
+        'status': inventory.status,
+        'rows': rows,
+    }
+
+
+def _render_inventory_tool(output, data, generated_at):
+    """Setzt die Inventurliste mit Checkboxen und Anmerkungsfeldern."""
     doc = SimpleDocTemplate(output, pagesize=A4, topMargin=2*cm, bottomMargin=2*cm)
     story = []
     
     styles = getSampleStyleSheet()
     
     # Logo hinzufügen
-    logo_path = get_logo_path()
-    if logo_path:
-        try:
-            logo = Image(logo_path, width=3*cm, height=3*cm, kind='proportional')
-            story.append(logo)
-            story.append(Spacer(1, 0.3*cm))
-        except Exception as e:
-            current_app.logger.warning(f"Konnte Logo nicht laden: {e}")
+    logo = _logo_image(data['logo'], 3*cm, 3*cm)
+    if logo:
+        story.append(logo)
+        story.append(Spacer(1, 0.3*cm))
     
     # Titel
     title_style = ParagraphStyle(
@@ -360,7 +522,7 @@ def generate_inventory_tool_pdf(inventory, items, output=None):
         alignment=TA_CENTER,
         spaceAfter=10
     )
-    story.append(Paragraph(f"Inventur: {inventory.name}", title_style))
+    story.append(Paragraph(f"Inventur: {data['name']}", title_style))
     
     # Datum und Status
     date_style = ParagraphStyle(
@@ -370,30 +532,20 @@ def generate_inventory_tool_pdf(inventory, items, output=None):
         alignment=TA_CENTER,
         spaceAfter=5
     )
-    story.append(Paragraph(f"Gestartet: {inventory.started_at.strftime('%d.%m.%Y %H:%M')}", date_style))
-    if inventory.completed_at:
-        story.append(Paragraph(f"Abgeschlossen: {inventory.completed_at.strftime('%d.%m.%Y %H:%M')}", date_style))
-    story.append(Paragraph(f"Status: {'Abgeschlossen' if inventory.status == 'completed' else 'Aktiv'}", date_style))
+    story.append(Paragraph(f"Gestartet: {data['started_at']}", date_style))
+    if data['completed_at']:
+        story.append(Paragraph(f"Abgeschlossen: {data['completed_at']}", date_style))
+    story.append(Paragraph(f"Status: {'Abgeschlossen' if data['status'] == 'completed' else 'Aktiv'}", date_style))
     story.append(Spacer(1, 0.5*cm))
     
     # Tabellendaten vorbereiten
     # Spalten: #, Produktname, Kategorie, Lagerort, Zustand, Inventiert (Checkbox), Anmerkungen
     table_data = [['#', 'Produktname', 'Kategorie', 'Lagerort', 'Zustand', 'Inventiert', 'Anmerkungen']]
     
-    for item in items:
-        product = item.product
+    for row in data['rows']:
         # Checkbox als leeres Kästchen darstellen (□)
-        checkbox = '☐' if not item.checked else '☑'
-        
-        table_data.append([
-            str(product.id),
-            product.name or '-',
-            product.category or '-',
-            product.location or '-',
-            product.condition or '-',
-            checkbox,
-            item.notes or ''  # Anmerkungen können leer sein
-        ])
+        checkbox = '☑' if row[5] else '☐'
+        table_data.append(row[:5] + [checkbox, row[6]])
     
     # Tabelle erstellen
     # Spaltenbreiten anpassen (A4 Breite: 21cm, abzüglich Ränder)
@@ -451,7 +603,6 @@ def generate_inventory_tool_pdf(inventory, items, output=None):
     story.append(Paragraph(f"Seite 1", footer_style))
     
     doc.build(story)
-    return output
 
 
 def generate_qr_code_sheet_pdf(products, output=None, label_type='cable'):
@@ -469,6 +620,11 @@ def generate_qr_code_sheet_pdf(products, output=None, label_type='cable'):
     if output is None:
         output = BytesIO()
     
+    return _write_output(output, cached_pdf('qr_sheets', qr_sheet_document(products, label_type)))
+
+
+def qr_sheet_document(products, label_type='cable'):
+    """Daten des Druckbogens: je Label Produkt, QR-Daten, Längentext und Farbe."""
     # Initialisiere Farbzuordnungen falls nötig
     # Wichtig: Auch bei Fehler fortfahren, damit Geräte-PDFs ohne Länge funktionieren
     try:
@@ -479,6 +635,41 @@ def generate_qr_code_sheet_pdf(products, output=None, label_type='cable'):
         from app import db
         db.session.rollback()
     
+    # Farben einmal laden statt pro Label abzufragen
+    try:
+        color_mappings = get_all_color_mappings()
+    except Exception as e:
+        current_app.logger.warning(f"Fehler beim Laden der Farbzuordnungen: {e}")
+        color_mappings = {}
+    
+    labels = []
+    for product in products:
+        color_hex = None
+        if label_type == 'cable' and product.length_meters is not None:
+            meters = round(float(product.length_meters), 2)
+            if meters not in color_mappings:
+                color_mappings[meters] = get_or_create_color_mapping(meters)
+            color_hex = color_mappings[meters]
+        labels.append({
+            'id': product.id,
+            'name': product.name,
+            'qr_data': generate_product_qr_code(product.id),
+            'length': _format_length(product.length, product.length_meters) if product.length else None,
+            'color': color_hex,
+        })
+    
+    return {
+        'app_name': _portal_name(),
+        'logo': _logo_info(),
+        'label_type': label_type,
+        'labels': labels,
+    }
+
+
+def _render_qr_sheet(output, data, generated_at):
+    """Setzt den QR-Code-Druckbogen; QR-Codes werden vorab berechnet und als Vektoren gezeichnet."""
+    label_type = data['label_type']
+    products = data['labels']
     # A4-Seite: 21cm × 29.7cm
     # Ränder: 1.5cm links/rechts, 2cm oben/unten
     # Speichere Label-Parameter für Custom Template
@@ -499,18 +690,9 @@ def generate_qr_code_sheet_pdf(products, output=None, label_type='cable'):
     styles = getSampleStyleSheet()
     
     # Header: Logo links, "Labels" Text rechts daneben
-    logo_path = get_logo_path()
     header_data = []
     
-    if logo_path:
-        try:
-            logo = Image(logo_path, width=2.5*cm, height=2.5*cm, kind='proportional')
-            header_data.append([logo])
-        except Exception as e:
-            current_app.logger.warning(f"Konnte Logo nicht laden: {e}")
-            header_data.append([''])
-    else:
-        header_data.append([''])
+    header_data.append([_logo_image(data['logo'], 2.5*cm, 2.5*cm) or ''])
     
     # "Labels" Text daneben
     label_type_text = "Kabel-Labels" if label_type == 'cable' else "Geräte-Labels"
@@ -544,32 +726,34 @@ def generate_qr_code_sheet_pdf(products, output=None, label_type='cable'):
     available_width = 21*cm - 3*cm  # A4-Breite minus linke/rechte Ränder
     cols_per_row = int(available_width / label_width)
     
+    # QR-Code-Matrizen für alle Produkte
+    matrices = qr_code_matrices([product['qr_data'] for product in products])
+    
     # Erstelle Labels für alle Produkte
     label_rows = []
     current_row = []
     
-    for product in products:
-        # QR-Code generieren
-        qr_data = generate_product_qr_code(product.id)
-        
+    for product, matrix in zip(products, matrices):
         try:
+            if matrix is None:
+                raise ValueError("QR-Code konnte nicht berechnet werden")
+            
             if label_type == 'cable':
-                # Kabel-Label: Invertierter QR-Code
-                qr_bytes = generate_qr_code_inverted_bytes(qr_data, box_size=6)
-                qr_image = Image(BytesIO(qr_bytes), width=qr_size, height=qr_size)
+                # Kabel-Label: Invertierter QR-Code (weiße Module auf Schwarz)
+                qr_image = QRCodeFlowable(matrix, qr_size, color=colors.white, background=colors.black)
                 
                 # Produktname (einzeilig, kürzen falls zu lang)
-                product_name = product.name
+                product_name = product['name']
                 if len(product_name) > 20:
                     product_name = product_name[:17] + "..."
                 
                 # Hole Farbe für Länge
-                color_hex = get_color_for_length(product.length) if product.length else None
+                color_hex = product['color']
                 color_obj = colors.HexColor(color_hex) if color_hex else colors.black
                 
                 # Obere Hälfte: Farbstreifen (wenn Länge vorhanden) + Text
                 # Wenn keine Länge: Komplett schwarz, kein Farbstreifen
-                has_length = color_hex and product.length
+                has_length = color_hex and product['length']
                 color_stripe_height = 0.4*cm if has_length else 0  # Höhe des Farbstreifens
                 text_area_height = label_height - color_stripe_height - qr_size
                 
@@ -601,7 +785,7 @@ def generate_qr_code_sheet_pdf(products, output=None, label_type='cable'):
                 )
                 text_elements.append(Paragraph(product_name, name_style))
                 
-                if product.length:
+                if product['length']:
                     length_style = ParagraphStyle(
                         'LabelLength',
                         parent=styles['Normal'],
@@ -610,7 +794,7 @@ def generate_qr_code_sheet_pdf(products, output=None, label_type='cable'):
                         alignment=TA_CENTER,
                         leading=9
                     )
-                    text_elements.append(Paragraph(_format_length(product.length), length_style))
+                    text_elements.append(Paragraph(product['length'], length_style))
                 
                 text_table = Table([[text_elements]], colWidths=[label_width], rowHeights=[text_area_height])
                 text_table.setStyle(TableStyle([
@@ -650,11 +834,10 @@ def generate_qr_code_sheet_pdf(products, output=None, label_type='cable'):
                 
             else:
                 # Geräte-Label: Normaler QR-Code
-                qr_bytes = generate_qr_code_bytes(qr_data, box_size=6)
-                qr_image = Image(BytesIO(qr_bytes), width=qr_size, height=qr_size)
+                qr_image = QRCodeFlowable(matrix, qr_size)
                 
                 # Produktname (einzeilig, kürzen falls zu lang)
-                product_name = product.name
+                product_name = product['name']
                 if len(product_name) > 20:
                     product_name = product_name[:17] + "..."
                 
@@ -723,7 +906,7 @@ def generate_qr_code_sheet_pdf(products, output=None, label_type='cable'):
                 current_row = []
                 
         except Exception as e:
-            current_app.logger.error(f"Fehler beim Generieren des QR-Codes für Produkt {product.id}: {e}")
+            logger.error(f"Fehler beim Generieren des QR-Codes für Produkt {product['id']}: {e}")
             # Fallback: Leeres Label mit Text
             fallback_style = ParagraphStyle(
                 'LabelFallback',
@@ -732,7 +915,7 @@ def generate_qr_code_sheet_pdf(products, output=None, label_type='cable'):
                 textColor=colors.red,
                 alignment=TA_CENTER
             )
-            fallback_content = [[Paragraph(f"Fehler: {product.name}", fallback_style)]]
+            fallback_content = [[Paragraph(f"Fehler: {product['name']}", fallback_style)]]
             fallback_table = Table(fallback_content, colWidths=[label_width])
             current_row.append(fallback_table)
             
@@ -794,6 +977,16 @@ def generate_qr_code_sheet_pdf(products, output=None, label_type='cable'):
                 self.table.wrap(availWidth, availHeight)
                 return (self.width, self.height)
             
+            def split(self, availWidth, availHeight):
+                """Teilt das Raster zeilenweise auf mehrere Seiten auf."""
+                if availHeight < self.label_height:
+                    return []
+                return [
+                    TableWithDashedLines(part, self.label_width, self.label_height, self.cols_per_row,
+                                         len(part._cellvalues), self.line_color)
+                    for part in self.table.split(availWidth, availHeight)
+                ]
+            
             def draw(self):
                 """Rendert die Tabelle und zeichnet dann die gestrichelten Linien."""
                 # Rendere die Tabelle (sie wurde bereits in wrap() gewrappt)
@@ -830,25 +1023,12 @@ def generate_qr_code_sheet_pdf(products, output=None, label_type='cable'):
         textColor=colors.grey,
         alignment=TA_CENTER,
     )
-    # Get portal name from SystemSettings
-    try:
-        from app.models.settings import SystemSettings
-        portal_name_setting = SystemSettings.query.filter_by(key='portal_name').first()
-        app_name = portal_name_setting.value if portal_name_setting and portal_name_setting.value else current_app.config.get('APP_NAME', 'Prismateams')
-    except:
-        app_name = current_app.config.get('APP_NAME', 'Prismateams')
-    footer_text = f"Erstellt am {datetime.now().strftime('%d.%m.%Y %H:%M')} - {app_name}"
+    footer_text = f"Erstellt am {generated_at.strftime('%d.%m.%Y %H:%M')} - {data['app_name']}"
     story.append(Spacer(1, 0.5*cm))
     story.append(Paragraph(footer_text, footer_style))
     
     # PDF bauen
     doc.build(story)
-    
-    if isinstance(output, BytesIO):
-        output.seek(0)
-        return output
-    
-    return output
 
 
 def generate_color_code_table_pdf(output=None):
@@ -864,9 +1044,11 @@ def generate_color_code_table_pdf(output=None):
     if output is None:
         output = BytesIO()
     
-    from app.utils.color_mapping import get_all_color_mappings
-    from app.utils.lengths import format_length_from_meters
-    
+    return _write_output(output, cached_pdf('color_codes', color_codes_document()))
+
+
+def color_codes_document():
+    """Daten der Farbcodes-Tabelle: Längentext und Farbe je Zuordnung."""
     # Initialisiere Farbzuordnungen falls nötig
     try:
         initialize_color_mappings()
@@ -876,6 +1058,20 @@ def generate_color_code_table_pdf(output=None):
         from app import db
         db.session.rollback()
     
+    rows = []
+    for length_meters, color_hex in sorted(get_all_color_mappings().items()):
+        length_str = format_length_from_meters(length_meters) or f"{length_meters} m"
+        rows.append([length_str, color_hex])
+    
+    return {
+        'app_name': _portal_name(),
+        'logo': _logo_info(),
+        'rows': rows,
+    }
+
+
+def _render_color_codes(output, data, generated_at):
+    """Setzt die Tabelle aller Längen-Farb-Zuordnungen."""
     doc = SimpleDocTemplate(output, pagesize=A4, 
                            leftMargin=2*cm, rightMargin=2*cm,
                            topMargin=2*cm, bottomMargin=2*cm)
@@ -884,18 +1080,7 @@ def generate_color_code_table_pdf(output=None):
     styles = getSampleStyleSheet()
     
     # Header: Logo links, "Farbcodes" Text rechts daneben
-    logo_path = get_logo_path()
-    header_data = []
-    
-    if logo_path:
-        try:
-            logo = Image(logo_path, width=2.5*cm, height=2.5*cm, kind='proportional')
-            header_data.append([logo])
-        except Exception as e:
-            current_app.logger.warning(f"Konnte Logo nicht laden: {e}")
-            header_data.append([''])
-    else:
-        header_data.append([''])
+    header_data = [[_logo_image(data['logo'], 2.5*cm, 2.5*cm) or '']]
     
     # "Farbcodes" Text daneben
     title_style = ParagraphStyle(
@@ -918,8 +1103,8 @@ def generate_color_code_table_pdf(output=None):
     story.append(header_table)
     story.append(Spacer(1, 0.5*cm))
     
-    # Hole alle Farbzuordnungen
-    mappings = get_all_color_mappings()
+    # Alle Farbzuordnungen (nach Länge sortiert)
+    mappings = data['rows']
     
     if not mappings:
         # Keine Zuordnungen vorhanden
@@ -935,8 +1120,7 @@ def generate_color_code_table_pdf(output=None):
         # Erstelle Tabelle mit Längen und Farben
         table_data = [['Länge', 'Farbe']]
         
-        for length_meters, color_hex in sorted(mappings.items()):
-            length_str = format_length_from_meters(length_meters) or f"{length_meters} m"
+        for length_str, color_hex in mappings:
             table_data.append([length_str, ''])
         
         # Tabelle erstellen
@@ -973,7 +1157,7 @@ def generate_color_code_table_pdf(output=None):
         
         # Füge Hintergrundfarben für jede Zeile hinzu
         row_idx = 1
-        for length_meters, color_hex in sorted(mappings.items()):
+        for length_str, color_hex in mappings:
             color_obj = colors.HexColor(color_hex)
             table_style.append(('BACKGROUND', (1, row_idx), (1, row_idx), color_obj))
             row_idx += 1
@@ -989,25 +1173,12 @@ def generate_color_code_table_pdf(output=None):
         textColor=colors.grey,
         alignment=TA_CENTER,
     )
-    # Get portal name from SystemSettings
-    try:
-        from app.models.settings import SystemSettings
-        portal_name_setting = SystemSettings.query.filter_by(key='portal_name').first()
-        app_name = portal_name_setting.value if portal_name_setting and portal_name_setting.value else current_app.config.get('APP_NAME', 'Prismateams')
-    except:
-        app_name = current_app.config.get('APP_NAME', 'Prismateams')
-    footer_text = f"Erstellt am {datetime.now().strftime('%d.%m.%Y %H:%M')} - {app_name}"
+    footer_text = f"Erstellt am {generated_at.strftime('%d.%m.%Y %H:%M')} - {data['app_name']}"
     story.append(Spacer(1, 0.5*cm))
     story.append(Paragraph(footer_text, footer_style))
     
     # PDF bauen
     doc.build(story)
-    
-    if isinstance(output, BytesIO):
-        output.seek(0)
-        return output
-    
-    return output
 
 
 def generate_inventory_list_pdf(products, output=None):
@@ -1015,7 +1186,7 @@ def generate_inventory_list_pdf(products, output=None):
     Generiert eine Inventurliste als PDF.
     
     Args:
-        products: Liste von Product Objekten
+        products: Product Objekte oder Zeilen mit denselben Attributen (wird einmal durchlaufen)
         output: BytesIO Objekt oder Dateipfad (optional)
     
     Returns:
@@ -1024,20 +1195,43 @@ def generate_inventory_list_pdf(products, output=None):
     if output is None:
         output = BytesIO()
     
+    return _write_output(output, cached_pdf('inventory_lists', inventory_list_document(products)))
+
+
+def inventory_list_document(products):
+    """Daten der Inventurliste aller Produkte (Zeilen in Druckreihenfolge)."""
+    rows = []
+    for product in products:
+        rows.append([
+            str(product.id),
+            product.name or '-',
+            product.category or '-',
+            product.serial_number or '-',
+            product.location or '-',
+            _format_length(product.length, product.length_meters),
+            product.status,
+            product.condition or '-'
+        ])
+    
+    return {
+        'app_name': _portal_name(),
+        'logo': _logo_info(),
+        'rows': rows,
+    }
+
+
+def _render_inventory_list(output, data, generated_at):
+    """Setzt die Inventurliste mit Zusammenfassung nach Status."""
     doc = SimpleDocTemplate(output, pagesize=A4, topMargin=2*cm, bottomMargin=2*cm)
     story = []
     
     styles = getSampleStyleSheet()
     
     # Logo hinzufügen
-    logo_path = get_logo_path()
-    if logo_path:
-        try:
-            logo = Image(logo_path, width=3*cm, height=3*cm, kind='proportional')
-            story.append(logo)
-            story.append(Spacer(1, 0.3*cm))
-        except Exception as e:
-            current_app.logger.warning(f"Konnte Logo nicht laden: {e}")
+    logo = _logo_image(data['logo'], 3*cm, 3*cm)
+    if logo:
+        story.append(logo)
+        story.append(Spacer(1, 0.3*cm))
     
     # Titel
     title_style = ParagraphStyle(
@@ -1058,24 +1252,19 @@ def generate_inventory_list_pdf(products, output=None):
         alignment=TA_CENTER,
         spaceAfter=15
     )
-    story.append(Paragraph(f"Stand: {datetime.now().strftime('%d.%m.%Y %H:%M')}", date_style))
+    story.append(Paragraph(f"Stand: {generated_at.strftime('%d.%m.%Y %H:%M')}", date_style))
     story.append(Spacer(1, 0.5*cm))
     
     # Tabellendaten vorbereiten
     table_data = [['#', 'Produktname', 'Kategorie', 'Seriennummer', 'Lagerort', 'Länge', 'Status', 'Zustand']]
+    status_counts = {'available': 0, 'borrowed': 0, 'missing': 0}
     
-    for product in products:
-        status_text = 'Verfügbar' if product.status == 'available' else ('Ausgeliehen' if product.status == 'borrowed' else 'Fehlend')
-        table_data.append([
-            str(product.id),
-            product.name or '-',
-            product.category or '-',
-            product.serial_number or '-',
-            product.location or '-',
-            _format_length(product.length),
-            status_text,
-            product.condition or '-'
-        ])
+    for row in data['rows']:
+        status = row[6]
+        if status in status_counts:
+            status_counts[status] += 1
+        status_text = 'Verfügbar' if status == 'available' else ('Ausgeliehen' if status == 'borrowed' else 'Fehlend')
+        table_data.append(row[:6] + [status_text, row[7]])
     
     # Tabelle erstellen
     # Spaltenbreiten anpassen (A4 Breite: 21cm, abzüglich Ränder)
@@ -1124,10 +1313,10 @@ def generate_inventory_list_pdf(products, output=None):
     story.append(Spacer(1, 0.5*cm))
     
     # Zusammenfassung
-    available_count = sum(1 for p in products if p.status == 'available')
-    borrowed_count = sum(1 for p in products if p.status == 'borrowed')
-    missing_count = sum(1 for p in products if p.status == 'missing')
-    total_count = len(products)
+    available_count = status_counts['available']
+    borrowed_count = status_counts['borrowed']
+    missing_count = status_counts['missing']
+    total_count = len(table_data) - 1
     
     summary_style = ParagraphStyle(
         'Summary',
@@ -1147,158 +1336,12 @@ def generate_inventory_list_pdf(products, output=None):
         textColor=colors.grey,
         alignment=TA_CENTER,
     )
-    # Get portal name from SystemSettings
-    try:
-        from app.models.settings import SystemSettings
-        portal_name_setting = SystemSettings.query.filter_by(key='portal_name').first()
-        app_name = portal_name_setting.value if portal_name_setting and portal_name_setting.value else current_app.config.get('APP_NAME', 'Prismateams')
-    except:
-        app_name = current_app.config.get('APP_NAME', 'Prismateams')
-    footer_text = f"Erstellt am {datetime.now().strftime('%d.%m.%Y %H:%M')} - {app_name}"
+    footer_text = f"Erstellt am {generated_at.strftime('%d.%m.%Y %H:%M')} - {data['app_name']}"
     story.append(Spacer(1, 0.5*cm))
     story.append(Paragraph(footer_text, footer_style))
     
     # PDF bauen
     doc.build(story)
-    
-    if isinstance(output, BytesIO):
-        output.seek(0)
-        return output
-    
-    return output
-
-
-def generate_inventory_tool_pdf(inventory, items, output=None):
-    """
-    Generiert eine Inventurliste als PDF mit Checkboxen und Anmerkungsfeldern.
-    
-    Args:
-        inventory: Inventory Objekt
-        items: Liste von InventoryItem Objekten
-        output: BytesIO Objekt oder Dateipfad (optional)
-    
-    Returns:
-        BytesIO Objekt mit PDF-Daten (falls output=None)
-    """
-    if output is None:
-        output = BytesIO()
-    
-    doc = SimpleDocTemplate(output, pagesize=A4, topMargin=2*cm, bottomMargin=2*cm)
-    story = []
-    
-    styles = getSampleStyleSheet()
-    
-    # Logo hinzufügen
-    logo_path = get_logo_path()
-    if logo_path:
-        try:
-            logo = Image(logo_path, width=3*cm, height=3*cm, kind='proportional')
-            story.append(logo)
-            story.append(Spacer(1, 0.3*cm))
-        except Exception as e:
-            current_app.logger.warning(f"Konnte Logo nicht laden: {e}")
-    
-    # Titel
-    title_style = ParagraphStyle(
-        'InventoryTitle',
-        parent=styles['Heading1'],
-        fontSize=18,
-        textColor=colors.HexColor('#0d6efd'),
-        alignment=TA_CENTER,
-        spaceAfter=10
-    )
-    story.append(Paragraph(f"Inventur: {inventory.name}", title_style))
-    
-    # Datum und Status
-    date_style = ParagraphStyle(
-        'Date',
-        parent=styles['Normal'],
-        fontSize=10,
-        alignment=TA_CENTER,
-        spaceAfter=5
-    )
-    story.append(Paragraph(f"Gestartet: {inventory.started_at.strftime('%d.%m.%Y %H:%M')}", date_style))
-    if inventory.completed_at:
-        story.append(Paragraph(f"Abgeschlossen: {inventory.completed_at.strftime('%d.%m.%Y %H:%M')}", date_style))
-    story.append(Paragraph(f"Status: {'Abgeschlossen' if inventory.status == 'completed' else 'Aktiv'}", date_style))
-    story.append(Spacer(1, 0.5*cm))
-    
-    # Tabellendaten vorbereiten
-    # Spalten: #, Produktname, Kategorie, Lagerort, Zustand, Inventiert (Checkbox), Anmerkungen
-    table_data = [['#', 'Produktname', 'Kategorie', 'Lagerort', 'Zustand', 'Inventiert', 'Anmerkungen']]
-    
-    for item in items:
-        product = item.product
-        # Checkbox als leeres Kästchen darstellen (□)
-        checkbox = '☐' if not item.checked else '☑'
-        
-        table_data.append([
-            str(product.id),
-            product.name or '-',
-            product.category or '-',
-            product.location or '-',
-            product.condition or '-',
-            checkbox,
-            item.notes or ''  # Anmerkungen können leer sein
-        ])
-    
-    # Tabelle erstellen
-    # Spaltenbreiten anpassen (A4 Breite: 21cm, abzüglich Ränder)
-    available_width = 17*cm
-    col_widths = [
-        0.8*cm,  # #
-        4*cm,    # Produktname
-        2*cm,    # Kategorie
-        2*cm,    # Lagerort
-        1.5*cm,  # Zustand
-        1.2*cm,  # Inventiert (Checkbox)
-        5.5*cm   # Anmerkungen
-    ]
-    
-    table = Table(table_data, colWidths=col_widths, repeatRows=1)
-    table.setStyle(TableStyle([
-        # Header
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#0d6efd')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('ALIGN', (5, 1), (5, -1), 'CENTER'),  # Checkbox zentrieren
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 9),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
-        ('TOPPADDING', (0, 0), (-1, 0), 8),
-        
-        # Body
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 8),
-        ('FONTSIZE', (5, 1), (5, -1), 12),  # Größere Checkbox-Zeichen
-        ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-        ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f8f9fa')]),
-        
-        # Grid
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        
-        # Anmerkungsfeld - mehr Platz für Text
-        ('TOPPADDING', (6, 1), (6, -1), 4),
-        ('BOTTOMPADDING', (6, 1), (6, -1), 4),
-    ]))
-    
-    story.append(table)
-    
-    # Footer mit Seitenzahl
-    story.append(Spacer(1, 0.5*cm))
-    footer_style = ParagraphStyle(
-        'Footer',
-        parent=styles['Normal'],
-        fontSize=8,
-        alignment=TA_CENTER,
-        textColor=colors.grey
-    )
-    story.append(Paragraph(f"Seite 1", footer_style))
-    
-    doc.build(story)
-    return output
 
 
 def generate_return_confirmation_pdf(borrow_transaction, output=None):
@@ -1421,135 +1464,11 @@ def generate_return_confirmation_pdf(borrow_transaction, output=None):
     return output
 
 
-def generate_inventory_tool_pdf(inventory, items, output=None):
-    """
-    Generiert eine Inventurliste als PDF mit Checkboxen und Anmerkungsfeldern.
-    
-    Args:
-        inventory: Inventory Objekt
-        items: Liste von InventoryItem Objekten
-        output: BytesIO Objekt oder Dateipfad (optional)
-    
-    Returns:
-        BytesIO Objekt mit PDF-Daten (falls output=None)
-    """
-    if output is None:
-        output = BytesIO()
-    
-    doc = SimpleDocTemplate(output, pagesize=A4, topMargin=2*cm, bottomMargin=2*cm)
-    story = []
-    
-    styles = getSampleStyleSheet()
-    
-    # Logo hinzufügen
-    logo_path = get_logo_path()
-    if logo_path:
-        try:
-            logo = Image(logo_path, width=3*cm, height=3*cm, kind='proportional')
-            story.append(logo)
-            story.append(Spacer(1, 0.3*cm))
-        except Exception as e:
-            current_app.logger.warning(f"Konnte Logo nicht laden: {e}")
-    
-    # Titel
-    title_style = ParagraphStyle(
-        'InventoryTitle',
-        parent=styles['Heading1'],
-        fontSize=18,
-        textColor=colors.HexColor('#0d6efd'),
-        alignment=TA_CENTER,
-        spaceAfter=10
-    )
-    story.append(Paragraph(f"Inventur: {inventory.name}", title_style))
-    
-    # Datum und Status
-    date_style = ParagraphStyle(
-        'Date',
-        parent=styles['Normal'],
-        fontSize=10,
-        alignment=TA_CENTER,
-        spaceAfter=5
-    )
-    story.append(Paragraph(f"Gestartet: {inventory.started_at.strftime('%d.%m.%Y %H:%M')}", date_style))
-    if inventory.completed_at:
-        story.append(Paragraph(f"Abgeschlossen: {inventory.completed_at.strftime('%d.%m.%Y %H:%M')}", date_style))
-    story.append(Paragraph(f"Status: {'Abgeschlossen' if inventory.status == 'completed' else 'Aktiv'}", date_style))
-    story.append(Spacer(1, 0.5*cm))
-    
-    # Tabellendaten vorbereiten
-    # Spalten: #, Produktname, Kategorie, Lagerort, Zustand, Inventiert (Checkbox), Anmerkungen
-    table_data = [['#', 'Produktname', 'Kategorie', 'Lagerort', 'Zustand', 'Inventiert', 'Anmerkungen']]
-    
-    for item in items:
-        product = item.product
-        # Checkbox als leeres Kästchen darstellen (□)
-        checkbox = '☐' if not item.checked else '☑'
-        
-        table_data.append([
-            str(product.id),
-            product.name or '-',
-            product.category or '-',
-            product.location or '-',
-            product.condition or '-',
-            checkbox,
-            item.notes or ''  # Anmerkungen können leer sein
-        ])
-    
-    # Tabelle erstellen
-    # Spaltenbreiten anpassen (A4 Breite: 21cm, abzüglich Ränder)
-    available_width = 17*cm
-    col_widths = [
-        0.8*cm,  # #
-        4*cm,    # Produktname
-        2*cm,    # Kategorie
-        2*cm,    # Lagerort
-        1.5*cm,  # Zustand
-        1.2*cm,  # Inventiert (Checkbox)
-        5.5*cm   # Anmerkungen
-    ]
-    
-    table = Table(table_data, colWidths=col_widths, repeatRows=1)
-    table.setStyle(TableStyle([
-        # Header
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#0d6efd')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('ALIGN', (5, 1), (5, -1), 'CENTER'),  # Checkbox zentrieren
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 9),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
-        ('TOPPADDING', (0, 0), (-1, 0), 8),
-        
-        # Body
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 8),
-        ('FONTSIZE', (5, 1), (5, -1), 12),  # Größere Checkbox-Zeichen
-        ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-        ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f8f9fa')]),
-        
-        # Grid
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        
-        # Anmerkungsfeld - mehr Platz für Text
-        ('TOPPADDING', (6, 1), (6, -1), 4),
-        ('BOTTOMPADDING', (6, 1), (6, -1), 4),
-    ]))
-    
-    story.append(table)
-    
-    # Footer mit Seitenzahl
-    story.append(Spacer(1, 0.5*cm))
-    footer_style = ParagraphStyle(
-        'Footer',
-        parent=styles['Normal'],
-        fontSize=8,
-        alignment=TA_CENTER,
-        textColor=colors.grey
-    )
-    story.append(Paragraph(f"Seite 1", footer_style))
-    
-    doc.build(story)
-    return output
-
+# Setzfunktionen je Dokumentart (siehe render_pdf)
+_RENDERERS = {
+    'borrow_receipts': _render_borrow_receipt,
+    'inventories': _render_inventory_tool,
+    'inventory_lists': _render_inventory_list,
+    'qr_sheets': _render_qr_sheet,
+    'color_codes': _render_color_codes,
+}
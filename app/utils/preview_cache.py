@@ -0,0 +1,181 @@
+"""
+Cache für gerenderte Datei-Vorschauen.
+
+Markdown-Dateien werden einmal pro Version gerendert und das HTML im Speicher
+(LRU) sowie auf der Festplatte unter uploads/preview_cache/<Datei-ID>/ abgelegt.
+Der Schlüssel besteht aus Datei-ID, Versionsnummer und Renderer-Version; zusätzlich
+wird die Quelldatei (Pfad und Größe) geprüft, da Auto-Saves den Inhalt ohne
+Versionssprung ersetzen. Große Textdateien werden seitenweise gelesen.
+"""
+
+import hashlib
+import logging
+import os
+import shutil
+import threading
+from typing import Iterable, Optional, Tuple
+
+from flask import current_app
+
+from app.utils.markdown import MARKDOWN_RENDERER_VERSION, process_markdown
+from app.utils.lru_cache import LRUCache
+from app.utils.storage import get_storage, get_upload_root, read_stored_file, storage_key
+
+logger = logging.getLogger(__name__)
+
+PREVIEW_CACHE_DIR = 'preview_cache'
+DEFAULT_CACHE_SIZE = 64
+DEFAULT_MAX_RENDER_SIZE = 2 * 1024 * 1024
+DEFAULT_PAGE_SIZE = 256 * 1024
+# Sehr große HTML-Ergebnisse nur auf der Festplatte halten
+MAX_CACHED_HTML_SIZE = 1024 * 1024
+
+_HEADER_PREFIX = '<!-- preview-source: '
+_HEADER_SUFFIX = ' -->\n'
+
+
+# Schlüssel -> (Quellsignatur, HTML)
+_cache = LRUCache('FILE_PREVIEW_CACHE_SIZE', DEFAULT_CACHE_SIZE,
+                  accept=lambda value: len(value[1]) <= MAX_CACHED_HTML_SIZE)
+
+
+def _source_signature(file) -> str:
+    """Identifiziert den aktuellen Dateistand (Blob-Name und Größe)."""
+    return f"{os.path.basename(file.file_path or '')}:{file.file_size or 0}"
+
+
+def _cache_dir(file_id: int) -> str:
+    return os.path.join(get_upload_root(), PREVIEW_CACHE_DIR, str(file_id))
+
+
+def _cache_file(file_id: int, version_number: int) -> str:
+    return os.path.join(_cache_dir(file_id), f"v{version_number}_r{MARKDOWN_RENDERER_VERSION}.html")
+
+
+def _read_disk_cache(path: str, signature: str) -> Optional[str]:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            header = f.readline()
+            if header != f"{_HEADER_PREFIX}{signature}{_HEADER_SUFFIX}":
+                return None
+            return f.read()
+    except OSError:
+        return None
+
+
+def _write_disk_cache(file_id: int, path: str, signature: str, html: str):
+    """Schreibt das HTML atomar und entfernt ältere Einträge derselben Datei."""
+    directory = _cache_dir(file_id)
+    try:
+        os.makedirs(directory, exist_ok=True)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(f"{_HEADER_PREFIX}{signature}{_HEADER_SUFFIX}")
+            f.write(html)
+        os.replace(temp_path, path)
+        keep = os.path.basename(path)
+        for name in os.listdir(directory):
+            if name != keep and name.endswith('.html'):
+                os.remove(os.path.join(directory, name))
+    except OSError as e:
+        logger.warning(f"Vorschau-Cache für Datei {file_id} konnte nicht geschrieben werden: {e}")
+
+
+def get_max_render_size() -> int:
+    return current_app.config.get('FILE_PREVIEW_MAX_SIZE', DEFAULT_MAX_RENDER_SIZE)
+
+
+def get_rendered_markdown(file) -> str:
+    """
+    Liefert das gerenderte HTML der aktuellen Version einer Markdown-Datei.
+
+    Raises:
+        OSError/UnicodeDecodeError: Wenn die Quelldatei nicht gelesen werden kann
+    """
+    key = ('file', file.id, file.version_number, MARKDOWN_RENDERER_VERSION)
+    signature = _source_signature(file)
+
+    cached = _cache.get(key)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    cache_path = _cache_file(file.id, file.version_number)
+    html = _read_disk_cache(cache_path, signature)
+    if html is None:
+        content = read_stored_file(file.file_path).decode('utf-8')
+        html = process_markdown(content, wiki_mode=False)
+        _write_disk_cache(file.id, cache_path, signature, html)
+
+    _cache.put(key, (signature, html))
+    return html
+
+
+def render_markdown_preview(content: str) -> str:
+    """Rendert Editor-Inhalt; identische Inhalte werden aus dem Speicher bedient."""
+    digest = hashlib.sha256(content.encode('utf-8')).hexdigest()
+    key = ('content', digest, MARKDOWN_RENDERER_VERSION)
+    cached = _cache.get(key)
+    if cached is not None:
+        return cached[1]
+    html = process_markdown(content, wiki_mode=False)
+    _cache.put(key, (digest, html))
+    return html
+
+
+def invalidate_file_preview(file_ids: Iterable[int]):
+    """Verwirft gecachte Vorschauen (neue Version geschrieben oder Datei gelöscht)."""
+    file_ids = [file_id for file_id in file_ids if file_id is not None]
+    if not file_ids:
+        return
+    file_ids = set(file_ids)
+    _cache.invalidate(lambda key: key[0] == 'file' and key[1] in file_ids)
+    for file_id in file_ids:
+        shutil.rmtree(_cache_dir(file_id), ignore_errors=True)
+
+
+def read_text_page(file, page: int) -> Tuple[str, bool]:
+    """
+    Liest eine Seite einer großen Textdatei, ohne die ganze Datei zu laden.
+
+    Seite n enthält alle Zeilen, die im Byte-Bereich [n * Seitengröße,
+    (n + 1) * Seitengröße) beginnen; Zeilen werden nie zerschnitten.
+
+    Returns:
+        (Text der Seite, ob weitere Seiten folgen)
+    """
+    page_size = current_app.config.get('FILE_PREVIEW_PAGE_SIZE', DEFAULT_PAGE_SIZE)
+    storage = get_storage()
+    key = storage_key(file.file_path)
+    total = storage.size(key)
+    start = max(page, 0) * page_size
+    end = min(start + page_size, total)
+    if start >= total:
+        return '', False
+
+    if start > 0:
+        # Angeschnittene Zeile überspringen (bereits auf der vorherigen Seite)
+        if storage.read_range(key, start - 1, 1) != b'\n':
+            start = _find_line_end(storage, key, start, total)
+    data = storage.read_range(key, start, end - start) if start < end else b''
+    if data and not data.endswith(b'\n'):
+        # Letzte Zeile vervollständigen
+        line_end = _find_line_end(storage, key, end, total)
+        data += storage.read_range(key, end, line_end - end)
+        end = line_end
+    elif not data:
+        end = start
+
+    return data.decode('utf-8', errors='replace'), end < total
+
+
+def _find_line_end(storage, key: str, position: int, total: int, chunk_size: int = 64 * 1024) -> int:
+    """Position direkt hinter dem nächsten Zeilenumbruch ab `position` (oder Dateiende)."""
+    while position < total:
+        chunk = storage.read_range(key, position, min(chunk_size, total - position))
+        if not chunk:
+            break
+        index = chunk.find(b'\n')
+        if index != -1:
+            return position + index + 1
+        position += len(chunk)
+    return total
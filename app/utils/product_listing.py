@@ -0,0 +1,392 @@
+"""
+Seitenweise, projizierte Produktlisten für die Inventar-API.
+
+`api_products` und `api_stock` lesen nur die angeforderten Spalten als Tupel
+(`fields=`), statt vollständige Produkt-Objekte zu laden. Mit `limit` bzw.
+`cursor` wird seitenweise geliefert (Keyset-Paginierung): Sortiert wird nach
+dem gewählten Feld und der ID als eindeutigem Schlüssel, der Cursor enthält
+die Werte des letzten Eintrags. Eine Seite kostet damit eine indizierte Abfrage,
+unabhängig davon, wie weit vorne sie liegt. Längen werden über die gespeicherte
+Meter-Spalte (`length_meters`) sortiert und gefiltert (`length_min`/`length_max`).
+
+Facetten (`facet_counts`) liefern für Kategorie, Zustand, Lagerort, Länge,
+Anschaffungsjahr und Status die Anzahl der Produkte je Wert. Eine gruppierte
+Abfrage liefert alle Kombinationen dieser Werte; gezählt wird in Python, wobei
+für jede Facette die Auswahl der übrigen Facetten gilt.
+
+Gesamtzahlen und Facetten je Filterkombination werden im Speicher gehalten.
+Schreibzugriffe auf Produkte erhöhen die Tabellenversion
+(`product_table_version`) und machen die Einträge dieses Prozesses ungültig;
+andere Worker-Prozesse sehen neue Zahlen spätestens nach
+PRODUCT_COUNT_CACHE_TTL Sekunden.
+"""
+
+import base64
+import gzip
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from flask import current_app, request
+from sqlalchemy import and_, case, event, extract, func, or_, select
+
+from app import db
+from app.models.inventory import Product, ProductFolder
+from app.utils.export_stream import isoformat
+from app.utils.lengths import parse_length_to_meters
+from app.utils.lru_cache import LRUCache
+from app.utils.product_search import search_clause
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+DEFAULT_COUNT_CACHE_SIZE = 256
+DEFAULT_COUNT_CACHE_TTL = 30
+# Antworten ab dieser Größe (Bytes) werden bei Bedarf gzip-komprimiert
+GZIP_MIN_SIZE = 1024
+
+# Feld -> benötigte Spalten
+FIELD_COLUMNS = {
+    'id': (Product.id,),
+    'name': (Product.name,),
+    'description': (Product.description,),
+    'category': (Product.category,),
+    'serial_number': (Product.serial_number,),
+    'condition': (Product.condition,),
+    'location': (Product.location,),
+    'length': (Product.length,),
+    'length_meters': (Product.length_meters,),
+    'folder_id': (Product.folder_id,),
+    'folder_name': (ProductFolder.name.label('folder_name'),),
+    'purchase_date': (Product.purchase_date,),
+    'status': (Product.status,),
+    'image_path': (Product.image_path,),
+    'qr_code_data': (Product.qr_code_data,),
+    'created_at': (Product.created_at,),
+    'created_by': (Product.created_by,),
+}
+
+PRODUCT_FIELDS = (
+    'id', 'name', 'description', 'category', 'serial_number', 'condition', 'location', 'length',
+    'length_meters', 'folder_id', 'folder_name', 'purchase_date', 'status', 'image_path',
+    'qr_code_data', 'created_at', 'created_by'
+)
+STOCK_FIELDS = (
+    'id', 'name', 'category', 'serial_number', 'status', 'location', 'length', 'length_meters',
+    'folder_id', 'folder_name', 'image_path', 'qr_code_data'
+)
+
+# Sortierfeld -> [(Ausdruck, immer aufsteigend)]; NULL-Werte als '' bzw. 0, damit der
+# Cursor vergleichbar bleibt. Produkte ohne Länge stehen in beiden Richtungen am Ende.
+SORT_KEYS = {
+    'name': [(Product.name, False)],
+    'category': [(func.coalesce(Product.category, ''), False)],
+    'status': [(Product.status, False)],
+    'condition': [(func.coalesce(Product.condition, ''), False)],
+    'folder': [(func.coalesce(Product.folder_id, 0), False)],
+    'created_at': [(Product.created_at, False)],
+    'length': [(case((Product.length_meters.is_(None), 1), else_=0), True),
+               (func.coalesce(Product.length_meters, 0.0), False)],
+}
+SORT_FIELDS = set(SORT_KEYS)
+
+# Facetten: (Schlüssel der Antwort, Filterparameter, Ausdruck)
+FACETS = (
+    ('categories', 'category', Product.category),
+    ('conditions', 'condition', Product.condition),
+    ('locations', 'location', Product.location),
+    ('lengths', 'length', Product.length),
+    ('purchase_years', 'purchase_year', extract('year', Product.purchase_date)),
+    ('statuses', 'status', Product.status),
+)
+FACET_PARAMS = tuple(param for _, param, _ in FACETS)
+
+
+class ListingError(ValueError):
+    """Ungültige Parameter einer Produktliste (fields, limit, cursor)."""
+
+
+# ---------------------------------------------------------------------------
+# Tabellenversion und Cache der Gesamtzahlen
+# ---------------------------------------------------------------------------
+
+_version = 0
+_version_lock = threading.Lock()
+
+
+def product_table_version() -> int:
+    """Zähler, der bei jedem Schreibzugriff auf Produkte (in diesem Prozess) steigt."""
+    return _version
+
+
+def bump_product_version():
+    """Erhöht die Tabellenversion, z.B. nach Bulk-Inserts ohne Mapper-Events."""
+    global _version
+    with _version_lock:
+        _version += 1
+
+
+@event.listens_for(Product, 'after_insert')
+@event.listens_for(Product, 'after_update')
+@event.listens_for(Product, 'after_delete')
+def _product_changed(mapper, connection, target):
+    bump_product_version()
+
+
+# (Filter, Tabellenversion) -> Anzahl bzw. Facetten
+_counts = LRUCache('PRODUCT_COUNT_CACHE_SIZE', DEFAULT_COUNT_CACHE_SIZE,
+                   'PRODUCT_COUNT_CACHE_TTL', DEFAULT_COUNT_CACHE_TTL)
+
+
+# ---------------------------------------------------------------------------
+# Abfrage
+# ---------------------------------------------------------------------------
+
+def parse_fields(raw: Optional[str], default: Sequence[str]) -> List[str]:
+    """Angeforderte Felder (`fields=id,name,...`); die ID ist immer enthalten."""
+    if not raw or not raw.strip():
+        return list(default)
+    fields = ['id']
+    for name in raw.split(','):
+        name = name.strip()
+        if not name or name in fields:
+            continue
+        if name not in FIELD_COLUMNS:
+            raise ListingError(f'Unbekanntes Feld: {name}')
+        fields.append(name)
+    return fields
+
+
+def parse_limit(raw: Optional[str]) -> int:
+    if raw is None or raw == '':
+        return DEFAULT_PAGE_SIZE
+    try:
+        limit = int(raw)
+    except ValueError:
+        raise ListingError('limit muss eine Zahl sein')
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def parse_length_bound(raw: Optional[str]) -> Optional[float]:
+    """Grenze eines Längenfilters in Metern (`length_min`/`length_max`, z.B. "5" oder "120cm")."""
+    if raw is None or not raw.strip():
+        return None
+    meters = parse_length_to_meters(raw)
+    if meters is None:
+        raise ListingError(f'Ungültige Länge: {raw}')
+    return meters
+
+
+def product_filters(search: str = '', category: str = '', status: str = '',
+                    search_columns: Iterable = (Product.name, Product.serial_number),
+                    length_min: Optional[float] = None, length_max: Optional[float] = None) -> List:
+    """WHERE-Bedingungen für Suche (über den Suchindex), Kategorie, Status und Längenbereich (Meter)."""
+    filters = []
+    if search:
+        filters.append(search_clause(search, search_columns))
+    if category:
+        filters.append(Product.category == category)
+    if status:
+        filters.append(Product.status == status)
+    if length_min is not None:
+        filters.append(Product.length_meters >= length_min)
+    if length_max is not None:
+        filters.append(Product.length_meters <= length_max)
+    return filters
+
+
+def count_products(filters: List, signature: Tuple) -> int:
+    """Anzahl der Produkte zu den Filtern (je Filterkombination zwischengespeichert)."""
+    key = (signature, product_table_version())
+    total = _counts.get(key)
+    if total is None:
+        total = db.session.execute(select(func.count(Product.id)).where(*filters)).scalar() or 0
+        _counts.put(key, total)
+    return total
+
+
+def _select_fields(fields: Sequence[str], *extra):
+    columns = {}
+    for name in fields:
+        for column in FIELD_COLUMNS[name]:
+            columns.setdefault(column.key, column)
+    for column in extra:
+        columns.setdefault(column.key, column)
+    statement = select(*columns.values())
+    if 'folder_name' in fields:
+        statement = statement.outerjoin(ProductFolder, ProductFolder.id == Product.folder_id)
+    return statement
+
+
+def _image_name(image_path: Optional[str]) -> Optional[str]:
+    if not image_path:
+        return None
+    return os.path.basename(image_path) if os.path.isabs(image_path) else image_path
+
+
+def _blank_to_none(value):
+    return value if (value and str(value).strip()) else None
+
+
+def serialize_row(row, fields: Sequence[str], blank_as_none: bool = True) -> Dict:
+    """Wandelt eine Zeile in das JSON-Format der API (nur die angeforderten Felder).
+    
+    Mit `blank_as_none` werden leere Lagerorte und Längen als None geliefert.
+    """
+    data = {}
+    for name in fields:
+        if name in ('location', 'length') and blank_as_none:
+            data[name] = _blank_to_none(getattr(row, name))
+        elif name == 'image_path':
+            data[name] = _image_name(row.image_path)
+        elif name in ('purchase_date', 'created_at'):
+            data[name] = isoformat(getattr(row, name))
+        else:
+            data[name] = getattr(row, name)
+    return data
+
+
+def encode_cursor(sort_by: str, descending: bool, key: Sequence, row_id: int) -> str:
+    key = [value.isoformat() if isinstance(value, datetime) else value for value in key]
+    payload = json.dumps({'s': sort_by, 'd': descending, 'k': key, 'i': row_id}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str, sort_by: str, descending: bool):
+    """Sortierwerte und ID des letzten Eintrags der vorherigen Seite."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        key, row_id = list(payload['k']), int(payload['i'])
+    except (ValueError, KeyError, TypeError):
+        raise ListingError('Ungültiger Cursor')
+    if payload.get('s') != sort_by or bool(payload.get('d')) != descending or len(key) != len(SORT_KEYS[sort_by]):
+        raise ListingError('Cursor passt nicht zur Sortierung')
+    if sort_by == 'created_at' and key[0] is not None:
+        try:
+            key[0] = datetime.fromisoformat(key[0])
+        except (TypeError, ValueError):
+            raise ListingError('Ungültiger Cursor')
+    return key, row_id
+
+
+def _after(parts, values):
+    """Bedingung „Zeile liegt in der Sortierung hinter `values`“ für (Ausdruck, absteigend)-Paare."""
+    clauses = []
+    for i, (expression, descending) in enumerate(parts):
+        comparison = expression < values[i] if descending else expression > values[i]
+        clauses.append(and_(*(parts[j][0] == values[j] for j in range(i)), comparison))
+    return or_(*clauses)
+
+
+def list_products(fields: Sequence[str], filters: List, sort_by: str = 'name', descending: bool = False,
+                  limit: Optional[int] = None, cursor: Optional[str] = None, blank_as_none: bool = True):
+    """Produkte als Dicts, sortiert nach `sort_by` und ID.
+
+    Ohne `limit` werden alle Produkte geliefert. Mit `limit` höchstens `limit`
+    Einträge ab `cursor`; zurückgegeben wird (Einträge, Cursor der nächsten Seite
+    oder None).
+    """
+    keys = SORT_KEYS.get(sort_by) or SORT_KEYS['name']
+    parts = [(expression, descending and not ascending) for expression, ascending in keys]
+    parts.append((Product.id, descending))
+    labels = [expression.label(f'sort_{i}') for i, (expression, _) in enumerate(keys)]
+
+    statement = _select_fields(fields, *labels).where(*filters)
+    statement = statement.order_by(*(expression.desc() if desc else expression.asc() for expression, desc in parts))
+    if cursor:
+        key, last_id = decode_cursor(cursor, sort_by, descending)
+        statement = statement.where(_after(parts, key + [last_id]))
+    if limit is None:
+        return [serialize_row(row, fields, blank_as_none) for row in db.session.execute(statement)], None
+
+    rows = db.session.execute(statement.limit(limit + 1)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(sort_by, descending, [getattr(last, label.key) for label in labels], last.id)
+    return [serialize_row(row, fields, blank_as_none) for row in rows], next_cursor
+
+
+# ---------------------------------------------------------------------------
+# Facetten
+# ---------------------------------------------------------------------------
+
+def _facet_value(value) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return str(int(value)) if value > 0 else None
+    return value.strip() or None
+
+
+def facet_counts(filters: List, selected: Dict[str, Sequence[str]], signature: Tuple) -> Dict:
+    """Anzahl der Produkte je Facettenwert (je Filterkombination zwischengespeichert).
+
+    Args:
+        filters: WHERE-Bedingungen, die für alle Facetten gelten (z.B. Ordner, Suche)
+        selected: Ausgewählte Werte je Filterparameter (`FACET_PARAMS`); für die
+            Zahlen einer Facette gilt die Auswahl aller anderen Facetten
+        signature: Schlüssel der Filterkombination für den Cache
+
+    Returns:
+        Dict mit den Werten je Facette (sortiert), `counts` (Wert -> Anzahl je
+        Facette) und `total` (Produkte, die allen Filtern entsprechen)
+    """
+    key = (('facets',) + signature, product_table_version())
+    result = _counts.get(key)
+    if result is not None:
+        return result
+
+    selected = {param: set(values) for param, values in selected.items() if values}
+    counts = {name: {} for name, _, _ in FACETS}
+    meters = {}
+    total = 0
+    expressions = [expression for _, _, expression in FACETS]
+    statement = select(*expressions, func.max(Product.length_meters).label('length_meters'),
+                       func.count(Product.id)).where(*filters).group_by(*expressions)
+    for row in db.session.execute(statement):
+        values = [_facet_value(value) for value in row[:len(FACETS)]]
+        count = row[-1]
+        misses = [i for i, (_, param, _) in enumerate(FACETS)
+                  if param in selected and values[i] not in selected[param]]
+        if not misses:
+            total += count
+        if len(misses) > 1:
+            continue
+        for i, (name, param, _) in enumerate(FACETS):
+            if values[i] is not None and (not misses or misses == [i]):
+                counts[name][values[i]] = counts[name].get(values[i], 0) + count
+        length = values[FACET_PARAMS.index('length')]
+        if length is not None:
+            meters.setdefault(length, row.length_meters)
+
+    result = {
+        'categories': sorted(counts['categories']),
+        'conditions': sorted(counts['conditions']),
+        'locations': sorted(counts['locations']),
+        'lengths': sorted(counts['lengths'], key=lambda length: (meters[length] is None, meters[length] or 0, length)),
+        'purchase_years': sorted(counts['purchase_years'], key=int, reverse=True),
+        'statuses': sorted(counts['statuses']),
+        'counts': counts,
+        'total': total,
+    }
+    _counts.put(key, result)
+    return result
+
+
+# ---------------------------------------------------------------------------
+# Antwort
+# ---------------------------------------------------------------------------
+
+def json_response(payload, status: int = 200):
+    """JSON-Antwort, gzip-komprimiert, wenn der Client es unterstützt und es sich lohnt."""
+    body = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    response = current_app.response_class(body, status=status, mimetype='application/json')
+    response.vary.add('Accept-Encoding')
+    if len(body) >= GZIP_MIN_SIZE and 'gzip' in request.accept_encodings:
+        response.set_data(gzip.compress(body, compresslevel=6))
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
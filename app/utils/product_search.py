@@ -0,0 +1,403 @@
+"""
+Suchindex für Inventar-Produkte.
+
+Gesucht wird über Name, Seriennummer, Kategorie, Lagerort, Zustand und
+Beschreibung. Je nach Datenbank liegen dafür zwei Indizes vor:
+
+- SQLite: FTS5-Tabelle `product_search_fts` (Wörter, Präfixsuche) und
+  `product_trigram_fts` (Trigramm-Tokenizer über Name und Seriennummer für
+  Teilstrings und unscharfe Treffer). Beide werden per Mapper-Event in derselben
+  Transaktion wie das Produkt gepflegt.
+- MySQL/MariaDB: FULLTEXT-Index über die Produktspalten und ein FULLTEXT-Index
+  mit ngram-Parser über Name und Seriennummer; InnoDB pflegt beide selbst.
+
+Andere Datenbanken (oder ein fehlgeschlagenes Anlegen) fallen auf LIKE zurück.
+
+`search_products` liefert gewichtete Treffer: exakte Treffer auf Seriennummer
+bzw. QR-Code zuerst, dann nach Relevanz. Findet die Suche nichts, wird über die
+Trigramme unscharf gesucht (Tippfehler). Ergebnisse werden je Suchbegriff und
+Tabellenversion in einem LRU-Cache gehalten; gleichzeitige identische Anfragen
+(Suche während der Eingabe) werden nur einmal ausgeführt.
+"""
+
+import logging
+import re
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from sqlalchemy import Integer, and_, event, func, inspect, or_, select, text
+
+from app import db
+from app.models.inventory import Product
+from app.utils.lru_cache import LRUCache
+from app.utils.qr_code import parse_qr_code
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = 'product_search_fts'
+TRIGRAM_TABLE = 'product_trigram_fts'
+FULLTEXT_INDEX = 'ft_products_search'
+NGRAM_INDEX = 'ft_products_ngram'
+
+# Indexierte Spalten mit Gewichtung für das Ranking (bm25)
+SEARCH_COLUMNS = ('name', 'serial_number', 'category', 'location', 'condition', 'description')
+COLUMN_WEIGHTS = (10.0, 8.0, 3.0, 2.0, 2.0, 1.0)
+TRIGRAM_COLUMNS = ('name', 'serial_number')
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 1000
+MAX_TERMS = 10
+# Treffer, die höchstens gewichtet werden (begrenzt die Kosten sehr allgemeiner Suchbegriffe)
+RANK_CANDIDATES = 2000
+# Anteil der Trigramme eines Suchbegriffs, die ein unscharfer Treffer enthalten muss
+FUZZY_MIN_SHARE = 0.5
+DEFAULT_CACHE_SIZE = 512
+DEFAULT_CACHE_TTL = 30
+# Sekunden, die auf eine gleichzeitig laufende identische Suche gewartet wird
+PENDING_WAIT_TIMEOUT = 5
+
+_backend = None
+
+
+def _get_backend() -> str:
+    """Ermittelt die Suchimplementierung: 'fts5', 'fulltext' oder 'like'."""
+    global _backend
+    if _backend is None:
+        dialect = db.engine.dialect.name
+        if dialect == 'sqlite':
+            _backend = 'fts5'
+        elif dialect in ('mysql', 'mariadb'):
+            _backend = 'fulltext'
+        else:
+            _backend = 'like'
+    return _backend
+
+
+def ensure_product_search_index():
+    """Legt die Suchindizes an, falls sie fehlen (bei SQLite inklusive Erstbefüllung)."""
+    global _backend
+    backend = _get_backend()
+    try:
+        if backend == 'fts5':
+            existing = set(inspect(db.engine).get_table_names())
+            if FTS_TABLE in existing and TRIGRAM_TABLE in existing:
+                return
+            with db.engine.begin() as conn:
+                conn.execute(text(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+                    f"USING fts5({', '.join(SEARCH_COLUMNS)}, tokenize='unicode61 remove_diacritics 2')"
+                ))
+                conn.execute(text(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {TRIGRAM_TABLE} "
+                    f"USING fts5({', '.join(TRIGRAM_COLUMNS)}, tokenize='trigram')"
+                ))
+                _write_index_rows(conn)
+            logger.info("Produkt-Suchindex angelegt")
+        elif backend == 'fulltext':
+            existing = {idx['name'] for idx in inspect(db.engine).get_indexes(Product.__tablename__)}
+            with db.engine.begin() as conn:
+                if FULLTEXT_INDEX not in existing:
+                    conn.execute(text(
+                        f"ALTER TABLE products ADD FULLTEXT INDEX {FULLTEXT_INDEX} ({_mysql_columns(SEARCH_COLUMNS)})"
+                    ))
+                if NGRAM_INDEX not in existing:
+                    conn.execute(text(
+                        f"ALTER TABLE products ADD FULLTEXT INDEX {NGRAM_INDEX} "
+                        f"({_mysql_columns(TRIGRAM_COLUMNS)}) WITH PARSER ngram"
+                    ))
+    except Exception as e:
+        logger.warning(f"Produkt-Suchindex konnte nicht angelegt werden, verwende LIKE-Suche: {e}")
+        _backend = 'like'
+
+
+def _mysql_columns(columns: Sequence[str]) -> str:
+    # `condition` ist in MySQL ein reserviertes Wort
+    return ', '.join(f'`{column}`' for column in columns)
+
+
+# =========================
+# Indexpflege (SQLite)
+# =========================
+
+def _write_index_rows(conn, product_ids: Optional[Sequence[int]] = None):
+    """Schreibt die FTS-Zeilen der Produkte neu (ohne `product_ids`: alle)."""
+    if product_ids is None:
+        where = ''
+        conn.execute(text(f"DELETE FROM {FTS_TABLE}"))
+        conn.execute(text(f"DELETE FROM {TRIGRAM_TABLE}"))
+    else:
+        ids = ','.join(str(int(product_id)) for product_id in product_ids)
+        if not ids:
+            return
+        where = f"WHERE id IN ({ids})"
+        conn.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({ids})"))
+        conn.execute(text(f"DELETE FROM {TRIGRAM_TABLE} WHERE rowid IN ({ids})"))
+
+    values = ', '.join(f"COALESCE({column}, '')" for column in SEARCH_COLUMNS)
+    conn.execute(text(
+        f"INSERT INTO {FTS_TABLE}(rowid, {', '.join(SEARCH_COLUMNS)}) SELECT id, {values} FROM products {where}"
+    ))
+    values = ', '.join(f"COALESCE({column}, '')" for column in TRIGRAM_COLUMNS)
+    conn.execute(text(
+        f"INSERT INTO {TRIGRAM_TABLE}(rowid, {', '.join(TRIGRAM_COLUMNS)}) SELECT id, {values} FROM products {where}"
+    ))
+
+
+def index_products(product_ids: Iterable[int]):
+    """Aktualisiert den Suchindex für Produkte, die ohne Mapper-Events geschrieben wurden (Bulk-Insert)."""
+    product_ids = list(set(product_ids))
+    if product_ids and _get_backend() == 'fts5':
+        _write_index_rows(db.session.connection(), product_ids)
+
+
+def rebuild_product_search_index() -> int:
+    """Baut den Suchindex aller Produkte neu auf und gibt deren Anzahl zurück."""
+    ensure_product_search_index()
+    if _get_backend() == 'fts5':
+        _write_index_rows(db.session.connection())
+    return db.session.query(func.count(Product.id)).scalar() or 0
+
+
+@event.listens_for(Product, 'after_insert')
+def _product_inserted(mapper, connection, target):
+    if _get_backend() == 'fts5':
+        _write_index_rows(connection, [target.id])
+
+
+@event.listens_for(Product, 'after_update')
+def _product_updated(mapper, connection, target):
+    if _get_backend() != 'fts5':
+        return
+    state = inspect(target)
+    if any(state.attrs[column].history.has_changes() for column in SEARCH_COLUMNS):
+        _write_index_rows(connection, [target.id])
+
+
+@event.listens_for(Product, 'after_delete')
+def _product_deleted(mapper, connection, target):
+    if _get_backend() != 'fts5':
+        return
+    for table in (FTS_TABLE, TRIGRAM_TABLE):
+        connection.execute(text(f"DELETE FROM {table} WHERE rowid = :id"), {'id': target.id})
+
+
+# =========================
+# Filter für Produktlisten
+# =========================
+
+def _terms(query: str) -> List[str]:
+    return [term for term in re.findall(r'\w+', query.lower(), flags=re.UNICODE) if term][:MAX_TERMS]
+
+
+def _phrase(value: str) -> str:
+    return '"' + value.replace('"', '""') + '"'
+
+
+def _fts_match(terms: Sequence[str], columns: Sequence[str]) -> str:
+    """FTS5-Ausdruck: jeder Begriff als Präfix in einer der Spalten."""
+    scope = '{' + ' '.join(columns) + '} : ' if tuple(columns) != SEARCH_COLUMNS else ''
+    return ' AND '.join(f'{scope}{_phrase(term)}*' for term in terms)
+
+
+def _boolean_match(terms: Sequence[str]) -> str:
+    """MySQL-Boolean-Mode-Ausdruck: jeder Begriff muss als Präfix vorkommen."""
+    return ' '.join('+' + re.sub(r'[^\w]', '', term) + '*' for term in terms)
+
+
+def _exact_clauses(search: str) -> List:
+    """Exakte Treffer: Seriennummer oder QR-Code eines Produkts."""
+    clauses = [Product.serial_number == search]
+    parsed = parse_qr_code(search)
+    if parsed and parsed[0] == 'product':
+        clauses.append(Product.id == parsed[1])
+    return clauses
+
+
+def search_clause(search: str, columns: Sequence = ()):
+    """WHERE-Bedingung der Produktsuche über den Suchindex.
+
+    Treffer sind Produkte, bei denen jedes Wort des Suchbegriffs als Wortanfang
+    in einer der Spalten vorkommt, deren Name oder Seriennummer den Suchbegriff
+    enthält, sowie exakte Treffer auf Seriennummer bzw. QR-Code.
+
+    Args:
+        search: Suchbegriff
+        columns: Durchsuchte Spalten (Standard: alle indexierten)
+    """
+    names = [column.key for column in columns if column.key in SEARCH_COLUMNS] or list(SEARCH_COLUMNS)
+    backend = _get_backend()
+    if backend == 'like':
+        pattern = f'%{search}%'
+        return or_(*(getattr(Product, name).ilike(pattern) for name in names))
+
+    terms = _terms(search)
+    trigram_columns = [name for name in TRIGRAM_COLUMNS if name in names]
+    clauses = _exact_clauses(search)
+
+    if backend == 'fts5':
+        if terms:
+            clauses.append(Product.id.in_(
+                text(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match")
+                .bindparams(match=_fts_match(terms, names)).columns(rowid=Integer)
+            ))
+        if len(search) >= 3 and trigram_columns:
+            match = ('{' + ' '.join(trigram_columns) + '} : ' if len(trigram_columns) == 1 else '') + _phrase(search)
+            clauses.append(Product.id.in_(
+                text(f"SELECT rowid FROM {TRIGRAM_TABLE} WHERE {TRIGRAM_TABLE} MATCH :trigram")
+                .bindparams(trigram=match).columns(rowid=Integer)
+            ))
+    else:
+        restricted = len(names) < len(SEARCH_COLUMNS)
+        if terms:
+            match = text(f"MATCH({_mysql_columns(SEARCH_COLUMNS)}) AGAINST (:match IN BOOLEAN MODE)").bindparams(
+                match=_boolean_match(terms))
+            if restricted:
+                # Der FULLTEXT-Index umfasst alle Spalten; Einschränkung auf die Treffermenge
+                match = and_(match, *(
+                    or_(*(getattr(Product, name).ilike(f'%{term}%') for name in names)) for term in terms
+                ))
+            clauses.append(match)
+        if len(search) >= 2 and trigram_columns:
+            match = text(f"MATCH({_mysql_columns(TRIGRAM_COLUMNS)}) AGAINST (:ngram IN BOOLEAN MODE)").bindparams(
+                ngram=_phrase(search))
+            clauses.append(and_(match, or_(*(getattr(Product, name).ilike(f'%{search}%')
+                                              for name in trigram_columns))))
+    return or_(*clauses)
+
+
+# =========================
+# Gewichtete Suche
+# =========================
+
+class _SearchCache(LRUCache):
+    """LRU-Cache mit Ablaufzeit: (Suchbegriff, Limit, Tabellenversion) -> Treffer.
+
+    Läuft dieselbe Suche bereits in einem anderen Thread, wird auf deren Ergebnis
+    gewartet statt die Abfrage ein zweites Mal auszuführen.
+    """
+
+    def __init__(self):
+        super().__init__('PRODUCT_SEARCH_CACHE_SIZE', DEFAULT_CACHE_SIZE,
+                         'PRODUCT_SEARCH_CACHE_TTL', DEFAULT_CACHE_TTL)
+        self._pending: Dict = {}
+
+    def get_or_compute(self, key, compute):
+        while True:
+            with self._lock:
+                value = self._lookup(key)
+                if value is not None:
+                    return value
+                pending = self._pending.get(key)
+                if pending is None:
+                    pending = self._pending[key] = threading.Event()
+                    break
+            if not pending.wait(PENDING_WAIT_TIMEOUT):
+                return compute()
+        try:
+            value = compute()
+            self.put(key, value)
+            return value
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+            pending.set()
+
+
+_cache = _SearchCache()
+
+
+def _trigrams(value: str) -> set:
+    value = value.lower()
+    return {value[i:i + 3] for i in range(len(value) - 2) if value[i:i + 3].strip()}
+
+
+def _ranked_ids(search: str, limit: int) -> List[int]:
+    """Produkt-IDs der Suche, beste zuerst."""
+    backend = _get_backend()
+    statement = select(Product.id).where(or_(*_exact_clauses(search))).limit(limit)
+    ranked = [product_id for (product_id,) in db.session.execute(statement)]
+
+    def add(rows):
+        seen = set(ranked)
+        ranked.extend(product_id for (product_id,) in rows if product_id not in seen)
+
+    terms = _terms(search)
+    if backend == 'like':
+        add(db.session.execute(
+            select(Product.id).where(search_clause(search)).order_by(Product.name, Product.id).limit(limit)
+        ))
+        return ranked[:limit]
+
+    if backend == 'fts5':
+        # Treffer im Namen zuerst, dann in allen Spalten
+        for columns in (('name',), SEARCH_COLUMNS):
+            if not terms or len(ranked) >= limit:
+                break
+            add(db.session.execute(text(
+                f"SELECT rowid FROM (SELECT rowid, bm25({FTS_TABLE}, {', '.join(str(w) for w in COLUMN_WEIGHTS)}) "
+                f"AS score FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match LIMIT :candidates) "
+                f"ORDER BY score LIMIT :limit"
+            ), {'match': _fts_match(terms, columns), 'candidates': RANK_CANDIDATES, 'limit': limit}))
+        if len(search) >= 3 and len(ranked) < limit:
+            add(db.session.execute(text(
+                f"SELECT rowid FROM {TRIGRAM_TABLE} WHERE {TRIGRAM_TABLE} MATCH :match "
+                f"ORDER BY bm25({TRIGRAM_TABLE}) LIMIT :limit"
+            ), {'match': _phrase(search), 'limit': limit}))
+    else:
+        if terms:
+            match = f"MATCH({_mysql_columns(SEARCH_COLUMNS)}) AGAINST (:match IN BOOLEAN MODE)"
+            add(db.session.execute(text(
+                f"SELECT id FROM products WHERE {match} ORDER BY {match} DESC LIMIT :limit"
+            ), {'match': _boolean_match(terms), 'limit': limit}))
+        if len(search) >= 2 and len(ranked) < limit:
+            add(db.session.execute(
+                select(Product.id).where(search_clause(search, [Product.name, Product.serial_number]))
+                .order_by(Product.name, Product.id).limit(limit)
+            ))
+    if not ranked:
+        ranked = _fuzzy_ids(search, limit)
+    return ranked[:limit]
+
+
+def _fuzzy_ids(search: str, limit: int) -> List[int]:
+    """Unscharfe Treffer über gemeinsame Trigramme von Name bzw. Seriennummer."""
+    grams = _trigrams(search)
+    if len(grams) < 2:
+        return []
+    if _get_backend() == 'fts5':
+        rows = db.session.execute(text(
+            f"SELECT rowid, name, serial_number FROM {TRIGRAM_TABLE} WHERE {TRIGRAM_TABLE} MATCH :match LIMIT :limit"
+        ), {'match': ' OR '.join(_phrase(gram) for gram in sorted(grams)), 'limit': RANK_CANDIDATES})
+    else:
+        match = f"MATCH({_mysql_columns(TRIGRAM_COLUMNS)}) AGAINST (:match IN NATURAL LANGUAGE MODE)"
+        rows = db.session.execute(text(
+            f"SELECT id, name, serial_number FROM products WHERE {match} ORDER BY {match} DESC LIMIT :limit"
+        ), {'match': search, 'limit': RANK_CANDIDATES})
+
+    scored = []
+    for position, (product_id, name, serial_number) in enumerate(rows):
+        values = ((name or '').lower(), (serial_number or '').lower())
+        share = max(sum(gram in value for gram in grams) for value in values) / len(grams)
+        if share >= FUZZY_MIN_SHARE:
+            scored.append((-share, position, product_id))
+    return [product_id for _, _, product_id in sorted(scored)[:limit]]
+
+
+def search_products(search: str, limit: int = DEFAULT_LIMIT) -> List[Dict]:
+    """Gewichtete Produktsuche (exakte Treffer auf Seriennummer/QR-Code zuerst)."""
+    from app.utils.product_listing import product_table_version
+
+    search = search.strip()
+    limit = max(1, min(limit, MAX_LIMIT))
+
+    def compute():
+        ids = _ranked_ids(search, limit)
+        if not ids:
+            return []
+        rows = {row.id: row for row in db.session.execute(select(
+            Product.id, Product.name, Product.description, Product.category,
+            Product.serial_number, Product.status, Product.location
+        ).where(Product.id.in_(ids)))}
+        return [dict(rows[product_id]._mapping) for product_id in ids if product_id in rows]
+
+    return _cache.get_or_compute((search, limit, product_table_version()), compute)
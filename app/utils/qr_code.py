@@ -30,6 +30,47 @@ def generate_qr_code(data, box_size=10, border=4):
     return img
 
 
+def qr_code_matrix(data, border=4):
+    """
+    Berechnet die Modulmatrix eines QR-Codes (gleiche Parameter wie generate_qr_code).
+    
+    Args:
+        data: Die zu codierenden Daten (String)
+        border: Breite des Rahmens in Modulen (Standard: 4)
+    
+    Returns:
+        Liste von Zeilen (oben beginnend) mit True für dunkle Module, inklusive Rahmen
+    """
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        border=border,
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+    return qr.get_matrix()
+
+
+def qr_code_matrices(data_list, border=4):
+    """
+    Berechnet die Modulmatrizen vieler QR-Codes.
+    
+    Args:
+        data_list: Liste der zu codierenden Daten
+        border: Breite des Rahmens in Modulen
+    
+    Returns:
+        Liste der Matrizen in Eingabereihenfolge (None, falls ein Code nicht erzeugt werden konnte)
+    """
+    matrices = []
+    for data in data_list:
+        try:
+            matrices.append(qr_code_matrix(data, border))
+        except Exception:
+            matrices.append(None)
+    return matrices
+
+
 def generate_qr_code_bytes(data, box_size=10, border=4, format='PNG'):
     """
     Generiert einen QR-Code als Bytes (für Speicherung oder HTTP-Response).
@@ -0,0 +1,113 @@
+"""
+Cache für QR-Code-Bilder.
+
+Die codierten Daten von Produkten, Sets und Ausleihen ändern sich nie, die PNGs
+werden daher nur einmal erzeugt: Zuerst wird ein LRU-Cache im Speicher geprüft,
+dann das Verzeichnis uploads/qr_cache/, erst danach wird neu codiert. Der
+Schlüssel besteht aus Daten, Boxgröße, Rahmen und Invertierung. Für neu angelegte
+Produkte und Sets werden die Bilder im Hintergrund vorab erzeugt.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Iterable, Optional
+
+from flask import Response, current_app
+
+from app.utils.qr_code import generate_qr_code_bytes, generate_qr_code_inverted_bytes
+from app.utils.lru_cache import LRUCache
+from app.utils.storage import get_upload_root
+
+logger = logging.getLogger(__name__)
+
+QR_CACHE_DIR = 'qr_cache'
+DEFAULT_CACHE_SIZE = 512
+# Browser-Cache für QR-Bilder (ein Jahr, Inhalt ändert sich nie)
+QR_IMAGE_MAX_AGE = 365 * 24 * 3600
+
+
+# Schlüssel-Hash -> PNG-Bytes
+_cache = LRUCache('QR_IMAGE_CACHE_SIZE', DEFAULT_CACHE_SIZE)
+
+
+def _cache_key(data: str, box_size: int, border: int, inverted: bool) -> str:
+    payload = json.dumps([data, box_size, border, bool(inverted)], separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _cache_file(key: str) -> str:
+    return os.path.join(get_upload_root(), QR_CACHE_DIR, key[:2], f"{key}.png")
+
+
+def _read_disk_cache(path: str) -> Optional[bytes]:
+    try:
+        with open(path, 'rb') as f:
+            return f.read() or None
+    except OSError:
+        return None
+
+
+def _write_disk_cache(path: str, png: bytes):
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(png)
+        os.replace(temp_path, path)
+    except OSError as e:
+        logger.warning(f"QR-Code-Cache konnte nicht geschrieben werden: {e}")
+
+
+def get_qr_code_png(data: str, box_size: int = 10, border: int = 4, inverted: bool = False) -> bytes:
+    """QR-Code als PNG aus dem Cache; wird nur beim ersten Abruf codiert."""
+    key = _cache_key(data, box_size, border, inverted)
+    png = _cache.get(key)
+    if png is not None:
+        return png
+
+    path = _cache_file(key)
+    png = _read_disk_cache(path)
+    if png is None:
+        if inverted:
+            png = generate_qr_code_inverted_bytes(data, box_size=box_size, border=border)
+        else:
+            png = generate_qr_code_bytes(data, box_size=box_size, border=border)
+        _write_disk_cache(path, png)
+
+    _cache.put(key, png)
+    return png
+
+
+def qr_code_response(data: str, box_size: int = 10, border: int = 4, inverted: bool = False,
+                     public: bool = False) -> Response:
+    """PNG-Antwort mit unveränderlichen Cache-Headern (die URL bestimmt den Inhalt eindeutig)."""
+    response = Response(get_qr_code_png(data, box_size, border, inverted), mimetype='image/png')
+    response.cache_control.max_age = QR_IMAGE_MAX_AGE
+    response.cache_control.immutable = True
+    if public:
+        response.cache_control.public = True
+    else:
+        response.cache_control.private = True
+    return response
+
+
+def precompute_qr_codes(payloads: Iterable[str], box_size: int = 10, border: int = 4):
+    """Erzeugt die QR-Bilder für neue Objekte in einem Hintergrund-Thread."""
+    payloads = [data for data in payloads if data]
+    if not payloads:
+        return
+    app = current_app._get_current_object()
+
+    def run():
+        with app.app_context():
+            for data in payloads:
+                try:
+                    get_qr_code_png(data, box_size, border)
+                except Exception as e:
+                    logger.warning(f"QR-Code für {data} konnte nicht vorab erzeugt werden: {e}")
+
+    thread = threading.Thread(target=run, name='qr-precompute', daemon=True)
+    thread.start()
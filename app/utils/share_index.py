@@ -0,0 +1,172 @@
+"""
+Token-Index für öffentliche Freigabe-Links.
+
+Freigaben von Dateien und Ordnern stehen gemeinsam in der Tabelle `shares`
+(eindeutiger Index auf dem Token). Ein Link wird damit über eine einzige
+indizierte Abfrage aufgelöst; das Ergebnis – auch „Token unbekannt“ – wird
+für kurze Zeit in einem LRU-Cache gehalten, damit Crawler und Link-Vorschauen
+die Datenbank nicht wiederholt belasten.
+
+Der Cache hält nur die Zuordnung Token -> Ziel. Passwort, Ablaufdatum und
+Aktivierung werden am geladenen Ziel geprüft und greifen damit in allen
+Worker-Prozessen sofort.
+"""
+
+import logging
+import secrets
+from datetime import datetime
+from typing import Iterable, NamedTuple, Optional
+
+from app import db
+from app.models.file import File, Folder, Share
+from app.utils.lru_cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_SIZE = 1024
+DEFAULT_CACHE_TTL = 30
+
+ITEM_TYPES = {'file': File, 'folder': Folder}
+
+
+class ResolvedShare(NamedTuple):
+    """Aufgelöster Freigabe-Token (unabhängig von der Datenbank-Session)."""
+    token: str
+    item_type: str
+    item_id: int
+
+    def load_item(self):
+        """Lädt die freigegebene Datei bzw. den Ordner (Primärschlüssel-Zugriff).
+
+        Gibt None zurück, wenn das Ziel gelöscht oder die Freigabe inzwischen
+        deaktiviert bzw. mit neuem Token versehen wurde.
+        """
+        item = db.session.get(ITEM_TYPES[self.item_type], self.item_id)
+        if item is None or not item.share_enabled or item.share_token != self.token:
+            return None
+        return item
+
+
+# Token -> ResolvedShare bzw. None für unbekannte Tokens
+_cache = LRUCache('SHARE_CACHE_SIZE', DEFAULT_CACHE_SIZE, 'SHARE_CACHE_TTL', DEFAULT_CACHE_TTL)
+_MISSING = object()
+
+
+def invalidate_share_cache(tokens: Optional[Iterable[str]] = None):
+    """Entfernt einzelne Tokens (oder alle) aus dem Cache dieses Prozesses."""
+    if tokens is None:
+        _cache.invalidate()
+    else:
+        _cache.discard(tokens)
+
+
+def generate_share_token() -> str:
+    """Erzeugt einen neuen Token; Eindeutigkeit sichert der Index auf `shares.token`."""
+    return secrets.token_urlsafe(32)
+
+
+def _item_type(item) -> str:
+    return 'folder' if isinstance(item, Folder) else 'file'
+
+
+def resolve_share(token: str) -> Optional[ResolvedShare]:
+    """Löst einen Freigabe-Token auf (Cache-Treffer oder eine indizierte Abfrage)."""
+    if not token:
+        return None
+    resolved = _cache.get(token, _MISSING)
+    if resolved is not _MISSING:
+        return resolved
+
+    row = db.session.query(Share.item_type, Share.item_id).filter(Share.token == token).first()
+    resolved = None
+    if row is not None:
+        resolved = ResolvedShare(token, row.item_type, row.item_id)
+    _cache.put(token, resolved)
+    return resolved
+
+
+def save_share(item, password_hash: Optional[str], expires_at: Optional[datetime], new_token: bool = False) -> str:
+    """Aktiviert bzw. aktualisiert die Freigabe einer Datei oder eines Ordners.
+
+    Pflegt die `share_*`-Spalten am Element und den Eintrag in `shares` in derselben
+    Transaktion; der Commit erfolgt durch den Aufrufer. Gibt den Token zurück.
+    """
+    item_type = _item_type(item)
+    share = Share.query.filter_by(item_type=item_type, item_id=item.id).first()
+    old_token = share.token if share else item.share_token
+
+    token = item.share_token
+    if new_token or not token:
+        token = generate_share_token()
+
+    item.share_enabled = True
+    item.share_token = token
+    item.share_password_hash = password_hash
+    item.share_expires_at = expires_at
+
+    if share is None:
+        share = Share(item_type=item_type, item_id=item.id)
+        db.session.add(share)
+    share.token = token
+    share.password_hash = password_hash
+    share.expires_at = expires_at
+
+    invalidate_share_cache({old_token, token} - {None})
+    return token
+
+
+def remove_share(item):
+    """Deaktiviert die Freigabe eines Elements und entfernt den Token aus dem Index."""
+    tokens = {item.share_token} - {None}
+    shares = Share.query.filter_by(item_type=_item_type(item), item_id=item.id).all()
+    for share in shares:
+        tokens.add(share.token)
+        db.session.delete(share)
+
+    item.share_enabled = False
+    item.share_token = None
+    item.share_password_hash = None
+    item.share_expires_at = None
+    item.share_name = None
+    invalidate_share_cache(tokens)
+
+
+def remove_shares_for(file_ids: Iterable[int] = (), folder_ids: Iterable[int] = ()):
+    """Entfernt Index-Einträge gelöschter Dateien/Ordner (ohne Commit)."""
+    tokens = []
+    for item_type, ids in (('file', list(file_ids)), ('folder', list(folder_ids))):
+        if not ids:
+            continue
+        query = Share.query.filter(Share.item_type == item_type, Share.item_id.in_(ids))
+        tokens.extend(token for (token,) in query.with_entities(Share.token).all())
+        query.delete(synchronize_session=False)
+    invalidate_share_cache(tokens)
+
+
+def rebuild_share_index() -> int:
+    """Baut `shares` aus den `share_*`-Spalten von Dateien und Ordnern neu auf.
+
+    Wird von der Migration genutzt, um Freigaben aus Versionen vor 2.3 zu übernehmen.
+    Gibt die Anzahl der indizierten Freigaben zurück (Commit durch den Aufrufer).
+    """
+    Share.query.delete(synchronize_session=False)
+    count = 0
+    for item_type, model in ITEM_TYPES.items():
+        rows = db.session.query(
+            model.id, model.share_token, model.share_password_hash, model.share_expires_at
+        ).filter(model.share_enabled.is_(True), model.share_token.isnot(None)).all()
+        db.session.bulk_insert_mappings(Share, [
+            {
+                'token': row.share_token,
+                'item_type': item_type,
+                'item_id': row.id,
+                'password_hash': row.share_password_hash,
+                'expires_at': row.share_expires_at,
+                'created_at': datetime.utcnow(),
+            }
+            for row in rows
+        ])
+        count += len(rows)
+    invalidate_share_cache()
+    logger.info(f"Freigabe-Index neu aufgebaut: {count} Freigaben")
+    return count
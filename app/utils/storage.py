@@ -0,0 +1,477 @@
+"""
+Speicher-Abstraktion für hochgeladene Dateien.
+
+Alle Module legen Uploads über ein Storage-Backend ab und liefern sie darüber aus.
+Ein Objekt wird über einen Schlüssel relativ zum Upload-Verzeichnis adressiert
+(z.B. 'files/20250101_120000_bericht.docx'), der auch in der Datenbank gespeichert
+wird – unabhängig vom Upload-Verzeichnis des jeweiligen App-Servers. Bestehende
+Datensätze behalten ihre bisherigen Angaben (absolute Pfade, relative Pfade oder
+reine Dateinamen); `storage_key` leitet daraus den Schlüssel ab. Dadurch
+funktionieren Alt- und Neubestand und der Blob-Collector mit jedem Backend.
+
+Backends:
+    local: Dateisystem unterhalb von UPLOAD_FOLDER (Standard)
+    s3:    S3-kompatibler Objektspeicher (AWS S3, MinIO, ...), benötigt boto3
+"""
+
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator, Optional
+
+from flask import Response, abort, current_app, redirect, send_file, stream_with_context
+
+try:
+    import boto3
+    from botocore.config import Config as BotoConfig
+    from botocore.exceptions import ClientError
+    BOTO3_AVAILABLE = True
+except ImportError:
+    BOTO3_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+DEFAULT_PRESIGNED_EXPIRY = 300
+
+_backend_lock = threading.Lock()
+
+
+class StorageError(Exception):
+    """Fehler beim Zugriff auf das Storage-Backend."""
+
+
+class StorageBackend:
+    """Schnittstelle aller Storage-Backends."""
+
+    name = 'base'
+
+    def save(self, key: str, stream: BinaryIO) -> int:
+        """Speichert einen Datenstrom unter `key` und gibt die Größe in Bytes zurück."""
+        raise NotImplementedError
+
+    def save_local_file(self, key: str, path: str, move: bool = False) -> int:
+        """Übernimmt eine lokale Datei (z.B. einen fertigen Download) unter `key`."""
+        with open(path, 'rb') as f:
+            size = self.save(key, f)
+        if move:
+            os.remove(path)
+        return size
+
+    def open(self, key: str) -> BinaryIO:
+        """Öffnet ein Objekt zum sequentiellen Lesen (Aufrufer schließt den Stream)."""
+        raise NotImplementedError
+
+    def read_range(self, key: str, start: int, length: int) -> bytes:
+        """Liest `length` Bytes ab Position `start`."""
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        """Entfernt ein Objekt; fehlende Objekte sind kein Fehler."""
+        raise NotImplementedError
+
+    def exists(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def size(self, key: str) -> int:
+        raise NotImplementedError
+
+    def local_path(self, key: str) -> Optional[str]:
+        """Pfad im lokalen Dateisystem, falls das Backend Dateien lokal ablegt."""
+        return None
+
+    def presigned_url(self, key: str, expires_in: int = DEFAULT_PRESIGNED_EXPIRY,
+                      download_name: Optional[str] = None, mimetype: Optional[str] = None,
+                      as_attachment: bool = True) -> Optional[str]:
+        """Zeitlich begrenzte Download-URL, falls das Backend sie unterstützt."""
+        return None
+
+    @contextmanager
+    def local_file(self, key: str) -> Iterator[str]:
+        """
+        Stellt ein Objekt als lokale Datei bereit (für Bibliotheken, die Pfade erwarten).
+
+        Entfernte Backends laden das Objekt dafür in eine temporäre Datei.
+        """
+        path = self.local_path(key)
+        if path is not None:
+            yield path
+            return
+
+        suffix = os.path.splitext(key)[1]
+        fd, temp_path = tempfile.mkstemp(prefix='storage_', suffix=suffix)
+        try:
+            with os.fdopen(fd, 'wb') as target:
+                source = self.open(key)
+                try:
+                    shutil.copyfileobj(source, target, CHUNK_SIZE)
+                finally:
+                    source.close()
+            yield temp_path
+        finally:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+
+class LocalStorage(StorageBackend):
+    """Dateisystem-Backend unterhalb des Upload-Verzeichnisses."""
+
+    name = 'local'
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+
+    def _path(self, key: str) -> str:
+        # Altbestand außerhalb des Upload-Verzeichnisses wird mit absolutem Pfad adressiert
+        if os.path.isabs(key):
+            return os.path.normpath(key)
+        path = os.path.normpath(os.path.join(self.root, key))
+        if path != self.root and not path.startswith(self.root + os.sep):
+            raise StorageError(f"Ungültiger Speicherschlüssel: {key}")
+        return path
+
+    def save(self, key, stream):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Zuerst in eine temporäre Datei schreiben, damit Leser nie halbe Dateien sehen
+        fd, temp_path = tempfile.mkstemp(prefix='.upload_', suffix='.part', dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                if isinstance(stream, (bytes, bytearray)):
+                    f.write(stream)
+                else:
+                    shutil.copyfileobj(stream, f, CHUNK_SIZE)
+            os.replace(temp_path, path)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+        return os.path.getsize(path)
+
+    def save_local_file(self, key, path, move=False):
+        target = self._path(key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if move:
+            try:
+                os.replace(path, target)
+                return os.path.getsize(target)
+            except OSError:
+                # Anderes Dateisystem: kopieren und Quelle entfernen
+                pass
+        return super().save_local_file(key, path, move=move)
+
+    def open(self, key):
+        try:
+            return open(self._path(key), 'rb')
+        except FileNotFoundError as e:
+            raise StorageError(f"Objekt nicht gefunden: {key}") from e
+
+    def read_range(self, key, start, length):
+        with self.open(key) as f:
+            f.seek(start)
+            return f.read(length)
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def exists(self, key):
+        return os.path.isfile(self._path(key))
+
+    def size(self, key):
+        return os.path.getsize(self._path(key))
+
+    def local_path(self, key):
+        return self._path(key)
+
+
+class S3Storage(StorageBackend):
+    """S3-kompatibles Backend (AWS S3, MinIO, Ceph RGW, ...)."""
+
+    name = 's3'
+
+    def __init__(self, bucket: str, endpoint_url: Optional[str] = None, region: Optional[str] = None,
+                 access_key: Optional[str] = None, secret_key: Optional[str] = None,
+                 prefix: str = '', addressing_style: str = 'auto'):
+        if not BOTO3_AVAILABLE:
+            raise StorageError("STORAGE_BACKEND=s3 benötigt das Paket boto3")
+        if not bucket:
+            raise StorageError("STORAGE_BACKEND=s3 benötigt S3_BUCKET")
+        self.bucket = bucket
+        self.prefix = prefix.strip('/')
+        self.client = boto3.client(
+            's3',
+            endpoint_url=endpoint_url or None,
+            region_name=region or None,
+            aws_access_key_id=access_key or None,
+            aws_secret_access_key=secret_key or None,
+            config=BotoConfig(s3={'addressing_style': addressing_style}, retries={'max_attempts': 3}),
+        )
+
+    def _object_key(self, key: str) -> str:
+        if os.path.isabs(key):
+            raise StorageError(f"Pfad außerhalb des Upload-Verzeichnisses: {key}")
+        key = key.replace(os.sep, '/').lstrip('/')
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    @staticmethod
+    def _is_not_found(error) -> bool:
+        return error.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound')
+
+    def save(self, key, stream):
+        if isinstance(stream, (bytes, bytearray)):
+            self.client.put_object(Bucket=self.bucket, Key=self._object_key(key), Body=bytes(stream))
+            return len(stream)
+        # upload_fileobj nutzt Multipart-Uploads und hält nie die ganze Datei im Speicher
+        self.client.upload_fileobj(stream, self.bucket, self._object_key(key))
+        return self.size(key)
+
+    def open(self, key):
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=self._object_key(key))['Body']
+        except ClientError as e:
+            if self._is_not_found(e):
+                raise StorageError(f"Objekt nicht gefunden: {key}") from e
+            raise
+
+    def read_range(self, key, start, length):
+        if length <= 0:
+            return b''
+        response = self.client.get_object(
+            Bucket=self.bucket, Key=self._object_key(key), Range=f"bytes={start}-{start + length - 1}"
+        )
+        return response['Body'].read()
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=self._object_key(key))
+
+    def exists(self, key):
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._object_key(key))
+            return True
+        except ClientError as e:
+            if self._is_not_found(e):
+                return False
+            raise
+
+    def size(self, key):
+        return self.client.head_object(Bucket=self.bucket, Key=self._object_key(key))['ContentLength']
+
+    def presigned_url(self, key, expires_in=DEFAULT_PRESIGNED_EXPIRY, download_name=None,
+                      mimetype=None, as_attachment=True):
+        params = {'Bucket': self.bucket, 'Key': self._object_key(key)}
+        if download_name:
+            from urllib.parse import quote
+            disposition = 'attachment' if as_attachment else 'inline'
+            params['ResponseContentDisposition'] = f"{disposition}; filename*=UTF-8''{quote(download_name)}"
+        if mimetype:
+            params['ResponseContentType'] = mimetype
+        return self.client.generate_presigned_url('get_object', Params=params, ExpiresIn=expires_in)
+
+
+def get_upload_root() -> str:
+    """Absoluter Pfad des Upload-Verzeichnisses (Basis aller Speicherschlüssel)."""
+    project_root = os.path.dirname(current_app.root_path)
+    return os.path.normpath(os.path.join(project_root, current_app.config['UPLOAD_FOLDER']))
+
+
+def create_storage_backend(config) -> StorageBackend:
+    """Erzeugt das in der Konfiguration gewählte Backend."""
+    backend = (config.get('STORAGE_BACKEND') or 'local').lower()
+    if backend == 's3':
+        return S3Storage(
+            bucket=config.get('S3_BUCKET'),
+            endpoint_url=config.get('S3_ENDPOINT_URL'),
+            region=config.get('S3_REGION'),
+            access_key=config.get('S3_ACCESS_KEY_ID'),
+            secret_key=config.get('S3_SECRET_ACCESS_KEY'),
+            prefix=config.get('S3_PREFIX', ''),
+            addressing_style=config.get('S3_ADDRESSING_STYLE', 'auto'),
+        )
+    if backend != 'local':
+        raise StorageError(f"Unbekanntes STORAGE_BACKEND: {backend}")
+    return LocalStorage(get_upload_root())
+
+
+def get_storage() -> StorageBackend:
+    """Storage-Backend der aktuellen App (wird beim ersten Zugriff erzeugt)."""
+    app = current_app._get_current_object()
+    backend = app.extensions.get('storage')
+    if backend is None:
+        with _backend_lock:
+            backend = app.extensions.get('storage')
+            if backend is None:
+                backend = create_storage_backend(app.config)
+                app.extensions['storage'] = backend
+                logger.info(f"Storage-Backend: {backend.name}")
+    return backend
+
+
+def storage_key(stored_path: Optional[str], subdir: Optional[str] = None) -> Optional[str]:
+    """
+    Leitet aus einem gespeicherten Pfad den Speicherschlüssel ab.
+
+    Absolute und relative Pfade innerhalb des Upload-Verzeichnisses werden relativ
+    dazu ausgedrückt, reine Dateinamen relativ zu `subdir`. Pfade außerhalb des
+    Upload-Verzeichnisses (Altbestand) bleiben absolut.
+    """
+    if not stored_path:
+        return None
+    from app.utils.blob_gc import resolve_blob_path
+    path = resolve_blob_path(stored_path, subdir)
+    root = get_upload_root()
+    if path == root or not path.startswith(root + os.sep):
+        return path
+    return os.path.relpath(path, root).replace(os.sep, '/')
+
+
+def safe_key(subdir: str, filename: str) -> Optional[str]:
+    """Schlüssel für einen Dateinamen aus einer URL (None bei Pfad-Traversal)."""
+    from werkzeug.security import safe_join
+    if not filename or safe_join(subdir, filename) is None:
+        return None
+    return f"{subdir}/{filename}"
+
+
+def path_for_key(key: str) -> str:
+    """Angabe, die für einen Schlüssel in der Datenbank gespeichert wird (der Schlüssel selbst)."""
+    return key
+
+
+def unique_key(subdir: str, filename: str) -> str:
+    """Freier Schlüssel '<subdir>/<filename>'; bei Kollision mit Zähler vor der Endung."""
+    storage = get_storage()
+    base, ext = os.path.splitext(filename)
+    key = f"{subdir}/{filename}"
+    counter = 1
+    while storage.exists(key):
+        key = f"{subdir}/{base}_{counter}{ext}"
+        counter += 1
+    return key
+
+
+def save_upload(stream, subdir: str, filename: str, unique: bool = True) -> str:
+    """
+    Speichert einen Upload (FileStorage, Datei-Objekt oder Bytes) im Backend.
+
+    Returns:
+        Den verwendeten Speicherschlüssel
+    """
+    key = unique_key(subdir, filename) if unique else f"{subdir}/{filename}"
+    source = getattr(stream, 'stream', stream)
+    get_storage().save(key, source)
+    return key
+
+
+def stored_file_exists(stored_path: Optional[str], subdir: Optional[str] = None) -> bool:
+    key = storage_key(stored_path, subdir)
+    return bool(key) and get_storage().exists(key)
+
+
+def read_stored_file(stored_path: str, subdir: Optional[str] = None) -> bytes:
+    """Liest ein (kleines) Objekt vollständig, z.B. Logos für PDFs und E-Mails."""
+    source = get_storage().open(storage_key(stored_path, subdir))
+    try:
+        return source.read()
+    finally:
+        source.close()
+
+
+def delete_stored_file(stored_path: Optional[str], subdir: Optional[str] = None):
+    """Entfernt ein Objekt sofort (für Dateien ohne Blob-Collector, z.B. Profilbilder)."""
+    key = storage_key(stored_path, subdir)
+    if key:
+        try:
+            get_storage().delete(key)
+        except Exception as e:
+            logger.warning(f"Objekt {key} konnte nicht gelöscht werden: {e}")
+
+
+def _iter_stream(source, chunk_size: int = CHUNK_SIZE):
+    try:
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        source.close()
+
+
+def send_stored_file(stored_path: Optional[str], subdir: Optional[str] = None,
+                     download_name: Optional[str] = None, mimetype: Optional[str] = None,
+                     as_attachment: bool = False, max_age=None, allow_redirect: bool = True):
+    """
+    Liefert ein gespeichertes Objekt aus.
+
+    - lokales Backend: `send_file` (Range-Requests, Conditional GET)
+    - entferntes Backend mit STORAGE_PRESIGNED_DOWNLOADS: Redirect auf eine
+      zeitlich begrenzte URL, die Bytes laufen nicht durch die App-Worker
+    - sonst: gestreamte Antwort in Blöcken
+
+    `allow_redirect=False` für Empfänger, die keinen Redirect folgen
+    (z.B. den OnlyOffice Document Server hinter einem anderen Netz).
+    """
+    key = storage_key(stored_path, subdir)
+    if not key:
+        abort(404)
+    return send_storage_object(key, download_name=download_name, mimetype=mimetype,
+                               as_attachment=as_attachment, max_age=max_age, allow_redirect=allow_redirect)
+
+
+def send_storage_object(key: str, download_name: Optional[str] = None, mimetype: Optional[str] = None,
+                        as_attachment: bool = False, max_age=None, allow_redirect: bool = True):
+    """Wie `send_stored_file`, aber direkt über den Speicherschlüssel."""
+    storage = get_storage()
+
+    local_path = storage.local_path(key)
+    if local_path is not None:
+        if not os.path.isfile(local_path):
+            abort(404)
+        return send_file(local_path, mimetype=mimetype, as_attachment=as_attachment,
+                         download_name=download_name, max_age=max_age)
+
+    if allow_redirect and current_app.config.get('STORAGE_PRESIGNED_DOWNLOADS', False):
+        url = storage.presigned_url(
+            key,
+            expires_in=current_app.config.get('STORAGE_PRESIGNED_EXPIRY', DEFAULT_PRESIGNED_EXPIRY),
+            download_name=download_name or os.path.basename(key),
+            mimetype=mimetype,
+            as_attachment=as_attachment,
+        )
+        if url:
+            return redirect(url, code=302)
+
+    try:
+        size = storage.size(key)
+        source = storage.open(key)
+    except StorageError:
+        abort(404)
+    except Exception as e:
+        if BOTO3_AVAILABLE and isinstance(e, ClientError) and S3Storage._is_not_found(e):
+            abort(404)
+        raise
+
+    import mimetypes
+    from urllib.parse import quote
+    name = download_name or os.path.basename(key)
+    response = Response(
+        stream_with_context(_iter_stream(source)),
+        mimetype=mimetype or mimetypes.guess_type(name)[0] or 'application/octet-stream',
+        direct_passthrough=True,
+    )
+    response.content_length = size
+    disposition = 'attachment' if as_attachment else 'inline'
+    response.headers['Content-Disposition'] = f"{disposition}; filename*=UTF-8''{quote(name)}"
+    if max_age is not None:
+        response.cache_control.max_age = max_age
+    return response
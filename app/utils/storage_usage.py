@@ -0,0 +1,539 @@
+"""
+Speicherverbrauch pro Benutzer, Ordner der obersten Ebene und Modul.
+
+Die Zähler in `storage_usage` werden im selben Transaktionskontext wie die
+Änderung selbst fortgeschrieben: Mapper-Events sammeln die Größenänderungen der
+beteiligten Zeilen, `after_flush` schreibt sie gebündelt per Upsert. Bulk-
+Operationen umgehen die Mapper-Events und melden ihre Änderungen über
+`track_bulk_insert` bzw. `track_bulk_file_delete`. Der nächtliche Abgleich
+(`reconcile_storage_usage`) berechnet alle Zähler aus den Tabellen neu.
+
+Gezählt werden die tatsächlich gespeicherten Bytes:
+    files:     aktuelle Dateien und Versionen (Delta-Versionen mit Delta-Größe)
+    chat:      Medien in Chat-Nachrichten
+    email:     E-Mail-Anhänge
+    manuals:   Anleitungen
+    inventory: Produktdokumente
+"""
+
+import logging
+from datetime import datetime
+from functools import wraps
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from flask import current_app, flash, jsonify, redirect, request, url_for
+from flask_login import current_user
+from sqlalchemy import LargeBinary, case, cast, event, func, select
+from sqlalchemy.orm import Session, attributes
+
+from app import db
+from app.models.chat import ChatMessage
+from app.models.email import EmailAttachment
+from app.models.file import File, FileVersion, Folder
+from app.models.inventory import ProductDocument
+from app.models.manual import Manual
+from app.models.storage import StorageUsage
+
+logger = logging.getLogger(__name__)
+
+SCOPE_USER = 'user'
+SCOPE_FOLDER = 'folder'
+SCOPE_MODULE = 'module'
+ROOT_FOLDER_KEY = 'root'
+
+_SESSION_DELTAS = 'storage_usage_deltas'
+_SESSION_FOLDERS = 'storage_usage_folders'
+
+_listeners_registered = False
+
+
+# ---------------------------------------------------------------------------
+# Beiträge einzelner Zeilen
+# ---------------------------------------------------------------------------
+
+def _top_folder_key(connection, cache: Dict, folder_id: Optional[int]) -> Optional[str]:
+    """Schlüssel des Ordners der obersten Ebene (über den materialisierten Pfad)."""
+    if not folder_id:
+        return ROOT_FOLDER_KEY
+    if folder_id not in cache:
+        folders = Folder.__table__
+        tree_path = connection.execute(
+            select(folders.c.tree_path).where(folders.c.id == folder_id)
+        ).scalar()
+        cache[folder_id] = tree_path.strip('/').split('/')[0] if tree_path else str(folder_id)
+    return cache[folder_id]
+
+
+def _file_folder_id(connection, cache: Dict, file_id: int) -> Optional[int]:
+    key = ('file', file_id)
+    if key not in cache:
+        files = File.__table__
+        cache[key] = connection.execute(select(files.c.folder_id).where(files.c.id == file_id)).scalar()
+    return cache[key]
+
+
+def _version_size(delta: Optional[str], file_size: Optional[int]) -> int:
+    if delta is not None:
+        return len(delta.encode('utf-8'))
+    return file_size or 0
+
+
+def _version_size_expr(dialect: str):
+    """SQL-Gegenstück zu `_version_size` (Bytes des UTF-8-Deltas, nicht Zeichen)."""
+    if dialect == 'sqlite':
+        delta_bytes = func.length(cast(FileVersion.delta, LargeBinary))
+    else:
+        delta_bytes = func.octet_length(FileVersion.delta)
+    return case((FileVersion.delta.isnot(None), delta_bytes), else_=FileVersion.file_size)
+
+
+# Pro Modell: relevante Attribute und Funktion (Werte, Verbindung, Cache) -> Beiträge
+def _file_usage(values, connection, cache):
+    folder_key = _top_folder_key(connection, cache, values['folder_id'])
+    return _entries(values['file_size'] or 0, 'files', values['uploaded_by'], folder_key)
+
+
+def _file_version_usage(values, connection, cache):
+    folder_id = _file_folder_id(connection, cache, values['file_id'])
+    folder_key = _top_folder_key(connection, cache, folder_id)
+    size = _version_size(values['delta'], values['file_size'])
+    return _entries(size, 'files', values['uploaded_by'], folder_key)
+
+
+def _chat_message_usage(values, connection, cache):
+    if not values['media_url']:
+        return []
+    return _entries(values['media_size'] or 0, 'chat', values['sender_id'])
+
+
+def _email_attachment_usage(values, connection, cache):
+    return _entries(values['size'] or 0, 'email')
+
+
+def _manual_usage(values, connection, cache):
+    return _entries(values['file_size'] or 0, 'manuals', values['uploaded_by'])
+
+
+def _product_document_usage(values, connection, cache):
+    return _entries(values['file_size'] or 0, 'inventory', values['uploaded_by'])
+
+
+_TRACKED_MODELS = {
+    File: (('folder_id', 'file_size', 'uploaded_by'), _file_usage),
+    FileVersion: (('file_id', 'file_size', 'delta', 'uploaded_by'), _file_version_usage),
+    ChatMessage: (('media_url', 'media_size', 'sender_id'), _chat_message_usage),
+    EmailAttachment: (('size',), _email_attachment_usage),
+    Manual: (('file_size', 'uploaded_by'), _manual_usage),
+    ProductDocument: (('file_size', 'uploaded_by'), _product_document_usage),
+}
+
+
+def _entries(size: int, module: str, user_id: Optional[int] = None,
+             folder_key: Optional[str] = None) -> List[Tuple[Tuple[str, str], int]]:
+    entries = [((SCOPE_MODULE, module), size)]
+    if user_id:
+        entries.append(((SCOPE_USER, str(user_id)), size))
+    if folder_key:
+        entries.append(((SCOPE_FOLDER, folder_key), size))
+    return entries
+
+
+# ---------------------------------------------------------------------------
+# Sammeln und Schreiben der Änderungen
+# ---------------------------------------------------------------------------
+
+def _add_deltas(deltas: Dict, entries, sign: int, count: bool = True):
+    for scope_key, size in entries:
+        current = deltas.setdefault(scope_key, [0, 0])
+        current[0] += sign * size
+        if count:
+            current[1] += sign
+
+
+def _session_state(target):
+    session = attributes.instance_state(target).session
+    if session is None:
+        return None, None
+    return session.info.setdefault(_SESSION_DELTAS, {}), session.info.setdefault(_SESSION_FOLDERS, {})
+
+
+def _current_values(target, attrs) -> Dict:
+    return {attr: getattr(target, attr) for attr in attrs}
+
+
+def _previous_values(target, attrs) -> Optional[Dict]:
+    """Werte vor der Änderung; None, wenn sich kein relevantes Attribut geändert hat."""
+    values = {}
+    changed = False
+    for attr in attrs:
+        history = attributes.get_history(target, attr)
+        if history.added or history.deleted:
+            # Alte Werte sind dank active_history auch nach einem Commit bekannt
+            values[attr] = history.deleted[0] if history.deleted else None
+            changed = True
+        else:
+            values[attr] = getattr(target, attr)
+    return values if changed else None
+
+
+def _after_insert(mapper, connection, target):
+    attrs, usage = _TRACKED_MODELS[mapper.class_]
+    deltas, cache = _session_state(target)
+    if deltas is not None:
+        _add_deltas(deltas, usage(_current_values(target, attrs), connection, cache), 1)
+
+
+def _after_update(mapper, connection, target):
+    attrs, usage = _TRACKED_MODELS[mapper.class_]
+    deltas, cache = _session_state(target)
+    if deltas is None:
+        return
+    previous = _previous_values(target, attrs)
+    if previous is None:
+        return
+    old_entries = usage(previous, connection, cache)
+    new_entries = usage(_current_values(target, attrs), connection, cache)
+    # Objektanzahl nur ändern, wenn der Eintrag (z.B. Chat-Medium) hinzukommt oder wegfällt
+    old_keys = {key for key, _ in old_entries}
+    new_keys = {key for key, _ in new_entries}
+    _add_deltas(deltas, [(key, size) for key, size in old_entries if key in new_keys], -1, count=False)
+    _add_deltas(deltas, [(key, size) for key, size in new_entries if key in old_keys], 1, count=False)
+    _add_deltas(deltas, [(key, size) for key, size in old_entries if key not in new_keys], -1)
+    _add_deltas(deltas, [(key, size) for key, size in new_entries if key not in old_keys], 1)
+
+
+def _before_delete(mapper, connection, target):
+    # Vor dem DELETE, damit abgelaufene Attribute noch nachgeladen werden können
+    attrs, usage = _TRACKED_MODELS[mapper.class_]
+    deltas, cache = _session_state(target)
+    if deltas is not None:
+        _add_deltas(deltas, usage(_current_values(target, attrs), connection, cache), -1)
+
+
+def _after_flush(session, flush_context):
+    deltas = session.info.pop(_SESSION_DELTAS, None)
+    session.info.pop(_SESSION_FOLDERS, None)
+    if deltas:
+        apply_usage_deltas(session.connection(), deltas)
+
+
+def _after_rollback(session):
+    session.info.pop(_SESSION_DELTAS, None)
+    session.info.pop(_SESSION_FOLDERS, None)
+
+
+def apply_usage_deltas(connection, deltas: Dict[Tuple[str, str], List[int]]):
+    """Schreibt aufsummierte Änderungen {(scope, key): [bytes, anzahl]} per Upsert fort."""
+    table = StorageUsage.__table__
+    now = datetime.utcnow()
+    dialect = connection.dialect.name
+
+    for (scope, scope_key), (size, count) in deltas.items():
+        if not size and not count:
+            continue
+        values = {
+            'scope': scope,
+            'scope_key': scope_key,
+            'bytes_used': size,
+            'object_count': count,
+            'updated_at': now,
+        }
+        increments = {
+            'bytes_used': table.c.bytes_used + size,
+            'object_count': table.c.object_count + count,
+            'updated_at': now,
+        }
+        if dialect in ('mysql', 'mariadb'):
+            from sqlalchemy.dialects.mysql import insert as mysql_insert
+            connection.execute(mysql_insert(table).values(**values).on_duplicate_key_update(**increments))
+        elif dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+            connection.execute(
+                sqlite_insert(table).values(**values)
+                .on_conflict_do_update(index_elements=['scope', 'scope_key'], set_=increments)
+            )
+        else:
+            result = connection.execute(
+                table.update()
+                .where(table.c.scope == scope, table.c.scope_key == scope_key)
+                .values(**increments)
+            )
+            if result.rowcount == 0:
+                connection.execute(table.insert().values(**values))
+
+
+def _keep_history(target, value, oldvalue, initiator):
+    return value
+
+
+def init_storage_usage():
+    """Registriert die Event-Listener (einmalig pro Prozess)."""
+    global _listeners_registered
+    if _listeners_registered:
+        return
+    for model, (attrs, _) in _TRACKED_MODELS.items():
+        for attr in attrs:
+            event.listen(getattr(model, attr), 'set', _keep_history, active_history=True)
+        event.listen(model, 'after_insert', _after_insert)
+        event.listen(model, 'after_update', _after_update)
+        event.listen(model, 'before_delete', _before_delete)
+    event.listen(Session, 'after_flush', _after_flush)
+    event.listen(Session, 'after_soft_rollback', lambda session, previous_transaction: _after_rollback(session))
+    _listeners_registered = True
+
+
+# ---------------------------------------------------------------------------
+# Bulk-Operationen (ohne Mapper-Events)
+# ---------------------------------------------------------------------------
+
+def track_bulk_insert(model, rows: Iterable[Dict]):
+    """Verbucht per `bulk_insert_mappings` angelegte Zeilen (Dicts mit Spalten des Modells).
+
+    Modelle ohne Speicherverbrauch werden ignoriert; fehlende Spalten zählen als leer.
+    """
+    if model not in _TRACKED_MODELS:
+        return
+    attrs, usage = _TRACKED_MODELS[model]
+    connection = db.session.connection()
+    cache = {}
+    deltas = {}
+    for row in rows:
+        values = {attr: row.get(attr) for attr in attrs}
+        _add_deltas(deltas, usage(values, connection, cache), 1)
+    if deltas:
+        apply_usage_deltas(connection, deltas)
+
+
+def track_bulk_file_insert(rows: Iterable[Dict]):
+    """Verbucht per `bulk_insert_mappings` angelegte Dateien (Dicts mit File-Spalten)."""
+    track_bulk_insert(File, rows)
+
+
+def track_bulk_file_delete(file_ids: List[int]):
+    """Verbucht das Löschen von Dateien samt Versionen per Query.delete (vor dem DELETE aufrufen)."""
+    if not file_ids:
+        return
+    connection = db.session.connection()
+    cache = {}
+    deltas = {}
+    for file_id, folder_id, file_size, uploaded_by in db.session.query(
+            File.id, File.folder_id, File.file_size, File.uploaded_by).filter(File.id.in_(file_ids)):
+        cache[('file', file_id)] = folder_id
+        values = {'folder_id': folder_id, 'file_size': file_size, 'uploaded_by': uploaded_by}
+        _add_deltas(deltas, _file_usage(values, connection, cache), -1)
+    for file_id, file_size, delta, uploaded_by in db.session.query(
+            FileVersion.file_id, FileVersion.file_size, FileVersion.delta, FileVersion.uploaded_by
+    ).filter(FileVersion.file_id.in_(file_ids)):
+        values = {'file_id': file_id, 'file_size': file_size, 'delta': delta, 'uploaded_by': uploaded_by}
+        _add_deltas(deltas, _file_version_usage(values, connection, cache), -1)
+    if deltas:
+        apply_usage_deltas(connection, deltas)
+
+
+def track_folder_move(folder: Folder, old_top_key: str):
+    """Verschiebt den Verbrauch eines Teilbaums, wenn sich der Ordner der obersten Ebene ändert."""
+    new_top_key = folder.tree_path.strip('/').split('/')[0]
+    if new_top_key == old_top_key:
+        return
+    subtree = db.session.query(Folder.id).filter(Folder.tree_path.like(f'{folder.tree_path}%'))
+    file_bytes, file_count = db.session.query(
+        func.coalesce(func.sum(File.file_size), 0), func.count(File.id)
+    ).filter(File.folder_id.in_(subtree)).one()
+    connection = db.session.connection()
+    version_bytes, version_count = db.session.query(
+        func.coalesce(func.sum(_version_size_expr(connection.dialect.name)), 0),
+        func.count(FileVersion.id)
+    ).join(File, FileVersion.file_id == File.id).filter(File.folder_id.in_(subtree)).one()
+    size = int(file_bytes) + int(version_bytes)
+    count = int(file_count) + int(version_count)
+    apply_usage_deltas(connection, {
+        (SCOPE_FOLDER, old_top_key): [-size, -count],
+        (SCOPE_FOLDER, new_top_key): [size, count],
+    })
+
+
+# ---------------------------------------------------------------------------
+# Abfragen, Quota und Abgleich
+# ---------------------------------------------------------------------------
+
+def get_usage(scope: str, scope_key) -> Tuple[int, int]:
+    """(Bytes, Objektanzahl) für einen Zähler."""
+    row = db.session.query(StorageUsage.bytes_used, StorageUsage.object_count).filter_by(
+        scope=scope, scope_key=str(scope_key)
+    ).first()
+    return (int(row[0]), int(row[1])) if row else (0, 0)
+
+
+def get_usage_overview(scope: str, limit: Optional[int] = None) -> List[StorageUsage]:
+    query = StorageUsage.query.filter(
+        StorageUsage.scope == scope, StorageUsage.object_count > 0
+    ).order_by(StorageUsage.bytes_used.desc())
+    if limit:
+        query = query.limit(limit)
+    return query.all()
+
+
+def get_user_quota() -> int:
+    """Quota pro Benutzer in Bytes (0 = unbegrenzt)."""
+    return current_app.config.get('STORAGE_USER_QUOTA', 0) or 0
+
+
+def check_upload_quota(user_id: int, incoming_bytes: int) -> Tuple[bool, int, int]:
+    """
+    Prüft, ob ein Upload der angegebenen Größe in die Quota des Benutzers passt.
+
+    Returns:
+        (erlaubt, aktueller Verbrauch, Quota)
+    """
+    quota = get_user_quota()
+    if not quota:
+        return True, 0, 0
+    used, _ = get_usage(SCOPE_USER, user_id)
+    return used + max(incoming_bytes or 0, 0) <= quota, used, quota
+
+
+def upload_quota_response(user_id: int, json_response: Optional[bool] = None):
+    """
+    Ablehnung für einen Upload, dessen Content-Length die Quota von `user_id`
+    überschreiten würde; None, wenn der Upload passt.
+
+    Uploads ohne eigenes Konto (Briefkasten, Freigaben) werden gegen die Quota des
+    Besitzers geprüft. Ohne `json_response` richtet sich die Antwort nach dem Request.
+    """
+    if not request.content_length:
+        return None
+    allowed, used, quota = check_upload_quota(user_id, request.content_length)
+    if allowed:
+        return None
+    remaining_mb = max(quota - used, 0) / (1024 * 1024)
+    message = (f'Speicherkontingent überschritten. Verfügbar: {remaining_mb:.1f} MB '
+               f'von {quota / (1024 * 1024):.0f} MB.')
+    logger.info(f"Upload für Benutzer {user_id} abgelehnt (Quota, {request.content_length} Bytes)")
+    if json_response is None:
+        json_response = request.is_json or request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+    if json_response:
+        return jsonify({'error': message}), 413
+    flash(message, 'danger')
+    return redirect(request.referrer or url_for('dashboard.index'))
+
+
+def enforce_upload_quota(view):
+    """
+    Decorator: Lehnt Uploads ab, deren Content-Length die Quota überschreiten würde.
+
+    Die Prüfung erfolgt vor dem Zugriff auf `request.files`, der Request-Body wird
+    also gar nicht erst gelesen. Nach `@login_required` verwenden.
+    """
+    @wraps(view)
+    def wrapped(*args, **kwargs):
+        if current_user.is_authenticated:
+            rejection = upload_quota_response(current_user.id)
+            if rejection is not None:
+                return rejection
+        return view(*args, **kwargs)
+    return wrapped
+
+
+def compute_storage_usage() -> Dict[Tuple[str, str], List[int]]:
+    """Berechnet alle Zähler vollständig aus den Tabellen."""
+    totals = {}
+    connection = db.session.connection()
+    cache = {}
+    for folder_id, tree_path in db.session.query(Folder.id, Folder.tree_path):
+        cache[folder_id] = tree_path.strip('/').split('/')[0] if tree_path else str(folder_id)
+
+    for folder_id, file_size, uploaded_by in db.session.query(File.folder_id, File.file_size, File.uploaded_by):
+        values = {'folder_id': folder_id, 'file_size': file_size, 'uploaded_by': uploaded_by}
+        _add_deltas(totals, _file_usage(values, connection, cache), 1)
+
+    for file_id, folder_id in db.session.query(File.id, File.folder_id):
+        cache[('file', file_id)] = folder_id
+    for row in db.session.query(FileVersion.file_id, FileVersion.file_size, FileVersion.delta, FileVersion.uploaded_by):
+        values = {'file_id': row[0], 'file_size': row[1], 'delta': row[2], 'uploaded_by': row[3]}
+        _add_deltas(totals, _file_version_usage(values, connection, cache), 1)
+
+    simple_sources = (
+        (ChatMessage, ('media_url', 'media_size', 'sender_id'), _chat_message_usage,
+         ChatMessage.media_url.isnot(None)),
+        (EmailAttachment, ('size',), _email_attachment_usage, None),
+        (Manual, ('file_size', 'uploaded_by'), _manual_usage, None),
+        (ProductDocument, ('file_size', 'uploaded_by'), _product_document_usage, None),
+    )
+    for model, attrs, usage, criterion in simple_sources:
+        query = db.session.query(*[getattr(model, attr) for attr in attrs])
+        if criterion is not None:
+            query = query.filter(criterion)
+        for row in query:
+            _add_deltas(totals, usage(dict(zip(attrs, row)), connection, cache), 1)
+    return totals
+
+
+def backfill_chat_media_sizes(batch_size: int = 500) -> int:
+    """Ermittelt fehlende Mediengrößen alter Chat-Nachrichten aus dem Storage."""
+    from app.utils.storage import get_storage, storage_key
+    storage = get_storage()
+    updated = 0
+    last_id = 0
+    while True:
+        messages = ChatMessage.query.filter(
+            ChatMessage.id > last_id,
+            ChatMessage.media_url.isnot(None),
+            ChatMessage.media_size.is_(None)
+        ).order_by(ChatMessage.id).limit(batch_size).all()
+        if not messages:
+            break
+        for message in messages:
+            last_id = message.id
+            try:
+                message.media_size = storage.size(storage_key(message.media_url, 'chat'))
+            except Exception:
+                message.media_size = 0
+            updated += 1
+        db.session.commit()
+    return updated
+
+
+def reconcile_storage_usage() -> Dict:
+    """
+    Gleicht alle Zähler mit den Tabellen ab und korrigiert Abweichungen.
+
+    Returns:
+        Bericht mit Anzahl geprüfter und korrigierter Zähler
+    """
+    backfilled = backfill_chat_media_sizes()
+    totals = compute_storage_usage()
+    existing = {(row.scope, row.scope_key): row for row in StorageUsage.query.all()}
+
+    corrected = 0
+    drift_bytes = 0
+    now = datetime.utcnow()
+    for scope_key, (size, count) in totals.items():
+        row = existing.pop(scope_key, None)
+        if row is None:
+            db.session.add(StorageUsage(scope=scope_key[0], scope_key=scope_key[1],
+                                        bytes_used=size, object_count=count, updated_at=now))
+            corrected += 1
+            drift_bytes += abs(size)
+        elif row.bytes_used != size or row.object_count != count:
+            drift_bytes += abs(row.bytes_used - size)
+            row.bytes_used = size
+            row.object_count = count
+            corrected += 1
+    for row in existing.values():
+        if row.bytes_used or row.object_count:
+            drift_bytes += abs(row.bytes_used)
+            corrected += 1
+        db.session.delete(row)
+    db.session.commit()
+
+    report = {
+        'counters': len(totals),
+        'corrected': corrected,
+        'drift_bytes': drift_bytes,
+        'chat_media_backfilled': backfilled,
+    }
+    if corrected:
+        logger.warning(f"Speicherverbrauch abgeglichen: {report}")
+    else:
+        logger.info(f"Speicherverbrauch abgeglichen: {report}")
+    return report
@@ -0,0 +1,453 @@
+"""
+Delta-Speicherung für Textversionen (Dateien und Wiki-Seiten).
+
+Statt für jede Version eine vollständige Kopie abzulegen, wird eine Version als
+Zeilen-Delta gegenüber einer anderen Version gespeichert. Wiki-Versionen
+verweisen auf ihre Vorgängerversion. Dateiversionen werden rückwärts gespeichert:
+Die neueste Version behält die bisherige Datei, ältere Versionen sind Deltas
+gegenüber der jeweils nächstneueren. So hängt die älteste Version von keiner
+anderen ab und kann ohne Umschreiben gelöscht werden.
+
+Spätestens alle `TEXT_VERSION_SNAPSHOT_INTERVAL` Versionen (oder wenn das Delta
+kaum kleiner als der Volltext wäre) bleibt eine Version vollständig, damit die
+Rekonstruktionskette kurz bleibt. Zuletzt rekonstruierte Versionen werden in
+einem LRU-Cache gehalten.
+
+Delta-Format (JSON): Liste aus `[start, anzahl]` (Zeilen aus der Basisversion
+übernehmen) und Strings (neu eingefügter Text).
+"""
+
+import difflib
+import json
+import logging
+import os
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from flask import current_app
+
+from app import db
+from app.models.file import File, FileVersion
+from app.models.wiki import WikiPageVersion
+from app.utils.blob_gc import mark_blob_unreferenced
+from app.utils.lru_cache import LRUCache
+from app.utils.storage import (
+    get_storage, path_for_key, read_stored_file, save_upload, storage_key, stored_file_exists
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SNAPSHOT_INTERVAL = 10
+DEFAULT_CACHE_SIZE = 128
+# Deltas, die nicht deutlich kleiner als der Volltext sind, lohnen sich nicht
+MAX_DELTA_RATIO = 0.5
+# Größere Dateien werden weiterhin vollständig versioniert
+MAX_TEXT_VERSION_SIZE = 5 * 1024 * 1024
+# Sehr große Texte nicht im Cache halten
+MAX_CACHED_TEXT_SIZE = 512 * 1024
+
+TEXT_VERSION_EXTENSIONS = {'.txt', '.md', '.markdown', '.json', '.xml', '.csv', '.log'}
+
+
+# =========================
+# Delta-Berechnung
+# =========================
+
+def make_delta(base: str, target: str) -> str:
+    """Berechnet ein zeilenbasiertes Delta, das `base` in `target` überführt."""
+    base_lines = base.splitlines(keepends=True)
+    target_lines = target.splitlines(keepends=True)
+    matcher = difflib.SequenceMatcher(None, base_lines, target_lines, autojunk=False)
+
+    ops = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            ops.append([i1, i2 - i1])
+        elif tag in ('replace', 'insert'):
+            inserted = ''.join(target_lines[j1:j2])
+            if ops and isinstance(ops[-1], str):
+                ops[-1] += inserted
+            else:
+                ops.append(inserted)
+    return json.dumps(ops, ensure_ascii=False, separators=(',', ':'))
+
+
+def apply_delta(base: str, delta: str) -> str:
+    """Wendet ein mit `make_delta` erzeugtes Delta auf `base` an."""
+    base_lines = base.splitlines(keepends=True)
+    parts = []
+    for op in json.loads(delta):
+        if isinstance(op, str):
+            parts.append(op)
+        else:
+            start, count = op
+            parts.extend(base_lines[start:start + count])
+    return ''.join(parts)
+
+
+def delta_to_diff(base: str, delta: str) -> List[Tuple[str, str]]:
+    """
+    Leitet direkt aus einem Delta einen Zeilen-Diff ab (ohne erneuten Vergleich).
+
+    Returns:
+        Liste von (Markierung, Zeile) mit ' ' (unverändert), '-' (entfernt) und '+' (hinzugefügt)
+    """
+    base_lines = base.splitlines()
+    diff = []
+    pending_inserts = []
+    position = 0
+
+    def flush(until):
+        nonlocal position
+        diff.extend(('-', line) for line in base_lines[position:until])
+        position = max(position, until)
+        diff.extend(('+', line) for line in pending_inserts)
+        pending_inserts.clear()
+
+    for op in json.loads(delta):
+        if isinstance(op, str):
+            pending_inserts.extend(op.splitlines())
+        else:
+            start, count = op
+            flush(start)
+            diff.extend((' ', line) for line in base_lines[start:start + count])
+            position = start + count
+    flush(len(base_lines))
+    return diff
+
+
+def text_diff(old: str, new: str) -> List[Tuple[str, str]]:
+    """Zeilen-Diff zweier Volltexte im Format von `delta_to_diff`."""
+    return delta_to_diff(old, make_delta(old, new))
+
+
+def collapse_diff(diff: List[Tuple[str, str]], context: int = 3) -> List[Optional[Tuple[str, str]]]:
+    """Kürzt unveränderte Bereiche auf `context` Zeilen; Auslassungen werden als None markiert."""
+    changed = [i for i, (tag, _) in enumerate(diff) if tag != ' ']
+    if not changed:
+        return []
+    visible = set()
+    for index in changed:
+        visible.update(range(max(index - context, 0), min(index + context + 1, len(diff))))
+
+    result = []
+    previous = -1
+    for index in sorted(visible):
+        if index != previous + 1:
+            result.append(None)
+        result.append(diff[index])
+        previous = index
+    if previous < len(diff) - 1:
+        result.append(None)
+    return result
+
+
+# =========================
+# LRU-Cache rekonstruierter Versionen
+# =========================
+
+# (Art, Besitzer-ID, Versionsnummer) -> (Text, Kettentiefe)
+_cache = LRUCache('TEXT_VERSION_CACHE_SIZE', DEFAULT_CACHE_SIZE,
+                  accept=lambda value: len(value[0]) <= MAX_CACHED_TEXT_SIZE)
+
+
+def invalidate_version_cache(kind: str, owner_ids):
+    """Entfernt Cache-Einträge gelöschter Dateien ('file') bzw. Wiki-Seiten ('wiki')."""
+    owner_ids = set(owner_ids)
+    _cache.invalidate(lambda key: key[0] == kind and key[1] in owner_ids)
+
+
+def _snapshot_interval() -> int:
+    return max(current_app.config.get('TEXT_VERSION_SNAPSHOT_INTERVAL', DEFAULT_SNAPSHOT_INTERVAL), 1)
+
+
+def _materialize(kind, owner_id, version, versions_by_number, load_full) -> Tuple[str, int]:
+    """
+    Rekonstruiert den Text einer Version über die Delta-Kette.
+
+    Returns:
+        (Text, Anzahl Deltas seit dem letzten Snapshot)
+    """
+    chain = []
+    current = version
+    while True:
+        cached = _cache.get((kind, owner_id, current.version_number))
+        if cached is not None:
+            text, depth = cached
+            break
+        if current.delta is None:
+            text, depth = load_full(current), 0
+            break
+        chain.append(current)
+        base = versions_by_number.get(current.base_version_number)
+        if base is None:
+            raise ValueError(
+                f"Basisversion {current.base_version_number} für Version {current.version_number} fehlt"
+            )
+        current = base
+
+    if text is None:
+        raise ValueError(f"Version {current.version_number} ist keine Textversion")
+    if not chain:
+        _cache.put((kind, owner_id, current.version_number), (text, depth))
+    for delta_version in reversed(chain):
+        text = apply_delta(text, delta_version.delta)
+        depth += 1
+        _cache.put((kind, owner_id, delta_version.version_number), (text, depth))
+    return text, depth
+
+
+def _delta_or_none(base_text: str, text: str) -> Optional[str]:
+    delta = make_delta(base_text, text)
+    if len(delta) > max(len(text) * MAX_DELTA_RATIO, 64):
+        return None
+    return delta
+
+
+# =========================
+# Wiki-Versionen
+# =========================
+
+def _wiki_versions_by_number(page_id, up_to):
+    versions = WikiPageVersion.query.filter(
+        WikiPageVersion.wiki_page_id == page_id,
+        WikiPageVersion.version_number <= up_to
+    ).all()
+    return {version.version_number: version for version in versions}
+
+
+def get_wiki_version_content(version: WikiPageVersion) -> str:
+    """Gibt den vollständigen Markdown-Inhalt einer Wiki-Version zurück."""
+    if version.delta is None:
+        return version.content
+    versions = _wiki_versions_by_number(version.wiki_page_id, version.version_number)
+    text, _ = _materialize('wiki', version.wiki_page_id, version, versions, lambda v: v.content)
+    return text
+
+
+def create_wiki_version(page, created_by: int) -> WikiPageVersion:
+    """
+    Legt für den aktuellen Inhalt von `page` eine neue Version an (vor dem Speichern der Änderung).
+
+    Die Version wird als Delta zur vorherigen Version gespeichert, sofern die Kette
+    das Snapshot-Intervall nicht überschreitet und das Delta deutlich kleiner ist.
+    """
+    version = WikiPageVersion(
+        wiki_page_id=page.id,
+        version_number=page.version_number,
+        content=page.content,
+        file_path='',
+        created_by=created_by
+    )
+
+    previous = WikiPageVersion.query.filter(
+        WikiPageVersion.wiki_page_id == page.id,
+        WikiPageVersion.version_number < page.version_number
+    ).order_by(WikiPageVersion.version_number.desc()).first()
+
+    if previous is not None:
+        try:
+            versions = _wiki_versions_by_number(page.id, previous.version_number)
+            base_text, depth = _materialize('wiki', page.id, previous, versions, lambda v: v.content)
+            if depth + 1 < _snapshot_interval():
+                delta = _delta_or_none(base_text, page.content)
+                if delta is not None:
+                    version.content = ''
+                    version.delta = delta
+                    version.base_version_number = previous.version_number
+        except ValueError as e:
+            logger.warning(f"Wiki-Version wird als Snapshot gespeichert: {e}")
+
+    if version.delta is not None:
+        _cache.put(('wiki', page.id, version.version_number), (page.content, depth + 1))
+
+    # Inhalt liegt jetzt in der Datenbank, die bisherige Markdown-Datei wird nicht mehr benötigt
+    mark_blob_unreferenced(page.file_path, subdir='wiki', source='wiki_version')
+    db.session.add(version)
+    return version
+
+
+def prune_wiki_versions(page_id: int, limit: int):
+    """Löscht die ältesten Versionen, bis weniger als `limit` übrig sind (mit Rebase abhängiger Deltas)."""
+    versions = WikiPageVersion.query.filter_by(wiki_page_id=page_id).order_by(
+        WikiPageVersion.version_number.desc()
+    ).all()
+    while versions and len(versions) >= limit:
+        oldest = versions.pop()
+        for dependent in versions:
+            if dependent.delta is not None and dependent.base_version_number == oldest.version_number:
+                dependent.content = get_wiki_version_content(dependent)
+                dependent.delta = None
+                dependent.base_version_number = None
+                _cache.put(('wiki', page_id, dependent.version_number), (dependent.content, 0))
+        mark_blob_unreferenced(oldest.file_path, subdir='wiki', source='wiki_version')
+        db.session.delete(oldest)
+        db.session.flush()
+
+
+def compact_wiki_versions(page_id: int) -> int:
+    """
+    Wandelt vorhandene Vollversionen einer Wiki-Seite in eine Delta-Kette um.
+
+    Wird von der Migration für bestehende Installationen verwendet.
+
+    Returns:
+        Anzahl der in Deltas umgewandelten Versionen
+    """
+    versions = WikiPageVersion.query.filter_by(wiki_page_id=page_id).order_by(
+        WikiPageVersion.version_number
+    ).all()
+    interval = _snapshot_interval()
+    converted = 0
+    previous = None
+    previous_text = None
+    depth = 0
+    for version in versions:
+        text = get_wiki_version_content(version)
+        if version.file_path:
+            mark_blob_unreferenced(version.file_path, subdir='wiki', source='wiki_version')
+            version.file_path = ''
+        if version.delta is None and previous_text is not None and depth + 1 < interval:
+            delta = _delta_or_none(previous_text, text)
+            if delta is not None:
+                version.content = ''
+                version.delta = delta
+                version.base_version_number = previous.version_number
+                converted += 1
+        depth = depth + 1 if version.delta is not None else 0
+        previous, previous_text = version, text
+    return converted
+
+
+def get_wiki_version_diff(version: WikiPageVersion, page) -> List[Tuple[str, str]]:
+    """
+    Änderungen von `version` gegenüber ihrer Vorgängerversion.
+
+    Für Delta-Versionen wird der Diff direkt aus dem gespeicherten Delta abgeleitet.
+    """
+    if version.delta is not None:
+        versions = _wiki_versions_by_number(version.wiki_page_id, version.version_number)
+        base = versions.get(version.base_version_number)
+        if base is None:
+            raise ValueError(f"Basisversion {version.base_version_number} fehlt")
+        base_text, _ = _materialize('wiki', version.wiki_page_id, base, versions, lambda v: v.content)
+        return delta_to_diff(base_text, version.delta)
+
+    previous = WikiPageVersion.query.filter(
+        WikiPageVersion.wiki_page_id == version.wiki_page_id,
+        WikiPageVersion.version_number < version.version_number
+    ).order_by(WikiPageVersion.version_number.desc()).first()
+    previous_text = get_wiki_version_content(previous) if previous else ''
+    return text_diff(previous_text, version.content)
+
+
+# =========================
+# Datei-Versionen
+# =========================
+
+def _read_text_blob(version) -> Optional[str]:
+    """Liest eine vollständig gespeicherte Textversion (None bei Binärdaten)."""
+    key = storage_key(version.file_path)
+    storage = get_storage()
+    if not key or not storage.exists(key) or storage.size(key) > MAX_TEXT_VERSION_SIZE:
+        return None
+    data = read_stored_file(version.file_path)
+    try:
+        return data.decode('utf-8')
+    except UnicodeDecodeError:
+        return None
+
+
+def _file_versions_by_number(file_id):
+    versions = FileVersion.query.filter_by(file_id=file_id).all()
+    return {version.version_number: version for version in versions}
+
+
+def get_file_version_bytes(version: FileVersion) -> Optional[bytes]:
+    """Inhalt einer Dateiversion; Delta-Versionen werden rekonstruiert (None wenn nicht verfügbar)."""
+    if version.delta is None:
+        if stored_file_exists(version.file_path):
+            return read_stored_file(version.file_path)
+        return None
+    versions = _file_versions_by_number(version.file_id)
+    text, _ = _materialize('file', version.file_id, version, versions, _read_text_blob)
+    return text.encode('utf-8')
+
+
+def create_file_version(file: File) -> FileVersion:
+    """
+    Legt für den aktuellen Stand von `file` eine neue Version an (vor dem Ersetzen der Datei).
+
+    Die neue Version übernimmt die bisherige Datei als vollständige Kopie. Bei
+    Textdateien wird die bis dahin neueste Version in ein Rückwärts-Delta gegenüber
+    der neuen Version umgewandelt und ihre Datei zur Löschung vorgemerkt.
+    """
+    version = FileVersion(
+        file_id=file.id,
+        version_number=file.version_number,
+        file_path=path_for_key(storage_key(file.file_path)),
+        file_size=file.file_size,
+        uploaded_by=file.uploaded_by
+    )
+
+    if os.path.splitext(file.original_name)[1].lower() in TEXT_VERSION_EXTENSIONS:
+        older = FileVersion.query.filter(
+            FileVersion.file_id == file.id,
+            FileVersion.version_number < file.version_number
+        ).order_by(FileVersion.version_number.desc()).all()
+        previous = older[0] if older else None
+        if (previous is not None and previous.delta is None
+                and storage_key(previous.file_path) != storage_key(version.file_path)):
+            # Deltas, die bereits über `previous` aufgelöst werden (Kettenlänge danach + 1)
+            depth = 0
+            for older_version in older[1:]:
+                if older_version.delta is None:
+                    break
+                depth += 1
+            if depth + 1 < _snapshot_interval():
+                text = _read_text_blob(version)
+                previous_text = _read_text_blob(previous) if text is not None else None
+                if previous_text is not None:
+                    delta = _delta_or_none(text, previous_text)
+                    if delta is not None:
+                        mark_blob_unreferenced(previous.file_path, source='file_version')
+                        previous.file_path = ''
+                        previous.delta = delta
+                        previous.base_version_number = version.version_number
+                        _cache.put(('file', file.id, version.version_number), (text, 0))
+
+    db.session.add(version)
+    return version
+
+
+def prune_file_versions(file_id: int, limit: int):
+    """
+    Löscht die ältesten Versionen, bis weniger als `limit` übrig sind.
+
+    Rückwärts-Deltas verweisen nur auf neuere Versionen; abhängige Deltas gibt es
+    lediglich bei älteren Vorwärts-Deltas, die dann in vollständige Kopien
+    umgewandelt werden.
+    """
+    versions = FileVersion.query.filter_by(file_id=file_id).order_by(
+        FileVersion.version_number.desc()
+    ).all()
+    while versions and len(versions) >= limit:
+        oldest = versions.pop()
+        for dependent in versions:
+            if dependent.delta is not None and dependent.base_version_number == oldest.version_number:
+                _rebase_file_version(dependent)
+        mark_blob_unreferenced(oldest.file_path, source='file_version')
+        db.session.delete(oldest)
+        db.session.flush()
+
+
+def _rebase_file_version(version: FileVersion):
+    """Wandelt eine (Vorwärts-)Delta-Version in eine vollständige Kopie um."""
+    content = get_file_version_bytes(version)
+    _cache.put(('file', version.file_id, version.version_number), (content.decode('utf-8'), 0))
+    file = File.query.get(version.file_id)
+    timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
+    key = save_upload(content, 'files', f"{timestamp}_v{version.version_number}_{file.original_name}")
+    version.file_path = path_for_key(key)
+    version.delta = None
+    version.base_version_number = None
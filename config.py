@@ -43,6 +43,21 @@ class Config:
     IMAP_USE_SSL = os.environ.get('IMAP_USE_SSL', 'True').lower() == 'true'
     
     UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER', 'uploads')
+    # Speicher für Uploads: 'local' (UPLOAD_FOLDER) oder 's3' (S3-kompatibel, benötigt boto3)
+    STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'local')
+    S3_BUCKET = os.environ.get('S3_BUCKET', '')
+    S3_ENDPOINT_URL = os.environ.get('S3_ENDPOINT_URL') or None
+    S3_REGION = os.environ.get('S3_REGION') or None
+    S3_ACCESS_KEY_ID = os.environ.get('S3_ACCESS_KEY_ID') or None
+    S3_SECRET_ACCESS_KEY = os.environ.get('S3_SECRET_ACCESS_KEY') or None
+    S3_PREFIX = os.environ.get('S3_PREFIX', '')
+    S3_ADDRESSING_STYLE = os.environ.get('S3_ADDRESSING_STYLE', 'auto')
+    # Downloads per Redirect auf zeitlich begrenzte URLs (nur entfernte Backends, Ablauf in Sekunden)
+    STORAGE_PRESIGNED_DOWNLOADS = os.environ.get('STORAGE_PRESIGNED_DOWNLOADS', 'False').lower() == 'true'
+    STORAGE_PRESIGNED_EXPIRY = int(os.environ.get('STORAGE_PRESIGNED_EXPIRY', '300'))
+    # Speicherkontingent pro Benutzer in Bytes (0 = unbegrenzt) und Stunde (UTC) des nächtlichen Abgleichs
+    STORAGE_USER_QUOTA = int(os.environ.get('STORAGE_USER_QUOTA', '0'))
+    STORAGE_USAGE_RECONCILE_HOUR = int(os.environ.get('STORAGE_USAGE_RECONCILE_HOUR', '4'))
     MAX_CONTENT_LENGTH = int(os.environ.get('MAX_CONTENT_LENGTH', 524288000))
     ALLOWED_EXTENSIONS = {'txt', 'pdf', 'png', 'jpg', 'jpeg', 'gif', 'mp4', 'webm', 'ogg', 'mp3', 'wav', 'md', 'doc', 'docx', 'xls', 'xlsx', 'zip', 'rar'}
     
@@ -53,6 +68,65 @@ class Config:
     
     MAX_FILE_VERSIONS = 3
     
+    # Textversionen (Dateien/Wiki) als Delta speichern, alle N Versionen ein Vollsnapshot
+    TEXT_VERSION_SNAPSHOT_INTERVAL = int(os.environ.get('TEXT_VERSION_SNAPSHOT_INTERVAL', 10))
+    TEXT_VERSION_CACHE_SIZE = int(os.environ.get('TEXT_VERSION_CACHE_SIZE', 128))
+    
+    # Verzögertes Löschen nicht mehr referenzierter Dateien
+    BLOB_GC_GRACE_PERIOD = int(os.environ.get('BLOB_GC_GRACE_PERIOD', 3600))
+    BLOB_GC_BATCH_SIZE = int(os.environ.get('BLOB_GC_BATCH_SIZE', 200))
+    BLOB_GC_INTERVAL = int(os.environ.get('BLOB_GC_INTERVAL', 300))
+    BLOB_GC_RECONCILE_HOUR = int(os.environ.get('BLOB_GC_RECONCILE_HOUR', 3))
+    BLOB_GC_RECLAIM_ORPHANS = os.environ.get('BLOB_GC_RECLAIM_ORPHANS', 'False').lower() == 'true'
+    
+    # Volltextsuche im Dateimodul
+    FILE_SEARCH_MAX_CONTENT_CHARS = int(os.environ.get('FILE_SEARCH_MAX_CONTENT_CHARS', 1000000))
+    FILE_SEARCH_SCAN_INTERVAL = int(os.environ.get('FILE_SEARCH_SCAN_INTERVAL', 600))
+    
+    # Datei-Vorschau: gerendertes Markdown im Speicher (Einträge), größere Dateien (Bytes) seitenweise als Text
+    FILE_PREVIEW_CACHE_SIZE = int(os.environ.get('FILE_PREVIEW_CACHE_SIZE', 64))
+    FILE_PREVIEW_MAX_SIZE = int(os.environ.get('FILE_PREVIEW_MAX_SIZE', 2 * 1024 * 1024))
+    FILE_PREVIEW_PAGE_SIZE = int(os.environ.get('FILE_PREVIEW_PAGE_SIZE', 256 * 1024))
+    
+    # Öffentliche Freigabe-Links: aufgelöste Tokens im Speicher (Einträge, Gültigkeit in Sekunden)
+    SHARE_CACHE_SIZE = int(os.environ.get('SHARE_CACHE_SIZE', 1024))
+    SHARE_CACHE_TTL = int(os.environ.get('SHARE_CACHE_TTL', 30))
+    
+    # Inventar-API: Gesamt- und Facettenzahlen je Filterkombination im Speicher (Einträge, Gültigkeit in Sekunden)
+    PRODUCT_COUNT_CACHE_SIZE = int(os.environ.get('PRODUCT_COUNT_CACHE_SIZE', 256))
+    PRODUCT_COUNT_CACHE_TTL = int(os.environ.get('PRODUCT_COUNT_CACHE_TTL', 30))
+    # Inventar-Suche: Ergebnisse je Suchbegriff im Speicher (Einträge, Gültigkeit in Sekunden)
+    PRODUCT_SEARCH_CACHE_SIZE = int(os.environ.get('PRODUCT_SEARCH_CACHE_SIZE', 512))
+    PRODUCT_SEARCH_CACHE_TTL = int(os.environ.get('PRODUCT_SEARCH_CACHE_TTL', 30))
+    # Inventar-Statistik: Gültigkeit der zwischengespeicherten Antwort in Sekunden (0 = kein Cache)
+    INVENTORY_STATS_CACHE_TTL = int(os.environ.get('INVENTORY_STATS_CACHE_TTL', 30))
+    # Inventur-Scans: Abhaken gesammelt alle N Millisekunden schreiben (0 = sofort)
+    INVENTORY_SCAN_FLUSH_INTERVAL = int(os.environ.get('INVENTORY_SCAN_FLUSH_INTERVAL', 250))
+    # Fertige PDFs (z.B. QR-Code-Druckbögen) im PDF-Cache: Anzahl je Dokumentart (0 = kein Cache)
+    PDF_CACHE_MAX_FILES = int(os.environ.get('PDF_CACHE_MAX_FILES', 200))
+    # PDF-Aufträge: Prozesse zum Setzen der Dokumente (0 = CPU-Kerne)
+    PDF_JOB_WORKERS = int(os.environ.get('PDF_JOB_WORKERS', 0))
+    # PDF-Aufträge ohne Ergebnis nach dieser Zeit (Sekunden) als fehlgeschlagen melden
+    PDF_JOB_TIMEOUT = int(os.environ.get('PDF_JOB_TIMEOUT', 300))
+    # QR-Code-Bilder: zuletzt verwendete PNGs im Speicher (Einträge), alle weiteren unter uploads/qr_cache
+    QR_IMAGE_CACHE_SIZE = int(os.environ.get('QR_IMAGE_CACHE_SIZE', 512))
+    
+    # Backup-Import: Datensätze pro Bulk-Insert (bestimmt den Speicherbedarf großer Tabellen)
+    BACKUP_IMPORT_BATCH_SIZE = int(os.environ.get('BACKUP_IMPORT_BATCH_SIZE', 1000))
+    # Ablage serverseitiger Backups (Voll-, inkrementelle und differentielle Backups einer Kette)
+    BACKUP_FOLDER = os.environ.get('BACKUP_FOLDER', 'backups')
+    # Backup-Export: parallel exportierte Kategorien und Deflate-Stufe (0 = unkomprimiert)
+    BACKUP_EXPORT_WORKERS = int(os.environ.get('BACKUP_EXPORT_WORKERS', 4))
+    BACKUP_COMPRESSION_LEVEL = int(os.environ.get('BACKUP_COMPRESSION_LEVEL', 6))
+    # Geplante Backups: täglich zur angegebenen Stunde (UTC), Vollbackup am angegebenen
+    # Wochentag (0 = Montag), sonst BACKUP_SCHEDULE_TYPE; es bleiben die
+    # BACKUP_RETENTION_FULL jüngsten Vollbackups samt Folge-Backups erhalten
+    BACKUP_SCHEDULE_ENABLED = os.environ.get('BACKUP_SCHEDULE_ENABLED', 'False').lower() == 'true'
+    BACKUP_SCHEDULE_HOUR = int(os.environ.get('BACKUP_SCHEDULE_HOUR', 2))
+    BACKUP_SCHEDULE_FULL_WEEKDAY = int(os.environ.get('BACKUP_SCHEDULE_FULL_WEEKDAY', 6))
+    BACKUP_SCHEDULE_TYPE = os.environ.get('BACKUP_SCHEDULE_TYPE', 'incremental')
+    BACKUP_RETENTION_FULL = int(os.environ.get('BACKUP_RETENTION_FULL', 4))
+    
     VAPID_PRIVATE_KEY = os.environ.get('VAPID_PRIVATE_KEY')
     VAPID_PUBLIC_KEY = os.environ.get('VAPID_PUBLIC_KEY')
     
@@ -64,6 +138,11 @@ class Config:
     ONLYOFFICE_DOCUMENT_SERVER_URL = os.environ.get('ONLYOFFICE_DOCUMENT_SERVER_URL', '/onlyoffice')
     ONLYOFFICE_SECRET_KEY = os.environ.get('ONLYOFFICE_SECRET_KEY', '')
     ONLYOFFICE_PUBLIC_URL = os.environ.get('ONLYOFFICE_PUBLIC_URL', '')
+    # Gestreamter Download gespeicherter Dokumente (Timeouts in Sekunden, Größen in Bytes, 0 = unbegrenzt)
+    ONLYOFFICE_CONNECT_TIMEOUT = float(os.environ.get('ONLYOFFICE_CONNECT_TIMEOUT', '5'))
+    ONLYOFFICE_READ_TIMEOUT = float(os.environ.get('ONLYOFFICE_READ_TIMEOUT', '60'))
+    ONLYOFFICE_DOWNLOAD_CHUNK_SIZE = int(os.environ.get('ONLYOFFICE_DOWNLOAD_CHUNK_SIZE', str(1024 * 1024)))
+    ONLYOFFICE_MAX_DOWNLOAD_SIZE = int(os.environ.get('ONLYOFFICE_MAX_DOWNLOAD_SIZE', '0'))
     
     EXCALIDRAW_ENABLED = os.environ.get('EXCALIDRAW_ENABLED', 'False').lower() == 'true'
     EXCALIDRAW_URL = os.environ.get('EXCALIDRAW_URL', '/excalidraw')
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Datenbank-Migration: Version 2.3
+Performance-Erweiterungen für bestehende Installationen
+
+Diese Migration ergänzt bestehende Tabellen um neue Spalten und Indizes und
+füllt abgeleitete Daten nach. Sie deckt folgende Änderungen ab:
+
+1. Materialisierte Ordner-Hierarchie (`folders.tree_path`, `folders.depth`)
+2. Delta-Speicherung für Textversionen (`file_versions.delta`,
+   `wiki_page_versions.delta`, jeweils mit `base_version_number`)
+3. Speicherverbrauchs-Zähler (`chat_messages.media_size`, Tabelle
+   `storage_usage` wird aus den bestehenden Daten befüllt)
+4. Token-Index für öffentliche Freigaben (Tabelle `shares` wird aus den
+   `share_*`-Spalten von Dateien und Ordnern befüllt)
+5. Numerische Produktlänge (`products.length_meters`, aus `length` berechnet)
+6. Tägliche Ausleihzahlen (Tabelle `inventory_daily_stats` wird aus den
+   Ausleihen befüllt, Indizes auf den Datumsspalten von `borrow_transactions`)
+7. Fortschrittszähler für Inventuren (`inventories.items_total`,
+   `inventories.items_checked`, `inventories.event_seq`, aus den Items gezählt)
+
+WICHTIG: Die Felder und Tabellen sind in den SQLAlchemy-Modellen bereits
+definiert. Bei Neuinstallationen genügt weiterhin `db.create_all()`.
+Dieses Skript richtet sich ausschließlich an bestehende Installationen.
+"""
+
+import os
+import sys
+import importlib.util
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault('RUNNING_MIGRATION_2_3', '1')
+os.environ.setdefault('PRISMATEAMS_SKIP_BACKGROUND_JOBS', '1')
+
+from app import create_app, db
+from sqlalchemy import inspect
+
+
+def _load_migration_helpers():
+    """Lädt `migrate_table` aus der 2.2-Migration (Dateiname enthält Punkte)."""
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrate_to_2.2.0.py')
+    spec = importlib.util.spec_from_file_location('migrate_to_2_2_0', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+migrate_table = _load_migration_helpers().migrate_table
+
+
+def migrate_folder_tree():
+    """Fügt den materialisierten Ordnerpfad hinzu und füllt ihn für alle Ordner."""
+    print("\n1. Materialisierte Ordner-Hierarchie für 'folders'...")
+    fields_config = {
+        'tree_path': ('VARCHAR(1000)', None, True),
+        'depth': ('INTEGER', '0', False),
+    }
+    create_indexes = [('ix_folders_tree_path', 'tree_path', False)]
+    if not migrate_table('folders', fields_config, create_indexes):
+        return False
+
+    from app.models.file import Folder
+    count = Folder.rebuild_tree_paths()
+    db.session.commit()
+    print(f"  ✓ Pfade für {count} Ordner berechnet")
+    return True
+
+
+def migrate_version_deltas():
+    """Fügt die Delta-Spalten für Versionen hinzu und komprimiert bestehende Wiki-Historien."""
+    print("\n2. Delta-Speicherung für 'file_versions' und 'wiki_page_versions'...")
+    fields_config = {
+        'delta': ('TEXT', None, True),
+        'base_version_number': ('INTEGER', None, True),
+    }
+    if db.engine.dialect.name in ('mysql', 'mariadb'):
+        file_fields_config = dict(fields_config, delta=('MEDIUMTEXT', None, True))
+    else:
+        file_fields_config = fields_config
+    if not migrate_table('file_versions', file_fields_config, []):
+        return False
+    if not migrate_table('wiki_page_versions', fields_config, []):
+        return False
+
+    from app.models.wiki import WikiPage
+    from app.utils.version_storage import compact_wiki_versions
+    converted = 0
+    for (page_id,) in db.session.query(WikiPage.id).all():
+        converted += compact_wiki_versions(page_id)
+        db.session.commit()
+    print(f"  ✓ {converted} Wiki-Versionen als Delta gespeichert")
+    return True
+
+
+def migrate_storage_usage():
+    """Ergänzt die Mediengröße von Chat-Nachrichten und befüllt die Verbrauchszähler."""
+    print("\n3. Speicherverbrauchs-Zähler...")
+    if not migrate_table('chat_messages', {'media_size': ('BIGINT', None, True)}, []):
+        return False
+
+    from app.utils.storage_usage import reconcile_storage_usage
+    report = reconcile_storage_usage()
+    print(f"  ✓ {report['counters']} Zähler berechnet, {report['chat_media_backfilled']} Mediengrößen ergänzt")
+    return True
+
+
+def migrate_share_index():
+    """Übernimmt bestehende Datei- und Ordnerfreigaben in den Token-Index."""
+    print("\n4. Token-Index für Freigaben...")
+    from app.utils.share_index import rebuild_share_index
+    count = rebuild_share_index()
+    db.session.commit()
+    print(f"  ✓ {count} Freigaben indiziert")
+    return True
+
+
+def migrate_product_lengths():
+    """Fügt die numerische Länge für Produkte hinzu und berechnet sie aus den Längenangaben."""
+    print("\n5. Numerische Länge für 'products'...")
+    fields_config = {'length_meters': ('DOUBLE', None, True)}
+    create_indexes = [('ix_products_length_meters', 'length_meters', False)]
+    if not migrate_table('products', fields_config, create_indexes):
+        return False
+
+    from app.models.inventory import Product
+    count = Product.backfill_length_meters()
+    db.session.commit()
+    print(f"  ✓ {count} unterschiedliche Längenangaben umgerechnet")
+    return True
+
+
+def migrate_inventory_stats():
+    """Legt die Datumsindizes der Ausleihen an und berechnet die täglichen Ausleihzahlen."""
+    print("\n6. Tägliche Ausleihzahlen für die Inventar-Statistik...")
+    from app.models.inventory import BorrowTransaction, InventoryDailyStat
+    InventoryDailyStat.__table__.create(db.engine, checkfirst=True)
+
+    existing_indexes = {idx['name'] for idx in inspect(db.engine).get_indexes('borrow_transactions')}
+    for index in BorrowTransaction.__table__.indexes:
+        if index.name not in existing_indexes:
+            index.create(db.engine)
+            print(f"  ✓ Index {index.name} erstellt")
+
+    from app.utils.inventory_stats import close_inventory_stats
+    report = close_inventory_stats(rebuild=True)
+    print(f"  ✓ {report['rows']} Tageszeilen bis {report['through']} berechnet")
+    return True
+
+
+def migrate_inventory_progress():
+    """Fügt die Fortschrittszähler für Inventuren hinzu und zählt sie aus den Items."""
+    print("\n7. Fortschrittszähler für 'inventories'...")
+    fields_config = {
+        'items_total': ('INTEGER', '0', False),
+        'items_checked': ('INTEGER', '0', False),
+        'event_seq': ('INTEGER', '0', False),
+    }
+    if not migrate_table('inventories', fields_config, []):
+        return False
+
+    from app.utils.inventory_count import recount_inventory_progress
+    count = recount_inventory_progress()
+    db.session.commit()
+    print(f"  ✓ Fortschritt für {count} Inventuren gezählt")
+    return True
+
+
+def verify_migration():
+    """Prüft, ob alle neuen Spalten vorhanden sind."""
+    print("\nVerifiziere Migration...")
+    inspector = inspect(db.engine)
+    table_names = inspector.get_table_names()
+
+    checks = [
+        ('folders', ['tree_path', 'depth']),
+        ('file_versions', ['delta', 'base_version_number']),
+        ('wiki_page_versions', ['delta', 'base_version_number']),
+        ('chat_messages', ['media_size']),
+        ('shares', ['token', 'item_type', 'item_id', 'password_hash', 'expires_at']),
+        ('products', ['length_meters']),
+        ('inventory_daily_stats', ['day', 'product_id', 'borrowed', 'returned', 'overdue']),
+        ('inventories', ['items_total', 'items_checked', 'event_seq']),
+    ]
+
+    all_success = True
+    for table_name, required_fields in checks:
+        if table_name not in table_names:
+            print(f"  ⚠ Tabelle '{table_name}' existiert nicht (wird ggf. später erstellt)")
+            all_success = False
+            continue
+
+        columns = {col['name'] for col in inspector.get_columns(table_name)}
+        missing_fields = [field for field in required_fields if field not in columns]
+        if missing_fields:
+            print(f"  ❌ Warnung: In '{table_name}' fehlen noch: {missing_fields}")
+            all_success = False
+        else:
+            print(f"  ✓ '{table_name}': Alle Felder vorhanden")
+
+    print("\n" + "=" * 60)
+    if all_success:
+        print("Migration erfolgreich abgeschlossen!")
+    else:
+        print("Migration abgeschlossen mit Warnungen!")
+    print("=" * 60)
+    return all_success
+
+
+def migrate():
+    """Führt alle Migrationen aus."""
+    print("=" * 60)
+    print("Migration zu Version 2.3")
+    print("=" * 60)
+
+    app = create_app(os.getenv('FLASK_ENV', 'development'))
+
+    with app.app_context():
+        try:
+            if not migrate_folder_tree():
+                print("❌ Migration für 'folders' fehlgeschlagen!")
+                return False
+
+            if not migrate_version_deltas():
+                print("❌ Migration für Versionen fehlgeschlagen!")
+                return False
+
+            if not migrate_storage_usage():
+                print("❌ Migration für Speicherverbrauch fehlgeschlagen!")
+                return False
+
+            if not migrate_share_index():
+                print("❌ Migration für Freigaben fehlgeschlagen!")
+                return False
+
+            if not migrate_product_lengths():
+                print("❌ Migration für 'products' fehlgeschlagen!")
+                return False
+
+            if not migrate_inventory_stats():
+                print("❌ Migration für die Inventar-Statistik fehlgeschlagen!")
+                return False
+
+            if not migrate_inventory_progress():
+                print("❌ Migration für 'inventories' fehlgeschlagen!")
+                return False
+
+            return verify_migration()
+
+        except Exception as exc:  # pylint: disable=broad-except
+            print(f"\n❌ Fehler bei der Migration: {exc}")
+            import traceback
+            traceback.print_exc()
+            return False
+
+
+if __name__ == '__main__':
+    success = migrate()
+    sys.exit(0 if success else 1)
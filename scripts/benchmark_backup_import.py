@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Benchmark für den Backup-Import
+
+Erzeugt ein synthetisches Backup-Archiv (Benutzer, Chats, E-Mails, Dateien mit
+Inhalten, Inventar) und importiert es in eine leere Wegwerf-Datenbank. Gemessen
+werden Laufzeit, Durchsatz (Datensätze/s) sowie der Spitzen-Speicherbedarf
+(Python-Allokationen per tracemalloc und maximale RSS des Prozesses).
+
+    python scripts/benchmark_backup_import.py
+    python scripts/benchmark_backup_import.py --messages 500000 --files 20000 --batch-size 2000
+    python scripts/benchmark_backup_import.py --archive /pfad/zu/backup.prismateams
+
+Die Datenbank (Standard: SQLite im Arbeitsverzeichnis) und das Upload-Verzeichnis
+werden in einem temporären Verzeichnis angelegt und anschließend gelöscht.
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import resource
+import tempfile
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('PRISMATEAMS_SKIP_BACKGROUND_JOBS', '1')
+
+
+def generate_archive(path, users, messages, files, file_size, emails, products):
+    """Schreibt ein synthetisches Backup mit der angegebenen Anzahl an Datensätzen."""
+    from app.utils.backup_archive import BackupArchiveWriter
+
+    now = datetime.utcnow()
+    user_emails = [f'benutzer{i}@example.com' for i in range(users)]
+
+    def user_email(i):
+        return user_emails[i % users]
+
+    def content(i):
+        # Unterschiedliche Inhalte, damit die Deduplizierung nicht greift
+        return (f'Datei {i}\n'.encode('utf-8') * (file_size // 8 + 1))[:file_size]
+
+    with BackupArchiveWriter(path, ['all']) as archive:
+        archive.write_table('users', ({
+            'email': email,
+            'first_name': 'Benutzer',
+            'last_name': str(i),
+            'password_hash': 'pbkdf2:sha256:benchmark',
+            'is_active': True,
+            'is_email_confirmed': True,
+        } for i, email in enumerate(user_emails)))
+
+        archive.write_table('chats', [{
+            'name': 'Benchmark-Chat',
+            'created_by_email': user_email(0),
+            'is_main_chat': True,
+        }])
+        archive.write_table('chat_members', ({
+            'chat_name': 'Benchmark-Chat',
+            'user_email': email,
+        } for email in user_emails))
+        archive.write_table('chat_messages', ({
+            'chat_name': 'Benchmark-Chat',
+            'sender_email': user_email(i),
+            'content': f'Nachricht {i}',
+            'message_type': 'text',
+            'created_at': (now - timedelta(seconds=messages - i)).isoformat(),
+        } for i in range(messages)))
+
+        archive.write_table('emails', ({
+            'message_id': f'<benchmark-{i}@example.com>',
+            'subject': f'Betreff {i}',
+            'sender': user_email(i),
+            'recipients': '[]',
+            'body_text': 'Hallo\n' * 20,
+            'folder': 'INBOX',
+            'received_at': now.isoformat(),
+        } for i in range(emails)))
+        archive.write_table('email_attachments', ({
+            'email_message_id': f'<benchmark-{i}@example.com>',
+            'filename': f'anhang{i}.txt',
+            'content_type': 'text/plain',
+            'size': file_size,
+            'content_blob': archive.add_bytes(content(-i - 1)),
+        } for i in range(0, emails, 10)))
+
+        archive.write_table('folders', [{
+            'name': f'Ordner {i}',
+            'created_by_email': user_email(i),
+        } for i in range(10)])
+        archive.write_table('files', ({
+            'name': f'datei{i}.txt',
+            'original_name': f'datei{i}.txt',
+            'folder_name': f'Ordner {i % 10}',
+            'uploaded_by_email': user_email(i),
+            'file_size': file_size,
+            'mime_type': 'text/plain',
+            'content_blob': archive.add_bytes(content(i)),
+        } for i in range(files)))
+
+        archive.write_table('product_folders', [{'name': 'Benchmark', 'created_by_email': user_email(0)}])
+        archive.write_table('products', ({
+            'name': f'Produkt {i}',
+            'category': 'Benchmark',
+            'folder_name': 'Benchmark',
+            'status': 'available',
+            'created_by_email': user_email(i),
+        } for i in range(products)))
+        archive.write_table('borrow_transactions', ({
+            'transaction_number': f'BM-{i:08d}',
+            'product_name': f'Produkt {i}',
+            'borrower_email': user_email(i),
+            'borrowed_by_email': user_email(i + 1),
+            'borrow_date': now.isoformat(),
+            'expected_return_date': (now + timedelta(days=7)).isoformat(),
+            'status': 'active',
+        } for i in range(products)))
+        archive.write_table('inventories', [{
+            'name': 'Benchmark-Inventur',
+            'started_by_email': user_email(0),
+            'status': 'active',
+        }])
+        archive.write_table('inventory_items', ({
+            'inventory_name': 'Benchmark-Inventur',
+            'product_name': f'Produkt {i}',
+            'checked': i % 2 == 0,
+            'checked_by_email': user_email(i),
+        } for i in range(products)))
+
+    return archive.tables
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Misst Durchsatz und Speicherbedarf des Backup-Imports.')
+    parser.add_argument('--archive', help='Vorhandenes Backup importieren statt eines synthetischen')
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--messages', type=int, default=100000)
+    parser.add_argument('--files', type=int, default=5000)
+    parser.add_argument('--file-size', type=int, default=16 * 1024, help='Bytes pro Datei')
+    parser.add_argument('--emails', type=int, default=20000)
+    parser.add_argument('--products', type=int, default=10000)
+    parser.add_argument('--batch-size', type=int, default=None, help='BACKUP_IMPORT_BATCH_SIZE')
+    parser.add_argument('--database-uri', default=None, help='Leere Zieldatenbank (Standard: temporäres SQLite)')
+    parser.add_argument('--keep', action='store_true', help='Temporäres Verzeichnis nicht löschen')
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='prismateams-benchmark-')
+    os.environ['UPLOAD_FOLDER'] = os.path.join(work_dir, 'uploads')
+    os.environ['DATABASE_URI'] = args.database_uri or f"sqlite:///{os.path.join(work_dir, 'benchmark.db')}"
+    if args.batch_size:
+        os.environ['BACKUP_IMPORT_BATCH_SIZE'] = str(args.batch_size)
+
+    import config
+    if os.environ['DATABASE_URI'].startswith('sqlite'):
+        # Pool- und MySQL-Verbindungsoptionen gelten nicht für SQLite
+        config.Config.SQLALCHEMY_ENGINE_OPTIONS = {}
+
+    from app import create_app, db
+    from app.utils.backup import import_backup
+
+    try:
+        app = create_app('production')
+        with app.app_context():
+            db.create_all()
+
+            archive_path = args.archive
+            if not archive_path:
+                archive_path = os.path.join(work_dir, 'benchmark.prismateams')
+                print('Erzeuge synthetisches Backup ...')
+                started = time.perf_counter()
+                tables = generate_archive(archive_path, args.users, args.messages, args.files,
+                                          args.file_size, args.emails, args.products)
+                print(f"  {sum(t['rows'] for t in tables.values())} Datensätze, "
+                      f"{os.path.getsize(archive_path) / (1024 * 1024):.1f} MB "
+                      f"in {time.perf_counter() - started:.1f} s")
+
+            rows = {}
+
+            def progress(table, done, total):
+                rows[table] = done
+
+            print(f"Importiere {archive_path} (Blockgröße {app.config['BACKUP_IMPORT_BATCH_SIZE']}) ...")
+            tracemalloc.start()
+            started = time.perf_counter()
+            result = import_backup(archive_path, ['all'], None, progress=progress)
+            elapsed = time.perf_counter() - started
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+        if not result['success']:
+            print(f"Import fehlgeschlagen: {result.get('error')}")
+            return 1
+
+        # ru_maxrss: Kilobyte unter Linux, Byte unter macOS
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if sys.platform != 'darwin':
+            max_rss *= 1024
+
+        total_rows = sum(rows.values())
+        print(f"Datensätze:        {total_rows}")
+        print(f"Laufzeit:          {elapsed:.1f} s")
+        print(f"Durchsatz:         {total_rows / elapsed:.0f} Datensätze/s")
+        print(f"Spitze (Python):   {peak / (1024 * 1024):.1f} MB")
+        print(f"Spitze (RSS):      {max_rss / (1024 * 1024):.1f} MB")
+        for table, count in sorted(rows.items(), key=lambda item: -item[1])[:10]:
+            print(f"  {table}: {count}")
+        return 0
+    finally:
+        if args.keep:
+            print(f"Arbeitsverzeichnis: {work_dir}")
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
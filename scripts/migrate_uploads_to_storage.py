@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Kopiert das lokale uploads/-Verzeichnis in das konfigurierte Storage-Backend
+
+Vor dem Umstellen auf STORAGE_BACKEND=s3 einmalig ausführen (mit bereits gesetzten
+S3_*-Variablen). Objekte, die im Ziel bereits mit gleicher Größe existieren, werden
+übersprungen; der Lauf kann daher jederzeit wiederholt werden:
+    python scripts/migrate_uploads_to_storage.py            # kopieren
+    python scripts/migrate_uploads_to_storage.py --dry-run  # nur anzeigen
+"""
+
+import os
+import sys
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('PRISMATEAMS_SKIP_BACKGROUND_JOBS', '1')
+
+# Abgeleitete Daten, die bei Bedarf neu erzeugt werden
+SKIPPED_SUBDIRS = ('preview_cache',)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Kopiert uploads/ in das konfigurierte Storage-Backend.')
+    parser.add_argument('--dry-run', action='store_true', help='Nur anzeigen, nichts kopieren')
+    args = parser.parse_args()
+
+    from app import create_app
+    from app.utils.storage import get_storage, get_upload_root
+
+    app = create_app(os.getenv('FLASK_ENV', 'production'))
+    with app.app_context():
+        storage = get_storage()
+        if storage.name == 'local':
+            print("STORAGE_BACKEND ist 'local', es gibt nichts zu kopieren.")
+            return 1
+
+        root = get_upload_root()
+        copied = skipped = failed = 0
+        copied_bytes = 0
+        for dirpath, dirnames, filenames in os.walk(root):
+            if dirpath == root:
+                dirnames[:] = [d for d in dirnames if d not in SKIPPED_SUBDIRS]
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                key = os.path.relpath(path, root).replace(os.sep, '/')
+                size = os.path.getsize(path)
+                try:
+                    if storage.exists(key) and storage.size(key) == size:
+                        skipped += 1
+                        continue
+                    if not args.dry_run:
+                        storage.save_local_file(key, path)
+                    copied += 1
+                    copied_bytes += size
+                    print(f"  + {key}")
+                except Exception as e:
+                    failed += 1
+                    print(f"  ! {key}: {e}")
+
+        action = 'Zu kopieren' if args.dry_run else 'Kopiert'
+        print(f"{action}: {copied} Dateien ({copied_bytes / (1024*1024):.1f} MB)")
+        print(f"Bereits vorhanden: {skipped}")
+        if failed:
+            print(f"Fehlgeschlagen: {failed}")
+        return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Abgleich des uploads/-Verzeichnisses mit den Datenbank-Referenzen
+
+Meldet verwaiste Dateien und entfernt sie optional:
+    python scripts/reconcile_uploads.py            # nur Bericht
+    python scripts/reconcile_uploads.py --reclaim  # verwaiste Dateien löschen
+"""
+
+import os
+import sys
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('PRISMATEAMS_SKIP_BACKGROUND_JOBS', '1')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Gleicht uploads/ mit den Datenbank-Referenzen ab.')
+    parser.add_argument('--reclaim', action='store_true', help='Verwaiste Dateien löschen')
+    parser.add_argument('--min-age', type=int, default=None,
+                        help='Mindestalter verwaister Dateien in Sekunden (Standard: BLOB_GC_GRACE_PERIOD)')
+    args = parser.parse_args()
+
+    from app import create_app
+    from app.utils.blob_gc import reconcile_upload_tree, collect_pending_blobs
+
+    app = create_app(os.getenv('FLASK_ENV', 'production'))
+    with app.app_context():
+        report = reconcile_upload_tree(reclaim=args.reclaim, min_age_seconds=args.min_age)
+
+        print(f"Geprüfte Dateien: {report['scanned']}")
+        print(f"Verwaiste Dateien: {len(report['orphans'])} ({report['orphan_bytes'] / (1024*1024):.1f} MB)")
+        for path in report['orphans'][:50]:
+            print(f"  - {path}")
+        if len(report['orphans']) > 50:
+            print(f"  ... und {len(report['orphans']) - 50} weitere")
+
+        if args.reclaim:
+            stats = collect_pending_blobs(grace_period_seconds=0)
+            print(f"Gelöscht: {stats['deleted']}, fehlgeschlagen: {stats['failed']}")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())